@@ -3,22 +3,32 @@
 ## Copyright 2025 FIAP Team
 ## Licensed under the Apache License, Version 2.0
 
-from .agent import b2shift_root_agent
-from .sub_agents import cluster_agent, data_agent, decision_agent
-from .tools import (
-    analyze_customer_clusters,
-    generate_business_strategies,
-    evaluate_cluster_quality,
-    predict_customer_behavior
-)
-from .models import CustomerProfile, ClusterResult, BusinessStrategy
+# Os atributos públicos são resolvidos sob demanda (PEP 562): importar o
+# pacote não carrega google-adk/genai nem constrói os agentes. Cada nome é
+# importado apenas no primeiro acesso e então fica em cache no módulo.
+
+import importlib
 
 __version__ = "0.1.0"
 __author__ = "FIAP Data Science Team"
 
+_LAZY_ATTRIBUTES = {
+    "b2shift_root_agent": ".agent",
+    "cluster_agent": ".sub_agents",
+    "data_agent": ".sub_agents",
+    "decision_agent": ".sub_agents",
+    "analyze_customer_clusters": ".tools",
+    "generate_business_strategies": ".tools",
+    "evaluate_cluster_quality": ".tools",
+    "predict_customer_behavior": ".tools",
+    "CustomerProfile": ".models",
+    "ClusterResult": ".models",
+    "BusinessStrategy": ".models",
+}
+
 __all__ = [
     "b2shift_root_agent",
-    "cluster_agent", 
+    "cluster_agent",
     "data_agent",
     "decision_agent",
     "analyze_customer_clusters",
@@ -26,6 +36,20 @@ __all__ = [
     "evaluate_cluster_quality",
     "predict_customer_behavior",
     "CustomerProfile",
-    "ClusterResult", 
+    "ClusterResult",
     "BusinessStrategy"
 ]
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
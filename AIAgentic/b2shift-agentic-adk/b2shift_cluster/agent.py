@@ -9,29 +9,20 @@ O agente utiliza machine learning para identificar padrões de comportamento de
 B2B e gera recomendações personalizadas para cada segmento identificado.
 """
 
+import importlib.util
 import os
 from datetime import date
-from typing import Dict, Any
+from typing import Dict, Any, TYPE_CHECKING
 
-from google.genai import types
-from google.adk.agents import Agent
-from google.adk.agents.callback_context import CallbackContext
-from google.adk.tools import load_artifacts
-
-from .sub_agents import cluster_agent, data_agent, decision_agent
 from .prompts import return_instructions_root
-from .tools import (
-    call_data_agent,
-    call_cluster_agent, 
-    call_decision_agent,
-    analyze_customer_clusters,
-    generate_business_strategies
-)
+
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
 
 date_today = date.today()
 
 
-def setup_b2shift_context(callback_context: CallbackContext):
+def setup_b2shift_context(callback_context: "CallbackContext"):
     """
     Configura o contexto específico do B2Shift antes da execução do agente.
     
@@ -158,51 +149,178 @@ def setup_b2shift_context(callback_context: CallbackContext):
     )
 
 
-# Agente principal B2Shift
-b2shift_root_agent = Agent(
-    model=os.getenv("ROOT_AGENT_MODEL", "gemini-1.5-pro"),
-    name="b2shift_cluster_agent",
-    instruction=return_instructions_root(),
-    global_instruction=(
-        f"""
-        Você é o B2Shift Customer Clustering and Decision Agent da TOTVS.
-        
-        Sua missão é analisar dados de clientes B2B para identificar clusters comportamentais
-        significativos e gerar estratégias de negócio personalizadas para cada segmento.
-        
-        Capacidades principais:
-        1. Análise avançada de clusterização de clientes B2B
-        2. Identificação de padrões comportamentais e de negócio
-        3. Geração de insights estratégicos por segmento
-        4. Recomendações de ações comerciais e de produto
-        5. Predição de comportamentos futuros de clientes
-        
-        Contexto: TOTVS B2Shift - Transformação Digital B2B
-        Data de hoje: {date_today}
-        
-        Sempre priorize:
-        - Qualidade dos clusters (alta separação, baixa variância intra-cluster)
-        - Insights acionáveis para equipes comerciais e de produto
-        - ROI demonstrável das recomendações
-        - Explicabilidade das decisões tomadas
-        """
-    ),
-    sub_agents=[cluster_agent, data_agent, decision_agent],
-    tools=[
+def _text_of(content) -> str:
+    if content is None or not content.parts:
+        return ""
+    return "".join(part.text or "" for part in content.parts if not getattr(part, "thought", False))
+
+
+def serve_cached_answer(callback_context: "CallbackContext"):
+    """
+    Responde pelo cache semântico quando uma pergunta similar já foi
+    respondida com os mesmos dados e modelos.
+
+    Retornar conteúdo encerra a invocação sem acionar os sub-agentes; a
+    resposta traz o indicador de cache e ``state["semantic_cache"]``
+    registra o acerto.
+    """
+    from .runtime.semantic_cache import cache_scope, format_cached_answer, get_semantic_cache
+
+    cache = get_semantic_cache()
+    query = _text_of(callback_context.user_content)
+    if cache is None or not query.strip():
+        return None
+
+    hit = cache.lookup(query, cache_scope())
+    if hit is None:
+        callback_context.state["semantic_cache"] = {"hit": False}
+        return None
+
+    from google.genai import types
+
+    callback_context.state["semantic_cache"] = {
+        "hit": True,
+        "similarity": round(hit.similarity, 4),
+        "cached_query": hit.cached_query,
+        "age_seconds": round(hit.age_seconds, 1),
+    }
+    return types.Content(role="model", parts=[types.Part(text=format_cached_answer(hit))])
+
+
+def store_answer_in_cache(callback_context: "CallbackContext"):
+    """
+    Guarda no cache semântico a resposta final desta invocação.
+    """
+    from .runtime.semantic_cache import cache_scope, get_semantic_cache
+
+    cache = get_semantic_cache()
+    query = _text_of(callback_context.user_content)
+    if cache is None or not query.strip():
+        return None
+
+    invocation = callback_context._invocation_context
+    answer = ""
+    for event in reversed(invocation.session.events):
+        if event.invocation_id != invocation.invocation_id:
+            break
+        if event.author == invocation.agent.name and event.is_final_response():
+            answer = _text_of(event.content)
+            if answer.strip():
+                break
+    # Respostas de erro das ferramentas não são reaproveitadas
+    if answer.strip() and not answer.lstrip().startswith("❌"):
+        cache.store(query, answer, cache_scope())
+    return None
+
+
+def bound_conversation_context(callback_context: "CallbackContext", llm_request):
+    """
+    Mantém o histórico enviado ao modelo dentro do orçamento de tokens:
+    turnos recentes na íntegra, turnos antigos resumidos e saídas grandes
+    de ferramentas trocadas por handles (ver ``runtime.context``).
+    """
+    from .runtime.context import get_context_window
+
+    stats = get_context_window().apply(llm_request, session=callback_context.session.id)
+    callback_context.state["context_window"] = stats.to_dict()
+    return None
+
+
+def create_root_agent():
+    """
+    Constrói o agente principal B2Shift com seus sub-agentes e ferramentas.
+
+    google-adk/genai, os sub-agentes e as ferramentas são importados apenas
+    aqui. O atributo ``b2shift_root_agent`` guarda a instância compartilhada,
+    construída no primeiro acesso.
+    """
+    from google.genai import types
+    from google.adk.agents import Agent
+    from google.adk.tools import load_artifacts
+
+    from .runtime.models import limited_model
+    from .sub_agents import cluster_agent, data_agent, decision_agent
+    from .tools import (
+        call_data_agent,
+        call_cluster_agent,
+        call_decision_agent,
+        analyze_customer_clusters,
+        generate_business_strategies,
+        query_customer_data,
+        recall_context,
+    )
+
+    tools = [
         call_data_agent,
         call_cluster_agent,
         call_decision_agent,
         analyze_customer_clusters,
         generate_business_strategies,
-        load_artifacts,
-    ],
-    before_agent_callback=setup_b2shift_context,
-    generate_content_config=types.GenerateContentConfig(
-        temperature=0.1,  # Baixa temperatura para decisões mais consistentes
-        top_p=0.9,
-        max_output_tokens=4096
-    ),
-)
+    ]
+    # A camada de dados requer pyarrow (extra "arrow"); sem ele a
+    # ferramenta só devolveria erro
+    if importlib.util.find_spec("pyarrow") is not None:
+        tools.append(query_customer_data)
+    tools += [recall_context, load_artifacts]
+
+    return Agent(
+        model=limited_model(os.getenv("ROOT_AGENT_MODEL", "gemini-1.5-pro")),
+        name="b2shift_cluster_agent",
+        instruction=return_instructions_root(),
+        global_instruction=(
+            f"""
+            Você é o B2Shift Customer Clustering and Decision Agent da TOTVS.
+        
+            Sua missão é analisar dados de clientes B2B para identificar clusters comportamentais
+            significativos e gerar estratégias de negócio personalizadas para cada segmento.
+        
+            Capacidades principais:
+            1. Análise avançada de clusterização de clientes B2B
+            2. Identificação de padrões comportamentais e de negócio
+            3. Geração de insights estratégicos por segmento
+            4. Recomendações de ações comerciais e de produto
+            5. Predição de comportamentos futuros de clientes
+        
+            Contexto: TOTVS B2Shift - Transformação Digital B2B
+            Data de hoje: {date_today}
+        
+            Sempre priorize:
+            - Qualidade dos clusters (alta separação, baixa variância intra-cluster)
+            - Insights acionáveis para equipes comerciais e de produto
+            - ROI demonstrável das recomendações
+            - Explicabilidade das decisões tomadas
+            """
+        ),
+        sub_agents=[cluster_agent, data_agent, decision_agent],
+        tools=tools,
+        before_agent_callback=[setup_b2shift_context, serve_cached_answer],
+        after_agent_callback=store_answer_in_cache,
+        before_model_callback=bound_conversation_context,
+        generate_content_config=types.GenerateContentConfig(
+            temperature=0.1,  # Baixa temperatura para decisões mais consistentes
+            top_p=0.9,
+            max_output_tokens=4096
+        ),
+    )
+
+
+def get_root_agent():
+    """
+    Retorna a instância compartilhada do agente principal, construindo-a no
+    primeiro uso.
+    """
+    agent = globals().get("b2shift_root_agent")
+    if agent is None:
+        agent = create_root_agent()
+        globals()["b2shift_root_agent"] = agent
+    return agent
+
+
+def __getattr__(name: str):
+    # Agente principal construído no primeiro acesso (PEP 562)
+    if name == "b2shift_root_agent":
+        return get_root_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def main():
@@ -221,9 +339,12 @@ def main():
                        help="Modo de operação do agente")
     
     args = parser.parse_args()
+
+    # Construído só depois do parse: `--help` não paga o custo do google-adk
+    root_agent = get_root_agent()
     
     async def run_agent():
-        response = await b2shift_root_agent.send_message_async(args.query)
+        response = await root_agent.send_message_async(args.query)
         print("\n" + "="*80)
         print("B2SHIFT CUSTOMER CLUSTERING ANALYSIS")
         print("="*80)
@@ -0,0 +1,52 @@
+# Motores analíticos do B2Shift Customer Clustering Agent
+
+# Implementações numéricas (numpy/scikit-learn) usadas pelas ferramentas e
+# pelos sub-agentes. Como no pacote principal, os nomes públicos são
+# resolvidos sob demanda (PEP 562) para não carregar scikit-learn no import.
+
+import importlib
+
+_LAZY_ATTRIBUTES = {
+    "ClusteringArtifact": ".artifact",
+    "NeighborIndex": ".neighbors",
+    "lookalike_audience": ".neighbors",
+    "knn_outlier_scores": ".neighbors",
+    "BehaviorScorer": ".scoring",
+    "ClusterPriors": ".scoring",
+    "DensityClusterer": ".density",
+    "DensityResult": ".density",
+    "MicroClusterHierarchy": ".hierarchical",
+    "PreprocessingCache": ".preprocessing",
+    "PreprocessedMatrix": ".preprocessing",
+    "ReducedPCA": ".decomposition",
+    "reduce_matrix": ".decomposition",
+    "column_statistics": ".feature_selection",
+    "select_features": ".feature_selection",
+    "iqr_bounds": ".feature_selection",
+    "UsageRollup": ".usage",
+    "rollup_usage": ".usage",
+    "ColumnSketch": ".sketches",
+    "GroupedSketch": ".sketches",
+    "cluster_statistics": ".sketches",
+    "ClusterConfidence": ".confidence",
+    "SilhouetteSample": ".confidence",
+    "cluster_confidence": ".confidence",
+    "sample_silhouette": ".confidence",
+    "write_cluster_confidence": ".confidence",
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
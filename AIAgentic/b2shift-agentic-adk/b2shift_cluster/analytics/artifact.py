@@ -0,0 +1,302 @@
+"""
+Artefato persistido de uma clusterização B2Shift.
+
+Reúne o que é preciso para reutilizar uma clusterização fora do notebook que
+a gerou: parâmetros de padronização e projeção (StandardScaler + PCA),
+centróides, labels por cliente, o embedding reduzido dos clientes e
+metadados. Cada array é gravado como ``.npy`` em um diretório e lido com
+``mmap_mode="r"``, então abrir o artefato não carrega a base inteira em
+memória. Índices auxiliares (ex.: vizinhos mais próximos) são gravados em
+subdiretórios do próprio artefato.
+
+O artefato em uso pelas ferramentas do agente é o diretório em
+``B2SHIFT_CLUSTERING_ARTIFACT`` (``default_artifact``).
+"""
+
+import functools
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+MANIFEST_FILE = "artifact.json"
+NEIGHBORS_DIR = "neighbors"
+
+_ARRAY_FIELDS = (
+    "centroids", "labels", "customer_ids", "clip_lower", "clip_upper",
+    "scaler_mean", "scaler_scale", "components", "projection_mean", "embedding",
+)
+
+
+@dataclass
+class ClusteringArtifact:
+    """
+    Parâmetros e resultados de uma clusterização, no espaço reduzido.
+    """
+    feature_names: List[str]
+    centroids: np.ndarray  # (k, d) no espaço do embedding
+    labels: np.ndarray  # (n,) cluster por cliente
+
+    customer_ids: Optional[np.ndarray] = None  # (n,) alinhado a labels
+
+    # Pré-processamento: x -> clip(x, clip_lower, clip_upper)
+    #                   x -> (x - scaler_mean) / scaler_scale
+    clip_lower: Optional[np.ndarray] = None
+    clip_upper: Optional[np.ndarray] = None
+    scaler_mean: Optional[np.ndarray] = None
+    scaler_scale: Optional[np.ndarray] = None
+
+    # Projeção: z -> (z - projection_mean) @ components.T
+    components: Optional[np.ndarray] = None
+    projection_mean: Optional[np.ndarray] = None
+
+    # Clientes no espaço reduzido (n, d)
+    embedding: Optional[np.ndarray] = None
+
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    path: Optional[Path] = field(default=None, repr=False, compare=False)
+    _neighbors: Any = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def n_clusters(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def n_customers(self) -> int:
+        return len(self.labels)
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """
+        Leva features brutas para o espaço do embedding/centróides.
+
+        Args:
+            X: Matriz (m, len(feature_names))
+
+        Returns:
+            Matriz (m, d) no espaço reduzido
+        """
+        Z = np.asarray(X, dtype=np.float64)
+        if self.clip_lower is not None:
+            Z = np.clip(Z, self.clip_lower, self.clip_upper)
+        if self.scaler_mean is not None:
+            Z = Z - self.scaler_mean
+        if self.scaler_scale is not None:
+            Z = Z / np.where(self.scaler_scale == 0, 1.0, self.scaler_scale)
+        if self.components is not None:
+            if self.projection_mean is not None:
+                Z = Z - self.projection_mean
+            Z = Z @ np.asarray(self.components).T
+        return Z
+
+    def assign(self, columns, feature_store=None) -> np.ndarray:
+        """
+        Cluster (centróide mais próximo) de clientes a partir de suas colunas.
+
+        Args:
+            columns: Colunas numéricas nomeadas como ``feature_names`` (dict
+                de arrays ou DataFrame)
+            feature_store: EventFeatureStore opcional; com ``customer_id``
+                nas colunas, as features da janela de eventos substituem os
+                valores do lote
+
+        Returns:
+            Array de cluster_ids
+        """
+        if feature_store is not None:
+            columns = feature_store.overlay(columns)
+
+        Z = self.transform(self._feature_matrix(columns))
+        centroids = np.asarray(self.centroids, dtype=np.float64)
+        sq = np.einsum("ij,ij->i", centroids, centroids)
+        return np.argmin(sq[None, :] - 2 * Z @ centroids.T, axis=1)
+
+    def _feature_matrix(self, columns) -> np.ndarray:
+        return np.column_stack([
+            np.atleast_1d(np.asarray(columns[name], dtype=np.float64)) for name in self.feature_names
+        ])
+
+    @classmethod
+    def from_pipeline(
+        cls,
+        prepared,
+        reduced,
+        labels: np.ndarray,
+        centroids: np.ndarray,
+        customer_ids: Optional[np.ndarray] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> "ClusteringArtifact":
+        """
+        Monta o artefato a partir das etapas do pipeline.
+
+        Args:
+            prepared: PreprocessedMatrix de ``PreprocessingCache.preprocess``
+            reduced: PreprocessedMatrix de ``decomposition.reduce_matrix``
+            labels: Cluster por cliente
+            centroids: Centróides no espaço reduzido
+            customer_ids: IDs alinhados às linhas
+            metadata: Metadados adicionais
+        """
+        params = prepared.params
+        selected = params["selected"]
+
+        def selected_param(name):
+            value = params.get(name)
+            return None if value is None else np.asarray(value)[selected]
+
+        return cls(
+            feature_names=list(prepared.feature_names),
+            centroids=np.asarray(centroids),
+            labels=np.asarray(labels),
+            customer_ids=customer_ids,
+            clip_lower=selected_param("clip_lower"),
+            clip_upper=selected_param("clip_upper"),
+            scaler_mean=selected_param("scaler_mean"),
+            scaler_scale=selected_param("scaler_scale"),
+            components=reduced.params["components"],
+            projection_mean=reduced.params["projection_mean"],
+            embedding=reduced.matrix,
+            metadata={
+                "explained_variance_ratio": np.asarray(
+                    reduced.params["explained_variance_ratio"]
+                ).tolist(),
+                **(metadata or {}),
+            },
+        )
+
+    def customer_index(self):
+        """CustomerIdIndex alinhado às posições de ``labels``/``embedding``."""
+        from ..models.membership import CustomerIdIndex
+
+        if self.customer_ids is None:
+            raise ValueError("Artefato não contém customer_ids")
+        return CustomerIdIndex(np.asarray(self.customer_ids, dtype=object))
+
+    def save(self, directory: Union[str, os.PathLike]) -> Path:
+        """
+        Grava o artefato em ``directory`` (um .npy por array + manifesto).
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        arrays = []
+        for name in _ARRAY_FIELDS:
+            value = getattr(self, name)
+            if value is None:
+                continue
+            array = np.asarray(value)
+            if array.dtype == object:
+                # IDs em largura fixa (U) para dispensar pickle e permitir mmap
+                array = array.astype(str)
+            np.save(directory / f"{name}.npy", array, allow_pickle=False)
+            arrays.append(name)
+
+        manifest = {
+            "saved_at": datetime.now().isoformat(),
+            "feature_names": list(self.feature_names),
+            "arrays": arrays,
+            "metadata": self.metadata,
+        }
+        with open(directory / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        self.path = directory
+        return directory
+
+    @classmethod
+    def load(cls, directory: Union[str, os.PathLike], mmap: bool = True) -> "ClusteringArtifact":
+        """
+        Abre um artefato gravado por ``save``.
+
+        Args:
+            directory: Diretório do artefato
+            mmap: Mapeia os arrays em memória em vez de lê-los por completo
+        """
+        directory = Path(directory)
+        with open(directory / MANIFEST_FILE, encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        arrays = {
+            name: np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None,
+                          allow_pickle=False)
+            for name in manifest["arrays"]
+        }
+        return cls(
+            feature_names=manifest["feature_names"],
+            metadata=manifest.get("metadata", {}),
+            path=directory,
+            **arrays,
+        )
+
+    def cluster_confidence(self, n_jobs: Optional[int] = None):
+        """
+        Confiança por cliente (silhueta simplificada pelos centróides) sobre
+        ``embedding`` e ``labels``; ver ``analytics.confidence``.
+        """
+        from .confidence import cluster_confidence
+
+        if self.embedding is None:
+            raise ValueError("Artefato não contém embedding dos clientes")
+        return cluster_confidence(self.embedding, self.centroids, labels=self.labels,
+                                  customer_ids=self.customer_ids, n_jobs=n_jobs)
+
+    # ------------------------------------------------------------------
+    # Índice de vizinhos persistido junto ao artefato
+    # ------------------------------------------------------------------
+
+    def build_neighbor_index(self, **params):
+        """
+        Constrói um NeighborIndex sobre ``embedding`` e, se o artefato já foi
+        gravado, persiste-o em ``<artefato>/neighbors``.
+
+        Args:
+            **params: Parâmetros de NeighborIndex (method, n_lists, n_probe...)
+        """
+        from .neighbors import NeighborIndex
+
+        if self.embedding is None:
+            raise ValueError("Artefato não contém embedding dos clientes")
+
+        index = NeighborIndex(**params).fit(self.embedding)
+        if self.path is not None:
+            index.save(self.path / NEIGHBORS_DIR)
+        return index
+
+    def load_neighbor_index(self):
+        """Abre o NeighborIndex persistido junto ao artefato."""
+        from .neighbors import NeighborIndex
+
+        if self.path is None or not (self.path / NEIGHBORS_DIR).exists():
+            raise FileNotFoundError("Artefato não possui índice de vizinhos persistido")
+        return NeighborIndex.load(self.path / NEIGHBORS_DIR)
+
+    def similar_customers(self, columns, k: int = 10):
+        """
+        Clientes da base mais similares (no embedding) a clientes dados por
+        suas colunas, pelo índice de vizinhos persistido (aberto uma vez).
+
+        Args:
+            columns: Colunas nomeadas como ``feature_names`` (dict ou DataFrame)
+            k: Vizinhos por cliente
+
+        Returns:
+            (distâncias, posições), ambas (m, k); ``labels[posições]`` dá o
+            cluster de cada vizinho
+        """
+        if self._neighbors is None:
+            self._neighbors = self.load_neighbor_index()
+        return self._neighbors.query(self.transform(self._feature_matrix(columns)), k=k)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_artifact(path: str) -> ClusteringArtifact:
+    return ClusteringArtifact.load(path)
+
+
+def default_artifact() -> Optional[ClusteringArtifact]:
+    """Artefato em ``B2SHIFT_CLUSTERING_ARTIFACT`` (None se não configurado)."""
+    path = os.getenv("B2SHIFT_CLUSTERING_ARTIFACT")
+    return _load_artifact(path) if path else None
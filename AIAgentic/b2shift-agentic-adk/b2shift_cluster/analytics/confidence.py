@@ -0,0 +1,313 @@
+"""
+Confiança da atribuição de cada cliente ao seu cluster.
+
+``silhouette_samples`` do scikit-learn é O(n²) em tempo e memória. Aqui há
+duas medidas complementares, ambas calculadas em blocos e em threads (o
+produto matricial do numpy libera o GIL):
+
+- ``cluster_confidence`` — para todos os clientes, silhueta simplificada
+  pelos centróides: com ``a`` = distância ao centróide do próprio cluster
+  e ``b`` = distância ao centróide alternativo mais próximo,
+  ``s = (b - a) / max(a, b)``. Custo O(n·k·d). A confiança é ``s``
+  limitada a [0, 1]; perto de 0 o cliente está na fronteira entre dois
+  clusters (``second_labels`` diz qual).
+- ``sample_silhouette`` — silhueta exata (distância média a todos os
+  pontos de cada cluster) de uma amostra de clientes contra a base
+  inteira, acumulando somas de distâncias por cluster bloco a bloco.
+  Custo O(amostra·n·d), sem matriz n x n. Serve para diagnosticar a
+  clusterização e calibrar a medida simplificada (``agreement``).
+
+Rótulos negativos (ruído do DBSCAN) não têm centróide: ficam com
+confiança 0 e fora das silhuetas.
+
+``write_cluster_confidence`` grava o resultado na tabela
+``customer_clusters`` do warehouse (``DataSource.load_frame``), onde
+vendas filtra as contas de baixa confiança (``low_confidence``, limiar
+``B2SHIFT_LOW_CONFIDENCE_THRESHOLD``) antes das campanhas.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .neighbors import _squared_distances
+
+CONFIDENCE_TABLE = "customer_clusters"
+
+# Memória de cada bloco de distâncias (linhas x colunas, float64); blocos
+# de no máximo _CHUNK_ROWS linhas para haver trabalho para todas as threads
+_BLOCK_BYTES = 64 * 2**20
+_CHUNK_ROWS = 65_536
+
+
+def _n_jobs(n_jobs: Optional[int]) -> int:
+    return n_jobs or int(os.getenv("B2SHIFT_CONFIDENCE_JOBS", 0)) or os.cpu_count() or 1
+
+
+def _map_blocks(function, n_rows: int, block: int, n_jobs: Optional[int]) -> List[Any]:
+    starts = list(range(0, n_rows, block))
+    n_jobs = min(_n_jobs(n_jobs), len(starts))
+    if n_jobs <= 1:
+        return [function(start, min(start + block, n_rows)) for start in starts]
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        return list(executor.map(lambda start: function(start, min(start + block, n_rows)), starts))
+
+
+def low_confidence_threshold() -> float:
+    """Limiar de confiança abaixo do qual a conta é marcada (``B2SHIFT_LOW_CONFIDENCE_THRESHOLD``)."""
+    return float(os.getenv("B2SHIFT_LOW_CONFIDENCE_THRESHOLD", 0.2))
+
+
+@dataclass
+class ClusterConfidence:
+    """
+    Silhueta simplificada por cliente, alinhada às linhas do embedding.
+    """
+    labels: np.ndarray  # cluster atribuído (-1 = ruído)
+    second_labels: np.ndarray  # centróide alternativo mais próximo (-1 se não há)
+    silhouette: np.ndarray  # (b - a) / max(a, b), NaN para ruído
+    margin: np.ndarray  # b - a, na unidade do embedding
+    customer_ids: Optional[np.ndarray] = None
+
+    @property
+    def confidence(self) -> np.ndarray:
+        """Silhueta simplificada limitada a [0, 1] (ruído -> 0)."""
+        return np.clip(np.nan_to_num(self.silhouette, nan=0.0), 0.0, 1.0)
+
+    def low_confidence(self, threshold: Optional[float] = None) -> np.ndarray:
+        """Máscara das contas com confiança abaixo do limiar."""
+        threshold = low_confidence_threshold() if threshold is None else threshold
+        return self.confidence < threshold
+
+    def to_dataframe(self, threshold: Optional[float] = None):
+        """Uma linha por cliente, no formato da tabela ``customer_clusters``."""
+        import pandas as pd
+
+        if self.customer_ids is None:
+            raise ValueError("Resultado sem customer_ids")
+        return pd.DataFrame({
+            "customer_id": np.asarray(self.customer_ids, dtype=object),
+            "cluster_id": self.labels.astype(np.int64),
+            "second_cluster_id": self.second_labels.astype(np.int64),
+            "cluster_confidence": self.confidence,
+            "silhouette": self.silhouette,
+            "margin": self.margin,
+            "low_confidence": self.low_confidence(threshold),
+            "scored_at": datetime.now().isoformat(timespec="seconds"),
+        })
+
+    def apply(self, profiles: Iterable[Any]) -> int:
+        """
+        Preenche ``cluster_id`` e ``cluster_confidence`` de CustomerProfiles
+        pelo ``customer_id``. Retorna quantos perfis foram atualizados.
+        """
+        import pandas as pd
+
+        if self.customer_ids is None:
+            raise ValueError("Resultado sem customer_ids")
+        profiles = list(profiles)
+        positions = pd.Index(self.customer_ids).get_indexer([p.customer_id for p in profiles])
+        confidence = self.confidence
+        updated = 0
+        for profile, position in zip(profiles, positions.tolist()):
+            if position < 0:
+                continue
+            profile.cluster_id = int(self.labels[position])
+            profile.cluster_confidence = float(confidence[position])
+            updated += 1
+        return updated
+
+
+def cluster_confidence(
+    Z: np.ndarray,
+    centroids: np.ndarray,
+    labels: Optional[np.ndarray] = None,
+    customer_ids: Optional[np.ndarray] = None,
+    n_jobs: Optional[int] = None,
+) -> ClusterConfidence:
+    """
+    Silhueta simplificada (pelos centróides) de todos os clientes.
+
+    Args:
+        Z: Clientes no espaço dos centróides (n, d); ndarray ou memmap
+        centroids: Centróides (k, d)
+        labels: Cluster atribuído (posição em ``centroids``; -1 = ruído).
+            Padrão: centróide mais próximo
+        customer_ids: IDs alinhados às linhas
+        n_jobs: Threads (padrão: ``B2SHIFT_CONFIDENCE_JOBS`` ou o número de CPUs)
+    """
+    centroids = np.asarray(centroids, dtype=np.float64)
+    n_rows, n_clusters = len(Z), len(centroids)
+    centroid_sq = np.einsum("ij,ij->i", centroids, centroids)
+
+    def score(start: int, end: int):
+        D = _squared_distances(np.asarray(Z[start:end], dtype=np.float64), centroids, centroid_sq)
+        rows = np.arange(end - start)
+        own = np.argmin(D, axis=1) if labels is None else np.asarray(labels[start:end], dtype=np.int64)
+        noise = own < 0
+        own_safe = np.where(noise, 0, own)
+        a = np.sqrt(D[rows, own_safe])
+        if n_clusters > 1:
+            D[rows, own_safe] = np.inf
+            second = np.argmin(D, axis=1)
+            b = np.sqrt(D[rows, second])
+        else:
+            second = np.full(end - start, -1)
+            b = a.copy()
+        scale = np.maximum(a, b)
+        silhouette = np.divide(b - a, scale, out=np.zeros(end - start), where=scale > 0)
+        silhouette[noise] = np.nan
+        return own, np.where(noise, -1, second), silhouette, np.where(noise, np.nan, b - a)
+
+    block = min(_CHUNK_ROWS, max(1, _BLOCK_BYTES // (8 * max(n_clusters, 1))))
+    parts = _map_blocks(score, n_rows, block, n_jobs)
+    if not parts:
+        empty = np.empty(0)
+        return ClusterConfidence(empty.astype(np.int64), empty.astype(np.int64), empty, empty, customer_ids)
+    return ClusterConfidence(*(np.concatenate(column) for column in zip(*parts)), customer_ids=customer_ids)
+
+
+@dataclass
+class SilhouetteSample:
+    """
+    Silhueta exata de uma amostra de clientes, contra a base inteira.
+    """
+    indices: np.ndarray  # linhas amostradas
+    labels: np.ndarray
+    silhouette: np.ndarray
+    simplified: Optional[np.ndarray] = None  # silhueta simplificada das mesmas linhas
+
+    @property
+    def mean(self) -> float:
+        return float(np.mean(self.silhouette)) if len(self.silhouette) else float("nan")
+
+    def by_cluster(self) -> Dict[int, float]:
+        """Silhueta média por cluster."""
+        return {
+            int(label): float(self.silhouette[self.labels == label].mean())
+            for label in np.unique(self.labels)
+        }
+
+    def agreement(self) -> Dict[str, float]:
+        """
+        Comparação com a silhueta simplificada nas mesmas linhas
+        (correlação de Spearman e diferença absoluta média).
+        """
+        if self.simplified is None or len(self.silhouette) < 2:
+            return {}
+        exact_rank = np.argsort(np.argsort(self.silhouette))
+        simplified_rank = np.argsort(np.argsort(self.simplified))
+        return {
+            "spearman": float(np.corrcoef(exact_rank, simplified_rank)[0, 1]),
+            "mean_abs_diff": float(np.abs(self.silhouette - self.simplified).mean()),
+        }
+
+
+def sample_silhouette(
+    Z: np.ndarray,
+    labels: np.ndarray,
+    sample_size: int = 2_000,
+    seed: int = 0,
+    centroids: Optional[np.ndarray] = None,
+    n_jobs: Optional[int] = None,
+) -> SilhouetteSample:
+    """
+    Silhueta exata de ``sample_size`` clientes sorteados.
+
+    Args:
+        Z: Clientes (n, d); ndarray ou memmap
+        labels: Cluster por cliente (-1 = ruído, ignorado)
+        sample_size: Clientes amostrados
+        seed: Semente do sorteio
+        centroids: Se dados, calcula também a silhueta simplificada das
+            mesmas linhas (``SilhouetteSample.agreement``)
+        n_jobs: Threads (padrão: ``B2SHIFT_CONFIDENCE_JOBS`` ou o número de CPUs)
+    """
+    labels = np.asarray(labels, dtype=np.int64)
+    clustered = np.flatnonzero(labels >= 0)
+    rng = np.random.default_rng(seed)
+    indices = np.sort(rng.choice(clustered, min(sample_size, len(clustered)), replace=False))
+
+    cluster_values, codes = np.unique(labels, return_inverse=True)
+    codes = codes.ravel()
+    n_codes = len(cluster_values)
+    sizes = np.bincount(codes, minlength=n_codes).astype(np.float64)
+
+    S = np.asarray(Z[indices], dtype=np.float64)
+
+    def partial_sums(start: int, end: int) -> np.ndarray:
+        # Soma das distâncias de cada amostra aos clientes do bloco, por cluster
+        block = np.asarray(Z[start:end], dtype=np.float64)
+        distances = np.sqrt(_squared_distances(S, block, np.einsum("ij,ij->i", block, block)))
+        membership = np.zeros((end - start, n_codes))
+        membership[np.arange(end - start), codes[start:end]] = 1.0
+        return distances @ membership
+
+    block = min(_CHUNK_ROWS, max(1, _BLOCK_BYTES // (8 * max(len(S), 1))))
+    sums = sum(_map_blocks(partial_sums, len(labels), block, n_jobs), np.zeros((len(S), n_codes)))
+
+    own = codes[indices]
+    rows = np.arange(len(S))
+    # O próprio cliente (distância 0) não entra na média do seu cluster
+    a = sums[rows, own] / np.maximum(sizes[own] - 1, 1)
+    means = sums / np.maximum(sizes, 1)
+    means[:, cluster_values < 0] = np.inf
+    means[rows, own] = np.inf
+    b = means.min(axis=1)
+    scale = np.maximum(a, b)
+    silhouette = np.divide(b - a, scale, out=np.zeros(len(S)), where=np.isfinite(b) & (scale > 0))
+    silhouette[sizes[own] <= 1] = 0.0  # convenção do scikit-learn para clusters unitários
+
+    simplified = None
+    if centroids is not None:
+        simplified = cluster_confidence(S, centroids, labels=labels[indices], n_jobs=1).silhouette
+    return SilhouetteSample(indices, labels[indices], silhouette, simplified)
+
+
+def write_cluster_confidence(
+    result: ClusterConfidence,
+    source=None,
+    table: str = CONFIDENCE_TABLE,
+    threshold: Optional[float] = None,
+) -> int:
+    """
+    Grava a confiança por cliente no warehouse, substituindo a tabela.
+
+    Args:
+        result: Saída de ``cluster_confidence`` (com customer_ids)
+        source: DataSource (padrão: ``data.warehouse.get_data_source()``)
+        table: Tabela de destino
+        threshold: Limiar de ``low_confidence`` (padrão:
+            ``B2SHIFT_LOW_CONFIDENCE_THRESHOLD``)
+
+    Returns:
+        Número de linhas gravadas
+    """
+    if source is None:
+        from ..data.warehouse import get_data_source
+
+        source = get_data_source()
+    frame = result.to_dataframe(threshold)
+    source.load_frame(table, frame, indexes=("customer_id", "cluster_id"))
+    return len(frame)
+
+
+def confidence_summary(result: ClusterConfidence, threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Por cluster: clientes, confiança média/mediana e fração de baixa confiança."""
+    confidence = result.confidence
+    low = result.low_confidence(threshold)
+    summary = []
+    for label in np.unique(result.labels).tolist():
+        mask = result.labels == label
+        summary.append({
+            "cluster_id": int(label),
+            "customers": int(mask.sum()),
+            "mean_confidence": float(confidence[mask].mean()),
+            "median_confidence": float(np.median(confidence[mask])),
+            "low_confidence_share": float(low[mask].mean()),
+        })
+    return summary
@@ -0,0 +1,288 @@
+"""
+Redução de dimensionalidade (PCA) para matrizes grandes de clientes.
+
+``PCA(n_components=0.8)`` faz um SVD completo da matriz densa. Aqui:
+
+- ``covariance``: uma passada acumulando a matriz de Gram (d x d) e
+  ``eigh`` — o mais rápido enquanto o número de colunas é moderado;
+- ``randomized``: SVD randomizado (range finder + iterações de potência)
+  em blocos de linhas, funcionando sobre matrizes mapeadas em memória sem
+  criar a cópia centrada; indicado quando as colunas dummy são milhares;
+- ``incremental``: ``IncrementalPCA`` ajustado bloco a bloco (streaming);
+- alvo de variância: a variância total vem das variâncias das colunas
+  (uma passada barata), então basta calcular componentes até atingir a
+  fração desejada — o número de componentes cresce em dobro até lá.
+
+O resultado alimenta o cache de pré-processamento (``reduce_matrix``) e os
+campos ``components``/``projection_mean`` do ClusteringArtifact.
+"""
+
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+METHODS = ("auto", "covariance", "randomized", "incremental")
+
+_CHUNK_ROWS = 131_072
+# Até este número de colunas o modo "auto" usa a matriz de covariância
+_COVARIANCE_MAX_FEATURES = 1024
+
+
+def _column_moments(X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Média e variância (ddof=1) por coluna, em blocos."""
+    n_rows = len(X)
+    total = np.zeros(X.shape[1])
+    total_sq = np.zeros(X.shape[1])
+    for start in range(0, n_rows, _CHUNK_ROWS):
+        block = np.asarray(X[start:start + _CHUNK_ROWS], dtype=np.float64)
+        total += block.sum(axis=0)
+        total_sq += np.einsum("ij,ij->j", block, block)
+    mean = total / n_rows
+    variance = np.maximum(total_sq - n_rows * mean ** 2, 0) / max(n_rows - 1, 1)
+    return mean, variance
+
+
+def _orthonormalize(Y: np.ndarray) -> np.ndarray:
+    """
+    Base ortonormal das colunas de uma matriz alta (n x l) por CholeskyQR2:
+    só produtos l x l, bem mais barato que ``np.linalg.qr`` em n grande.
+    """
+    for _ in range(2):
+        gram = Y.T @ Y
+        gram.flat[::len(gram) + 1] += 1e-12 * max(np.trace(gram), 1.0)
+        Y = Y @ np.linalg.inv(np.linalg.cholesky(gram)).T
+    return Y
+
+
+def _centered_matmul(X: np.ndarray, mean: np.ndarray, M: np.ndarray) -> np.ndarray:
+    """(X - mean) @ M, em blocos, sem materializar X centrada."""
+    result = np.empty((len(X), M.shape[1]))
+    shift = mean @ M
+    for start in range(0, len(X), _CHUNK_ROWS):
+        block = np.asarray(X[start:start + _CHUNK_ROWS], dtype=np.float64)
+        result[start:start + len(block)] = block @ M - shift
+    return result
+
+
+def _centered_rmatmul(X: np.ndarray, mean: np.ndarray, Q: np.ndarray) -> np.ndarray:
+    """(X - mean).T @ Q, em blocos."""
+    result = np.zeros((X.shape[1], Q.shape[1]))
+    for start in range(0, len(X), _CHUNK_ROWS):
+        block = np.asarray(X[start:start + _CHUNK_ROWS], dtype=np.float64)
+        result += block.T @ Q[start:start + len(block)]
+    return result - np.outer(mean, Q.sum(axis=0))
+
+
+class ReducedPCA:
+    """
+    PCA randomizado/incremental com alvo de variância explicada.
+
+    Args:
+        n_components: Inteiro (número de componentes) ou fração em (0, 1)
+            da variância a explicar
+        method: "auto", "covariance", "randomized" ou "incremental"
+        n_oversamples: Colunas extras do range finder randomizado
+        n_iter: Iterações de potência (mais = mais preciso em espectros planos)
+        batch_size: Linhas por bloco do modo incremental
+        random_state: Semente
+    """
+
+    def __init__(
+        self,
+        n_components: Union[int, float] = 0.8,
+        method: str = "auto",
+        n_oversamples: int = 10,
+        n_iter: int = 4,
+        batch_size: int = 65_536,
+        random_state: int = 42,
+    ):
+        if method not in METHODS:
+            raise ValueError(f"Método {method} não suportado. Use um de {METHODS}")
+        self.n_components = n_components
+        self.method = method
+        self.n_oversamples = n_oversamples
+        self.n_iter = n_iter
+        self.batch_size = batch_size
+        self.random_state = random_state
+
+        self.mean_: Optional[np.ndarray] = None
+        self.components_: Optional[np.ndarray] = None
+        self.explained_variance_: Optional[np.ndarray] = None
+        self.explained_variance_ratio_: Optional[np.ndarray] = None
+        self.total_variance_: Optional[float] = None
+
+    @property
+    def n_components_(self) -> int:
+        return 0 if self.components_ is None else len(self.components_)
+
+    def get_params(self) -> Dict[str, Any]:
+        return {
+            "n_components": self.n_components,
+            "method": self.method,
+            "n_oversamples": self.n_oversamples,
+            "n_iter": self.n_iter,
+            "random_state": self.random_state,
+        }
+
+    def _target(self, n_features: int) -> Tuple[Optional[int], Optional[float]]:
+        """(número fixo de componentes, fração de variância) — um dos dois."""
+        if isinstance(self.n_components, float) and 0 < self.n_components < 1:
+            return None, self.n_components
+        return min(int(self.n_components), n_features), None
+
+    def fit(self, X: np.ndarray) -> "ReducedPCA":
+        """
+        Ajusta os componentes principais de ``X`` (ndarray ou memmap).
+        """
+        n_rows, n_features = X.shape
+        self.mean_, variance = _column_moments(X)
+        self.total_variance_ = float(variance.sum())
+
+        method = self.method
+        if method == "auto":
+            method = "covariance" if n_features <= _COVARIANCE_MAX_FEATURES else "randomized"
+
+        n_fixed, ratio = self._target(n_features)
+        if method == "covariance":
+            components, explained = self._fit_covariance(X, n_fixed)
+        elif method == "randomized":
+            components, explained = self._fit_randomized(X, n_fixed, ratio)
+        else:
+            components, explained = self._fit_incremental(X, n_fixed, ratio)
+
+        if ratio is not None:
+            cumulative = np.cumsum(explained) / max(self.total_variance_, 1e-12)
+            keep = int(np.searchsorted(cumulative, ratio - 1e-12) + 1)
+            components, explained = components[:keep], explained[:keep]
+
+        self.components_ = components
+        self.explained_variance_ = explained
+        self.explained_variance_ratio_ = explained / max(self.total_variance_, 1e-12)
+        return self
+
+    def _fit_covariance(self, X, n_fixed):
+        n_rows, n_features = X.shape
+        gram = np.zeros((n_features, n_features))
+        for start in range(0, n_rows, _CHUNK_ROWS):
+            block = np.asarray(X[start:start + _CHUNK_ROWS], dtype=np.float64)
+            gram += block.T @ block
+        covariance = (gram - n_rows * np.outer(self.mean_, self.mean_)) / max(n_rows - 1, 1)
+
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        order = np.argsort(eigenvalues)[::-1][:n_fixed or n_features]
+        return eigenvectors[:, order].T, np.maximum(eigenvalues[order], 0)
+
+    def _randomized_svd(self, X: np.ndarray, rank: int, rng) -> Tuple[np.ndarray, np.ndarray]:
+        n_rows, n_features = X.shape
+        size = min(rank + self.n_oversamples, n_features, n_rows)
+        Q = _centered_matmul(X, self.mean_, rng.standard_normal((n_features, size)))
+        Q = _orthonormalize(Q)
+        for _ in range(self.n_iter):
+            Z, _ = np.linalg.qr(_centered_rmatmul(X, self.mean_, Q))
+            Q = _orthonormalize(_centered_matmul(X, self.mean_, Z))
+
+        # B = Q.T @ Xc (size x d) e seu SVD denso, pequeno
+        B = _centered_rmatmul(X, self.mean_, Q).T
+        _, singular, Vt = np.linalg.svd(B, full_matrices=False)
+        return singular[:rank], Vt[:rank]
+
+    def _fit_randomized(self, X, n_fixed, ratio):
+        rng = np.random.default_rng(self.random_state)
+        n_features = X.shape[1]
+        explained_scale = max(len(X) - 1, 1)
+
+        if n_fixed is not None:
+            singular, Vt = self._randomized_svd(X, n_fixed, rng)
+            return Vt, singular ** 2 / explained_scale
+
+        # Dobra o número de componentes até atingir a fração de variância
+        rank = min(16, n_features)
+        while True:
+            singular, Vt = self._randomized_svd(X, rank, rng)
+            explained = singular ** 2 / explained_scale
+            if explained.sum() >= ratio * self.total_variance_ or rank >= n_features:
+                return Vt, explained
+            rank = min(2 * rank, n_features)
+
+    def _fit_incremental(self, X, n_fixed, ratio):
+        from sklearn.decomposition import IncrementalPCA
+
+        n_rows, n_features = X.shape
+        # Com alvo de variância o streaming mantém todos os componentes (o
+        # custo por bloco é o SVD de um bloco pequeno) e o corte é feito no fim
+        n_components = n_features if n_fixed is None else n_fixed
+        batch_size = max(self.batch_size, n_components)
+        n_components = min(n_components, batch_size, n_rows)
+
+        model = IncrementalPCA(n_components=n_components, batch_size=batch_size)
+        for start in range(0, n_rows, batch_size):
+            block = np.asarray(X[start:start + batch_size], dtype=np.float64)
+            if len(block) < n_components:
+                # partial_fit exige ao menos n_components linhas no bloco
+                break
+            model.partial_fit(block)
+        return model.components_, model.explained_variance_
+
+    def transform(self, X: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Projeta ``X`` nos componentes, em blocos (opcionalmente em ``out``)."""
+        if self.components_ is None:
+            raise ValueError("ReducedPCA não foi ajustado: chame fit()")
+        result = out if out is not None else np.empty((len(X), self.n_components_), dtype=np.float32)
+        shift = self.mean_ @ self.components_.T
+        for start in range(0, len(X), _CHUNK_ROWS):
+            block = np.asarray(X[start:start + _CHUNK_ROWS], dtype=np.float64)
+            result[start:start + len(block)] = block @ self.components_.T - shift
+        return result
+
+    def fit_transform(self, X: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        return self.fit(X).transform(X, out=out)
+
+    def artifact_fields(self) -> Dict[str, np.ndarray]:
+        """Campos de projeção do ClusteringArtifact."""
+        return {"components": self.components_, "projection_mean": self.mean_}
+
+    def to_params(self) -> Dict[str, Any]:
+        return {
+            "components": self.components_,
+            "projection_mean": self.mean_,
+            "explained_variance": self.explained_variance_,
+            "explained_variance_ratio": self.explained_variance_ratio_,
+        }
+
+
+def reduce_matrix(prepared, cache=None, **pca_params):
+    """
+    Aplica ``ReducedPCA`` a uma matriz pré-processada, com cache.
+
+    A chave deriva da chave da matriz de entrada e dos parâmetros do PCA,
+    então a projeção também é reaproveitada entre algoritmos e sessões.
+
+    Args:
+        prepared: PreprocessedMatrix (de ``PreprocessingCache.preprocess``)
+        cache: PreprocessingCache (sem cache se None)
+        **pca_params: Parâmetros de ReducedPCA
+
+    Returns:
+        PreprocessedMatrix com o embedding; ``params`` contém components,
+        projection_mean e as variâncias explicadas
+    """
+    import hashlib
+    import json
+
+    from .preprocessing import PreprocessedMatrix
+
+    reducer = ReducedPCA(**pca_params)
+
+    def build(out: Callable):
+        reducer.fit(prepared.matrix)
+        matrix = reducer.transform(prepared.matrix, out=out((len(prepared.matrix), reducer.n_components_)))
+        names = [f"pc_{i + 1}" for i in range(reducer.n_components_)]
+        return matrix, names, reducer.to_params()
+
+    if cache is None or prepared.key is None:
+        matrix, names, params = build(lambda shape: np.empty(shape, dtype=np.float32))
+        return PreprocessedMatrix(matrix=matrix, feature_names=names, params=params)
+
+    payload = json.dumps({"input": prepared.key, "pca": reducer.get_params()}, sort_keys=True)
+    key = hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+    return cache.get_or_build(key, build)
@@ -0,0 +1,468 @@
+"""
+Clusterização por densidade (DBSCAN / HDBSCAN) com grafo de vizinhos reutilizável.
+
+O custo caro — índice espacial e k vizinhos de cada cliente — é pago uma
+única vez em ``fit``. A partir do grafo k-NN:
+
+- distâncias core para qualquer ``min_samples <= n_neighbors`` são uma
+  coluna da matriz de distâncias;
+- a árvore geradora mínima (MST) das distâncias de alcançabilidade mútua
+  é calculada uma vez por ``min_samples`` e guardada;
+- DBSCAN para um ``eps`` é só cortar a MST em ``eps`` (componentes conexas
+  dos pontos core) e anexar os pontos de borda pelo grafo k-NN;
+- HDBSCAN é a hierarquia single-linkage da mesma MST, condensada por
+  ``min_cluster_size`` e extraída por estabilidade (excess of mass).
+
+Varreduras de ``eps``/``min_samples`` viram re-rotulações, e a memória fica
+em O(n · n_neighbors), sem matriz n x n. Quando a vizinhança-eps de algum
+ponto core não cabe nos k vizinhos, o resultado de DBSCAN é uma aproximação
+(``DensityResult.exact`` indica o caso).
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+NOISE = -1
+
+
+@dataclass
+class DensityResult:
+    """
+    Rotulação de uma configuração de densidade.
+    """
+    labels: np.ndarray  # cluster por cliente, NOISE (-1) para ruído
+    algorithm: str  # 'dbscan' ou 'hdbscan'
+    params: Dict[str, Any]
+    exact: bool = True
+    probabilities: Optional[np.ndarray] = None  # força de pertença (HDBSCAN)
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def n_clusters(self) -> int:
+        return int(self.labels.max()) + 1 if len(self.labels) else 0
+
+    @property
+    def noise_ratio(self) -> float:
+        return float(np.mean(self.labels == NOISE)) if len(self.labels) else 0.0
+
+
+def _relabel(components: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Numera componentes de ``mask`` como 0..k-1 e o resto como ruído."""
+    labels = np.full(len(components), NOISE, dtype=np.int64)
+    if mask.any():
+        _, labels[mask] = np.unique(components[mask], return_inverse=True)
+    return labels
+
+
+class DensityClusterer:
+    """
+    Motor de DBSCAN/HDBSCAN sobre um grafo k-NN calculado uma vez.
+
+    Args:
+        n_neighbors: Vizinhos guardados por cliente (limita ``min_samples`` e
+            a exatidão do DBSCAN para ``eps`` grandes)
+        index_params: Parâmetros do NeighborIndex (method, n_probe...)
+        chunk_size: Clientes por lote na construção do grafo
+    """
+
+    def __init__(self, n_neighbors: int = 32, index_params: Optional[Dict[str, Any]] = None,
+                 chunk_size: int = 65_536):
+        self.n_neighbors = n_neighbors
+        self.index_params = index_params or {}
+        self.chunk_size = chunk_size
+
+        self.index = None
+        self.distances: Optional[np.ndarray] = None  # (n, k), coluna 0 = o próprio ponto
+        self.neighbors: Optional[np.ndarray] = None
+        self._mst_cache: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    @property
+    def n_samples(self) -> int:
+        return 0 if self.distances is None else len(self.distances)
+
+    def fit(self, X: np.ndarray = None, index=None) -> "DensityClusterer":
+        """
+        Constrói o grafo k-NN.
+
+        Args:
+            X: Matriz (n, d), tipicamente o embedding PCA
+            index: NeighborIndex já construído (ex.: o do ClusteringArtifact),
+                dispensando ``X``
+        """
+        from .neighbors import NeighborIndex
+
+        if index is None:
+            if X is None:
+                raise ValueError("Informe X ou um NeighborIndex")
+            index = NeighborIndex(**self.index_params).fit(X)
+        self.index = index
+
+        n_rows = index.n_samples
+        k = min(self.n_neighbors, n_rows)
+        distances = np.empty((n_rows, k), dtype=np.float32)
+        neighbors = np.empty((n_rows, k), dtype=np.int64)
+
+        for start in range(0, n_rows, self.chunk_size):
+            positions = np.arange(start, min(start + self.chunk_size, n_rows))
+            dist, ind = index.query_positions(positions, k=k - 1, exclude_self=True)
+            distances[positions, 0] = 0.0
+            neighbors[positions, 0] = positions
+            distances[positions, 1:] = dist
+            neighbors[positions, 1:] = ind
+
+        self.distances, self.neighbors = distances, neighbors
+        self._mst_cache.clear()
+        return self
+
+    # ------------------------------------------------------------------
+    # Estruturas derivadas (cacheadas por min_samples)
+    # ------------------------------------------------------------------
+
+    def _check_min_samples(self, min_samples: int):
+        if self.distances is None:
+            raise ValueError("DensityClusterer não foi ajustado: chame fit()")
+        if not 1 <= min_samples <= self.distances.shape[1]:
+            raise ValueError(
+                f"min_samples deve estar entre 1 e n_neighbors={self.distances.shape[1]}"
+            )
+
+    def core_distances(self, min_samples: int) -> np.ndarray:
+        """Distância ao ``min_samples``-ésimo vizinho (contando o próprio ponto)."""
+        self._check_min_samples(min_samples)
+        return self.distances[:, min_samples - 1]
+
+    def mutual_reachability_mst(self, min_samples: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        MST do grafo k-NN com pesos de alcançabilidade mútua
+        ``max(core(a), core(b), d(a, b))``.
+
+        Componentes desconexas do grafo são ligadas por arestas de peso
+        infinito, então o resultado é sempre uma árvore.
+
+        Returns:
+            (origens, destinos, pesos) das n-1 arestas, ordenadas por peso
+        """
+        self._check_min_samples(min_samples)
+        if min_samples in self._mst_cache:
+            return self._mst_cache[min_samples]
+
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components, minimum_spanning_tree
+
+        n_rows, k = self.distances.shape
+        core = self.core_distances(min_samples).astype(np.float64)
+
+        rows = np.repeat(np.arange(n_rows), k - 1)
+        cols = self.neighbors[:, 1:].ravel()
+        neighbor_core = np.where(cols >= 0, core[np.maximum(cols, 0)], np.inf)
+        weights = np.maximum(self.distances[:, 1:].ravel(), np.maximum(core[rows], neighbor_core))
+        valid = (cols >= 0) & np.isfinite(weights)
+        # Peso zero seria tratado como aresta ausente pela matriz esparsa
+        weights = np.maximum(weights[valid], np.finfo(np.float64).tiny)
+
+        graph = coo_matrix((weights, (rows[valid], cols[valid])), shape=(n_rows, n_rows)).tocsr()
+        mst = minimum_spanning_tree(graph).tocoo()
+        src, dst, w = mst.row.astype(np.int64), mst.col.astype(np.int64), mst.data
+
+        n_components, component = connected_components(mst, directed=False)
+        if n_components > 1:
+            representatives = np.unique(component, return_index=True)[1]
+            src = np.concatenate([src, np.repeat(representatives[0], n_components - 1)])
+            dst = np.concatenate([dst, representatives[1:]])
+            w = np.concatenate([w, np.full(n_components - 1, np.inf)])
+
+        order = np.argsort(w, kind="stable")
+        result = (src[order], dst[order], w[order])
+        self._mst_cache[min_samples] = result
+        return result
+
+    # ------------------------------------------------------------------
+    # DBSCAN
+    # ------------------------------------------------------------------
+
+    def dbscan(self, eps: float, min_samples: int = 5) -> DensityResult:
+        """
+        DBSCAN para um par (eps, min_samples), reaproveitando grafo e MST.
+
+        Pontos core conectados por cadeias de vizinhos a distância <= eps
+        formam um cluster; pontos não-core a <= eps de um core são
+        anexados ao core mais próximo (borda); o resto é ruído.
+        """
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        src, dst, weights = self.mutual_reachability_mst(min_samples)
+        core_dist = self.core_distances(min_samples)
+        is_core = core_dist <= eps
+        n_rows = self.n_samples
+
+        keep = weights <= eps
+        graph = coo_matrix(
+            (np.ones(int(keep.sum())), (src[keep], dst[keep])), shape=(n_rows, n_rows)
+        )
+        _, components = connected_components(graph, directed=False)
+        labels = _relabel(components, is_core)
+
+        # Borda: vizinhos em ordem crescente de distância, o 1º core a <= eps
+        border = np.flatnonzero(~is_core)
+        if len(border):
+            ind = self.neighbors[border]
+            reachable = (self.distances[border] <= eps) & (ind >= 0) & is_core[np.maximum(ind, 0)]
+            has_core = reachable.any(axis=1)
+            nearest = ind[has_core, reachable[has_core].argmax(axis=1)]
+            labels[border[has_core]] = labels[nearest]
+
+        # Exato quando a vizinhança-eps de todo core cabe nos k vizinhos
+        exact = bool(np.all(self.distances[is_core, -1] > eps)) or self.distances.shape[1] >= n_rows
+
+        return DensityResult(
+            labels=labels,
+            algorithm="dbscan",
+            params={"eps": eps, "min_samples": min_samples},
+            exact=exact,
+            metrics={"core_ratio": float(is_core.mean())},
+        )
+
+    def sweep(self, eps_values: Iterable[float], min_samples_values: Iterable[int] = (5,)) -> List[DensityResult]:
+        """
+        DBSCAN para a grade eps x min_samples; cada ponto da grade custa uma
+        re-rotulação.
+        """
+        return [
+            self.dbscan(eps, min_samples)
+            for min_samples in min_samples_values
+            for eps in eps_values
+        ]
+
+    def suggest_eps(self, min_samples: int = 5, quantile: float = 0.9) -> float:
+        """
+        Sugere ``eps`` pelo quantil das distâncias core (heurística do
+        "joelho" da curva k-distância).
+        """
+        return float(np.quantile(self.core_distances(min_samples), quantile))
+
+    # ------------------------------------------------------------------
+    # HDBSCAN
+    # ------------------------------------------------------------------
+
+    def hdbscan(self, min_cluster_size: int = 50, min_samples: Optional[int] = None,
+                allow_single_cluster: bool = False) -> DensityResult:
+        """
+        HDBSCAN (excess of mass) a partir da MST de alcançabilidade mútua.
+
+        Args:
+            min_cluster_size: Tamanho mínimo de um cluster na árvore condensada
+            min_samples: Vizinhos da distância core (padrão: min_cluster_size,
+                limitado a n_neighbors)
+            allow_single_cluster: Permite selecionar a raiz como único cluster
+        """
+        if min_samples is None:
+            min_samples = min(min_cluster_size, self.distances.shape[1])
+
+        src, dst, weights = self.mutual_reachability_mst(min_samples)
+        hierarchy = _single_linkage(src, dst, weights, self.n_samples)
+        parent, child, lambdas, sizes = _condense_tree(hierarchy, min_cluster_size)
+        labels, probabilities, stability = _extract_clusters(
+            parent, child, lambdas, sizes, self.n_samples, allow_single_cluster
+        )
+
+        return DensityResult(
+            labels=labels,
+            algorithm="hdbscan",
+            params={"min_cluster_size": min_cluster_size, "min_samples": min_samples},
+            exact=True,
+            probabilities=probabilities,
+            metrics={"total_stability": float(stability)},
+        )
+
+    def fit_predict(self, config) -> DensityResult:
+        """
+        Executa a configuração de ``ClusteringConfiguration``: DBSCAN quando
+        ``eps`` é informado, senão HDBSCAN com ``min_cluster_size``.
+        """
+        min_samples = config.min_samples or 5
+        if config.eps is not None:
+            return self.dbscan(config.eps, min_samples)
+        return self.hdbscan(config.min_cluster_size, min(min_samples, self.distances.shape[1]))
+
+
+def _single_linkage(src: np.ndarray, dst: np.ndarray, weights: np.ndarray, n_rows: int) -> np.ndarray:
+    """
+    Hierarquia single-linkage (formato scipy: esquerda, direita, distância,
+    tamanho) a partir das arestas da MST ordenadas por peso.
+    """
+    parent = list(range(2 * n_rows - 1))
+    sizes = [1] * (2 * n_rows - 1)
+    hierarchy = np.empty((n_rows - 1, 4))
+
+    def find(node):
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        # Compressão de caminho
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    for i, (a, b, w) in enumerate(zip(src.tolist(), dst.tolist(), weights.tolist())):
+        root_a, root_b = find(a), find(b)
+        new = n_rows + i
+        parent[root_a] = parent[root_b] = new
+        sizes[new] = sizes[root_a] + sizes[root_b]
+        hierarchy[i] = (root_a, root_b, w, sizes[new])
+    return hierarchy
+
+
+def _condense_tree(hierarchy: np.ndarray, min_cluster_size: int):
+    """
+    Árvore condensada do HDBSCAN: só divisões em que os dois lados têm
+    ``min_cluster_size`` pontos criam clusters; nas demais os pontos
+    "caem" do cluster pai no lambda (1/distância) da divisão.
+
+    Returns:
+        (pai, filho, lambda, tamanho) por aresta; clusters são numerados a
+        partir de n (raiz = n), pontos são 0..n-1
+    """
+    n_rows = len(hierarchy) + 1
+    root = 2 * n_rows - 2
+    left = hierarchy[:, 0].astype(np.int64).tolist()
+    right = hierarchy[:, 1].astype(np.int64).tolist()
+    distance = hierarchy[:, 2].tolist()
+    size = [1] * n_rows + hierarchy[:, 3].astype(np.int64).tolist()
+
+    parent_out, child_out, lambda_out, size_out = [], [], [], []
+    relabel = {root: n_rows}
+    next_label = n_rows + 1
+
+    def leaves(node):
+        stack, found = [node], []
+        while stack:
+            node = stack.pop()
+            if node < n_rows:
+                found.append(node)
+            else:
+                stack.append(left[node - n_rows])
+                stack.append(right[node - n_rows])
+        return found
+
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node < n_rows:
+            continue
+        a, b = left[node - n_rows], right[node - n_rows]
+        dist = distance[node - n_rows]
+        value = 1.0 / dist if dist > 0 else np.inf
+        cluster = relabel[node]
+        big_a, big_b = size[a] >= min_cluster_size, size[b] >= min_cluster_size
+
+        if big_a and big_b:
+            for side in (a, b):
+                relabel[side] = next_label
+                parent_out.append(cluster)
+                child_out.append(next_label)
+                lambda_out.append(value)
+                size_out.append(size[side])
+                next_label += 1
+                stack.append(side)
+            continue
+
+        for side, big in ((a, big_a), (b, big_b)):
+            if big:
+                # O lado grande continua sendo o mesmo cluster
+                relabel[side] = cluster
+                stack.append(side)
+            else:
+                for point in leaves(side):
+                    parent_out.append(cluster)
+                    child_out.append(point)
+                    lambda_out.append(value)
+                    size_out.append(1)
+
+    return (np.asarray(parent_out, dtype=np.int64), np.asarray(child_out, dtype=np.int64),
+            np.asarray(lambda_out, dtype=np.float64), np.asarray(size_out, dtype=np.int64))
+
+
+def _extract_clusters(parent, child, lambdas, sizes, n_rows: int, allow_single_cluster: bool):
+    """
+    Seleção por excess of mass e rótulos finais.
+
+    Returns:
+        (labels, probabilidades, estabilidade total selecionada)
+    """
+    if len(parent) == 0:
+        return np.full(n_rows, NOISE, dtype=np.int64), np.zeros(n_rows), 0.0
+
+    n_nodes = int(max(parent.max(), child.max())) + 1
+    root = n_rows
+
+    # Lambda de nascimento de cada cluster (raiz nasce em 0)
+    birth = np.zeros(n_nodes)
+    is_cluster_edge = child >= n_rows
+    birth[child[is_cluster_edge]] = lambdas[is_cluster_edge]
+    finite = np.where(np.isfinite(lambdas), lambdas, 0.0)
+    max_finite = finite.max() if len(finite) else 0.0
+    lambdas_f = np.where(np.isfinite(lambdas), lambdas, max_finite)
+
+    stability = np.bincount(parent, weights=(lambdas_f - birth[parent]) * sizes, minlength=n_nodes)
+
+    cluster_parent = np.full(n_nodes, -1, dtype=np.int64)
+    cluster_parent[child[is_cluster_edge]] = parent[is_cluster_edge]
+    clusters = np.arange(root, n_nodes)
+
+    # De baixo para cima: filhos têm rótulos maiores que os pais
+    selected = np.zeros(n_nodes, dtype=bool)
+    subtree = stability.copy()
+    children: Dict[int, List[int]] = {}
+    for c in clusters.tolist():
+        if cluster_parent[c] >= 0:
+            children.setdefault(int(cluster_parent[c]), []).append(c)
+
+    for c in clusters[::-1].tolist():
+        kids = children.get(c, [])
+        kids_total = sum(subtree[k] for k in kids)
+        if c == root and not allow_single_cluster:
+            subtree[c] = kids_total
+            continue
+        if kids and kids_total > stability[c]:
+            subtree[c] = kids_total
+        else:
+            subtree[c] = stability[c]
+            selected[c] = True
+            # Descendentes deixam de estar selecionados
+            pending = list(kids)
+            while pending:
+                k = pending.pop()
+                selected[k] = False
+                pending.extend(children.get(k, []))
+
+    # Cluster selecionado ancestral de cada nó (descendo a partir da raiz)
+    assigned = np.full(n_nodes, -1, dtype=np.int64)
+    for c in clusters.tolist():
+        if selected[c]:
+            assigned[c] = c
+        elif cluster_parent[c] >= 0:
+            assigned[c] = assigned[cluster_parent[c]]
+
+    point_edges = ~is_cluster_edge
+    points, point_parent, point_lambda = child[point_edges], parent[point_edges], lambdas_f[point_edges]
+
+    labels = np.full(n_rows, NOISE, dtype=np.int64)
+    owner = assigned[point_parent]
+    in_cluster = owner >= 0
+    selected_ids = np.flatnonzero(selected)
+    labels[points[in_cluster]] = np.searchsorted(selected_ids, owner[in_cluster])
+
+    # Força de pertença: lambda do ponto / maior lambda do seu cluster
+    probabilities = np.zeros(n_rows)
+    if in_cluster.any():
+        max_lambda = np.zeros(n_nodes)
+        np.maximum.at(max_lambda, owner[in_cluster], point_lambda[in_cluster])
+        denominator = max_lambda[owner[in_cluster]]
+        probabilities[points[in_cluster]] = np.where(
+            denominator > 0, np.minimum(point_lambda[in_cluster] / np.where(denominator > 0, denominator, 1), 1.0), 1.0
+        )
+
+    return labels, probabilities, float(stability[selected].sum())
@@ -0,0 +1,389 @@
+"""
+Seleção de features e tratamento de outliers vetorizados para o B2Shift.
+
+Implementa as flags ``feature_selection`` e ``handle_outliers`` de
+``ClusteringConfiguration`` sobre a matriz completa, em blocos de linhas:
+
+- ``column_statistics``: uma passada acumula as estatísticas suficientes
+  (contagem, soma, mínimo/máximo e a matriz de Gram ``XᵀX``) e guarda as
+  colunas binárias (dummies) como bitsets compactados;
+- ``select_features``: remove colunas de variância baixa, dummies raras,
+  duplicatas/complementos exatos (comparando os bitsets, com contagem de
+  bits pela tabela de popcount) e colunas muito correlacionadas com outra
+  já mantida — tudo a partir das estatísticas, sem nova leitura;
+- ``iqr_bounds``: limites de Tukey (Q1 - k·IQR, Q3 + k·IQR) com quartis
+  exatos, por histogramas refinados em passadas sobre os blocos.
+
+O resultado reduz as colunas que K-Means e PCA precisam processar.
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..models.membership import popcount
+
+_CHUNK_ROWS = 262_144
+_HISTOGRAM_BINS = 4096
+# Refinamento dos quartis: valores lidos na passada final e passadas máximas
+_EXACT_ROWS = 65_536
+_MAX_REFINEMENTS = 8
+
+
+@dataclass
+class ColumnStatistics:
+    """
+    Estatísticas suficientes por coluna (NaN ignorado).
+    """
+    count: np.ndarray
+    total: np.ndarray
+    gram: np.ndarray  # XᵀX com NaN -> 0
+    minimum: np.ndarray
+    maximum: np.ndarray
+    is_binary: np.ndarray
+    # Bitsets (np.packbits) das colunas binárias, na ordem de binary_columns
+    bitsets: Dict[int, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def n_rows(self) -> int:
+        return int(self.count.max()) if len(self.count) else 0
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self.total / np.maximum(self.count, 1)
+
+    @property
+    def variance(self) -> np.ndarray:
+        count = np.maximum(self.count, 1)
+        return np.maximum(np.diag(self.gram) / count - self.mean ** 2, 0)
+
+    @property
+    def correlation(self) -> np.ndarray:
+        """Correlação de Pearson entre colunas, a partir da matriz de Gram."""
+        n_rows = max(self.n_rows, 1)
+        covariance = self.gram / n_rows - np.outer(self.mean, self.mean)
+        std = np.sqrt(np.maximum(np.diag(covariance), 0))
+        denominator = np.outer(std, std)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlation = np.where(denominator > 0, covariance / denominator, 0.0)
+        return np.clip(correlation, -1, 1)
+
+
+def column_statistics(X: np.ndarray, track_binary: bool = True) -> ColumnStatistics:
+    """
+    Estatísticas suficientes de ``X`` em uma passada.
+
+    Args:
+        X: Matriz (n, d), ndarray ou memmap
+        track_binary: Guarda bitsets das colunas 0/1
+    """
+    n_rows, n_features = X.shape
+    count = np.zeros(n_features)
+    total = np.zeros(n_features)
+    gram = np.zeros((n_features, n_features))
+    minimum = np.full(n_features, np.inf)
+    maximum = np.full(n_features, -np.inf)
+    is_binary = np.ones(n_features, dtype=bool)
+    bit_chunks: List[List[np.ndarray]] = [[] for _ in range(n_features)] if track_binary else []
+
+    for start in range(0, n_rows, _CHUNK_ROWS):
+        block = np.asarray(X[start:start + _CHUNK_ROWS], dtype=np.float64)
+        valid = ~np.isnan(block)
+        filled = np.where(valid, block, 0.0)
+
+        count += valid.sum(axis=0)
+        total += filled.sum(axis=0)
+        gram += filled.T @ filled
+        minimum = np.minimum(minimum, np.where(valid, block, np.inf).min(axis=0))
+        maximum = np.maximum(maximum, np.where(valid, block, -np.inf).max(axis=0))
+        is_binary &= ((block == 0) | (block == 1)).all(axis=0)
+
+        if track_binary:
+            # Bitsets por coluna; blocos são múltiplos de 8 linhas, então a
+            # concatenação dos pedaços compactados é o bitset da coluna inteira
+            for column in np.flatnonzero(is_binary).tolist():
+                bit_chunks[column].append(np.packbits(block[:, column] == 1))
+
+    bitsets = {}
+    if track_binary:
+        bitsets = {
+            column: np.concatenate(bit_chunks[column]) if bit_chunks[column] else np.empty(0, np.uint8)
+            for column in np.flatnonzero(is_binary).tolist()
+        }
+
+    return ColumnStatistics(count, total, gram, minimum, maximum, is_binary, bitsets)
+
+
+def _binary_duplicates(stats: ColumnStatistics, n_rows: int) -> Dict[int, Tuple[int, str]]:
+    """
+    Dummies idênticas ou complementares a outra anterior, por hash dos bitsets.
+
+    Returns:
+        coluna -> (coluna mantida equivalente, "duplicate" | "complement")
+    """
+    padding = (-n_rows) % 8
+    tail_mask = np.uint8((0xFF << padding) & 0xFF)
+    seen: Dict[bytes, int] = {}
+    found = {}
+
+    for column in sorted(stats.bitsets):
+        bits = stats.bitsets[column]
+        ones = popcount(bits)
+        if ones in (0, n_rows):
+            continue
+        digest = hashlib.blake2b(bits.tobytes(), digest_size=16).digest()
+        complement = np.invert(bits)
+        if len(complement):
+            complement[-1] &= tail_mask
+        complement_digest = hashlib.blake2b(complement.tobytes(), digest_size=16).digest()
+
+        if digest in seen:
+            found[column] = (seen[digest], "duplicate")
+        elif complement_digest in seen:
+            found[column] = (seen[complement_digest], "complement")
+        else:
+            seen[digest] = column
+    return found
+
+
+def select_features(
+    stats: ColumnStatistics,
+    variance_threshold: float = 1e-8,
+    correlation_threshold: float = 0.95,
+    min_binary_count: int = 1,
+    priority: Optional[Sequence[int]] = None,
+) -> Tuple[np.ndarray, Dict[int, str]]:
+    """
+    Seleciona colunas a partir das estatísticas suficientes.
+
+    Args:
+        stats: Saída de ``column_statistics``
+        variance_threshold: Variância mínima para manter uma coluna
+        correlation_threshold: |correlação| a partir da qual a coluna é
+            considerada redundante com uma já mantida
+        min_binary_count: Mínimo de ocorrências (e de não-ocorrências) de
+            uma dummy
+        priority: Ordem de preferência ao desempatar redundâncias (padrão:
+            ordem original das colunas)
+
+    Returns:
+        (índices mantidos em ordem crescente, coluna removida -> motivo)
+    """
+    n_features = len(stats.count)
+    n_rows = stats.n_rows
+    removed: Dict[int, str] = {}
+
+    variance = stats.variance
+    for column in np.flatnonzero(variance <= variance_threshold).tolist():
+        removed[column] = "low_variance"
+
+    if stats.bitsets:
+        ones = {column: popcount(bits) for column, bits in stats.bitsets.items()}
+        for column, count in ones.items():
+            if column not in removed and min(count, n_rows - count) < min_binary_count:
+                removed[column] = "rare_binary"
+        for column, (kept, kind) in _binary_duplicates(stats, n_rows).items():
+            if column not in removed and kept not in removed:
+                removed[column] = f"{kind}_of:{kept}"
+
+    # Greedy: cada coluna é mantida se não for redundante com as já mantidas
+    correlation = np.abs(stats.correlation)
+    order = list(priority) if priority is not None else list(range(n_features))
+    kept_mask = np.zeros(n_features, dtype=bool)
+    for column in order:
+        if column in removed:
+            continue
+        redundant = correlation[column] >= correlation_threshold
+        redundant &= kept_mask
+        if redundant.any():
+            removed[column] = f"correlated_with:{int(np.flatnonzero(redundant)[0])}"
+        else:
+            kept_mask[column] = True
+
+    return np.flatnonzero(kept_mask), removed
+
+
+def _bin_slots(values: np.ndarray, lo: np.ndarray, hi: np.ndarray, closed: np.ndarray,
+               width: np.ndarray, bins: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (máscara dos valores no intervalo de cada alvo, bin de cada valor).
+
+    O bin ``s`` é exatamente ``[lo + s·width, lo + (s+1)·width)`` (o último
+    vai até ``hi``): o arredondamento da divisão é corrigido comparando com
+    as bordas, para que a passada seguinte reconheça os mesmos valores.
+    """
+    inside = (values >= lo) & ((values < hi) | (closed & (values == hi)))
+    slots = np.clip(np.floor((np.where(inside, values, lo) - lo) / width), 0, bins - 1).astype(np.int64)
+    slots -= (slots > 0) & (values < lo + slots * width)
+    slots += (slots < bins - 1) & (values >= lo + (slots + 1) * width)
+    return inside, slots
+
+
+def _order_statistics(
+    X: np.ndarray,
+    columns: np.ndarray,
+    ranks: np.ndarray,
+    counts: np.ndarray,
+    low: np.ndarray,
+    high: np.ndarray,
+    bins: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Valores de posto ``ranks`` (0 = menor, NaN ignorado) e do posto
+    seguinte, para cada alvo (coluna ``columns[t]``).
+
+    Cada passada conta os valores do intervalo corrente de cada alvo em
+    ``bins`` bins e desce para o bin que contém o posto; quando o bin tem
+    até ``_EXACT_ROWS`` valores, a última passada os lê e seleciona o posto
+    exato. Caudas longas (receita, MRR) concentram quase tudo no primeiro
+    bin da primeira passada, e o refinamento resolve em mais uma ou duas.
+    Um intervalo que cabe inteiro em um bin pode ser de valores empatados
+    (ex.: zeros de contagens esparsas): na passada seguinte o mínimo e o
+    máximo dele são conferidos e, se iguais, o posto está determinado.
+    """
+    n_targets = len(columns)
+    lo, hi = low.astype(np.float64), high.astype(np.float64)
+    closed = np.ones(n_targets, dtype=bool)
+    below = np.zeros(n_targets, dtype=np.int64)  # valores abaixo de lo
+    inside = counts.astype(np.int64)  # valores no intervalo
+    suspect = np.zeros(n_targets, dtype=bool)  # intervalo pode ser de empates
+    tied = np.zeros(n_targets, dtype=bool)
+    tied_value = np.zeros(n_targets)
+
+    for _ in range(_MAX_REFINEMENTS):
+        active = np.flatnonzero((inside > _EXACT_ROWS) & (hi > lo) & ~tied)
+        if len(active) == 0:
+            break
+        # Alvos com o mesmo intervalo na mesma coluna (Q1 e Q3 na primeira
+        # passada) compartilham o histograma
+        keys = np.column_stack([columns[active], lo[active], hi[active], closed[active]])
+        keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        key_columns, k_lo, k_hi = keys[:, 0].astype(np.int64), keys[:, 1], keys[:, 2]
+        k_closed = keys[:, 3].astype(bool)
+        width = (k_hi - k_lo) / bins
+        offsets = np.arange(len(keys)) * bins
+        histogram = np.zeros(len(keys) * bins, dtype=np.int64)
+        check = np.flatnonzero(np.bincount(inverse, weights=suspect[active], minlength=len(keys)) > 0)
+        k_min = np.full(len(check), np.inf)
+        k_max = np.full(len(check), -np.inf)
+        for start in range(0, len(X), _CHUNK_ROWS):
+            block = np.asarray(X[start:start + _CHUNK_ROWS][:, key_columns], dtype=np.float64)
+            mask, slots = _bin_slots(block, k_lo, k_hi, k_closed, width, bins)
+            histogram += np.bincount((slots + offsets)[mask], minlength=len(histogram))
+            if len(check):
+                k_min = np.minimum(k_min, np.where(mask[:, check], block[:, check], np.inf).min(axis=0))
+                k_max = np.maximum(k_max, np.where(mask[:, check], block[:, check], -np.inf).max(axis=0))
+
+        # Intervalo com um único valor: o posto já está determinado
+        single = np.zeros(len(keys), dtype=bool)
+        single[check] = k_min == k_max
+        minimum = np.zeros(len(keys))
+        minimum[check] = k_min
+        done = single[inverse]
+        tied[active[done]] = True
+        tied_value[active[done]] = minimum[inverse][done]
+        active, inverse = active[~done], inverse[~done]
+        if len(active) == 0:
+            break
+
+        histogram = histogram.reshape(len(keys), bins)[inverse]
+        cumulative = np.cumsum(histogram, axis=1)
+        rows = np.arange(len(active))
+        slot = np.argmax(cumulative > (ranks[active] - below[active])[:, None], axis=1)
+        below[active] += np.where(slot > 0, cumulative[rows, slot - 1], 0)
+        suspect[active] = histogram[rows, slot] == inside[active]
+        inside[active] = histogram[rows, slot]
+        a_lo, a_width, last = k_lo[inverse], width[inverse], slot == bins - 1
+        hi[active] = np.where(last, hi[active], a_lo + (slot + 1) * a_width)
+        lo[active] = a_lo + slot * a_width
+        closed[active] &= last
+
+    # Passada final: valores dos intervalos (pequenos, salvo com poucos bins
+    # e passadas esgotadas) e, quando o posto seguinte fica fora do
+    # intervalo, o primeiro valor acima dele
+    position = ranks - below
+    exact = np.flatnonzero(~tied)
+    beyond = np.flatnonzero(position + 1 >= inside)
+    found: List[List[np.ndarray]] = [[] for _ in exact]
+    above = np.full(len(beyond), np.inf)
+    if len(exact) or len(beyond):
+        for start in range(0, len(X), _CHUNK_ROWS):
+            chunk = X[start:start + _CHUNK_ROWS]
+            block = np.asarray(chunk[:, columns[exact]], dtype=np.float64)
+            mask = (block >= lo[exact]) & ((block < hi[exact]) | (closed[exact] & (block == hi[exact])))
+            for position_in_block in range(len(exact)):
+                found[position_in_block].append(block[mask[:, position_in_block], position_in_block])
+            if len(beyond):
+                block = np.asarray(chunk[:, columns[beyond]], dtype=np.float64)
+                outside = (block > hi[beyond]) | (~closed[beyond] & (block == hi[beyond]))
+                above = np.minimum(above, np.where(outside, block, np.inf).min(axis=0))
+
+    value = np.where(tied, tied_value, lo)
+    following = value.copy()
+    following[beyond] = above
+    for target, pieces in zip(exact.tolist(), found):
+        values = np.sort(np.concatenate(pieces))
+        value[target] = values[position[target]]
+        if position[target] + 1 < len(values):
+            following[target] = values[position[target] + 1]
+    following = np.where(np.isfinite(following), following, value)
+    return value, following
+
+
+def iqr_bounds(
+    X: np.ndarray,
+    stats: ColumnStatistics,
+    whisker: float = 1.5,
+    columns: Optional[np.ndarray] = None,
+    bins: int = _HISTOGRAM_BINS,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Limites de corte de Tukey por coluna.
+
+    Os quartis são exatos (interpolação linear, como ``np.percentile``):
+    histogramas sucessivos refinam o bin de cada quartil e a última
+    passada seleciona o valor entre os poucos que sobram.
+
+    Colunas binárias e colunas com IQR nulo (ex.: contagens esparsas) não
+    são cortadas (limites infinitos).
+
+    Args:
+        X: Matriz (n, d)
+        stats: Estatísticas (contagem e mínimo/máximo de cada coluna)
+        whisker: Multiplicador do IQR
+        columns: Colunas a considerar (padrão: todas)
+        bins: Bins por coluna em cada passada de refinamento
+
+    Returns:
+        (limite inferior, limite superior), arrays de tamanho d
+    """
+    n_features = X.shape[1]
+    lower = np.full(n_features, -np.inf)
+    upper = np.full(n_features, np.inf)
+
+    if columns is None:
+        columns = np.arange(n_features)
+    columns = np.asarray([c for c in np.asarray(columns).tolist()
+                          if not stats.is_binary[c] and stats.maximum[c] > stats.minimum[c]], dtype=np.int64)
+    if len(columns) == 0:
+        return lower, upper
+
+    # Um alvo por (coluna, quartil): posto floor(h) e fração de h = (n - 1)·q
+    quartiles = np.array([0.25, 0.75])
+    targets = np.repeat(columns, len(quartiles))
+    counts = stats.count[targets].astype(np.int64)
+    h = (counts - 1) * np.tile(quartiles, len(columns))
+    ranks = np.floor(h).astype(np.int64)
+    value, following = _order_statistics(
+        X, targets, ranks, counts, stats.minimum[targets], stats.maximum[targets], bins
+    )
+    q1, q3 = (value + (h - ranks) * (following - value)).reshape(len(columns), 2).T
+
+    iqr = q3 - q1
+    cap = iqr > 0
+    lower[columns[cap]] = (q1 - whisker * iqr)[cap]
+    upper[columns[cap]] = (q3 + whisker * iqr)[cap]
+    return lower, upper
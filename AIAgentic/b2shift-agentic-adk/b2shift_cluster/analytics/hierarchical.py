@@ -0,0 +1,242 @@
+"""
+Clusterização hierárquica escalável por pré-agregação em micro-clusters.
+
+A aglomeração exata é O(n²) em memória. Aqui os clientes são primeiro
+comprimidos em ``n_micro`` micro-clusters (super-segmentação K-Means),
+cada um resumido pelo clustering feature (N, soma linear, soma dos
+quadrados). O linkage roda sobre os resumos, ponderado pelo tamanho de
+cada micro-cluster, e os cortes do dendrograma voltam para os clientes
+por uma indexação ``labels_micro[assignment]``.
+
+Como o dendrograma é calculado uma vez, cortar em vários níveis (ex.: 5
+segmentos de negócio e 22 clusters finos) é instantâneo, e os níveis são
+aninhados: cada cluster fino pertence a exatamente um segmento.
+"""
+
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+LINKAGES = ("ward", "average", "complete", "single")
+
+
+def _weighted_linkage(centroids: np.ndarray, weights: np.ndarray, method: str) -> np.ndarray:
+    """
+    Aglomeração de Lance-Williams sobre centróides ponderados.
+
+    Para ``ward`` a distância é o aumento da inércia ao fundir dois grupos,
+    exato dado que cada micro-cluster é um átomo; as alturas seguem a
+    escala do scipy (``sqrt(2·Δ)``). Os demais métodos partem da distância
+    euclidiana entre centróides.
+
+    Returns:
+        Matriz de linkage no formato scipy (esquerda, direita, altura, tamanho)
+    """
+    m = len(centroids)
+    sq = np.einsum("ij,ij->i", centroids, centroids)
+    D = np.maximum(sq[:, None] + sq[None, :] - 2 * centroids @ centroids.T, 0)
+    if method == "ward":
+        D *= (weights[:, None] * weights[None, :]) / (weights[:, None] + weights[None, :])
+    else:
+        np.sqrt(D, out=D)
+    np.fill_diagonal(D, np.inf)
+
+    sizes = weights.astype(np.float64).copy()
+    node_id = np.arange(m)
+    active = np.ones(m, dtype=bool)
+    Z = np.empty((m - 1, 4))
+
+    for step in range(m - 1):
+        flat = int(np.argmin(D))
+        i, j = divmod(flat, m)
+        if i > j:
+            i, j = j, i
+        d_ij = D[i, j]
+        n_i, n_j = sizes[i], sizes[j]
+
+        d_ki, d_kj = D[i], D[j]
+        if method == "ward":
+            n_k = sizes
+            merged = ((n_k + n_i) * d_ki + (n_k + n_j) * d_kj - n_k * d_ij) / (n_k + n_i + n_j)
+        elif method == "average":
+            merged = (n_i * d_ki + n_j * d_kj) / (n_i + n_j)
+        elif method == "complete":
+            merged = np.maximum(d_ki, d_kj)
+        else:
+            merged = np.minimum(d_ki, d_kj)
+
+        height = np.sqrt(2 * d_ij) if method == "ward" else d_ij
+        Z[step] = (node_id[i], node_id[j], height, n_i + n_j)
+
+        # O grupo fundido ocupa a linha i; a linha j sai da matriz
+        merged[~active] = np.inf
+        merged[i] = np.inf
+        D[i, :] = merged
+        D[:, i] = merged
+        D[j, :] = np.inf
+        D[:, j] = np.inf
+        active[j] = False
+        sizes[i] = n_i + n_j
+        node_id[i] = m + step
+
+    return Z
+
+
+class MicroClusterHierarchy:
+    """
+    Hierarquia de clientes via micro-clusters + linkage ponderado.
+
+    Args:
+        n_micro: Número de micro-clusters (resolução da hierarquia)
+        linkage: "ward", "average", "complete" ou "single"
+        batch_size: Lote do MiniBatchKMeans da super-segmentação
+        random_state: Semente da super-segmentação
+    """
+
+    def __init__(self, n_micro: int = 1000, linkage: str = "ward", batch_size: int = 4096,
+                 random_state: int = 42):
+        if linkage not in LINKAGES:
+            raise ValueError(f"Linkage {linkage} não suportado. Use um de {LINKAGES}")
+        self.n_micro = n_micro
+        self.linkage = linkage
+        self.batch_size = batch_size
+        self.random_state = random_state
+
+        self.assignment: Optional[np.ndarray] = None  # micro-cluster de cada cliente
+        self.centroids: Optional[np.ndarray] = None
+        # Clustering features dos micro-clusters
+        self.counts: Optional[np.ndarray] = None
+        self.linear_sum: Optional[np.ndarray] = None
+        self.squared_sum: Optional[np.ndarray] = None
+        self.linkage_matrix: Optional[np.ndarray] = None
+        self._cuts: Dict[int, np.ndarray] = {}
+
+    @classmethod
+    def from_config(cls, config, **params) -> "MicroClusterHierarchy":
+        """Cria a partir de ``ClusteringConfiguration`` (usa ``linkage``)."""
+        return cls(linkage=config.linkage or "ward", **params)
+
+    @property
+    def n_micro_clusters(self) -> int:
+        return 0 if self.counts is None else len(self.counts)
+
+    def fit(self, X: np.ndarray) -> "MicroClusterHierarchy":
+        """
+        Super-segmenta ``X`` em micro-clusters e constrói o dendrograma.
+
+        Args:
+            X: Matriz (n, d), tipicamente o embedding PCA padronizado
+        """
+        from sklearn.cluster import MiniBatchKMeans
+
+        X = np.asarray(X, dtype=np.float64)
+        n_micro = min(self.n_micro, len(X))
+
+        kmeans = MiniBatchKMeans(
+            n_clusters=n_micro, n_init=1, batch_size=self.batch_size, random_state=self.random_state
+        ).fit(X)
+        assignment = kmeans.labels_
+
+        # Micro-clusters que ficaram vazios são descartados
+        counts = np.bincount(assignment, minlength=n_micro)
+        used = np.flatnonzero(counts)
+        remap = np.full(n_micro, -1, dtype=np.int64)
+        remap[used] = np.arange(len(used))
+        assignment = remap[assignment].astype(np.int32)
+
+        n_used = len(used)
+        linear_sum = np.zeros((n_used, X.shape[1]))
+        np.add.at(linear_sum, assignment, X)
+        squared_sum = np.bincount(assignment, weights=np.einsum("ij,ij->i", X, X), minlength=n_used)
+
+        self.assignment = assignment
+        self.counts = counts[used]
+        self.linear_sum = linear_sum
+        self.squared_sum = squared_sum
+        self.centroids = linear_sum / self.counts[:, None]
+        self.linkage_matrix = (
+            _weighted_linkage(self.centroids, self.counts.astype(np.float64), self.linkage)
+            if n_used > 1 else np.empty((0, 4))
+        )
+        self._cuts.clear()
+        return self
+
+    @property
+    def micro_radius(self) -> np.ndarray:
+        """Raio (desvio médio ao centróide) de cada micro-cluster, via CF."""
+        variance = self.squared_sum / self.counts - np.einsum("ij,ij->i", self.centroids, self.centroids)
+        return np.sqrt(np.maximum(variance, 0))
+
+    # ------------------------------------------------------------------
+    # Cortes
+    # ------------------------------------------------------------------
+
+    def micro_labels(self, n_clusters: int) -> np.ndarray:
+        """
+        Cluster de cada micro-cluster ao cortar o dendrograma em
+        ``n_clusters`` grupos (numerados por tamanho decrescente).
+        """
+        if self.linkage_matrix is None:
+            raise ValueError("MicroClusterHierarchy não foi ajustada: chame fit()")
+        m = self.n_micro_clusters
+        n_clusters = max(1, min(n_clusters, m))
+        if n_clusters in self._cuts:
+            return self._cuts[n_clusters]
+
+        # Aplica as primeiras m - n_clusters fusões com union-find
+        parent = np.arange(2 * m - 1)
+        for step, (left, right) in enumerate(self.linkage_matrix[:m - n_clusters, :2].astype(np.int64)):
+            parent[left] = parent[right] = m + step
+
+        roots = np.arange(m)
+        while True:
+            next_roots = parent[roots]
+            if np.array_equal(next_roots, roots):
+                break
+            roots = next_roots
+
+        _, labels = np.unique(roots, return_inverse=True)
+        # Rótulo 0 = maior cluster em clientes
+        sizes = np.bincount(labels, weights=self.counts)
+        rank = np.empty(len(sizes), dtype=np.int64)
+        rank[np.argsort(-sizes, kind="stable")] = np.arange(len(sizes))
+        labels = rank[labels]
+
+        self._cuts[n_clusters] = labels
+        return labels
+
+    def cut(self, n_clusters: int) -> np.ndarray:
+        """Cluster de cada cliente para um corte em ``n_clusters`` grupos."""
+        return self.micro_labels(n_clusters)[self.assignment]
+
+    def cut_levels(self, levels: Iterable[int] = (5, 22)) -> Dict[int, np.ndarray]:
+        """Vários cortes do mesmo ajuste (ex.: segmentos e clusters finos)."""
+        return {n_clusters: self.cut(n_clusters) for n_clusters in levels}
+
+    def parent_map(self, coarse: int, fine: int) -> Dict[int, int]:
+        """
+        Segmento (corte ``coarse``) de cada cluster do corte ``fine``.
+
+        Os cortes são aninhados, então cada cluster fino tem um único pai.
+        """
+        fine_labels = self.micro_labels(fine)
+        coarse_labels = self.micro_labels(coarse)
+        return dict(zip(fine_labels.tolist(), coarse_labels.tolist()))
+
+    def cluster_sizes(self, n_clusters: int) -> np.ndarray:
+        """Clientes por cluster, sem percorrer a base (soma dos CFs)."""
+        return np.bincount(self.micro_labels(n_clusters), weights=self.counts).astype(np.int64)
+
+    def cluster_centroids(self, n_clusters: int) -> np.ndarray:
+        """Centróides exatos de cada cluster, a partir das somas lineares."""
+        labels = self.micro_labels(n_clusters)
+        sums = np.zeros((labels.max() + 1, self.linear_sum.shape[1]))
+        np.add.at(sums, labels, self.linear_sum)
+        return sums / self.cluster_sizes(n_clusters)[:, None]
+
+    def predict(self, X: np.ndarray, n_clusters: int) -> np.ndarray:
+        """Atribui novos clientes pelo micro-cluster mais próximo."""
+        X = np.asarray(X, dtype=np.float64)
+        sq = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        nearest = np.argmin(sq[None, :] - 2 * X @ self.centroids.T, axis=1)
+        return self.micro_labels(n_clusters)[nearest]
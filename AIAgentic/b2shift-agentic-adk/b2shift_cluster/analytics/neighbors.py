@@ -0,0 +1,448 @@
+"""
+Índice de vizinhos mais próximos para consultas de clientes similares.
+
+Trabalha sobre o embedding reduzido (PCA) dos clientes e oferece:
+
+- modos exatos: ``kd_tree`` e ``ball_tree`` (scikit-learn) e ``brute``
+  (produto matricial em blocos);
+- modo aproximado ``ivf``: os clientes são particionados por um K-Means
+  grosso e cada consulta visita só as ``n_probe`` listas mais próximas.
+  A busca percorre lista a lista, calculando de uma vez as distâncias de
+  todas as consultas que visitam aquela lista.
+
+Todas as consultas são em lote (matriz de consultas -> matrizes k-NN) e o
+índice é persistido como arrays ``.npy`` mapeáveis em memória, normalmente
+no subdiretório ``neighbors`` do ClusteringArtifact.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+METHODS = ("auto", "kd_tree", "ball_tree", "brute", "ivf")
+MANIFEST_FILE = "neighbors.json"
+
+# Limiares do modo "auto"
+_EXACT_MAX_ROWS = 200_000
+_KD_TREE_MAX_DIMS = 16
+
+# Memória de cada bloco de distâncias (consultas x candidatos, float32)
+_BLOCK_BYTES = 64 * 2**20
+
+
+def _squared_distances(Q: np.ndarray, X: np.ndarray, X_sq: np.ndarray) -> np.ndarray:
+    """||q - x||² = ||q||² - 2 q·x + ||x||², limitado a >= 0."""
+    D = Q @ X.T
+    D *= -2
+    D += np.einsum("ij,ij->i", Q, Q)[:, None]
+    D += X_sq[None, :]
+    np.maximum(D, 0, out=D)
+    return D
+
+
+def _merge_top_k(best_d: np.ndarray, best_i: np.ndarray,
+                 cand_d: np.ndarray, cand_i: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Combina o top-k corrente com novos candidatos (distâncias ao quadrado)."""
+    all_d = np.concatenate([best_d, cand_d], axis=1)
+    all_i = np.concatenate([best_i, cand_i], axis=1)
+    if all_d.shape[1] > k:
+        keep = np.argpartition(all_d, k - 1, axis=1)[:, :k]
+        all_d = np.take_along_axis(all_d, keep, axis=1)
+        all_i = np.take_along_axis(all_i, keep, axis=1)
+    return all_d, all_i
+
+
+def _sort_results(dist_sq: np.ndarray, ind: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(dist_sq, axis=1, kind="stable")
+    return (np.sqrt(np.take_along_axis(dist_sq, order, axis=1)),
+            np.take_along_axis(ind, order, axis=1))
+
+
+def _invert(permutation: np.ndarray) -> np.ndarray:
+    inverse = np.empty(len(permutation), dtype=np.int64)
+    inverse[permutation] = np.arange(len(permutation))
+    return inverse
+
+
+class NeighborIndex:
+    """
+    Índice k-NN euclidiano sobre o embedding de clientes.
+
+    Args:
+        method: "auto", "kd_tree", "ball_tree", "brute" ou "ivf" (aproximado)
+        leaf_size: Tamanho de folha das árvores exatas
+        n_lists: Número de listas do IVF (padrão: ~sqrt(n))
+        n_probe: Listas visitadas por consulta no IVF (recall x tempo)
+        n_jobs: Threads para consultas em lote nas árvores exatas
+        random_state: Semente do K-Means grosso do IVF
+    """
+
+    def __init__(
+        self,
+        method: str = "auto",
+        leaf_size: int = 40,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        n_jobs: int = 1,
+        random_state: int = 42,
+    ):
+        if method not in METHODS:
+            raise ValueError(f"Método {method} não suportado. Use um de {METHODS}")
+
+        self.method = method
+        self.leaf_size = leaf_size
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+        self._data: Optional[np.ndarray] = None
+        self._data_sq: Optional[np.ndarray] = None
+        self._tree = None
+        # IVF: dados ordenados por lista, posição original (e a inversa,
+        # posição -> linha de ``_data``) e limites das listas
+        self._centroids: Optional[np.ndarray] = None
+        self._positions: Optional[np.ndarray] = None
+        self._rows: Optional[np.ndarray] = None
+        self._list_offsets: Optional[np.ndarray] = None
+
+    @property
+    def n_samples(self) -> int:
+        return 0 if self._data is None else len(self._data)
+
+    def _resolve_method(self, n_rows: int, n_dims: int) -> str:
+        if self.method != "auto":
+            return self.method
+        if n_rows > _EXACT_MAX_ROWS:
+            return "ivf"
+        return "kd_tree" if n_dims <= _KD_TREE_MAX_DIMS else "ball_tree"
+
+    # ------------------------------------------------------------------
+    # Construção
+    # ------------------------------------------------------------------
+
+    def fit(self, X: np.ndarray) -> "NeighborIndex":
+        """
+        Constrói o índice sobre ``X`` (n, d); posições retornadas pelas
+        consultas são linhas de ``X``.
+        """
+        X = np.asarray(X)
+        if X.ndim != 2 or len(X) == 0:
+            raise ValueError("NeighborIndex.fit requer uma matriz (n, d) não vazia")
+
+        self.method = self._resolve_method(*X.shape)
+
+        if self.method == "ivf":
+            self._fit_ivf(X)
+        else:
+            self._data = np.ascontiguousarray(X, dtype=np.float32 if self.method == "brute" else np.float64)
+            if self.method == "brute":
+                self._data_sq = np.einsum("ij,ij->i", self._data, self._data)
+            else:
+                self._build_tree()
+        return self
+
+    def _build_tree(self):
+        from sklearn.neighbors import BallTree, KDTree
+
+        tree_class = KDTree if self.method == "kd_tree" else BallTree
+        self._tree = tree_class(self._data, leaf_size=self.leaf_size)
+
+    def _fit_ivf(self, X: np.ndarray):
+        from sklearn.cluster import MiniBatchKMeans
+
+        n_rows = len(X)
+        n_lists = self.n_lists or max(1, int(np.sqrt(n_rows)))
+        n_lists = min(n_lists, n_rows)
+
+        # K-Means grosso treinado em amostra (~32 pontos por lista)
+        rng = np.random.default_rng(self.random_state)
+        sample_size = min(n_rows, 32 * n_lists)
+        sample = X[rng.choice(n_rows, sample_size, replace=False)] if sample_size < n_rows else X
+        coarse = MiniBatchKMeans(
+            n_clusters=n_lists, n_init=1, batch_size=4096, max_iter=20,
+            random_state=self.random_state
+        ).fit(np.asarray(sample, dtype=np.float32))
+        centroids = coarse.cluster_centers_.astype(np.float32)
+
+        assignments = self._nearest_lists(X, centroids, n_probe=1)[:, 0]
+        order = np.argsort(assignments, kind="stable")
+
+        self.n_lists = n_lists
+        self._centroids = centroids
+        self._positions = order.astype(np.int64)
+        self._rows = _invert(self._positions)
+        self._list_offsets = np.searchsorted(
+            assignments[order], np.arange(n_lists + 1)
+        ).astype(np.int64)
+        self._data = np.ascontiguousarray(X[order], dtype=np.float32)
+        self._data_sq = np.einsum("ij,ij->i", self._data, self._data)
+
+    @staticmethod
+    def _nearest_lists(X: np.ndarray, centroids: np.ndarray, n_probe: int) -> np.ndarray:
+        centroid_sq = np.einsum("ij,ij->i", centroids, centroids)
+        block = max(1, _BLOCK_BYTES // (4 * len(centroids)))
+        n_probe = min(n_probe, len(centroids))
+        result = np.empty((len(X), n_probe), dtype=np.int64)
+
+        for start in range(0, len(X), block):
+            Q = np.asarray(X[start:start + block], dtype=np.float32)
+            D = _squared_distances(Q, centroids, centroid_sq)
+            if n_probe == 1:
+                result[start:start + len(Q), 0] = D.argmin(axis=1)
+            else:
+                result[start:start + len(Q)] = np.argpartition(D, n_probe - 1, axis=1)[:, :n_probe]
+        return result
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def query(self, Q: np.ndarray, k: int = 10, chunk_size: int = 4096) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k vizinhos mais próximos de cada linha de ``Q``.
+
+        Args:
+            Q: Consultas (m, d) no mesmo espaço de ``fit``
+            k: Número de vizinhos
+            chunk_size: Consultas por bloco (limita a memória)
+
+        Returns:
+            (distâncias, posições), ambas (m, k) e ordenadas por distância;
+            posições -1/distância inf quando há menos de k candidatos (IVF)
+        """
+        if self._data is None:
+            raise ValueError("NeighborIndex não foi construído: chame fit() ou load()")
+
+        Q = np.atleast_2d(np.asarray(Q, dtype=np.float64))
+        k = min(k, self.n_samples)
+        chunks = [Q[start:start + chunk_size] for start in range(0, len(Q), chunk_size)]
+
+        if self.method in ("kd_tree", "ball_tree"):
+            search = self._query_tree
+        elif self.method == "brute":
+            search = self._query_brute
+        else:
+            search = self._query_ivf
+
+        if self.n_jobs > 1 and len(chunks) > 1 and self.method != "ivf":
+            with ThreadPoolExecutor(max_workers=self.n_jobs) as executor:
+                results = list(executor.map(lambda chunk: search(chunk, k), chunks))
+        else:
+            results = [search(chunk, k) for chunk in chunks]
+
+        if not results:
+            return np.empty((0, k)), np.empty((0, k), dtype=np.int64)
+        return (np.concatenate([r[0] for r in results]),
+                np.concatenate([r[1] for r in results]))
+
+    def _query_tree(self, Q: np.ndarray, k: int):
+        dist, ind = self._tree.query(Q, k=k, return_distance=True, sort_results=True)
+        return dist, ind.astype(np.int64)
+
+    def _query_brute(self, Q: np.ndarray, k: int):
+        Q = Q.astype(np.float32)
+        best_d = np.full((len(Q), 0), np.inf, dtype=np.float32)
+        best_i = np.empty((len(Q), 0), dtype=np.int64)
+        block = max(k, _BLOCK_BYTES // (4 * max(len(Q), 1)))
+
+        for start in range(0, self.n_samples, block):
+            D = _squared_distances(Q, self._data[start:start + block], self._data_sq[start:start + block])
+            cand_i = np.broadcast_to(np.arange(start, start + D.shape[1]), D.shape)
+            best_d, best_i = _merge_top_k(best_d, best_i, D, cand_i, k)
+        return _sort_results(best_d, best_i)
+
+    def _query_ivf(self, Q: np.ndarray, k: int):
+        Q = Q.astype(np.float32)
+        n_queries = len(Q)
+        probes = self._nearest_lists(Q, self._centroids, self.n_probe)
+
+        # Inverte (consulta -> listas) em (lista -> consultas)
+        flat_lists = probes.ravel()
+        flat_queries = np.repeat(np.arange(n_queries), probes.shape[1])
+        order = np.argsort(flat_lists, kind="stable")
+        flat_lists, flat_queries = flat_lists[order], flat_queries[order]
+        boundaries = np.flatnonzero(np.diff(flat_lists)) + 1
+        starts = np.concatenate([[0], boundaries])
+        ends = np.concatenate([boundaries, [len(flat_lists)]])
+
+        best_d = np.full((n_queries, k), np.inf, dtype=np.float32)
+        best_i = np.full((n_queries, k), -1, dtype=np.int64)
+
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            list_id = flat_lists[start]
+            lo, hi = self._list_offsets[list_id], self._list_offsets[list_id + 1]
+            if lo == hi:
+                continue
+            queries = flat_queries[start:end]
+            D = _squared_distances(Q[queries], self._data[lo:hi], self._data_sq[lo:hi])
+            cand_i = np.broadcast_to(np.arange(lo, hi), D.shape)
+            merged_d, merged_i = _merge_top_k(best_d[queries], best_i[queries], D, cand_i, k)
+            best_d[queries], best_i[queries] = merged_d, merged_i
+
+        dist, ind = _sort_results(best_d, best_i)
+        # Converte posições internas (ordenadas por lista) em linhas originais
+        valid = ind >= 0
+        ind[valid] = self._positions[ind[valid]]
+        return dist, ind
+
+    def query_positions(self, positions: np.ndarray, k: int = 10,
+                        exclude_self: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vizinhos de clientes já indexados (pelas suas posições em ``fit``).
+
+        Args:
+            positions: Posições dos clientes consultados
+            k: Número de vizinhos
+            exclude_self: Remove o próprio cliente do resultado
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        if self.method == "ivf":
+            Q = self._data[self._rows[positions]]
+        else:
+            Q = self._data[positions]
+
+        dist, ind = self.query(Q, k=k + 1 if exclude_self else k)
+        if not exclude_self:
+            return dist, ind
+
+        # Remove a ocorrência do próprio cliente (ou a última coluna se não veio)
+        is_self = ind == positions[:, None]
+        drop = np.where(is_self.any(axis=1), is_self.argmax(axis=1), ind.shape[1] - 1)
+        keep = np.ones(ind.shape, dtype=bool)
+        keep[np.arange(len(ind)), drop] = False
+        shape = (len(ind), ind.shape[1] - 1)
+        return dist[keep].reshape(shape), ind[keep].reshape(shape)
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+
+    def save(self, directory: Union[str, os.PathLike]) -> Path:
+        """
+        Grava o índice; árvores exatas são reconstruídas a partir dos dados
+        na leitura (sem pickle).
+        """
+        if self._data is None:
+            raise ValueError("NeighborIndex vazio não pode ser gravado")
+
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        arrays = {"data": self._data}
+        if self.method == "ivf":
+            arrays.update(centroids=self._centroids, positions=self._positions,
+                          list_offsets=self._list_offsets)
+        for name, array in arrays.items():
+            np.save(directory / f"{name}.npy", array, allow_pickle=False)
+
+        manifest = {
+            "method": self.method,
+            "leaf_size": self.leaf_size,
+            "n_lists": self.n_lists,
+            "n_probe": self.n_probe,
+            "random_state": self.random_state,
+            "n_samples": self.n_samples,
+            "arrays": sorted(arrays),
+        }
+        with open(directory / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        return directory
+
+    @classmethod
+    def load(cls, directory: Union[str, os.PathLike], n_jobs: int = 1) -> "NeighborIndex":
+        """Abre um índice gravado por ``save`` (arrays mapeados em memória)."""
+        directory = Path(directory)
+        with open(directory / MANIFEST_FILE, encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        index = cls(
+            method=manifest["method"],
+            leaf_size=manifest["leaf_size"],
+            n_lists=manifest["n_lists"],
+            n_probe=manifest["n_probe"],
+            n_jobs=n_jobs,
+            random_state=manifest["random_state"],
+        )
+        arrays = {
+            name: np.load(directory / f"{name}.npy", mmap_mode="r", allow_pickle=False)
+            for name in manifest["arrays"]
+        }
+
+        index._data = arrays["data"]
+        if index.method == "ivf":
+            index._centroids = np.asarray(arrays["centroids"])
+            index._positions = np.asarray(arrays["positions"])
+            index._rows = _invert(index._positions)
+            index._list_offsets = np.asarray(arrays["list_offsets"])
+        if index.method in ("ivf", "brute"):
+            index._data_sq = np.einsum("ij,ij->i", index._data, index._data)
+        else:
+            index._build_tree()
+        return index
+
+
+def lookalike_audience(index: NeighborIndex, seed_positions: np.ndarray, size: int,
+                       k: int = 20) -> np.ndarray:
+    """
+    Audiência lookalike: clientes mais próximos de um conjunto semente.
+
+    Cada candidato é pontuado pela menor distância a qualquer semente;
+    sementes ficam fora da audiência.
+
+    Args:
+        index: NeighborIndex sobre o embedding da base
+        seed_positions: Posições dos clientes semente (ex.: melhores contas)
+        size: Tamanho desejado da audiência
+        k: Vizinhos consultados por semente
+
+    Returns:
+        Posições da audiência, da mais próxima para a mais distante
+    """
+    seed_positions = np.unique(np.asarray(seed_positions, dtype=np.int64))
+    dist, ind = index.query_positions(seed_positions, k=k, exclude_self=True)
+
+    candidates, distances = ind.ravel(), dist.ravel()
+    valid = (candidates >= 0) & ~np.isin(candidates, seed_positions)
+    candidates, distances = candidates[valid], distances[valid]
+
+    # Menor distância por candidato: ordena por distância e mantém a 1ª ocorrência
+    order = np.argsort(distances, kind="stable")
+    unique_candidates, first = np.unique(candidates[order], return_index=True)
+    ranked = unique_candidates[np.argsort(first)]
+    return ranked[:size]
+
+
+def knn_outlier_scores(index: NeighborIndex, k: int = 10,
+                       positions: Optional[np.ndarray] = None,
+                       chunk_size: int = 65_536) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score de outlier por distância média aos k vizinhos, com os vizinhos
+    usados como explicação ("parecido com estes clientes, mas distante").
+
+    Args:
+        index: NeighborIndex sobre o embedding da base
+        k: Vizinhos considerados
+        positions: Clientes avaliados (padrão: toda a base)
+        chunk_size: Clientes por lote
+
+    Returns:
+        (scores (m,), vizinhos (m, k))
+    """
+    if positions is None:
+        positions = np.arange(index.n_samples)
+    positions = np.asarray(positions, dtype=np.int64)
+
+    scores = np.empty(len(positions))
+    neighbors = np.empty((len(positions), min(k, index.n_samples - 1)), dtype=np.int64)
+    for start in range(0, len(positions), chunk_size):
+        block = positions[start:start + chunk_size]
+        dist, ind = index.query_positions(block, k=k, exclude_self=True)
+        finite = np.isfinite(dist)
+        scores[start:start + len(block)] = np.where(finite, dist, 0).sum(axis=1) / np.maximum(finite.sum(axis=1), 1)
+        neighbors[start:start + len(block)] = ind
+    return scores, neighbors
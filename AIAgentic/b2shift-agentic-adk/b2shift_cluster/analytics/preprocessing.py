@@ -0,0 +1,349 @@
+"""
+Pré-processamento de features com cache em disco para o B2Shift.
+
+Cada tentativa de clusterização (algoritmo, K, semente) parte da mesma
+matriz transformada. Este módulo calcula essa matriz uma vez por
+combinação de (hash dos dados de entrada, ``features``, ``scale_features``,
+``handle_outliers``, ``feature_selection``) de ``ClusteringConfiguration``
+e a grava como ``.npy`` mapeável em memória, reaproveitada entre
+algoritmos, processos e sessões. O cache tem limite de tamanho com
+remoção das entradas usadas há mais tempo.
+
+As etapas são feitas em blocos: passadas para as estatísticas (seleção de
+features e limites de outliers vêm de ``feature_selection``) e uma última
+escrevendo o resultado direto no arquivo mapeado.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Incrementar quando o resultado das etapas mudar, invalidando o cache
+PIPELINE_VERSION = 2
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "b2shift" / "preprocessing"
+DEFAULT_MAX_MB = 2048
+
+MATRIX_FILE = "matrix.npy"
+META_FILE = "meta.json"
+
+_CHUNK_ROWS = 262_144
+
+
+@dataclass
+class PreprocessedMatrix:
+    """
+    Matriz pronta para clusterização e os parâmetros que a geraram.
+    """
+    matrix: np.ndarray  # (n, len(feature_names)), normalmente np.memmap
+    feature_names: List[str]
+    params: Dict[str, Any] = field(default_factory=dict)
+    key: Optional[str] = None
+    from_cache: bool = False
+
+
+def _as_matrix(data: Any, features: Sequence[str]) -> np.ndarray:
+    """Extrai ``features`` de um DataFrame/dict de colunas ou aceita uma matriz."""
+    if isinstance(data, np.ndarray):
+        if data.ndim != 2 or data.shape[1] != len(features):
+            raise ValueError(f"Matriz {data.shape} incompatível com {len(features)} features")
+        return data
+    missing = [name for name in features if name not in data]
+    if missing:
+        raise ValueError(f"Features ausentes nos dados: {missing}")
+    columns = [data[name] for name in features]
+    columns = [column.to_numpy() if hasattr(column, "to_numpy") else np.asarray(column) for column in columns]
+    return np.column_stack([np.asarray(column, dtype=np.float64) for column in columns])
+
+
+def data_fingerprint(X: np.ndarray) -> str:
+    """Hash do conteúdo (formato, dtype e bytes) de uma matriz, em blocos."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{X.shape}|{X.dtype.str}".encode())
+    for start in range(0, len(X), _CHUNK_ROWS):
+        digest.update(np.ascontiguousarray(X[start:start + _CHUNK_ROWS]).data)
+    return digest.hexdigest()
+
+
+def cache_key(fingerprint: str, config, extra: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Chave de cache: hash dos dados + campos de pré-processamento da config.
+
+    Args:
+        fingerprint: Saída de ``data_fingerprint``
+        config: ClusteringConfiguration
+        extra: Parâmetros adicionais das etapas (ex.: redução de dimensão)
+    """
+    payload = {
+        "version": PIPELINE_VERSION,
+        "data": fingerprint,
+        "features": list(config.features),
+        "scale_features": config.scale_features,
+        "handle_outliers": config.handle_outliers,
+        "feature_selection": config.feature_selection,
+        "extra": extra or {},
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def _column_stats(X: np.ndarray, lower: Optional[np.ndarray] = None,
+                  upper: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Média e desvio-padrão por coluna em uma passada (ignora NaN, aplica o corte)."""
+    count = np.zeros(X.shape[1])
+    total = np.zeros(X.shape[1])
+    total_sq = np.zeros(X.shape[1])
+    for start in range(0, len(X), _CHUNK_ROWS):
+        block = np.asarray(X[start:start + _CHUNK_ROWS], dtype=np.float64)
+        if lower is not None:
+            block = np.clip(block, lower, upper)
+        valid = ~np.isnan(block)
+        block = np.where(valid, block, 0.0)
+        count += valid.sum(axis=0)
+        total += block.sum(axis=0)
+        total_sq += np.einsum("ij,ij->j", block, block)
+    count = np.maximum(count, 1)
+    mean = total / count
+    std = np.sqrt(np.maximum(total_sq / count - mean ** 2, 0))
+    return mean, std
+
+
+def _describe_removal(reason: str, feature_names: Sequence[str]) -> str:
+    # "correlated_with:4" -> "correlated_with:<nome da feature 4>"
+    kind, _, column = reason.partition(":")
+    return f"{kind}:{feature_names[int(column)]}" if column else kind
+
+
+def fit_preprocessing(X: np.ndarray, feature_names: Sequence[str], config) -> Dict[str, Any]:
+    """
+    Estima os parâmetros das etapas ativas na configuração.
+
+    Returns:
+        Dicionário com ``selected`` (índices das colunas mantidas) e, conforme
+        as flags, ``removed`` (feature -> motivo), ``clip_lower``/``clip_upper``
+        e ``scaler_mean``/``scaler_scale``
+    """
+    from .feature_selection import column_statistics, iqr_bounds, select_features
+
+    params: Dict[str, Any] = {"selected": np.arange(X.shape[1])}
+    stats = column_statistics(X) if config.feature_selection or config.handle_outliers else None
+
+    if config.feature_selection:
+        selected, removed = select_features(stats)
+        params["selected"] = selected
+        params["removed"] = {
+            feature_names[column]: _describe_removal(reason, feature_names)
+            for column, reason in removed.items()
+        }
+
+    if config.handle_outliers:
+        lower, upper = iqr_bounds(X, stats, columns=params["selected"])
+        params["clip_lower"], params["clip_upper"] = lower, upper
+
+    mean, std = _column_stats(X, params.get("clip_lower"), params.get("clip_upper"))
+
+    if config.scale_features:
+        params["scaler_mean"] = mean
+        params["scaler_scale"] = np.where(std > 0, std, 1.0)
+    return params
+
+
+def transform_block(block: np.ndarray, params: Dict[str, Any]) -> np.ndarray:
+    """Aplica os parâmetros de ``fit_preprocessing`` a um bloco de linhas."""
+    block = np.array(block, dtype=np.float64)
+    if "clip_lower" in params:
+        np.clip(block, params["clip_lower"], params["clip_upper"], out=block)
+    if "scaler_mean" in params:
+        block -= params["scaler_mean"]
+        block /= params["scaler_scale"]
+    block = np.nan_to_num(block, nan=0.0)
+    return block[:, params["selected"]]
+
+
+def preprocess_features(X: np.ndarray, feature_names: Sequence[str], config,
+                        out: Optional[Callable[[Tuple[int, int]], np.ndarray]] = None):
+    """
+    Executa o pré-processamento completo em blocos.
+
+    Args:
+        X: Matriz bruta (n, len(feature_names))
+        feature_names: Nomes das colunas de ``X``
+        config: ClusteringConfiguration
+        out: Fábrica do array de saída dado o formato (ex.: ``open_memmap``)
+
+    Returns:
+        (matriz transformada, nomes das features mantidas, parâmetros)
+    """
+    params = fit_preprocessing(X, feature_names, config)
+    selected = params["selected"]
+    shape = (len(X), len(selected))
+    result = out(shape) if out is not None else np.empty(shape, dtype=np.float32)
+
+    for start in range(0, len(X), _CHUNK_ROWS):
+        result[start:start + _CHUNK_ROWS] = transform_block(X[start:start + _CHUNK_ROWS], params)
+
+    names = [feature_names[i] for i in selected.tolist()]
+    return result, names, params
+
+
+def _encode_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: value.tolist() if isinstance(value, np.ndarray) else value for name, value in params.items()}
+
+
+def _decode_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: np.asarray(value) if isinstance(value, list) else value for name, value in params.items()}
+
+
+class PreprocessingCache:
+    """
+    Cache em disco de matrizes pré-processadas, com limite de tamanho (LRU).
+
+    Cada entrada é um diretório ``<chave>/`` com ``matrix.npy`` e
+    ``meta.json``; entradas são publicadas com ``os.replace`` para que
+    processos concorrentes nunca vejam uma escrita pela metade.
+
+    Args:
+        directory: Diretório do cache (padrão: ``B2SHIFT_PREPROCESSING_CACHE_DIR``)
+        max_bytes: Tamanho máximo (padrão: ``B2SHIFT_PREPROCESSING_CACHE_MAX_MB``)
+    """
+
+    def __init__(self, directory: Optional[Union[str, os.PathLike]] = None,
+                 max_bytes: Optional[int] = None):
+        self.directory = Path(directory or os.getenv("B2SHIFT_PREPROCESSING_CACHE_DIR", DEFAULT_CACHE_DIR))
+        self.max_bytes = max_bytes if max_bytes is not None else (
+            int(os.getenv("B2SHIFT_PREPROCESSING_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 2**20
+        )
+
+    def _entry(self, key: str) -> Path:
+        return self.directory / key
+
+    def get(self, key: str) -> Optional[PreprocessedMatrix]:
+        """Abre uma entrada (mapeada em memória) ou retorna None."""
+        entry = self._entry(key)
+        try:
+            with open(entry / META_FILE, encoding="utf-8") as f:
+                meta = json.load(f)
+            matrix = np.load(entry / MATRIX_FILE, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+
+        # mtime marca o último uso, para a remoção LRU
+        os.utime(entry, None)
+        return PreprocessedMatrix(
+            matrix=matrix,
+            feature_names=meta["feature_names"],
+            params=_decode_params(meta["params"]),
+            key=key,
+            from_cache=True,
+        )
+
+    def preprocess(self, data: Any, config, extra: Optional[Dict[str, Any]] = None,
+                   steps: Callable = preprocess_features) -> PreprocessedMatrix:
+        """
+        Matriz pré-processada para ``data`` e ``config``, do cache quando possível.
+
+        Args:
+            data: DataFrame, dict de colunas ou matriz (n, len(config.features))
+            config: ClusteringConfiguration
+            extra: Parâmetros adicionais que entram na chave
+            steps: Função com a assinatura de ``preprocess_features``
+        """
+        X = _as_matrix(data, config.features)
+        key = cache_key(data_fingerprint(X), config, extra)
+        return self.get_or_build(key, lambda out: steps(X, list(config.features), config, out=out))
+
+    def get_or_build(self, key: str, build: Callable) -> PreprocessedMatrix:
+        """
+        Abre a entrada ``key`` ou a constrói com ``build(out)``.
+
+        Args:
+            key: Chave da entrada
+            build: Recebe a fábrica ``out(shape)`` do array mapeado de saída e
+                retorna (matriz, nomes das colunas, parâmetros)
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{key}-", dir=self.directory))
+        try:
+            def open_matrix(shape):
+                return np.lib.format.open_memmap(staging / MATRIX_FILE, mode="w+", dtype=np.float32, shape=shape)
+
+            matrix, names, params = build(open_matrix)
+            if isinstance(matrix, np.memmap):
+                matrix.flush()
+            else:
+                np.save(staging / MATRIX_FILE, np.asarray(matrix, dtype=np.float32))
+            del matrix
+
+            with open(staging / META_FILE, "w", encoding="utf-8") as f:
+                json.dump({"feature_names": names, "params": _encode_params(params)}, f)
+
+            try:
+                os.replace(staging, self._entry(key))
+            except OSError:
+                # Outro processo publicou a mesma chave primeiro
+                pass
+        finally:
+            if staging.exists():
+                _remove_tree(staging)
+
+        self.evict()
+        result = self.get(key)
+        if result is None:
+            raise RuntimeError(f"Falha ao gravar a entrada {key} no cache de pré-processamento")
+        result.from_cache = False
+        return result
+
+    def entries(self) -> List[Tuple[Path, int, float]]:
+        """(diretório, bytes, último uso) de cada entrada publicada."""
+        if not self.directory.exists():
+            return []
+        found = []
+        for entry in self.directory.iterdir():
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            size = sum(path.stat().st_size for path in entry.iterdir() if path.is_file())
+            found.append((entry, size, entry.stat().st_mtime))
+        return found
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes: Optional[int] = None) -> List[str]:
+        """
+        Remove as entradas usadas há mais tempo até caber em ``max_bytes``.
+
+        Returns:
+            Chaves removidas
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self.entries(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        # A entrada mais recente é mantida mesmo que sozinha exceda o limite
+        for entry, size, _ in entries[:-1]:
+            if total <= limit:
+                break
+            _remove_tree(entry)
+            total -= size
+            removed.append(entry.name)
+        return removed
+
+    def clear(self):
+        for entry, _, _ in self.entries():
+            _remove_tree(entry)
+
+
+def _remove_tree(path: Path):
+    shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,520 @@
+"""
+Motor de scoring de comportamento em lote para o B2Shift.
+
+Calcula probabilidades de churn, upgrade, expansão e renovação para arrays
+de clientes em uma única passada vetorizada:
+
+    logit = logit(prior do cluster) + features @ pesos
+
+As priors por cluster vêm de taxas históricas suavizadas (empirical Bayes)
+em direção à taxa global; as features são derivadas das colunas de
+``CustomerProfile`` com transformações fixas (sem estatísticas do lote),
+então o score de um cliente não depende de quem mais está no lote. O
+horizonte é ajustado por risco constante a partir do horizonte de
+referência (6 meses).
+
+A saída é uma tabela colunar (dict de ndarrays) que pode virar
+``PredictionResult`` ou DataFrame.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+OUTCOMES = ("churn", "upgrade", "expansion", "renewal")
+
+HORIZON_MONTHS = {"3_months": 3, "6_months": 6, "1_year": 12}
+REFERENCE_HORIZON_MONTHS = 6
+
+# Taxas de referência em 6 meses quando não há histórico por cluster
+DEFAULT_BASE_RATES = {"churn": 0.12, "upgrade": 0.25, "expansion": 0.30, "renewal": 0.85}
+
+PAYMENT_RISK = {"current": 0.0, "late": 1 / 3, "at_risk": 2 / 3, "delinquent": 1.0}
+
+# Features derivadas (centradas em um cliente "típico") e pesos em logit por
+# desfecho, na ordem de OUTCOMES
+FEATURES = (
+    "adoption",
+    "churn_risk",
+    "payment_risk",
+    "engagement",
+    "support_load",
+    "integration_depth",
+    "tenure",
+    "seat_utilization",
+    "api_intensity",
+)
+
+DEFAULT_WEIGHTS = np.array([
+    #  churn  upgrade expansion renewal
+    [-1.60,  1.20,   0.90,    1.40],  # adoption
+    [2.50, -0.80,  -0.60,   -2.00],  # churn_risk
+    [1.20, -0.70,  -0.50,   -1.30],  # payment_risk
+    [-0.50,  0.40,   0.35,    0.45],  # engagement
+    [0.30, -0.15,  -0.10,   -0.25],  # support_load
+    [-0.45,  0.20,   0.35,    0.40],  # integration_depth
+    [-0.25,  0.10,   0.15,    0.30],  # tenure
+    [-0.30,  0.50,   1.10,    0.25],  # seat_utilization
+    [-0.15,  0.35,   0.25,    0.10],  # api_intensity
+], dtype=np.float64)
+
+# Desfechos em que o risco cresce com o horizonte; renovação é tratada pelo
+# complemento (risco de não renovar)
+_EVENT_OUTCOMES = {"churn": True, "upgrade": True, "expansion": True, "renewal": False}
+
+_PROBABILITY_CLIP = 1e-4
+
+
+def _logit(p: np.ndarray) -> np.ndarray:
+    p = np.clip(p, _PROBABILITY_CLIP, 1 - _PROBABILITY_CLIP)
+    return np.log(p / (1 - p))
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _horizon_months(horizon: str) -> int:
+    try:
+        return HORIZON_MONTHS[horizon]
+    except KeyError:
+        raise ValueError(f"Horizonte {horizon} não suportado. Use um de {tuple(HORIZON_MONTHS)}") from None
+
+
+def _column(columns: Mapping[str, Any], name: str, n_rows: int, default: float = np.nan) -> np.ndarray:
+    if name not in columns:
+        return np.full(n_rows, default)
+    values = columns[name]
+    values = values.to_numpy() if hasattr(values, "to_numpy") else np.asarray(values)
+    return values
+
+
+def _numeric(columns: Mapping[str, Any], name: str, n_rows: int) -> np.ndarray:
+    return np.asarray(_column(columns, name, n_rows), dtype=np.float64)
+
+
+def _n_rows(columns: Mapping[str, Any]) -> int:
+    for values in columns.values():
+        return len(values)
+    return 0
+
+
+def _most_frequent(values: np.ndarray) -> np.ndarray:
+    """Valor mais frequente de cada linha de ``values`` (empate -> o menor)."""
+    if values.size == 0:
+        return np.empty(len(values), dtype=values.dtype)
+    ordered = np.sort(values, axis=1)
+    matches = (ordered[:, :, None] == ordered[:, None, :]).sum(axis=2)
+    return ordered[np.arange(len(ordered)), matches.argmax(axis=1)]
+
+
+class ClusterPriors:
+    """
+    Taxas-base por cluster para cada desfecho (horizonte de referência).
+
+    Args:
+        cluster_ids: IDs dos clusters
+        rates: Matriz (n_clusters, len(OUTCOMES)) de taxas em 6 meses
+        counts: Clientes observados por cluster (usado na confiança)
+        global_rates: Taxas para clusters desconhecidos
+        smoothing: Peso (em clientes) da taxa global na suavização
+    """
+
+    def __init__(
+        self,
+        cluster_ids: Sequence[int] = (),
+        rates: Optional[np.ndarray] = None,
+        counts: Optional[np.ndarray] = None,
+        global_rates: Optional[Mapping[str, float]] = None,
+        smoothing: float = 50.0,
+    ):
+        global_rates = {**DEFAULT_BASE_RATES, **(global_rates or {})}
+        self.global_rates = np.array([global_rates[o] for o in OUTCOMES], dtype=np.float64)
+        self.smoothing = smoothing
+
+        self.cluster_ids = np.asarray(cluster_ids, dtype=np.int64)
+        order = np.argsort(self.cluster_ids, kind="stable")
+        self.cluster_ids = self.cluster_ids[order]
+        n_clusters = len(self.cluster_ids)
+
+        self.rates = (
+            np.tile(self.global_rates, (n_clusters, 1)) if rates is None
+            else np.asarray(rates, dtype=np.float64).reshape(n_clusters, len(OUTCOMES))[order]
+        )
+        self.counts = (
+            np.zeros(n_clusters) if counts is None
+            else np.asarray(counts, dtype=np.float64)[order]
+        )
+
+    @classmethod
+    def fit(
+        cls,
+        cluster_ids: np.ndarray,
+        outcomes: Mapping[str, np.ndarray],
+        smoothing: float = 50.0,
+    ) -> "ClusterPriors":
+        """
+        Estima as priors a partir de desfechos históricos (0/1 por cliente).
+
+        Args:
+            cluster_ids: Cluster de cada cliente
+            outcomes: Desfecho -> array 0/1 observado no horizonte de referência;
+                desfechos ausentes usam a taxa padrão
+            smoothing: Peso (em clientes) da taxa global
+
+        Returns:
+            ClusterPriors com taxas suavizadas em direção à taxa global
+        """
+        cluster_ids = np.asarray(cluster_ids, dtype=np.int64)
+        unique, inverse, counts = np.unique(cluster_ids, return_inverse=True, return_counts=True)
+
+        global_rates = dict(DEFAULT_BASE_RATES)
+        rates = np.empty((len(unique), len(OUTCOMES)))
+        for j, outcome in enumerate(OUTCOMES):
+            if outcome not in outcomes:
+                rates[:, j] = global_rates[outcome]
+                continue
+            observed = np.asarray(outcomes[outcome], dtype=np.float64)
+            global_rates[outcome] = float(observed.mean())
+            positives = np.bincount(inverse, weights=observed, minlength=len(unique))
+            rates[:, j] = (positives + smoothing * global_rates[outcome]) / (counts + smoothing)
+
+        return cls(unique, rates, counts, global_rates=global_rates, smoothing=smoothing)
+
+    def lookup(self, cluster_ids: np.ndarray):
+        """
+        Taxas e contagens para um vetor de clusters (desconhecidos -> global).
+
+        Returns:
+            (taxas (n, len(OUTCOMES)), contagens (n,))
+        """
+        cluster_ids = np.asarray(cluster_ids, dtype=np.int64)
+        if len(self.cluster_ids) == 0:
+            return np.tile(self.global_rates, (len(cluster_ids), 1)), np.zeros(len(cluster_ids))
+
+        slot = np.minimum(np.searchsorted(self.cluster_ids, cluster_ids), len(self.cluster_ids) - 1)
+        known = self.cluster_ids[slot] == cluster_ids
+        rates = np.where(known[:, None], self.rates[slot], self.global_rates)
+        counts = np.where(known, self.counts[slot], 0.0)
+        return rates, counts
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "smoothing": self.smoothing,
+            "global_rates": dict(zip(OUTCOMES, self.global_rates.tolist())),
+            "clusters": {
+                str(cluster_id): {"count": count, **dict(zip(OUTCOMES, rates))}
+                for cluster_id, count, rates in zip(
+                    self.cluster_ids.tolist(), self.counts.tolist(), self.rates.tolist()
+                )
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "ClusterPriors":
+        clusters = data.get("clusters", {})
+        return cls(
+            cluster_ids=[int(cluster_id) for cluster_id in clusters],
+            rates=np.array([[entry[o] for o in OUTCOMES] for entry in clusters.values()]).reshape(-1, len(OUTCOMES)),
+            counts=np.array([entry.get("count", 0) for entry in clusters.values()]),
+            global_rates=data.get("global_rates"),
+            smoothing=data.get("smoothing", 50.0),
+        )
+
+    def save(self, path: Union[str, os.PathLike]) -> Path:
+        path = Path(path)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, path: Union[str, os.PathLike]) -> "ClusterPriors":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def build_features(columns: Mapping[str, Any]) -> np.ndarray:
+    """
+    Deriva a matriz de features (n, len(FEATURES)) a partir de colunas de
+    ``CustomerProfile``. Valores ausentes viram 0 (cliente típico).
+
+    Args:
+        columns: Colunas no formato de ``columnar.to_columns`` ou DataFrame
+    """
+    n_rows = _n_rows(columns)
+    X = np.empty((n_rows, len(FEATURES)))
+
+    payment = _column(columns, "payment_health", n_rows, default=None)
+    payment_risk = np.fromiter(
+        (PAYMENT_RISK.get(getattr(value, "value", value), np.nan) for value in payment),
+        dtype=np.float64, count=n_rows,
+    )
+
+    employees = np.maximum(_numeric(columns, "employee_count", n_rows), 1)
+    seat_utilization = np.clip(_numeric(columns, "monthly_active_users", n_rows) / employees, 0, 1)
+
+    X[:, 0] = _numeric(columns, "feature_adoption_score", n_rows) - 0.5
+    X[:, 1] = _numeric(columns, "churn_risk_score", n_rows) - 0.2
+    X[:, 2] = payment_risk
+    X[:, 3] = np.log1p(_numeric(columns, "login_frequency", n_rows)) - np.log1p(5)
+    X[:, 4] = np.log1p(_numeric(columns, "support_ticket_count", n_rows)) - np.log1p(10)
+    X[:, 5] = np.log1p(_numeric(columns, "integrations_count", n_rows)) - np.log1p(3)
+    X[:, 6] = np.log1p(_numeric(columns, "account_age_months", n_rows)) - np.log1p(24)
+    X[:, 7] = seat_utilization - 0.3
+    X[:, 8] = np.log1p(_numeric(columns, "api_calls_monthly", n_rows)) - np.log1p(1000)
+    return X
+
+
+class BehaviorScorer:
+    """
+    Scoring vetorizado de churn/upgrade/expansão/renovação.
+
+    Args:
+        priors: Priors por cluster (padrão: ``B2SHIFT_SCORING_PRIORS`` ou
+            taxas padrão)
+        weights: Matriz (len(FEATURES), len(OUTCOMES)) de pesos em logit
+        chunk_size: Clientes por bloco (limita a memória das matrizes)
+        feature_store: EventFeatureStore cujas features da janela de
+            eventos substituem as do lote (ex.:
+            ``streaming.features.get_feature_store()``); sem store, as
+            colunas são usadas como recebidas
+    """
+
+    def __init__(
+        self,
+        priors: Optional[ClusterPriors] = None,
+        weights: Optional[np.ndarray] = None,
+        chunk_size: int = 500_000,
+        feature_store=None,
+    ):
+        if priors is None:
+            priors_path = os.getenv("B2SHIFT_SCORING_PRIORS")
+            priors = ClusterPriors.load(priors_path) if priors_path else ClusterPriors()
+        self.priors = priors
+        self.weights = DEFAULT_WEIGHTS if weights is None else np.asarray(weights, dtype=np.float64)
+        self.chunk_size = chunk_size
+        self.feature_store = feature_store
+
+    def _fresh_columns(self, columns: Mapping[str, Any]) -> Mapping[str, Any]:
+        """Sobrepõe as features de eventos em tempo real, se houver store."""
+        store = self.feature_store
+        return columns if store is None else store.overlay(columns)
+
+    def score(
+        self,
+        columns: Mapping[str, Any],
+        cluster_ids: Optional[np.ndarray] = None,
+        horizon: str = "6_months",
+        neighbor_clusters: Optional[np.ndarray] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Calcula as probabilidades de todos os clientes em ``columns``.
+
+        Args:
+            columns: Colunas de CustomerProfile (dict de arrays ou DataFrame)
+            cluster_ids: Cluster por cliente (padrão: coluna ``cluster_id``;
+                ausente -> -1, que usa as taxas globais)
+            horizon: "3_months", "6_months" ou "1_year"
+            neighbor_clusters: Matriz (n, k) com o cluster dos k clientes mais
+                similares de cada cliente (``ClusteringArtifact.similar_customers``).
+                Quando informada, a prior é a média das taxas dos clusters
+                vizinhos e o cluster ausente vira o mais frequente entre eles
+
+        Returns:
+            Tabela colunar com customer_id, cluster_id, prediction_horizon,
+            ``<desfecho>_probability`` e confidence_score
+        """
+        return self._score(self._fresh_columns(columns), cluster_ids, horizon, neighbor_clusters)
+
+    def _score(self, columns: Mapping[str, Any], cluster_ids: Optional[np.ndarray],
+               horizon: str, neighbor_clusters: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        n_rows = _n_rows(columns)
+        scale = _horizon_months(horizon) / REFERENCE_HORIZON_MONTHS
+
+        infer_clusters = cluster_ids is None and neighbor_clusters is not None
+        if cluster_ids is None:
+            cluster_ids = np.nan_to_num(_numeric(columns, "cluster_id", n_rows), nan=-1)
+        cluster_ids = np.asarray(cluster_ids, dtype=np.int64)
+        if neighbor_clusters is not None:
+            neighbor_clusters = np.asarray(neighbor_clusters, dtype=np.int64).reshape(n_rows, -1)
+
+        probabilities = np.empty((n_rows, len(OUTCOMES)))
+        confidence = np.empty(n_rows)
+
+        for start in range(0, n_rows, self.chunk_size):
+            stop = min(start + self.chunk_size, n_rows)
+            block = {name: values[start:stop] for name, values in columns.items()}
+            X = build_features(block)
+            missing = np.isnan(X)
+            X[missing] = 0.0
+
+            if neighbor_clusters is None:
+                rates, counts = self.priors.lookup(cluster_ids[start:stop])
+            else:
+                neighbors = neighbor_clusters[start:stop]
+                if infer_clusters:
+                    block_clusters = cluster_ids[start:stop]
+                    unknown = block_clusters < 0
+                    block_clusters[unknown] = _most_frequent(neighbors[unknown])
+                rates, counts = self.priors.lookup(neighbors.ravel())
+                rates = rates.reshape(*neighbors.shape, len(OUTCOMES)).mean(axis=1)
+                counts = counts.reshape(neighbors.shape).mean(axis=1)
+            logits = _logit(rates) + X @ self.weights
+            p = _sigmoid(logits)
+
+            # Ajuste de horizonte por risco constante; para renovação o risco
+            # é o de não renovar, então P(renovar em h) = p ** (h / 6)
+            for j, outcome in enumerate(OUTCOMES):
+                if _EVENT_OUTCOMES[outcome]:
+                    p[:, j] = 1 - (1 - p[:, j]) ** scale
+                else:
+                    p[:, j] = p[:, j] ** scale
+            probabilities[start:stop] = p
+
+            # Confiança: histórico do cluster x completude das features
+            evidence = counts / (counts + self.priors.smoothing)
+            completeness = 1 - missing.mean(axis=1)
+            confidence[start:stop] = (0.5 + 0.45 * evidence) * completeness
+
+        table = {
+            "customer_id": _column(columns, "customer_id", n_rows, default=None).astype(object),
+            "cluster_id": cluster_ids,
+            "prediction_horizon": np.full(n_rows, horizon, dtype=object),
+        }
+        for j, outcome in enumerate(OUTCOMES):
+            table[f"{outcome}_probability"] = probabilities[:, j]
+        table["confidence_score"] = confidence
+        return table
+
+    def score_profiles(self, profiles: Sequence[Any], horizon: str = "6_months") -> Dict[str, np.ndarray]:
+        """Atalho para listas de ``CustomerProfile``."""
+        from ..models import CustomerProfile
+        from ..models.columnar import to_columns
+
+        return self.score(to_columns(profiles, CustomerProfile), horizon=horizon)
+
+    def predict(self, columns: Mapping[str, Any], cluster_ids: Optional[np.ndarray] = None,
+                horizon: str = "6_months", neighbor_clusters: Optional[np.ndarray] = None) -> List[Any]:
+        """Scoring + ``PredictionResult`` por cliente."""
+        columns = self._fresh_columns(columns)
+        table = self._score(columns, cluster_ids, horizon, neighbor_clusters)
+        return to_prediction_results(table, columns)
+
+
+# ----------------------------------------------------------------------
+# Recomendações em lote: regras viram um código por cliente e cada código
+# único é traduzido uma vez só
+# ----------------------------------------------------------------------
+
+_RISK_RULES = (
+    ("Churn risk elevado", "Plano de sucesso com executive sponsor"),
+    ("Pagamento em atraso", "Renegociação de condições comerciais"),
+    ("Baixa adoção de features", "Programa de onboarding e treinamento"),
+    ("Volume alto de suporte", "Revisão técnica com customer success"),
+)
+
+_OPPORTUNITY_RULES = (
+    ("cross_sell", "Integration modules"),
+    ("upsell", "Advanced analytics"),
+    ("expansion", "Additional users"),
+    ("upsell", "Premium support"),
+)
+
+_ACTIONS = {
+    "churn": (
+        ["Contato do customer success em até 7 dias", "Diagnóstico de adoção", "Plano de retenção"],
+        {"30_days": "Diagnóstico e plano de retenção", "60_days": "Revisão de adoção", "90_days": "Renovação antecipada"},
+    ),
+    "upgrade": (
+        ["Apresentar roadmap de funcionalidades", "Propor pilot de advanced analytics", "Proposta de upgrade"],
+        {"30_days": "Roadmap", "60_days": "Pilot", "90_days": "Proposta de upgrade"},
+    ),
+    "expansion": (
+        ["Mapear novas áreas usuárias", "Oferecer licenças adicionais", "Discutir expansion plan"],
+        {"30_days": "Mapeamento de áreas", "60_days": "Oferta de licenças", "90_days": "Expansion plan"},
+    ),
+    "renewal": (
+        ["Manter cadência de relacionamento", "Avaliar para customer success story"],
+        {"30_days": "Check-in", "90_days": "QBR", "6_months": "Case de sucesso"},
+    ),
+}
+
+
+def _recommendation_codes(table: Mapping[str, np.ndarray], columns: Mapping[str, Any]):
+    n_rows = len(table["cluster_id"])
+    X = np.nan_to_num(build_features(columns)) if n_rows else np.empty((0, len(FEATURES)))
+
+    risk_masks = (
+        table["churn_probability"] > 0.3,
+        X[:, 2] > 0,
+        X[:, 0] < -0.2,
+        X[:, 4] > 0.5,
+    )
+    opportunity_masks = (
+        (X[:, 5] < 0) & (X[:, 0] > 0),
+        table["upgrade_probability"] > 0.5,
+        table["expansion_probability"] > 0.5,
+        table["upgrade_probability"] > 0.7,
+    )
+    risk_code = sum(mask.astype(np.int64) << bit for bit, mask in enumerate(risk_masks))
+    opportunity_code = sum(mask.astype(np.int64) << bit for bit, mask in enumerate(opportunity_masks))
+
+    # Ação dominante: churn se o risco é relevante, senão o maior potencial
+    potentials = np.column_stack([table["upgrade_probability"], table["expansion_probability"]])
+    action = np.where(risk_masks[0], 0, np.where(potentials.max(axis=1) > 0.4, 1 + potentials.argmax(axis=1), 3))
+    return risk_code, opportunity_code, action
+
+
+def to_prediction_results(table: Mapping[str, np.ndarray], columns: Mapping[str, Any]) -> List[Any]:
+    """
+    Converte a tabela de ``BehaviorScorer.score`` em ``PredictionResult``.
+
+    Args:
+        table: Saída de ``score``
+        columns: As mesmas colunas usadas no scoring (para as regras)
+    """
+    from ..models import PredictionResult
+    from ..models.columnar import from_columns
+
+    risk_code, opportunity_code, action = _recommendation_codes(table, columns)
+    action_names = ("churn", "upgrade", "expansion", "renewal")
+
+    def expand(codes, build):
+        translated = {code: build(code) for code in np.unique(codes).tolist()}
+        return [translated[code] for code in codes.tolist()]
+
+    def risks(code):
+        return [rule for bit, rule in enumerate(_RISK_RULES) if code >> bit & 1]
+
+    def opportunities(code, kind):
+        return [name for bit, (rule_kind, name) in enumerate(_OPPORTUNITY_RULES)
+                if rule_kind == kind and code >> bit & 1]
+
+    risk_rules = expand(risk_code, risks)
+    cross_sell = expand(opportunity_code, lambda code: opportunities(code, "cross_sell"))
+    upsell = expand(opportunity_code, lambda code: opportunities(code, "upsell") + opportunities(code, "expansion"))
+    actions = expand(action, lambda code: _ACTIONS[action_names[code]])
+
+    # Cada registro recebe suas próprias listas/dicts (modelos são mutáveis)
+    result_columns = dict(table)
+    result_columns.update(
+        cross_sell_opportunities=[list(values) for values in cross_sell],
+        upsell_opportunities=[list(values) for values in upsell],
+        risk_factors=[[risk for risk, _ in rules] for rules in risk_rules],
+        mitigation_strategies=[[mitigation for _, mitigation in rules] for rules in risk_rules],
+        recommended_actions=[list(steps) for steps, _ in actions],
+        optimal_timing=[dict(timing) for _, timing in actions],
+        prediction_date=np.full(len(table["cluster_id"]), np.datetime64(datetime.now(), "us")),
+    )
+    return from_columns(PredictionResult, result_columns)
+
+
+def to_dataframe(table: Mapping[str, np.ndarray]):
+    """Tabela de scoring como pandas.DataFrame."""
+    import pandas as pd
+
+    return pd.DataFrame(table)
@@ -0,0 +1,377 @@
+"""
+Estatísticas por cluster com sketches de quantis mescláveis.
+
+Medianas e percentis por cluster exigiriam ordenar cada grupo inteiro. Aqui
+cada coluna numérica é resumida, para todos os clusters de uma vez, por:
+
+- um t-digest (centroides média/peso ordenados por cluster e valor),
+  compactado pela função de escala ``k1`` (``δ/2π · asin(2q - 1)``): os
+  centroides são pequenos nas caudas e grandes no meio, com
+  ~``compression/2`` centroides por cluster independentemente do volume;
+- momentos exatos (contagem, média, soma dos quadrados dos desvios,
+  mínimo e máximo), unidos pela fórmula de Chan.
+
+A compactação é vetorizada: um ``lexsort`` por (cluster, valor), posições
+acumuladas por cluster, o bin ``floor(k(q))`` de cada ponto e uma redução
+(``np.add.reduceat``) nas fronteiras de bin — sem laços Python por cluster.
+Sketches de partições diferentes se unem concatenando centroides e
+compactando de novo, então o resultado não depende de como os dados foram
+particionados (a menos do erro do sketch: ~2·10⁻⁴ em posição com
+``compression=200`` em ``benchmarks/bench_sketches.py``).
+
+``cluster_statistics`` processa partições em paralelo (processos para
+arquivos, threads para frames em memória, como ``analytics.usage``) em
+blocos de ``_CHUNK_ROWS`` linhas e une os sketches parciais.
+``GroupedSketch.describe`` devolve o perfil por cluster no formato de
+``ClusterResult.typical_profile``.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+_CHUNK_ROWS = 1_048_576
+DEFAULT_COMPRESSION = 200
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def _group_starts(groups: np.ndarray, n_groups: int) -> np.ndarray:
+    # Primeira posição de cada grupo em ``groups`` ordenado
+    return np.searchsorted(groups, np.arange(n_groups))
+
+
+def _encode_labels(labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (rótulos únicos ordenados, posição de cada linha nos únicos). Rótulos
+    inteiros de faixa curta (o caso dos clusters) usam uma tabela em vez
+    de ordenar.
+    """
+    if labels.dtype.kind in "iu" and len(labels):
+        low, high = int(labels.min()), int(labels.max())
+        if high - low < 1 << 16:
+            offsets = (labels - low).astype(np.int64)
+            present = np.flatnonzero(np.bincount(offsets, minlength=high - low + 1))
+            lookup = np.zeros(high - low + 1, dtype=np.int64)
+            lookup[present] = np.arange(len(present))
+            return present + low, lookup[offsets]
+    unique, groups = np.unique(labels, return_inverse=True)
+    return unique, groups.astype(np.int64).ravel()
+
+
+def _group_order(groups: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Ordem por (grupo, valor): ordena os valores e depois, de forma estável,
+    os grupos — com poucos grupos a segunda ordenação é radix (``uint8``/
+    ``uint16``), bem mais rápida que ``np.lexsort``.
+    """
+    order = np.argsort(values)
+    if n_groups <= 1:
+        return order
+    code_type = np.uint8 if n_groups <= 1 << 8 else np.uint16 if n_groups <= 1 << 16 else np.int64
+    return order[np.argsort(groups[order].astype(code_type), kind="stable")]
+
+
+def _compress(groups: np.ndarray, means: np.ndarray, weights: np.ndarray,
+              n_groups: int, compression: float,
+              presorted: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compacta centroides (grupo, média, peso) de vários grupos de uma vez.
+
+    Returns:
+        (grupos, médias, pesos) dos novos centroides, ordenados por
+        (grupo, média)
+    """
+    if len(groups) == 0:
+        return groups, means, weights
+    if not presorted:
+        order = _group_order(groups, means, n_groups)
+        groups, means, weights = groups[order], means[order], weights[order]
+
+    cumulative = np.cumsum(weights)
+    before = np.concatenate(([0.0], cumulative))[_group_starts(groups, n_groups)]
+    totals = np.bincount(groups, weights, minlength=n_groups)
+    # Posição relativa do centro de cada centroide no seu grupo
+    q = (cumulative - weights / 2 - before[groups]) / totals[groups]
+    bins = np.floor(compression / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))).astype(np.int64)
+
+    boundaries = np.flatnonzero(np.concatenate(
+        ([True], (groups[1:] != groups[:-1]) | (bins[1:] != bins[:-1]))
+    ))
+    merged_weights = np.add.reduceat(weights, boundaries)
+    merged_means = np.add.reduceat(means * weights, boundaries) / merged_weights
+    return groups[boundaries], merged_means, merged_weights
+
+
+@dataclass
+class ColumnSketch:
+    """
+    t-digest e momentos de uma coluna, para cada grupo em ``labels``.
+
+    ``centroid_group`` é a posição do grupo em ``labels``.
+    """
+    labels: np.ndarray
+    count: np.ndarray
+    mean: np.ndarray
+    m2: np.ndarray
+    minimum: np.ndarray
+    maximum: np.ndarray
+    centroid_group: np.ndarray
+    centroid_mean: np.ndarray
+    centroid_weight: np.ndarray
+    compression: float = DEFAULT_COMPRESSION
+
+    @classmethod
+    def from_values(cls, labels: np.ndarray, values: np.ndarray,
+                    compression: float = DEFAULT_COMPRESSION) -> "ColumnSketch":
+        """Sketch de um bloco de valores com o rótulo de grupo de cada um (NaN ignorado)."""
+        return cls._from_groups(*_encode_labels(np.asarray(labels)), values, compression)
+
+    @classmethod
+    def _from_groups(cls, unique: np.ndarray, groups: np.ndarray, values: np.ndarray,
+                     compression: float) -> "ColumnSketch":
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        if not valid.all():
+            groups, values = groups[valid], values[valid]
+
+        n_groups = len(unique)
+        order = _group_order(groups, values, n_groups)
+        groups, values = groups[order], values[order]
+
+        starts = _group_starts(groups, n_groups)
+        ends = np.append(starts[1:], len(values)) - 1
+        count = np.bincount(groups, minlength=n_groups).astype(np.float64)
+        mean = np.bincount(groups, values, minlength=n_groups) / np.maximum(count, 1)
+        m2 = np.bincount(groups, (values - mean[groups]) ** 2, minlength=n_groups)
+        # Grupo sem valores (só NaN no bloco): mínimo/máximo NaN, que o
+        # merge ignora; o início dele é o do grupo seguinte
+        present = count > 0
+        minimum, maximum = np.full(n_groups, np.nan), np.full(n_groups, np.nan)
+        minimum[present], maximum[present] = values[starts[present]], values[ends[present]]
+
+        centroids = _compress(groups, values, np.ones(len(values)), n_groups, compression, presorted=True)
+        return cls(unique, count, mean, m2, minimum, maximum, *centroids,
+                   compression=compression)
+
+    def merge(self, other: "ColumnSketch") -> "ColumnSketch":
+        """União com outro sketch da mesma coluna (novo objeto)."""
+        labels = np.union1d(self.labels, other.labels)
+        n_groups = len(labels)
+        mine, theirs = np.searchsorted(labels, self.labels), np.searchsorted(labels, other.labels)
+
+        def spread(values, positions, fill):
+            result = np.full(n_groups, fill, dtype=np.float64)
+            result[positions] = values
+            return result
+
+        count_a, count_b = spread(self.count, mine, 0.0), spread(other.count, theirs, 0.0)
+        mean_a, mean_b = spread(self.mean, mine, 0.0), spread(other.mean, theirs, 0.0)
+        count = count_a + count_b
+        delta = mean_b - mean_a
+        share = np.divide(count_b, count, out=np.zeros(n_groups), where=count > 0)
+        mean = mean_a + delta * share
+        m2 = (spread(self.m2, mine, 0.0) + spread(other.m2, theirs, 0.0)
+              + delta ** 2 * count_a * share)
+        minimum = np.fmin(spread(self.minimum, mine, np.nan), spread(other.minimum, theirs, np.nan))
+        maximum = np.fmax(spread(self.maximum, mine, np.nan), spread(other.maximum, theirs, np.nan))
+
+        centroids = _compress(
+            np.concatenate((mine[self.centroid_group], theirs[other.centroid_group])),
+            np.concatenate((self.centroid_mean, other.centroid_mean)),
+            np.concatenate((self.centroid_weight, other.centroid_weight)),
+            n_groups, self.compression,
+        )
+        return ColumnSketch(labels, count, mean, m2, minimum, maximum, *centroids,
+                            compression=self.compression)
+
+    def quantiles(self, q: Sequence[float]) -> np.ndarray:
+        """
+        Quantis estimados por grupo.
+
+        Returns:
+            Matriz (grupos, len(q)) alinhada a ``labels``
+        """
+        q = np.asarray(q, dtype=np.float64)
+        result = np.full((len(self.labels), len(q)), np.nan)
+        starts = _group_starts(self.centroid_group, len(self.labels))
+        ends = np.append(starts[1:], len(self.centroid_group))
+        for group, (start, end) in enumerate(zip(starts, ends)):
+            if start == end:
+                continue
+            means = self.centroid_mean[start:end]
+            weights = self.centroid_weight[start:end]
+            total = weights.sum()
+            # Interpolação entre os centros dos centroides, com mínimo e
+            # máximo exatos nas pontas
+            centers = np.cumsum(weights) - weights / 2
+            ranks = np.concatenate(([0.0], centers, [total]))
+            points = np.concatenate(([self.minimum[group]], means, [self.maximum[group]]))
+            result[group] = np.interp(q * total, ranks, points)
+        return result
+
+    @property
+    def variance(self) -> np.ndarray:
+        return np.divide(self.m2, self.count - 1, out=np.full(len(self.count), np.nan),
+                         where=self.count > 1)
+
+
+class GroupedSketch:
+    """
+    Sketches de várias colunas agrupadas por rótulo de cluster.
+
+    Args:
+        compression: Parâmetro δ do t-digest (mais alto = mais preciso e
+            mais centroides)
+    """
+
+    def __init__(self, compression: float = DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.columns: Dict[str, ColumnSketch] = {}
+        self.rows = 0
+
+    def update(self, labels: Any, columns: Mapping[str, Any]) -> "GroupedSketch":
+        """
+        Acrescenta linhas: ``labels[i]`` é o cluster da linha ``i`` de cada
+        coluna de ``columns`` (nome -> array). Processa em blocos.
+        """
+        labels = np.asarray(labels)
+        columns = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+        for start in range(0, len(labels), _CHUNK_ROWS):
+            # Rótulos codificados uma vez por bloco, para todas as colunas
+            unique, groups = _encode_labels(labels[start:start + _CHUNK_ROWS])
+            for name, values in columns.items():
+                sketch = ColumnSketch._from_groups(unique, groups, values[start:start + _CHUNK_ROWS],
+                                                   self.compression)
+                current = self.columns.get(name)
+                self.columns[name] = sketch if current is None else current.merge(sketch)
+        self.rows += len(labels)
+        return self
+
+    def merge(self, other: "GroupedSketch") -> "GroupedSketch":
+        """Une ``other`` a este sketch (no lugar)."""
+        for name, sketch in other.columns.items():
+            current = self.columns.get(name)
+            self.columns[name] = sketch if current is None else current.merge(sketch)
+        self.rows += other.rows
+        return self
+
+    @property
+    def labels(self) -> np.ndarray:
+        """Rótulos de cluster vistos em qualquer coluna."""
+        if not self.columns:
+            return np.empty(0)
+        return np.unique(np.concatenate([sketch.labels for sketch in self.columns.values()]))
+
+    def quantiles(self, column: str, q: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """(rótulos, matriz rótulos x quantis) de uma coluna."""
+        sketch = self.columns[column]
+        return sketch.labels, sketch.quantiles(q)
+
+    def describe(self, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Dict[Any, Dict[str, Dict[str, float]]]:
+        """
+        Perfil por cluster: ``{rótulo: {coluna: {count, mean, std, min,
+        p5, ..., max}}}``.
+        """
+        names = [f"p{round(q * 100, 2):g}" for q in quantiles]
+        profiles: Dict[Any, Dict[str, Dict[str, float]]] = {}
+        for column, sketch in self.columns.items():
+            estimates = sketch.quantiles(quantiles)
+            std = np.sqrt(sketch.variance)
+            for position, label in enumerate(sketch.labels.tolist()):
+                if sketch.count[position] == 0:
+                    continue
+                entry = {
+                    "count": int(sketch.count[position]),
+                    "mean": float(sketch.mean[position]),
+                    "std": float(std[position]),
+                    "min": float(sketch.minimum[position]),
+                }
+                entry.update(zip(names, estimates[position].tolist()))
+                entry["max"] = float(sketch.maximum[position])
+                profiles.setdefault(label, {})[column] = entry
+        return profiles
+
+    def to_dataframe(self, quantiles: Sequence[float] = DEFAULT_QUANTILES):
+        """``describe`` como pandas.DataFrame com índice (cluster, coluna)."""
+        import pandas as pd
+
+        rows = {
+            (label, column): stats
+            for label, columns in self.describe(quantiles).items()
+            for column, stats in columns.items()
+        }
+        frame = pd.DataFrame.from_dict(rows, orient="index")
+        frame.index.names = ["cluster", "column"]
+        return frame.sort_index()
+
+
+def _read_partition(source: Any, columns: Sequence[str]):
+    import pandas as pd
+
+    if isinstance(source, (str, os.PathLike)):
+        path = str(source)
+        if path.endswith(".parquet"):
+            return pd.read_parquet(path, columns=list(columns))
+        return pd.read_csv(path, usecols=list(columns))
+    return source
+
+
+def sketch_partition(source: Any, label_column: str, columns: Sequence[str],
+                     compression: float = DEFAULT_COMPRESSION) -> GroupedSketch:
+    """
+    Sketch de uma partição (DataFrame, dict de arrays ou caminho
+    .parquet/.csv) com o rótulo de cluster em ``label_column``.
+    """
+    frame = _read_partition(source, [label_column, *columns])
+    return GroupedSketch(compression).update(
+        np.asarray(frame[label_column]), {name: frame[name] for name in columns}
+    )
+
+
+def cluster_statistics(
+    partitions: Union[Any, Iterable[Any]],
+    columns: Sequence[str],
+    label_column: str = "cluster_id",
+    compression: float = DEFAULT_COMPRESSION,
+    n_jobs: Optional[int] = None,
+) -> GroupedSketch:
+    """
+    Estatísticas por cluster de ``columns`` em uma passada sobre as partições.
+
+    Args:
+        partitions: Uma partição ou iterável de partições (DataFrames, dicts
+            de arrays ou caminhos .parquet/.csv)
+        columns: Colunas numéricas a resumir
+        label_column: Coluna com o rótulo de cluster de cada linha
+        compression: Parâmetro δ do t-digest
+        n_jobs: Partições processadas em paralelo (padrão:
+            ``B2SHIFT_SKETCH_JOBS`` ou o número de CPUs)
+
+    Returns:
+        GroupedSketch unido de todas as partições
+    """
+    if isinstance(partitions, (str, os.PathLike, dict)) or hasattr(partitions, "columns"):
+        partitions = [partitions]
+    partitions = list(partitions)
+    n_jobs = n_jobs or int(os.getenv("B2SHIFT_SKETCH_JOBS", 0)) or os.cpu_count() or 1
+    n_jobs = min(n_jobs, len(partitions))
+    arguments = ([label_column] * len(partitions), [list(columns)] * len(partitions),
+                 [compression] * len(partitions))
+
+    if n_jobs <= 1:
+        partials: List[GroupedSketch] = list(map(sketch_partition, partitions, *arguments))
+    else:
+        # Arquivos são lidos nos próprios processos; frames em memória ficam
+        # em threads para não serializá-los
+        from_files = all(isinstance(p, (str, os.PathLike)) for p in partitions)
+        executor_class = ProcessPoolExecutor if from_files else ThreadPoolExecutor
+        with executor_class(max_workers=n_jobs) as executor:
+            partials = list(executor.map(sketch_partition, partitions, *arguments))
+
+    result = GroupedSketch(compression)
+    for partial in partials:
+        result.merge(partial)
+    return result
@@ -0,0 +1,267 @@
+"""
+Rollups vetorizados de ``customer_usage`` em uma matriz de features.
+
+Transforma linhas (customer_id, product_module, usage_metric, usage_value,
+usage_date) em uma matriz cliente x (módulo, métrica, janela) sem pivot do
+pandas sobre a tabela inteira:
+
+1. cada partição é codificada em códigos categóricos locais
+   (``pd.factorize``), as datas viram janelas de 30 dias antes de
+   ``as_of`` e uma chave inteira composta é reduzida por ordenação
+   (``argsort`` + ``np.add.reduceat``) em somas e contagens por célula;
+2. partições são processadas em paralelo (processos quando são arquivos,
+   threads quando já estão em memória) e produzem agregados parciais;
+3. os parciais são unidos remapeando os códigos locais para dicionários
+   globais e reduzindo de novo — o resultado independe do particionamento.
+
+Features por (módulo, métrica): soma em 30/60/90 dias e tendência
+``(últimos 30 - 30 anteriores) / (soma dos dois)``; por módulo: adoção
+(uso nos 90 dias); por cliente: número de módulos adotados.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+USAGE_COLUMNS = ("customer_id", "product_module", "usage_metric", "usage_value", "usage_date")
+
+WINDOW_DAYS = 30
+N_WINDOWS = 3  # 0-30, 30-60 e 60-90 dias antes de as_of
+_DIMENSIONS = ("customer_id", "product_module", "usage_metric")
+
+
+@dataclass
+class PartialRollup:
+    """
+    Agregado parcial de uma partição, em códigos locais.
+    """
+    categories: Dict[str, np.ndarray]  # dimensão -> valores (códigos = posição)
+    codes: np.ndarray  # (m, 4): cliente, módulo, métrica, janela
+    sums: np.ndarray
+    counts: np.ndarray
+    rows: int  # linhas lidas (antes do filtro de janela)
+
+
+@dataclass
+class UsageRollup:
+    """
+    Matriz cliente x feature resultante.
+    """
+    customer_ids: np.ndarray
+    feature_names: List[str]
+    matrix: np.ndarray  # float32 (clientes, features)
+    rows: int
+
+    def to_dataframe(self):
+        import pandas as pd
+
+        return pd.DataFrame(self.matrix, index=pd.Index(self.customer_ids, name="customer_id"),
+                            columns=self.feature_names)
+
+    def reindex(self, customer_ids: Sequence[str]) -> np.ndarray:
+        """Linhas alinhadas a ``customer_ids`` (clientes sem uso -> zeros)."""
+        import pandas as pd
+
+        positions = pd.Index(self.customer_ids).get_indexer(pd.Index(customer_ids))
+        result = np.zeros((len(positions), self.matrix.shape[1]), dtype=self.matrix.dtype)
+        found = positions >= 0
+        result[found] = self.matrix[positions[found]]
+        return result
+
+
+def _group_reduce(keys: np.ndarray, values: np.ndarray, counts: Optional[np.ndarray] = None):
+    """Soma e contagem por chave, via ordenação. Retorna (chaves únicas, somas, contagens)."""
+    if len(keys) == 0:
+        return keys, values.astype(np.float64), np.zeros(0, dtype=np.int64)
+    order = np.argsort(keys)
+    keys = keys[order]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    sums = np.add.reduceat(values[order].astype(np.float64), starts)
+    if counts is None:
+        group_counts = np.diff(np.append(starts, len(keys)))
+    else:
+        group_counts = np.add.reduceat(counts[order], starts)
+    return keys[starts], sums, group_counts
+
+
+def _compose(codes: np.ndarray, sizes: Sequence[int]) -> np.ndarray:
+    """Chave int64 única a partir de códigos (linha a linha, base mista)."""
+    key = np.zeros(len(codes), dtype=np.int64)
+    for column, size in enumerate(sizes):
+        key = key * size + codes[:, column]
+    return key
+
+
+def _decompose(keys: np.ndarray, sizes: Sequence[int]) -> np.ndarray:
+    codes = np.empty((len(keys), len(sizes)), dtype=np.int64)
+    for column in range(len(sizes) - 1, -1, -1):
+        keys, codes[:, column] = np.divmod(keys, sizes[column])
+    return codes
+
+
+def _read_partition(source: Any):
+    import pandas as pd
+
+    if isinstance(source, (str, os.PathLike)):
+        path = str(source)
+        if path.endswith(".parquet"):
+            return pd.read_parquet(path, columns=list(USAGE_COLUMNS))
+        return pd.read_csv(path, usecols=list(USAGE_COLUMNS))
+    return source
+
+
+def aggregate_partition(source: Any, as_of: date) -> PartialRollup:
+    """
+    Agrega uma partição (DataFrame, dict de arrays ou caminho .parquet/.csv).
+
+    Args:
+        source: Partição de ``customer_usage``
+        as_of: Data de referência; janelas contam para trás a partir dela
+    """
+    import pandas as pd
+
+    frame = _read_partition(source)
+    n_rows = len(frame[USAGE_COLUMNS[0]])
+
+    def series_of(name):
+        # Séries do pandas (inclusive categóricas) são usadas como estão
+        values = frame[name]
+        return values if isinstance(values, pd.Series) else pd.Series(np.asarray(values))
+
+    days = pd.to_datetime(series_of("usage_date")).to_numpy().astype("datetime64[D]")
+    age = (np.datetime64(as_of, "D") - days).astype(np.int64)
+    # Só o que cai nos 90 dias antes de as_of (inclusive) é agregado
+    keep = (age >= 0) & (age < WINDOW_DAYS * N_WINDOWS)
+    values = np.asarray(frame["usage_value"], dtype=np.float64)[keep]
+    keep_index = np.flatnonzero(keep)
+
+    categories = {}
+    codes = np.empty((len(keep_index), 4), dtype=np.int64)
+    for column, name in enumerate(_DIMENSIONS):
+        series = series_of(name)
+        local_codes, uniques = pd.factorize(series if keep.all() else series.iloc[keep_index])
+        codes[:, column] = local_codes
+        categories[name] = np.asarray(uniques, dtype=object)
+    codes[:, 3] = age[keep] // WINDOW_DAYS
+
+    valid = ~np.isnan(values) & (codes[:, :3] >= 0).all(axis=1)
+    codes, values = codes[valid], values[valid]
+
+    sizes = [max(len(categories[name]), 1) for name in _DIMENSIONS] + [N_WINDOWS]
+    keys, sums, counts = _group_reduce(_compose(codes, sizes), values)
+    return PartialRollup(categories, _decompose(keys, sizes), sums, counts, n_rows)
+
+
+def merge_partials(partials: Sequence[PartialRollup]) -> PartialRollup:
+    """
+    Une agregados parciais: códigos locais -> dicionários globais e nova
+    redução por chave.
+    """
+    import pandas as pd
+
+    categories = {}
+    remapped = [partial.codes.copy() for partial in partials]
+    for column, name in enumerate(_DIMENSIONS):
+        merged = pd.Index(np.concatenate([p.categories[name] for p in partials])
+                          if partials else np.empty(0, dtype=object)).unique()
+        categories[name] = np.asarray(merged, dtype=object)
+        for codes, partial in zip(remapped, partials):
+            mapping = merged.get_indexer(pd.Index(partial.categories[name]))
+            codes[:, column] = mapping[codes[:, column]] if len(codes) else codes[:, column]
+
+    sizes = [max(len(categories[name]), 1) for name in _DIMENSIONS] + [N_WINDOWS]
+    codes = np.concatenate(remapped) if remapped else np.empty((0, 4), dtype=np.int64)
+    keys, sums, counts = _group_reduce(
+        _compose(codes, sizes),
+        np.concatenate([p.sums for p in partials]) if partials else np.empty(0),
+        np.concatenate([p.counts for p in partials]) if partials else np.empty(0, dtype=np.int64),
+    )
+    return PartialRollup(categories, _decompose(keys, sizes), sums, counts,
+                         sum(p.rows for p in partials))
+
+
+def build_rollup(merged: PartialRollup) -> UsageRollup:
+    """Espalha o agregado global em uma matriz densa cliente x feature."""
+    modules = merged.categories["product_module"]
+    metrics = merged.categories["usage_metric"]
+    customers = merged.categories["customer_id"]
+    customer, module, metric, window = merged.codes.T
+    n_metrics = max(len(metrics), 1)
+
+    # Colunas só para os pares (módulo, métrica) e módulos observados
+    pairs, pair_index = np.unique(module * n_metrics + metric, return_inverse=True)
+    used_modules, module_index = np.unique(module, return_inverse=True)
+    n_pairs = len(pairs)
+    block = N_WINDOWS + 1  # somas acumuladas em 30/60/90 dias + tendência
+
+    matrix = np.zeros((len(customers), n_pairs * block + len(used_modules) + 1), dtype=np.float32)
+    base = pair_index * block
+    # Cada (cliente, par, janela) é único após a redução, então as somas
+    # podem ser atribuídas por indexação sem np.add.at
+    for source in range(N_WINDOWS):
+        rows = window == source
+        for target in range(source, N_WINDOWS):
+            matrix[customer[rows], base[rows] + target] += merged.sums[rows]
+
+    recent = matrix[:, 0:n_pairs * block:block]
+    previous = matrix[:, 1:n_pairs * block:block] - recent
+    with np.errstate(divide="ignore", invalid="ignore"):
+        matrix[:, N_WINDOWS:n_pairs * block:block] = np.where(
+            recent + previous != 0, (recent - previous) / (recent + previous), 0.0
+        )
+
+    adoption = n_pairs * block
+    matrix[customer, adoption + module_index] = 1.0
+    matrix[:, -1] = matrix[:, adoption:adoption + len(used_modules)].sum(axis=1)
+
+    names = []
+    for pair in pairs.tolist():
+        prefix = f"{modules[pair // n_metrics]}__{metrics[pair % n_metrics]}"
+        names.extend(f"{prefix}__{WINDOW_DAYS * (w + 1)}d" for w in range(N_WINDOWS))
+        names.append(f"{prefix}__trend_30d")
+    names.extend(f"{modules[code]}__adopted_90d" for code in used_modules.tolist())
+    names.append("modules_adopted_90d")
+
+    return UsageRollup(customer_ids=customers, feature_names=names, matrix=matrix, rows=merged.rows)
+
+
+def rollup_usage(
+    partitions: Union[Any, Iterable[Any]],
+    as_of: Optional[date] = None,
+    n_jobs: Optional[int] = None,
+) -> UsageRollup:
+    """
+    Rollup de ``customer_usage`` em features por cliente.
+
+    Args:
+        partitions: Uma partição ou iterável de partições (DataFrames, dicts
+            de arrays ou caminhos .parquet/.csv)
+        as_of: Data de referência das janelas (padrão: hoje)
+        n_jobs: Partições processadas em paralelo (padrão:
+            ``B2SHIFT_ROLLUP_JOBS`` ou o número de CPUs)
+
+    Returns:
+        UsageRollup com a matriz cliente x (módulo, métrica, janela)
+    """
+    if isinstance(partitions, (str, os.PathLike, dict)) or hasattr(partitions, "columns"):
+        partitions = [partitions]
+    partitions = list(partitions)
+    as_of = as_of or date.today()
+    n_jobs = n_jobs or int(os.getenv("B2SHIFT_ROLLUP_JOBS", 0)) or os.cpu_count() or 1
+    n_jobs = min(n_jobs, len(partitions))
+
+    if n_jobs <= 1:
+        partials = [aggregate_partition(partition, as_of) for partition in partitions]
+    else:
+        # Arquivos são lidos nos próprios processos; frames em memória ficam
+        # em threads para não serializá-los
+        from_files = all(isinstance(p, (str, os.PathLike)) for p in partitions)
+        executor_class = ProcessPoolExecutor if from_files else ThreadPoolExecutor
+        with executor_class(max_workers=n_jobs) as executor:
+            partials = list(executor.map(aggregate_partition, partitions, [as_of] * len(partitions)))
+
+    return build_rollup(merge_partials(partials))
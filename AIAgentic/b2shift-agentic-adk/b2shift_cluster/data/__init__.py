@@ -0,0 +1,37 @@
+# Acesso a dados do B2Shift Customer Clustering Agent
+
+# Fontes de dados (BigQuery ou SQL embarcado de desenvolvimento) com
+# pushdown de filtros/agregações e resultados em Arrow, e o layout colunar
+# particionado dos datasets. Os nomes públicos são resolvidos sob demanda
+# (PEP 562), como em ``b2shift_cluster.analytics``.
+
+import importlib
+
+_LAZY_ATTRIBUTES = {
+    "Query": ".warehouse",
+    "QueryCache": ".warehouse",
+    "DataSource": ".warehouse",
+    "SQLiteSource": ".warehouse",
+    "BigQuerySource": ".warehouse",
+    "get_data_source": ".warehouse",
+    "Dataset": ".dataset",
+    "open_dataset": ".dataset",
+    "write_dataset": ".dataset",
+    "csv_to_dataset": ".dataset",
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
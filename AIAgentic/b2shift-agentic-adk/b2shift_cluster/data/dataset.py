@@ -0,0 +1,423 @@
+"""
+Layout colunar particionado para os datasets de clientes B2Shift.
+
+Cada tabela vira um diretório com fragmentos particionados por colunas de
+negócio (ex.: ``industry``) e pelo mês de uma coluna de data::
+
+    customers/
+        _dataset.json
+        industry=Retail/part-00000/{customer_id,mrr,...}.npy
+    customer_usage/
+        _dataset.json
+        product_module=CRM/usage_date_month=2026-10/part-00000/...
+
+Cada coluna é um ``.npy`` (lido com ``mmap_mode="r"``): numéricas no tipo
+nativo, datas como ``datetime64[D]`` e textos como códigos int32 de um
+dicionário por fragmento (``<coluna>.dict.npy``). O manifesto guarda, por
+fragmento, os valores de partição, o número de linhas e mínimo/máximo de
+cada coluna — filtros descartam fragmentos inteiros antes de abrir
+qualquer arquivo (predicate pruning) e só as colunas pedidas são lidas.
+"""
+
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from urllib.parse import quote
+
+import numpy as np
+
+MANIFEST_FILE = "_dataset.json"
+FORMAT_VERSION = 1
+
+NUMERIC, DATE, STRING = "numeric", "date", "string"
+FILTER_OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "in", "between")
+
+Filter = Tuple[str, str, Any]
+
+
+def _column_kind(values) -> str:
+    import pandas as pd
+
+    dtype = pd.Series(values).dtype if not hasattr(values, "dtype") else values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return STRING
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_numeric_dtype(dtype):
+        return NUMERIC
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return DATE
+    return STRING
+
+
+def _encode(values, kind: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Array gravável (e dicionário, para textos)."""
+    import pandas as pd
+
+    if kind == NUMERIC:
+        series = pd.Series(values)
+        if series.dtype.kind not in "biuf":
+            # Inteiros anuláveis do pandas viram float com NaN
+            return series.astype(np.float64).to_numpy(), None
+        return series.to_numpy(), None
+    if kind == DATE:
+        return pd.to_datetime(pd.Series(values)).to_numpy().astype("datetime64[D]"), None
+    codes, uniques = pd.factorize(pd.Series(values), sort=True)
+    return codes.astype(np.int32), np.asarray(uniques, dtype=str)
+
+
+def _statistics(array: np.ndarray, dictionary: Optional[np.ndarray], kind: str):
+    """[mínimo, máximo] serializável em JSON (None se a coluna não tem valores)."""
+    if kind == STRING:
+        return [str(dictionary[0]), str(dictionary[-1])] if len(dictionary) else None
+    if kind == DATE:
+        valid = array[~np.isnat(array)]
+        return [str(valid.min()), str(valid.max())] if len(valid) else None
+    valid = array[~np.isnan(array)] if array.dtype.kind == "f" else array
+    return [valid.min().item(), valid.max().item()] if len(valid) else None
+
+
+def _comparable(value: Any, kind: str):
+    if kind == DATE:
+        return np.datetime64(value, "D")
+    if kind == STRING:
+        return str(value)
+    return value
+
+
+def _may_match(bounds, kind: str, operator: str, value: Any) -> bool:
+    """
+    Se um fragmento com [mínimo, máximo] pode conter linhas do filtro.
+    Nulos não satisfazem nenhum operador (inclusive ``!=``, como no SQL):
+    fragmentos sem valores na coluna são sempre descartados.
+    """
+    if bounds is None:
+        return False
+    low, high = (_comparable(bound, kind) for bound in bounds)
+    if operator == "=":
+        value = _comparable(value, kind)
+        return low <= value <= high
+    if operator == "in":
+        return any(low <= _comparable(item, kind) <= high for item in value)
+    if operator == "between":
+        start, stop = (_comparable(item, kind) for item in value)
+        return start <= high and stop >= low
+    if operator == "<":
+        return low < _comparable(value, kind)
+    if operator == "<=":
+        return low <= _comparable(value, kind)
+    if operator == ">":
+        return high > _comparable(value, kind)
+    if operator == ">=":
+        return high >= _comparable(value, kind)
+    # "!=": só descarta fragmentos em que todos os valores são iguais a value
+    return not (low == high == _comparable(value, kind))
+
+
+def _row_mask(values: np.ndarray, kind: str, operator: str, value: Any) -> np.ndarray:
+    if operator == "!=" and kind != STRING and values.dtype.kind in "fmM":
+        # NaN/NaT diferem de tudo no numpy; no SQL, nulo não passa no filtro
+        missing = np.isnat(values) if values.dtype.kind in "mM" else np.isnan(values)
+        return np.not_equal(values, _comparable(value, kind)) & ~missing
+    if operator == "in":
+        return np.isin(values, np.asarray([_comparable(item, kind) for item in value]))
+    if operator == "between":
+        start, stop = (_comparable(item, kind) for item in value)
+        return (values >= start) & (values <= stop)
+    value = _comparable(value, kind)
+    return {
+        "=": np.equal, "!=": np.not_equal, "<": np.less,
+        "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+    }[operator](values, value)
+
+
+@dataclass
+class Fragment:
+    """
+    Um arquivo colunar (diretório com um .npy por coluna) do dataset.
+    """
+    path: str  # relativo à raiz do dataset
+    rows: int
+    partition: Dict[str, str]
+    statistics: Dict[str, Any]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"path": self.path, "rows": self.rows, "partition": self.partition,
+                "statistics": self.statistics}
+
+
+class Dataset:
+    """
+    Leitor de um dataset colunar particionado.
+
+    Args:
+        root: Diretório da tabela (com ``_dataset.json``)
+    """
+
+    def __init__(self, root: Union[str, os.PathLike]):
+        self.root = Path(root)
+        with open(self.root / MANIFEST_FILE, encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.schema: Dict[str, str] = manifest["schema"]
+        self.partition_by: List[str] = manifest["partition_by"]
+        self.date_column: Optional[str] = manifest.get("date_column")
+        self.fragments = [Fragment(**fragment) for fragment in manifest["fragments"]]
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.schema)
+
+    @property
+    def num_rows(self) -> int:
+        return sum(fragment.rows for fragment in self.fragments)
+
+    def _validate(self, filters: Sequence[Filter]):
+        for column, operator, _ in filters:
+            if column not in self.schema:
+                raise KeyError(f"Coluna inexistente no dataset: {column}")
+            if operator not in FILTER_OPERATORS:
+                raise ValueError(f"Operador inválido: {operator!r} (use um de {FILTER_OPERATORS})")
+
+    def prune(self, filters: Sequence[Filter] = ()) -> List[Fragment]:
+        """Fragmentos que podem conter linhas que satisfazem ``filters``."""
+        filters = list(filters)
+        self._validate(filters)
+        return [
+            fragment for fragment in self.fragments
+            if all(_may_match(fragment.statistics.get(column), self.schema[column], operator, value)
+                   for column, operator, value in filters)
+        ]
+
+    def _load(self, fragment: Fragment, column: str, mmap: bool):
+        directory = self.root / fragment.path
+        values = np.load(directory / f"{column}.npy", mmap_mode="r" if mmap else None, allow_pickle=False)
+        dictionary = None
+        if self.schema[column] == STRING:
+            dictionary = np.load(directory / f"{column}.dict.npy", allow_pickle=False)
+        return values, dictionary
+
+    def scan(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        filters: Sequence[Filter] = (),
+        mmap: bool = True,
+        decode: bool = True,
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Percorre os fragmentos relevantes, um dict de colunas por fragmento.
+
+        Args:
+            columns: Projeção (padrão: todas)
+            filters: Tuplas ``(coluna, operador, valor)``; operadores em
+                FILTER_OPERATORS. Fragmentos são descartados pelas
+                estatísticas e as linhas restantes filtradas por máscara
+            mmap: Mapeia as colunas em memória (sem filtros de linha, as
+                numéricas saem como memmap somente leitura)
+            decode: Textos como arrays de objetos; se False, retorna
+                ``(códigos, dicionário)``
+        """
+        columns = list(columns) if columns is not None else self.columns
+        for column in columns:
+            if column not in self.schema:
+                raise KeyError(f"Coluna inexistente no dataset: {column}")
+        filters = list(filters)
+
+        for fragment in self.prune(filters):
+            mask = None
+            loaded = {}
+            for column, operator, value in filters:
+                values, dictionary = loaded.get(column) or self._load(fragment, column, mmap)
+                loaded[column] = (values, dictionary)
+                if dictionary is not None:
+                    # Compara os textos do dicionário e mapeia para os
+                    # códigos; o código -1 (nulo) cai no False acrescentado
+                    hits = np.append(_row_mask(dictionary, STRING, operator, value), False)
+                    condition = hits[values]
+                else:
+                    condition = _row_mask(values, self.schema[column], operator, value)
+                mask = condition if mask is None else mask & condition
+            if mask is not None and not mask.any():
+                continue
+
+            batch = {}
+            for column in columns:
+                values, dictionary = loaded.get(column) or self._load(fragment, column, mmap)
+                if mask is not None:
+                    values = values[mask]
+                if dictionary is None:
+                    batch[column] = values
+                elif decode:
+                    decoded = dictionary.astype(object)[np.maximum(values, 0)]
+                    decoded[values < 0] = None
+                    batch[column] = decoded
+                else:
+                    batch[column] = (values, dictionary)
+            yield batch
+
+    def read(self, columns: Optional[Sequence[str]] = None, filters: Sequence[Filter] = ()) -> Dict[str, np.ndarray]:
+        """Todas as linhas selecionadas, concatenadas em um dict de arrays."""
+        columns = list(columns) if columns is not None else self.columns
+        batches = list(self.scan(columns, filters))
+        if not batches:
+            return {column: np.empty(0, dtype=object if self.schema[column] == STRING else np.float64)
+                    for column in columns}
+        return {column: np.concatenate([batch[column] for batch in batches]) for column in columns}
+
+    def to_pandas(self, columns: Optional[Sequence[str]] = None, filters: Sequence[Filter] = ()):
+        """DataFrame com textos como ``Categorical``."""
+        import pandas as pd
+
+        columns = list(columns) if columns is not None else self.columns
+        pieces: Dict[str, List[Any]] = {column: [] for column in columns}
+        for batch in self.scan(columns, filters, decode=False):
+            for column in columns:
+                value = batch[column]
+                pieces[column].append(
+                    pd.Categorical.from_codes(value[0], categories=pd.Index(value[1]).astype(object))
+                    if isinstance(value, tuple) else np.asarray(value)
+                )
+        data = {}
+        for column, parts in pieces.items():
+            if not parts:
+                data[column] = pd.Series([], dtype=object)
+            elif self.schema[column] == STRING:
+                data[column] = pd.api.types.union_categoricals(parts, ignore_order=True)
+            else:
+                data[column] = np.concatenate(parts)
+        return pd.DataFrame(data)
+
+
+def _partition_value(value: Any) -> str:
+    return quote(str(value), safe="")
+
+
+def write_dataset(
+    frame,
+    root: Union[str, os.PathLike],
+    partition_by: Sequence[str] = (),
+    date_column: Optional[str] = None,
+    rows_per_file: int = 1_000_000,
+    mode: str = "append",
+) -> Dataset:
+    """
+    Grava um DataFrame no layout particionado (acrescentando fragmentos).
+
+    Args:
+        frame: DataFrame do pandas
+        root: Diretório da tabela
+        partition_by: Colunas de partição (ex.: ``["industry"]``)
+        date_column: Coluna de data particionada por mês
+            (``<coluna>_month=AAAA-MM``)
+        rows_per_file: Máximo de linhas por fragmento
+        mode: "append" (acrescenta ao manifesto existente) ou "overwrite"
+
+    Returns:
+        Dataset aberto
+    """
+    import pandas as pd
+
+    root = Path(root)
+    if mode == "overwrite" and root.exists():
+        shutil.rmtree(root)
+    root.mkdir(parents=True, exist_ok=True)
+
+    manifest_path = root / MANIFEST_FILE
+    if manifest_path.exists():
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["partition_by"] != list(partition_by) or manifest.get("date_column") != date_column:
+            raise ValueError("Particionamento diferente do dataset existente")
+    else:
+        manifest = {"version": FORMAT_VERSION, "schema": {}, "partition_by": list(partition_by),
+                    "date_column": date_column, "fragments": []}
+
+    schema = {column: _column_kind(frame[column]) for column in frame.columns}
+    for column, kind in manifest["schema"].items():
+        if schema.get(column, kind) != kind:
+            raise ValueError(f"Tipo da coluna {column} difere do dataset existente ({kind})")
+    manifest["schema"] = {**manifest["schema"], **schema}
+
+    keys = list(partition_by)
+    grouping = frame
+    if date_column is not None:
+        month_key = f"{date_column}_month"
+        # Mês como categórica (AAAA-MM), sem formatar cada linha
+        months, inverse = np.unique(pd.to_datetime(frame[date_column]).to_numpy().astype("datetime64[M]"),
+                                    return_inverse=True)
+        months = pd.Categorical.from_codes(inverse.ravel(), np.datetime_as_string(months, unit="M"))
+        grouping = frame.assign(**{month_key: months})
+        keys.append(month_key)
+
+    groups = grouping.groupby(keys, sort=True, observed=True, dropna=False) if keys else [((), grouping)]
+    next_part = len(manifest["fragments"])
+    for values, group in groups:
+        values = values if isinstance(values, tuple) else (values,)
+        partition = {key: str(value) for key, value in zip(keys, values)}
+        directory = Path(*[f"{key}={_partition_value(value)}" for key, value in partition.items()])
+        for start in range(0, len(group), rows_per_file):
+            chunk = group.iloc[start:start + rows_per_file]
+            relative = directory / f"part-{next_part:05d}"
+            next_part += 1
+            target = root / relative
+            target.mkdir(parents=True, exist_ok=True)
+
+            statistics = {}
+            for column in frame.columns:
+                kind = schema[column]
+                array, dictionary = _encode(chunk[column], kind)
+                np.save(target / f"{column}.npy", array, allow_pickle=False)
+                if dictionary is not None:
+                    np.save(target / f"{column}.dict.npy", dictionary, allow_pickle=False)
+                statistics[column] = _statistics(array, dictionary, kind)
+
+            manifest["fragments"].append(
+                Fragment(relative.as_posix(), len(chunk), partition, statistics).to_dict()
+            )
+
+    staging = manifest_path.with_suffix(".tmp")
+    with open(staging, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(staging, manifest_path)
+    return Dataset(root)
+
+
+def csv_to_dataset(
+    csv_path: Union[str, os.PathLike],
+    root: Union[str, os.PathLike],
+    partition_by: Sequence[str] = (),
+    date_column: Optional[str] = None,
+    sep: str = ",",
+    chunksize: int = 1_000_000,
+    **read_params,
+) -> Dataset:
+    """
+    Converte um CSV (ex.: os ``;`` dos notebooks) em blocos, sem carregá-lo inteiro.
+    """
+    import pandas as pd
+
+    dataset = None
+    mode = "overwrite"
+    for chunk in pd.read_csv(csv_path, sep=sep, chunksize=chunksize, **read_params):
+        if date_column is not None:
+            chunk[date_column] = pd.to_datetime(chunk[date_column])
+        dataset = write_dataset(chunk, root, partition_by, date_column, mode=mode)
+        mode = "append"
+    if dataset is None:
+        raise ValueError(f"CSV vazio: {csv_path}")
+    return dataset
+
+
+def open_dataset(table: str, root: Union[str, os.PathLike, None] = None) -> Dataset:
+    """
+    Abre a tabela ``table`` do diretório de datasets.
+
+    Args:
+        table: customers, customer_usage, customer_events...
+        root: Diretório base (padrão: ``B2SHIFT_DATASET_DIR`` ou
+            ``data/sample`` do projeto, ver ``warehouse.sample_data_dir``)
+    """
+    from .warehouse import sample_data_dir
+
+    root = Path(root) if root else sample_data_dir("B2SHIFT_DATASET_DIR")
+    return Dataset(root / table)
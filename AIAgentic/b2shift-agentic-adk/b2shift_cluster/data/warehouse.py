@@ -0,0 +1,481 @@
+"""
+Camada de acesso ao warehouse de clientes B2Shift.
+
+Consultas são descritas por ``Query`` (projeção, filtros, agrupamento,
+agregações, ordenação e limite) e renderizadas como SQL parametrizado no
+dialeto de cada backend, então filtros e agregações rodam no motor e só o
+resultado trafega — em lotes Arrow (``pyarrow.RecordBatch``).
+
+Backends:
+
+- ``BigQuerySource``: BigQuery (``BQ_PROJECT_ID``/``BQ_DATASET_ID``), com
+  parâmetros nomeados;
+- ``SQLiteSource``: SQL embarcado (sqlite3) carregado com os arquivos de
+  exemplo gerados pelo ``setup.py``, substituto do BigQuery em
+  desenvolvimento e benchmarks.
+
+Resultados são guardados em um cache LRU em memória pela impressão digital
+da consulta parametrizada (SQL + valores dos parâmetros + fonte), com TTL
+de ``CACHE_TTL_HOURS`` e desligável por ``ENABLE_CACHE``. Requer pyarrow
+(extra ``arrow``).
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+SAMPLE_TABLES = {
+    "customers": "sample_customers.csv",
+    "customer_usage": "sample_usage.csv",
+    "customer_events": "sample_events.csv",
+}
+
+OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "in", "not in", "between", "is null", "is not null", "like")
+AGGREGATES = ("count", "count_distinct", "sum", "avg", "min", "max")
+
+# Diretório do setup.py, onde ``python setup.py`` gera ``data/sample``
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_AGGREGATE_SPEC = re.compile(r"^\s*(\w+)\s*\(\s*(\*|\w+)\s*\)\s*$")
+
+
+def _require_arrow():
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("A camada de dados requer pyarrow: pip install 'b2shift-cluster-agent[arrow]'") from e
+    return pa
+
+
+_write_generation = 0
+_write_lock = threading.Lock()
+
+
+def write_generation() -> int:
+    """
+    Número de gravações (``load_frame``) feitas por este processo em
+    qualquer fonte; entra na versão dos dados do cache semântico.
+    """
+    return _write_generation
+
+
+def sample_data_dir(variable: str = "B2SHIFT_SAMPLE_DATA_DIR") -> Path:
+    """
+    Diretório dos dados de exemplo: ``variable`` se definida, senão
+    ``data/sample``. Caminhos relativos partem do diretório do projeto,
+    não do diretório corrente.
+    """
+    path = Path(os.getenv(variable) or "data/sample")
+    return path if path.is_absolute() else PROJECT_ROOT / path
+
+
+def _identifier(name: str) -> str:
+    if not isinstance(name, str) or not _IDENTIFIER.match(name):
+        raise ValueError(f"Identificador inválido: {name!r}")
+    return name
+
+
+@dataclass
+class Query:
+    """
+    Consulta declarativa sobre uma tabela do warehouse.
+
+    Args:
+        table: Tabela (``customers``, ``customer_usage``, ``customer_events``)
+        columns: Projeção (padrão: todas as colunas, ou só as de agrupamento
+            quando há agregações)
+        filters: Tuplas ``(coluna, operador, valor)``; operadores em OPERATORS
+        group_by: Colunas de agrupamento
+        aggregates: alias -> "função(coluna)", ex.: ``{"mrr_total": "sum(mrr)"}``
+        order_by: Colunas ou aliases; prefixo "-" para ordem decrescente
+        limit: Máximo de linhas
+    """
+    table: str
+    columns: Sequence[str] = ()
+    filters: Sequence[Tuple[str, str, Any]] = ()
+    group_by: Sequence[str] = ()
+    aggregates: Dict[str, str] = field(default_factory=dict)
+    order_by: Sequence[str] = ()
+    limit: Optional[int] = None
+
+    def render(self, dialect: str = "sqlite", table_prefix: str = "") -> Tuple[str, List[Any]]:
+        """
+        SQL parametrizado e valores dos parâmetros.
+
+        Args:
+            dialect: "sqlite" (``?``) ou "bigquery" (``@p0``, ``@p1``...)
+            table_prefix: Qualificação da tabela (ex.: "`projeto.dataset`.")
+        """
+        params: List[Any] = []
+
+        def placeholder(value):
+            params.append(value)
+            return "?" if dialect == "sqlite" else f"@p{len(params) - 1}"
+
+        select = [_identifier(column) for column in (self.columns or self.group_by)]
+        for alias, spec in self.aggregates.items():
+            match = _AGGREGATE_SPEC.match(spec)
+            if not match or match.group(1).lower() not in AGGREGATES:
+                raise ValueError(f"Agregação inválida: {spec!r} (use uma de {AGGREGATES})")
+            function, column = match.group(1).lower(), match.group(2)
+            column = column if column == "*" else _identifier(column)
+            expression = (f"COUNT(DISTINCT {column})" if function == "count_distinct"
+                          else f"{function.upper()}({column})")
+            select.append(f"{expression} AS {_identifier(alias)}")
+        sql = f"SELECT {', '.join(select) or '*'} FROM {table_prefix}{_identifier(self.table)}"
+
+        conditions = []
+        for column, operator, value in self.filters:
+            column, operator = _identifier(column), operator.lower()
+            if operator not in OPERATORS:
+                raise ValueError(f"Operador inválido: {operator!r} (use um de {OPERATORS})")
+            if operator in ("is null", "is not null"):
+                conditions.append(f"{column} {operator.upper()}")
+            elif operator in ("in", "not in"):
+                values = list(value)
+                if not values:
+                    conditions.append("1 = 0" if operator == "in" else "1 = 1")
+                    continue
+                marks = ", ".join(placeholder(item) for item in values)
+                conditions.append(f"{column} {operator.upper()} ({marks})")
+            elif operator == "between":
+                low, high = value
+                conditions.append(f"{column} BETWEEN {placeholder(low)} AND {placeholder(high)}")
+            else:
+                conditions.append(f"{column} {operator.upper()} {placeholder(value)}")
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+
+        if self.group_by:
+            sql += " GROUP BY " + ", ".join(_identifier(column) for column in self.group_by)
+        if self.order_by:
+            terms = [f"{_identifier(term.lstrip('-'))} {'DESC' if term.startswith('-') else 'ASC'}"
+                     for term in self.order_by]
+            sql += " ORDER BY " + ", ".join(terms)
+        if self.limit is not None:
+            sql += f" LIMIT {int(self.limit)}"
+        return sql, params
+
+    def fingerprint(self, source_id: str, dialect: str = "sqlite") -> str:
+        """Impressão digital da consulta parametrizada em uma fonte."""
+        sql, params = self.render(dialect)
+        payload = json.dumps({"source": source_id, "sql": sql, "params": params}, default=str)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class QueryCache:
+    """
+    Cache LRU em memória de resultados (``pyarrow.Table``) com TTL.
+
+    Args:
+        max_bytes: Limite de memória (padrão: ``B2SHIFT_QUERY_CACHE_MAX_MB``)
+        ttl_seconds: Validade das entradas (padrão: ``CACHE_TTL_HOURS``)
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            float(os.getenv("B2SHIFT_QUERY_CACHE_MAX_MB", 512)) * 1024 ** 2)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(
+            os.getenv("CACHE_TTL_HOURS", 24)) * 3600
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, table) -> None:
+        size = table.nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic(), table)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str):
+        _, table = self._entries.pop(key)
+        self._bytes -= table.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DataSource:
+    """
+    Base dos backends: renderiza, executa e cacheia consultas.
+
+    Subclasses definem ``dialect``, ``source_id`` e ``_execute_batches``.
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, cache: Optional[QueryCache] = None, use_cache: Optional[bool] = None):
+        if use_cache is None:
+            use_cache = os.getenv("ENABLE_CACHE", "true").lower() in ("1", "true", "yes")
+        self.cache = (cache or QueryCache()) if use_cache else None
+
+    @property
+    def source_id(self) -> str:
+        raise NotImplementedError
+
+    def _written(self):
+        """Depois de uma gravação: limpa o cache e avança ``write_generation``."""
+        global _write_generation
+        with _write_lock:
+            _write_generation += 1
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _table_prefix(self) -> str:
+        return ""
+
+    def _execute_batches(self, sql: str, params: List[Any], batch_size: int) -> Iterator[Any]:
+        raise NotImplementedError
+
+    def render(self, query: Query) -> Tuple[str, List[Any]]:
+        return query.render(self.dialect, self._table_prefix())
+
+    def iter_batches(self, query: Query, batch_size: int = 65_536) -> Iterator[Any]:
+        """
+        Executa ``query`` e produz ``pyarrow.RecordBatch`` (sem cache).
+        """
+        sql, params = self.render(query)
+        yield from self._execute_batches(sql, params, batch_size)
+
+    def execute(self, query: Query, use_cache: bool = True):
+        """
+        Executa ``query`` e retorna um ``pyarrow.Table``, usando o cache.
+        """
+        pa = _require_arrow()
+        key = query.fingerprint(self.source_id, self.dialect) if self.cache is not None and use_cache else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        batches = list(self.iter_batches(query))
+        table = pa.Table.from_batches(batches) if batches else pa.table({})
+        if key is not None:
+            self.cache.put(key, table)
+        return table
+
+    def to_pandas(self, query: Query, use_cache: bool = True):
+        return self.execute(query, use_cache=use_cache).to_pandas()
+
+    def load_frame(self, table: str, frame, indexes: Sequence[str] = ("customer_id",),
+                   if_exists: str = "replace"):
+        """Grava um DataFrame como tabela (``if_exists``: "replace" ou "append")."""
+        raise NotImplementedError
+
+
+class SQLiteSource(DataSource):
+    """
+    Backend SQL embarcado (sqlite3), substituto local do BigQuery.
+
+    Args:
+        path: Arquivo do banco (padrão: em memória)
+        cache / use_cache: Ver ``DataSource``
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, path: Union[str, os.PathLike] = ":memory:", cache: Optional[QueryCache] = None,
+                 use_cache: Optional[bool] = None):
+        super().__init__(cache=cache, use_cache=use_cache)
+        self.path = str(path)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._version = 0  # muda a cada carga, invalidando o cache
+
+    @property
+    def source_id(self) -> str:
+        return f"sqlite:{self.path}:{id(self)}:{self._version}"
+
+    @classmethod
+    def from_sample_data(cls, directory: Union[str, os.PathLike, None] = None, **params) -> "SQLiteSource":
+        """
+        Carrega os arquivos de exemplo do ``setup.py`` (``data/sample``),
+        preferindo o layout colunar (``<tabela>/_dataset.json``) ao CSV.
+
+        Args:
+            directory: Diretório dos CSVs (padrão: ``sample_data_dir()``)
+        """
+        import pandas as pd
+
+        from .dataset import MANIFEST_FILE, Dataset
+
+        directory = Path(directory) if directory else sample_data_dir()
+        source = cls(**params)
+        loaded = 0
+        for table, filename in SAMPLE_TABLES.items():
+            if (directory / table / MANIFEST_FILE).exists():
+                dataset = Dataset(directory / table)
+                frame = dataset.to_pandas()
+                # Texto no SQLite; datas como ISO, como nos CSVs
+                for column, kind in dataset.schema.items():
+                    if kind == "string":
+                        frame[column] = frame[column].astype(object)
+                    elif kind == "date":
+                        frame[column] = pd.to_datetime(frame[column]).dt.strftime("%Y-%m-%d")
+                source.load_frame(table, frame)
+            elif (directory / filename).exists():
+                source.load_frame(table, pd.read_csv(directory / filename))
+            else:
+                continue
+            loaded += 1
+        if not loaded:
+            raise FileNotFoundError(
+                f"Nenhum arquivo de exemplo em {directory} (gere com: python setup.py)"
+            )
+        return source
+
+    def load_frame(self, table: str, frame, indexes: Sequence[str] = ("customer_id",),
+                   if_exists: str = "replace"):
+        """Grava um DataFrame como tabela e cria índices nas colunas dadas."""
+        table = _identifier(table)
+        with self._lock:
+            frame.to_sql(table, self._connection, if_exists=if_exists, index=False, chunksize=100_000)
+            for column in indexes:
+                if column in frame.columns:
+                    self._connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{table}_{_identifier(column)} ON {table} ({column})"
+                    )
+            self._connection.commit()
+            self._version += 1
+        self._written()
+
+    def _execute_batches(self, sql: str, params: List[Any], batch_size: int) -> Iterator[Any]:
+        pa = _require_arrow()
+        with self._lock:
+            cursor = self._connection.execute(sql, params)
+            names = [description[0] for description in cursor.description]
+            rows = cursor.fetchall()
+        if not rows:
+            yield pa.RecordBatch.from_arrays([pa.array([]) for _ in names], names=names)
+            return
+        # Conversão colunar fora do lock. Os tipos são inferidos do resultado
+        # inteiro: uma coluna só com NULL no primeiro lote viraria tipo null
+        # e os lotes seguintes teriam outro schema
+        columns = [pa.array(column) for column in zip(*rows)]
+        del rows
+        yield from pa.Table.from_arrays(columns, names=names).to_batches(max_chunksize=batch_size)
+
+
+class BigQuerySource(DataSource):
+    """
+    Backend BigQuery com parâmetros nomeados e resultados em Arrow.
+
+    Args:
+        project_id: Projeto (padrão: ``BQ_PROJECT_ID``)
+        dataset_id: Dataset (padrão: ``BQ_DATASET_ID``)
+        cache / use_cache: Ver ``DataSource``
+    """
+
+    dialect = "bigquery"
+
+    def __init__(self, project_id: Optional[str] = None, dataset_id: Optional[str] = None,
+                 cache: Optional[QueryCache] = None, use_cache: Optional[bool] = None):
+        super().__init__(cache=cache, use_cache=use_cache)
+        from google.cloud import bigquery
+
+        self.project_id = project_id or os.getenv("BQ_PROJECT_ID")
+        self.dataset_id = dataset_id or os.getenv("BQ_DATASET_ID", "b2shift_customer_data")
+        self._bigquery = bigquery
+        self._client = bigquery.Client(project=self.project_id)
+
+    @property
+    def source_id(self) -> str:
+        return f"bigquery:{self.project_id}.{self.dataset_id}"
+
+    def _table_prefix(self) -> str:
+        return f"`{self.project_id}.{self.dataset_id}`."
+
+    def _parameter(self, name: str, value: Any):
+        bigquery = self._bigquery
+        if isinstance(value, bool):
+            kind = "BOOL"
+        elif isinstance(value, int):
+            kind = "INT64"
+        elif isinstance(value, float):
+            kind = "FLOAT64"
+        else:
+            kind = "STRING"
+            value = str(value)
+        return bigquery.ScalarQueryParameter(name, kind, value)
+
+    def _execute_batches(self, sql: str, params: List[Any], batch_size: int) -> Iterator[Any]:
+        job_config = self._bigquery.QueryJobConfig(
+            query_parameters=[self._parameter(f"p{i}", value) for i, value in enumerate(params)]
+        )
+        rows = self._client.query(sql, job_config=job_config).result(page_size=batch_size)
+        yield from rows.to_arrow_iterable()
+
+    def load_frame(self, table: str, frame, indexes: Sequence[str] = ("customer_id",),
+                   if_exists: str = "replace"):
+        """
+        Grava um DataFrame como tabela via load job. O BigQuery não tem
+        índices; ``indexes`` viram o clustering da tabela.
+        """
+        bigquery = self._bigquery
+        disposition = (bigquery.WriteDisposition.WRITE_TRUNCATE if if_exists == "replace"
+                       else bigquery.WriteDisposition.WRITE_APPEND)
+        job_config = bigquery.LoadJobConfig(
+            write_disposition=disposition,
+            clustering_fields=[column for column in indexes if column in frame.columns][:4] or None,
+        )
+        destination = f"{self.project_id}.{self.dataset_id}.{_identifier(table)}"
+        self._client.load_table_from_dataframe(frame, destination, job_config=job_config).result()
+        self._written()
+
+
+_default_source: Optional[DataSource] = None
+
+
+def get_data_source() -> DataSource:
+    """
+    Fonte de dados padrão do processo, conforme ``B2SHIFT_DATA_BACKEND``
+    ("sqlite" para os dados de exemplo ou "bigquery").
+    """
+    global _default_source
+    if _default_source is None:
+        backend = os.getenv("B2SHIFT_DATA_BACKEND", "sqlite")
+        if backend == "bigquery":
+            _default_source = BigQuerySource()
+        elif backend == "sqlite":
+            _default_source = SQLiteSource.from_sample_data()
+        else:
+            raise ValueError(f"B2SHIFT_DATA_BACKEND inválido: {backend} (use 'sqlite' ou 'bigquery')")
+    return _default_source
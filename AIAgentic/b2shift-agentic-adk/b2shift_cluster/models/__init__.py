@@ -6,7 +6,7 @@ clientes, clusters e estratégias de negócio no contexto B2Shift.
 """
 
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
 from datetime import datetime
 from enum import Enum
 
@@ -32,6 +32,49 @@ class Industry(Enum):
     OTHER = "other"
 
 
+class _ColumnarMixin:
+    """
+    Conversões em lote coluna a coluna, delegadas a ``models.columnar``.
+
+    O módulo colunar (numpy/pandas) só é importado quando um destes métodos é
+    chamado, mantendo leve o import dos modelos.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_dataframe(cls, df) -> list:
+        """Constrói instâncias a partir de um pandas.DataFrame."""
+        from .columnar import from_dataframe
+        return from_dataframe(cls, df)
+
+    @classmethod
+    def to_dataframe(cls, records):
+        """Converte instâncias em pandas.DataFrame."""
+        from .columnar import to_dataframe
+        return to_dataframe(records, cls)
+
+    @classmethod
+    def to_arrow(cls, records):
+        """Converte instâncias em pyarrow.Table."""
+        from .columnar import to_arrow
+        return to_arrow(records, cls)
+
+    @classmethod
+    def encode_batch(cls, records) -> bytes:
+        """Codifica instâncias no formato binário compacto B2SB."""
+        from .columnar import encode_batch
+        return encode_batch(records, cls)
+
+    @classmethod
+    def decode_batch(cls, payload) -> list:
+        """Decodifica um payload B2SB gerado por ``encode_batch``."""
+        from .columnar import decode_batch
+        records = decode_batch(payload)
+        if records and not isinstance(records[0], cls):
+            raise ValueError(f"Payload contém {type(records[0]).__name__}, esperado {cls.__name__}")
+        return records
+
+
 class PaymentHealth(Enum):
     """Enum para situação de pagamento."""
     CURRENT = "current"
@@ -40,8 +83,8 @@ class PaymentHealth(Enum):
     DELINQUENT = "delinquent"
 
 
-@dataclass
-class CustomerProfile:
+@dataclass(slots=True)
+class CustomerProfile(_ColumnarMixin):
     """
     Perfil completo de um cliente B2B no contexto B2Shift.
     """
@@ -84,8 +127,8 @@ class CustomerProfile:
     cluster_confidence: Optional[float] = None
 
 
-@dataclass
-class ClusterResult:
+@dataclass(slots=True)
+class ClusterResult(_ColumnarMixin):
     """
     Resultado da análise de clusterização.
     """
@@ -111,12 +154,13 @@ class ClusterResult:
     intra_cluster_distance: float
     silhouette_score: float
     
-    # Clientes no cluster
-    customer_ids: List[str]
+    # Clientes no cluster: List[str] ou ClusterMembership (posições em um
+    # CustomerIdIndex compartilhado, decodificadas sob demanda)
+    customer_ids: Sequence[str]
     
     
-@dataclass
-class BusinessStrategy:
+@dataclass(slots=True)
+class BusinessStrategy(_ColumnarMixin):
     """
     Estratégia de negócio para um cluster específico.
     """
@@ -179,8 +223,8 @@ class ClusteringConfiguration:
     feature_selection: bool = True
 
 
-@dataclass
-class PredictionResult:
+@dataclass(slots=True)
+class PredictionResult(_ColumnarMixin):
     """
     Resultado de predição de comportamento de cliente.
     """
@@ -244,3 +288,41 @@ class B2ShiftAnalysisReport:
     next_actions: List[str]
     monitoring_plan: str
     review_schedule: str
+
+    def save(self, path) -> None:
+        """Grava o relatório em streaming (ver ``models.report_io``)."""
+        from .report_io import write_report
+        write_report(self, path)
+
+    @staticmethod
+    def open(path):
+        """Abre um relatório gravado para leitura seletiva (ReportReader)."""
+        from .report_io import ReportReader
+        return ReportReader(path)
+
+
+# Modelos endereçáveis por nome na codificação binária (models.columnar)
+MODEL_REGISTRY = {
+    model.__name__: model
+    for model in (CustomerProfile, ClusterResult, BusinessStrategy, PredictionResult)
+}
+
+
+_LAZY_ATTRIBUTES = {
+    "ClusterMembership": ".membership",
+    "CustomerIdIndex": ".membership",
+    "ClusterAnalysis": ".structured",
+    "StrategyPlan": ".structured",
+}
+
+
+def __getattr__(name: str):
+    # Estruturas baseadas em numpy/pydantic só são importadas quando usadas (PEP 562)
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    import importlib
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
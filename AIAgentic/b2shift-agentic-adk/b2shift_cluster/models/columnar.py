@@ -0,0 +1,614 @@
+"""
+Conversões em lote (colunares) para os modelos de dados B2Shift.
+
+As conversões trabalham coluna a coluna: cada campo do dataclass vira um
+``numpy.ndarray`` tipado e a construção de objetos usa ``map`` sobre as
+colunas já convertidas, sem laços Python por objeto/campo. O mesmo formato
+colunar alimenta ``to_dataframe``/``to_arrow`` e a codificação binária
+compacta usada para mover lotes entre processos.
+
+Formato binário (``encode_columns``/``decode_columns``)::
+
+    b"B2SB" | versão (u8) | 3 bytes reservados | tamanho do header (u32 LE)
+    header JSON (modelo, linhas, colunas e posição dos buffers)
+    buffers alinhados em 8 bytes
+
+Colunas numéricas e de data são gravadas como bytes crus; colunas de texto
+(inclusive enums, listas e dicts serializados em JSON) usam codificação por
+dicionário quando a cardinalidade é baixa ou offsets + blob UTF-8 caso
+contrário. A leitura usa ``numpy.frombuffer`` sobre o payload, sem cópia.
+"""
+
+import dataclasses
+import gc
+import json
+import struct
+import typing
+from collections import abc
+from datetime import datetime, timedelta
+from enum import Enum
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Type
+
+import numpy as np
+
+# Tipos lógicos de coluna
+FLOAT = "float"
+INT = "int"
+BOOL = "bool"
+STR = "str"
+ENUM = "enum"
+DATETIME = "datetime"
+LIST = "list"
+JSON = "json"
+
+_RAW_KINDS = (FLOAT, INT, BOOL, DATETIME)
+
+MAGIC = b"B2SB"
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct("<4sB3xI")
+_ALIGNMENT = 8
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+@dataclasses.dataclass(frozen=True)
+class FieldSpec:
+    """
+    Descrição colunar de um campo de dataclass.
+    """
+    name: str
+    kind: str
+    optional: bool = False
+    enum_type: Optional[Type[Enum]] = None
+
+
+def _kind_of(annotation: Any) -> str:
+    if isinstance(annotation, type):
+        if issubclass(annotation, Enum):
+            return ENUM
+        if annotation is bool:
+            return BOOL
+        if annotation is int:
+            return INT
+        if annotation is float:
+            return FLOAT
+        if annotation is str:
+            return STR
+        if annotation is datetime:
+            return DATETIME
+    if typing.get_origin(annotation) in (list, abc.Sequence):
+        return LIST
+    return JSON
+
+
+@lru_cache(maxsize=None)
+def model_schema(model: type) -> Tuple[FieldSpec, ...]:
+    """
+    Retorna o schema colunar de um dataclass de modelo, na ordem dos campos.
+
+    Args:
+        model: Classe dataclass (ex.: CustomerProfile)
+
+    Returns:
+        Tupla de FieldSpec, um por campo
+    """
+    hints = typing.get_type_hints(model)
+    specs = []
+
+    for field in dataclasses.fields(model):
+        annotation = hints[field.name]
+        optional = False
+
+        if typing.get_origin(annotation) is typing.Union:
+            args = typing.get_args(annotation)
+            non_null = [arg for arg in args if arg is not type(None)]
+            optional = len(non_null) < len(args)
+            annotation = non_null[0] if len(non_null) == 1 else Any
+
+        kind = _kind_of(annotation)
+        specs.append(FieldSpec(
+            name=field.name,
+            kind=kind,
+            optional=optional,
+            enum_type=annotation if kind == ENUM else None,
+        ))
+
+    return tuple(specs)
+
+
+def _object_array(values: Sequence[Any]) -> np.ndarray:
+    # np.array(lista de listas) criaria uma matriz; aqui queremos 1-D de objetos
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _to_array(values: List[Any], spec: FieldSpec) -> np.ndarray:
+    if spec.kind == FLOAT or (spec.kind == INT and spec.optional):
+        # None -> NaN (inteiros opcionais seguem a convenção do pandas)
+        return np.array(values, dtype=np.float64)
+    if spec.kind == INT:
+        return np.array(values, dtype=np.int64)
+    if spec.kind == BOOL:
+        return np.array(values, dtype=bool)
+    if spec.kind == DATETIME:
+        return _datetimes_to_array(values)
+    if spec.kind == ENUM:
+        lookup = {member: member.value for member in spec.enum_type}
+        return _object_array([lookup.get(value, value) for value in values])
+    return _object_array(values)
+
+
+def _datetimes_to_array(values: List[Any]) -> np.ndarray:
+    try:
+        # Aritmética de timedelta é ~5x mais rápida que np.array(datetimes)
+        micros = np.fromiter(
+            ((value - _EPOCH) // _MICROSECOND for value in values),
+            dtype=np.int64, count=len(values),
+        )
+    except TypeError:
+        # None ou datetimes com timezone: caminho genérico do numpy
+        return np.array(values, dtype="datetime64[us]")
+    return micros.view("datetime64[us]")
+
+
+def _coerce_enum(enum_type: Type[Enum], value: Any) -> Enum:
+    try:
+        return enum_type(value)
+    except ValueError:
+        # Fontes externas usam rótulos capitalizados ("Technology")
+        if isinstance(value, str):
+            return enum_type(value.lower())
+        raise
+
+
+def _from_array(column: Any, spec: FieldSpec) -> List[Any]:
+    if spec.kind in (LIST, JSON):
+        values = list(column)
+        if values and isinstance(values[0], str):
+            values = [json.loads(value) if value is not None else None for value in values]
+        return values
+
+    array = np.asarray(column)
+
+    if spec.kind == FLOAT or (spec.kind == INT and spec.optional):
+        array = array.astype(np.float64, copy=False)
+        missing = np.isnan(array)
+        if spec.kind == INT:
+            values = np.where(missing, 0, array).astype(np.int64).tolist()
+        else:
+            values = array.tolist()
+        if spec.optional and missing.any():
+            for index in np.flatnonzero(missing).tolist():
+                values[index] = None
+        return values
+    if spec.kind == INT:
+        return array.astype(np.int64, copy=False).tolist()
+    if spec.kind == BOOL:
+        return array.astype(bool, copy=False).tolist()
+    if spec.kind == DATETIME:
+        return array.astype("datetime64[us]").tolist()
+    if spec.kind == ENUM:
+        values = array.tolist()
+        # Conversão feita uma vez por valor distinto, não por linha
+        lookup = {
+            value: None if value is None else _coerce_enum(spec.enum_type, value)
+            for value in set(values)
+        }
+        return [lookup[value] for value in values]
+    return array.tolist()
+
+
+def to_columns(records: Iterable[Any], model: Optional[type] = None) -> Dict[str, np.ndarray]:
+    """
+    Converte uma sequência de modelos em colunas numpy, campo a campo.
+
+    Args:
+        records: Instâncias do modelo
+        model: Classe do modelo (inferida do primeiro registro se omitida)
+
+    Returns:
+        Dicionário nome do campo -> ndarray
+
+    Raises:
+        ValueError: Se ``records`` estiver vazio e ``model`` não for informado
+    """
+    records = records if isinstance(records, list) else list(records)
+    if model is None:
+        if not records:
+            raise ValueError("Informe o modelo para converter uma lista vazia")
+        model = type(records[0])
+
+    return {
+        spec.name: _to_array(list(map(attrgetter(spec.name), records)), spec)
+        for spec in model_schema(model)
+    }
+
+
+def from_columns(model: type, columns: Mapping[str, Any]) -> List[Any]:
+    """
+    Constrói instâncias do modelo a partir de colunas (ndarray, listas ou Series).
+
+    Campos ausentes usam o default do dataclass; campos obrigatórios ausentes
+    geram erro.
+
+    Args:
+        model: Classe do modelo
+        columns: Mapeamento nome do campo -> valores
+
+    Returns:
+        Lista de instâncias do modelo
+
+    Raises:
+        ValueError: Se faltar uma coluna obrigatória ou os tamanhos divergirem
+    """
+    defaults = {
+        field.name: field.default
+        for field in dataclasses.fields(model)
+        if field.default is not dataclasses.MISSING
+    }
+    n_rows = None
+    converted = []
+
+    for spec in model_schema(model):
+        if spec.name in columns:
+            values = _from_array(columns[spec.name], spec)
+            if n_rows is None:
+                n_rows = len(values)
+            elif len(values) != n_rows:
+                raise ValueError(
+                    f"Coluna '{spec.name}' tem {len(values)} linhas, esperado {n_rows}"
+                )
+            converted.append(values)
+        elif spec.name in defaults:
+            converted.append(None)
+        else:
+            raise ValueError(f"Coluna obrigatória ausente para {model.__name__}: '{spec.name}'")
+
+    n_rows = n_rows or 0
+    arguments = [
+        values if values is not None else [defaults[spec.name]] * n_rows
+        for spec, values in zip(model_schema(model), converted)
+    ]
+
+    # Milhões de alocações seguidas disparariam o GC cíclico repetidamente
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return list(map(model, *arguments))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def to_dataframe(records: Iterable[Any], model: Optional[type] = None):
+    """
+    Converte modelos em ``pandas.DataFrame`` (enums como categorias).
+    """
+    import pandas as pd
+
+    records = records if isinstance(records, list) else list(records)
+    model = model or type(records[0])
+    columns = to_columns(records, model)
+
+    for spec in model_schema(model):
+        if spec.kind == ENUM:
+            columns[spec.name] = pd.Categorical(
+                columns[spec.name], categories=[member.value for member in spec.enum_type]
+            )
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def from_dataframe(model: type, df) -> List[Any]:
+    """
+    Constrói modelos a partir de um ``pandas.DataFrame``, coluna a coluna.
+
+    Colunas extras no DataFrame são ignoradas.
+    """
+    names = {spec.name for spec in model_schema(model)}
+    columns = {}
+    for name in df.columns:
+        if name in names:
+            column = df[name]
+            if str(column.dtype) == "category":
+                column = column.astype(object)
+            columns[name] = column.to_numpy()
+    return from_columns(model, columns)
+
+
+def to_arrow(records: Iterable[Any], model: Optional[type] = None):
+    """
+    Converte modelos em ``pyarrow.Table``.
+
+    Enums viram colunas dictionary-encoded, listas viram ``list<...>`` e dicts
+    são gravados como JSON.
+
+    Raises:
+        ImportError: Se pyarrow não estiver instalado
+    """
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("to_arrow requer pyarrow: pip install pyarrow") from e
+
+    records = records if isinstance(records, list) else list(records)
+    model = model or type(records[0])
+    columns = to_columns(records, model)
+    arrays = {}
+
+    for spec in model_schema(model):
+        values = columns[spec.name]
+        if spec.kind == FLOAT:
+            arrays[spec.name] = pa.array(values, mask=np.isnan(values) if spec.optional else None)
+        elif spec.kind == INT and spec.optional:
+            missing = np.isnan(values)
+            arrays[spec.name] = pa.array(np.where(missing, 0, values).astype(np.int64), mask=missing)
+        elif spec.kind == ENUM:
+            categories = [member.value for member in spec.enum_type]
+            codes = _dictionary_codes(values.tolist(), categories)
+            arrays[spec.name] = pa.DictionaryArray.from_arrays(
+                pa.array(codes, mask=codes < 0), pa.array(categories)
+            )
+        elif spec.kind == JSON:
+            arrays[spec.name] = pa.array(_json_strings(values), type=pa.string())
+        elif spec.kind == LIST:
+            arrays[spec.name] = pa.array(_materialize_lists(values))
+        elif spec.kind == STR:
+            arrays[spec.name] = pa.array(values.tolist())
+        else:
+            arrays[spec.name] = pa.array(values)
+
+    return pa.table(arrays)
+
+
+# ---------------------------------------------------------------------------
+# Codificação binária
+# ---------------------------------------------------------------------------
+
+def _materialize_lists(values: Sequence[Any]) -> List[Optional[list]]:
+    # Sequências preguiçosas (ex.: ClusterMembership) viram listas Python
+    return [
+        value if value is None or isinstance(value, list) else list(value)
+        for value in values
+    ]
+
+
+def _json_strings(values: Sequence[Any]) -> List[Optional[str]]:
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str).encode
+    return [None if value is None else dumps(value) for value in values]
+
+
+def _dictionary_codes(values: List[Any], categories: List[Any]) -> np.ndarray:
+    lookup = {category: code for code, category in enumerate(categories)}
+    return np.fromiter(
+        (lookup.get(value, -1) for value in values), dtype=np.int32, count=len(values)
+    )
+
+
+def _smallest_code_dtype(n_categories: int) -> np.dtype:
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def encode_strings(values: List[Optional[str]]) -> Tuple[np.ndarray, bytes, bool]:
+    """Offsets (int64, n+1) + blob UTF-8; indica se o blob é ASCII puro."""
+    texts = ["" if value is None else value for value in values]
+    joined = "".join(texts)
+    blob = joined.encode("utf-8")
+    is_ascii = len(blob) == len(joined)
+
+    if is_ascii:
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    else:
+        encoded = [text.encode("utf-8") for text in texts]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets, blob, is_ascii
+
+
+def decode_strings(offsets: np.ndarray, blob: memoryview, is_ascii: bool) -> List[str]:
+    """Inverso de ``encode_strings``."""
+    bounds = offsets.tolist()
+    if is_ascii:
+        text = bytes(blob).decode("ascii")
+        return [text[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+    data = bytes(blob)
+    return [data[start:end].decode("utf-8") for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+class _BufferWriter:
+    """Acumula buffers alinhados e devolve suas posições relativas."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.size = 0
+
+    def add(self, data) -> List[int]:
+        data = memoryview(data).cast("B")
+        padding = -self.size % _ALIGNMENT
+        if padding:
+            self.chunks.append(b"\x00" * padding)
+            self.size += padding
+        position = [self.size, data.nbytes]
+        self.chunks.append(data)
+        self.size += data.nbytes
+        return position
+
+
+def _encode_text_column(values: List[Optional[str]], writer: _BufferWriter,
+                        categories: Optional[List[str]] = None) -> Dict[str, Any]:
+    n_rows = len(values)
+    if categories is None:
+        distinct = dict.fromkeys(value for value in values if value is not None)
+        if len(distinct) <= max(1, n_rows // 2):
+            categories = list(distinct)
+
+    if categories is not None:
+        codes = _dictionary_codes(values, categories)
+        code_dtype = _smallest_code_dtype(len(categories))
+        offsets, blob, is_ascii = encode_strings(categories)
+        return {
+            "encoding": "dictionary",
+            "codes": writer.add(codes.astype(code_dtype)),
+            "code_dtype": code_dtype.str,
+            "offsets": writer.add(offsets),
+            "blob": writer.add(blob),
+            "ascii": is_ascii,
+        }
+
+    offsets, blob, is_ascii = encode_strings(values)
+    column = {
+        "encoding": "utf8",
+        "offsets": writer.add(offsets),
+        "blob": writer.add(blob),
+        "ascii": is_ascii,
+    }
+    missing = np.fromiter((value is None for value in values), dtype=bool, count=n_rows)
+    if missing.any():
+        column["nulls"] = writer.add(np.packbits(missing))
+    return column
+
+
+def encode_columns(model: type, columns: Mapping[str, Any]) -> bytes:
+    """
+    Codifica colunas (formato de ``to_columns``) no formato binário B2SB.
+
+    Args:
+        model: Classe do modelo
+        columns: Colunas por nome de campo
+
+    Returns:
+        Payload binário
+    """
+    writer = _BufferWriter()
+    header_columns = []
+    n_rows = None
+
+    for spec in model_schema(model):
+        if spec.name not in columns:
+            continue
+        values = columns[spec.name]
+        entry = {"name": spec.name, "kind": spec.kind}
+
+        if spec.kind in _RAW_KINDS:
+            array = np.ascontiguousarray(_to_array(list(values), spec)
+                                         if not isinstance(values, np.ndarray) else values)
+            if spec.kind == DATETIME:
+                array = array.astype("datetime64[us]", copy=False)
+            entry.update(encoding="raw", dtype=array.dtype.str, data=writer.add(array.view(np.uint8)))
+            n_values = len(array)
+        else:
+            values = list(values)
+            n_values = len(values)
+            if spec.kind == ENUM:
+                values = [getattr(value, "value", value) for value in values]
+                entry.update(_encode_text_column(
+                    values, writer, categories=[member.value for member in spec.enum_type]
+                ))
+            elif spec.kind == LIST:
+                entry.update(_encode_text_column(_json_strings(_materialize_lists(values)), writer))
+            elif spec.kind == JSON:
+                entry.update(_encode_text_column(_json_strings(values), writer))
+            else:
+                entry.update(_encode_text_column(values, writer))
+
+        if n_rows is None:
+            n_rows = n_values
+        elif n_values != n_rows:
+            raise ValueError(f"Coluna '{spec.name}' tem {n_values} linhas, esperado {n_rows}")
+        header_columns.append(entry)
+
+    header = json.dumps({
+        "model": model.__name__,
+        "rows": n_rows or 0,
+        "columns": header_columns,
+    }, separators=(",", ":")).encode("utf-8")
+
+    preamble = _PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header))
+    # Os buffers começam alinhados após preâmbulo + header
+    padding = -(len(preamble) + len(header)) % _ALIGNMENT
+    return b"".join([preamble, header, b" " * padding, *writer.chunks])
+
+
+def _read_buffer(body: memoryview, position: List[int]) -> memoryview:
+    start, length = position
+    return body[start:start + length]
+
+
+def decode_columns(payload) -> Tuple[type, Dict[str, np.ndarray]]:
+    """
+    Decodifica um payload B2SB em (classe do modelo, colunas).
+
+    Colunas numéricas são views somente leitura sobre ``payload``.
+
+    Raises:
+        ValueError: Se o payload não estiver no formato B2SB
+    """
+    from . import MODEL_REGISTRY
+
+    view = memoryview(payload).cast("B")
+    magic, version, header_length = _PREAMBLE.unpack_from(view)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError("Payload não está no formato binário B2SB suportado")
+
+    header_start = _PREAMBLE.size
+    header = json.loads(bytes(view[header_start:header_start + header_length]))
+    body_start = header_start + header_length
+    body = view[body_start + (-body_start % _ALIGNMENT):]
+
+    model = MODEL_REGISTRY[header["model"]]
+    n_rows = header["rows"]
+    columns = {}
+
+    for entry in header["columns"]:
+        encoding = entry["encoding"]
+        if encoding == "raw":
+            columns[entry["name"]] = np.frombuffer(
+                _read_buffer(body, entry["data"]), dtype=np.dtype(entry["dtype"])
+            )
+            continue
+
+        offsets = np.frombuffer(_read_buffer(body, entry["offsets"]), dtype=np.int64)
+        strings = decode_strings(offsets, _read_buffer(body, entry["blob"]), entry["ascii"])
+
+        if encoding == "dictionary":
+            codes = np.frombuffer(_read_buffer(body, entry["codes"]), dtype=np.dtype(entry["code_dtype"]))
+            categories = _object_array(strings + [None])
+            # código -1 aponta para o None acrescentado ao final
+            values = categories[codes]
+        else:
+            values = _object_array(strings)
+            if "nulls" in entry:
+                packed = np.frombuffer(_read_buffer(body, entry["nulls"]), dtype=np.uint8)
+                values[np.unpackbits(packed, count=n_rows).astype(bool)] = None
+
+        if entry["kind"] in (LIST, JSON):
+            values = _object_array([None if value is None else json.loads(value) for value in values])
+        columns[entry["name"]] = values
+
+    return model, columns
+
+
+def encode_batch(records: Iterable[Any], model: Optional[type] = None) -> bytes:
+    """
+    Codifica uma lista de modelos no formato binário B2SB.
+    """
+    records = records if isinstance(records, list) else list(records)
+    model = model or type(records[0])
+    return encode_columns(model, to_columns(records, model))
+
+
+def decode_batch(payload) -> List[Any]:
+    """
+    Decodifica um payload B2SB de volta em instâncias do modelo.
+    """
+    model, columns = decode_columns(payload)
+    return from_columns(model, columns)
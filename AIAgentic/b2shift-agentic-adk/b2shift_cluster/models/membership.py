@@ -0,0 +1,341 @@
+"""
+Armazenamento compacto de pertença a clusters para o B2Shift.
+
+Em vez de listas de strings duplicadas em cada ``ClusterResult``, relatório e
+estado de sessão, os clientes são codificados uma única vez em um
+``CustomerIdIndex`` compartilhado (posição -> customer_id). Cada cluster ou
+audiência guarda apenas as posições, como array ordenado de int32 (conjuntos
+esparsos) ou bitmap compactado (conjuntos densos), com união/interseção/
+diferença vetorizadas. Os IDs em texto só são decodificados quando alguém
+realmente precisa deles.
+"""
+
+from collections.abc import Sequence
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+INDEX_DTYPE = np.int32
+
+# Um membro custa 32 bits como índice e o universo custa 1 bit por cliente
+# como bitmap: acima de 1/32 de densidade o bitmap é menor
+_BITMAP_DENSITY = 1 / 32
+_DECODE_CHUNK = 65_536
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.int64)
+
+
+def popcount(bits: np.ndarray) -> int:
+    """Número de bits 1 em um array ``uint8`` (ex.: saída de ``np.packbits``)."""
+    return int(_POPCOUNT[bits].sum())
+
+
+class CustomerIdIndex:
+    """
+    Dicionário compartilhado de customer_ids (posição <-> ID).
+
+    O mapa reverso ID -> posição é construído apenas na primeira codificação.
+    """
+
+    __slots__ = ("_ids", "_positions", "_loader", "_size")
+
+    def __init__(self, customer_ids: Iterable[str] = ()):
+        ids = customer_ids if isinstance(customer_ids, np.ndarray) else list(customer_ids)
+        self._ids: Optional[np.ndarray] = np.asarray(ids, dtype=object)
+        self._positions: Optional[Dict[str, int]] = None
+        self._loader: Optional[Callable[[], Iterable[str]]] = None
+        self._size = len(self._ids)
+
+    @classmethod
+    def deferred(cls, size: int, loader: Callable[[], Iterable[str]]) -> "CustomerIdIndex":
+        """
+        Índice de ``size`` IDs que só chama ``loader`` no primeiro acesso aos
+        IDs; tamanho e operações de pertença não decodificam nada.
+        """
+        index = cls()
+        index._ids, index._loader, index._size = None, loader, size
+        return index
+
+    def _values(self) -> np.ndarray:
+        if self._ids is None:
+            ids = np.asarray(self._loader(), dtype=object)
+            if len(ids) != self._size:
+                raise ValueError(f"Índice com {len(ids)} IDs, esperados {self._size}")
+            self._ids, self._loader = ids, None
+        return self._ids
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __reduce__(self):
+        return (CustomerIdIndex, (self._values(),))
+
+    def __contains__(self, customer_id: str) -> bool:
+        return customer_id in self.positions
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Array (somente leitura) de IDs na ordem das posições."""
+        view = self._values().view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def positions(self) -> Dict[str, int]:
+        if self._positions is None:
+            ids = self._values()
+            positions = dict(zip(ids.tolist(), range(len(ids))))
+            if len(positions) != len(ids):
+                raise ValueError("CustomerIdIndex contém customer_ids duplicados")
+            self._positions = positions
+        return self._positions
+
+    def encode(self, customer_ids: Iterable[str], add_missing: bool = False) -> np.ndarray:
+        """
+        Converte customer_ids em posições do índice.
+
+        Args:
+            customer_ids: IDs a codificar
+            add_missing: Acrescenta ao índice IDs ainda desconhecidos
+
+        Returns:
+            Array int32 de posições, na ordem de entrada
+
+        Raises:
+            KeyError: Se um ID não existir e ``add_missing`` for False
+        """
+        positions = self.positions
+        customer_ids = list(customer_ids)
+
+        if add_missing:
+            new_ids = [cid for cid in dict.fromkeys(customer_ids) if cid not in positions]
+            if new_ids:
+                start = self._size
+                positions.update(zip(new_ids, range(start, start + len(new_ids))))
+                self._ids = np.concatenate([self._ids, np.asarray(new_ids, dtype=object)])
+                self._size = len(self._ids)
+
+        try:
+            return np.fromiter(
+                (positions[cid] for cid in customer_ids), dtype=INDEX_DTYPE, count=len(customer_ids)
+            )
+        except KeyError as e:
+            raise KeyError(f"customer_id não encontrado no índice: {e.args[0]}") from None
+
+    def decode(self, indices: Union[np.ndarray, Iterable[int]]) -> List[str]:
+        """Converte posições de volta em customer_ids."""
+        return self._values()[np.asarray(indices, dtype=np.intp)].tolist()
+
+    def copy(self) -> "CustomerIdIndex":
+        """Cópia independente: IDs acrescentados à cópia não alteram este índice."""
+        clone = CustomerIdIndex(self._values())
+        if self._positions is not None:
+            clone._positions = dict(self._positions)
+        return clone
+
+    def membership(self, customer_ids: Iterable[str]) -> "ClusterMembership":
+        """Cria a pertença de um conjunto de customer_ids."""
+        return ClusterMembership(self, self.encode(customer_ids))
+
+    def memberships_from_labels(self, labels: np.ndarray) -> Dict[int, "ClusterMembership"]:
+        """
+        Agrupa um vetor de labels (alinhado às posições do índice) por cluster.
+
+        Usa uma única ordenação estável em vez de um filtro por cluster.
+
+        Args:
+            labels: Label de cluster por cliente, ``len(labels) == len(index)``
+
+        Returns:
+            Dicionário cluster_id -> ClusterMembership
+        """
+        labels = np.asarray(labels)
+        if len(labels) != self._size:
+            raise ValueError(f"labels tem {len(labels)} posições, índice tem {self._size}")
+
+        order = np.argsort(labels, kind="stable").astype(INDEX_DTYPE)
+        cluster_ids, starts = np.unique(labels[order], return_index=True)
+        bounds = np.append(starts, len(order))
+
+        return {
+            int(cluster_id): ClusterMembership(self, order[start:end], assume_sorted=True).compact()
+            for cluster_id, start, end in zip(cluster_ids.tolist(), bounds[:-1], bounds[1:])
+        }
+
+
+class ClusterMembership(Sequence):
+    """
+    Conjunto de clientes de um cluster/audiência, relativo a um CustomerIdIndex.
+
+    Comporta-se como uma sequência (ordenada pela posição no índice) de
+    customer_ids, decodificados sob demanda. Operadores ``|``, ``&``, ``-`` e
+    ``^`` fazem união, interseção, diferença e diferença simétrica sem
+    materializar strings.
+    """
+
+    __slots__ = ("index", "_indices", "_bitmap", "_size")
+
+    def __init__(
+        self,
+        index: CustomerIdIndex,
+        indices: Optional[np.ndarray] = None,
+        bitmap: Optional[np.ndarray] = None,
+        assume_sorted: bool = False,
+    ):
+        if (indices is None) == (bitmap is None):
+            raise ValueError("Informe exatamente um de indices ou bitmap")
+
+        self.index = index
+        self._bitmap = None if bitmap is None else np.asarray(bitmap, dtype=np.uint8)
+        self._indices = None
+        self._size: Optional[int] = None
+
+        if indices is not None:
+            indices = np.asarray(indices, dtype=INDEX_DTYPE)
+            self._indices = indices if assume_sorted else np.unique(indices)
+            self._size = len(self._indices)
+
+    @classmethod
+    def from_ids(cls, index: CustomerIdIndex, customer_ids: Iterable[str]) -> "ClusterMembership":
+        return index.membership(customer_ids)
+
+    # ------------------------------------------------------------------
+    # Representações
+    # ------------------------------------------------------------------
+
+    @property
+    def indices(self) -> np.ndarray:
+        """Posições ordenadas (int32) dos membros."""
+        if self._indices is None:
+            # Bits de preenchimento são zero; o índice pode ter crescido depois
+            mask = np.unpackbits(self._bitmap).view(bool)
+            self._indices = np.flatnonzero(mask).astype(INDEX_DTYPE)
+        return self._indices
+
+    @property
+    def bitmap(self) -> np.ndarray:
+        """Bitmap compactado (``np.packbits``) sobre o universo do índice."""
+        if self._bitmap is None:
+            mask = np.zeros(len(self.index), dtype=bool)
+            mask[self._indices] = True
+            return np.packbits(mask)
+        return self._bitmap
+
+    @property
+    def is_bitmap(self) -> bool:
+        return self._bitmap is not None
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pela representação atual."""
+        return self._bitmap.nbytes if self._bitmap is not None else self._indices.nbytes
+
+    def compact(self) -> "ClusterMembership":
+        """
+        Mantém só a representação menor para a densidade do conjunto.
+        """
+        dense = len(self) > _BITMAP_DENSITY * max(len(self.index), 1)
+        if dense:
+            bitmap = self.bitmap
+            self._indices, self._bitmap = None, bitmap
+        else:
+            indices = self.indices
+            self._indices, self._bitmap = indices, None
+        return self
+
+    # ------------------------------------------------------------------
+    # Sequence[str]
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        if self._size is None:
+            self._size = popcount(self._bitmap)
+        return self._size
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self.index.decode(self.indices[item])
+        return self.index.ids[self.indices[item]]
+
+    def __iter__(self) -> Iterator[str]:
+        indices = self.indices
+        for start in range(0, len(indices), _DECODE_CHUNK):
+            yield from self.index.decode(indices[start:start + _DECODE_CHUNK])
+
+    def __contains__(self, customer_id) -> bool:
+        position = self.index.positions.get(customer_id)
+        if position is None:
+            return False
+        if self._bitmap is not None:
+            byte = position >> 3
+            return byte < len(self._bitmap) and bool(self._bitmap[byte] & (0x80 >> (position & 7)))
+        slot = np.searchsorted(self._indices, position)
+        return slot < len(self._indices) and self._indices[slot] == position
+
+    def to_ids(self) -> List[str]:
+        """Decodifica todos os membros em customer_ids."""
+        return self.index.decode(self.indices)
+
+    def __repr__(self) -> str:
+        kind = "bitmap" if self.is_bitmap else "indices"
+        return f"ClusterMembership(size={len(self)}, {kind}, nbytes={self.nbytes})"
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ClusterMembership):
+            if other.index is self.index:
+                return len(self) == len(other) and np.array_equal(self.indices, other.indices)
+            return self.to_ids() == other.to_ids()
+        if isinstance(other, list):
+            return self.to_ids() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # Serializa só a representação atual; o índice é compartilhado pelo pickle
+        return (
+            ClusterMembership,
+            (self.index, None if self.is_bitmap else self._indices, self._bitmap, True),
+        )
+
+    # ------------------------------------------------------------------
+    # Operações de conjunto
+    # ------------------------------------------------------------------
+
+    def _check_compatible(self, other: "ClusterMembership"):
+        if not isinstance(other, ClusterMembership):
+            raise TypeError(f"Operação requer ClusterMembership, recebido {type(other).__name__}")
+        if other.index is not self.index:
+            raise ValueError("Memberships de CustomerIdIndex diferentes não podem ser combinadas")
+
+    def _combine(self, other: "ClusterMembership", bitmap_op, index_op) -> "ClusterMembership":
+        self._check_compatible(other)
+        if self.is_bitmap and other.is_bitmap and len(self._bitmap) == len(other._bitmap):
+            return ClusterMembership(self.index, bitmap=bitmap_op(self._bitmap, other._bitmap)).compact()
+        return ClusterMembership(
+            self.index, index_op(self.indices, other.indices), assume_sorted=True
+        ).compact()
+
+    def union(self, other: "ClusterMembership") -> "ClusterMembership":
+        return self._combine(other, np.bitwise_or, np.union1d)
+
+    def intersection(self, other: "ClusterMembership") -> "ClusterMembership":
+        return self._combine(
+            other, np.bitwise_and, lambda a, b: np.intersect1d(a, b, assume_unique=True)
+        )
+
+    def difference(self, other: "ClusterMembership") -> "ClusterMembership":
+        return self._combine(
+            other,
+            lambda a, b: np.bitwise_and(a, np.invert(b)),
+            lambda a, b: np.setdiff1d(a, b, assume_unique=True),
+        )
+
+    def symmetric_difference(self, other: "ClusterMembership") -> "ClusterMembership":
+        return self._combine(
+            other, np.bitwise_xor, lambda a, b: np.setxor1d(a, b, assume_unique=True)
+        )
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+    __xor__ = symmetric_difference
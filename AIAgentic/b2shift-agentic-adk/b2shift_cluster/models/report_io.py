@@ -0,0 +1,339 @@
+"""
+Persistência em streaming do B2ShiftAnalysisReport.
+
+O relatório é gravado em um único arquivo com seções independentes, escritas
+à medida que chegam, e um manifesto pequeno no final::
+
+    b"B2SR" | versão (u8) | 3 bytes reservados
+    seção "summary"       JSON com os campos escalares do relatório
+    seção "members/<id>"  posições int32 ou bitmap de cada cluster
+    seção "clusters"      ClusterResult sem customer_ids, em B2SB (colunar)
+    seção "strategies"    BusinessStrategy em B2SB
+    seção "index/<n>"     blocos do CustomerIdIndex (offsets + blob UTF-8)
+    manifesto JSON        posição e tamanho de cada seção
+    rodapé                offset (u64) e tamanho (u64) do manifesto + b"B2SR"
+
+O leitor lê só o rodapé e o manifesto ao abrir; resumo, metadados de
+clusters, pertenças e índice são carregados individualmente. As pertenças
+são abertas via ``numpy.memmap``, sem copiar o arquivo para memória.
+"""
+
+import dataclasses
+import json
+import os
+import struct
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from . import B2ShiftAnalysisReport, BusinessStrategy, ClusterResult, ClusteringConfiguration
+from .columnar import (
+    decode_batch, decode_columns, decode_strings, encode_columns, encode_strings,
+    from_columns, to_columns,
+)
+from .membership import INDEX_DTYPE, ClusterMembership, CustomerIdIndex
+
+MAGIC = b"B2SR"
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct("<4sB3x")
+_FOOTER = struct.Struct("<QQ4s")
+_ALIGNMENT = 8
+
+# IDs por bloco do índice: limita o tamanho de cada buffer em memória
+INDEX_CHUNK_SIZE = 1_000_000
+
+_SUMMARY_EXCLUDED = ("clusters_identified", "business_strategies")
+
+
+class ReportWriter:
+    """
+    Escritor incremental de relatórios B2Shift.
+
+    Uso::
+
+        with ReportWriter("analise.b2sr") as writer:
+            writer.write_summary(report)
+            for cluster in clusters:
+                writer.write_cluster(cluster)
+            writer.write_strategies(strategies)
+
+    ``customer_ids`` em texto são codificados em um CustomerIdIndex do
+    escritor. O índice recebido (ou o do primeiro ClusterMembership) é
+    adotado sem cópia; se aparecerem IDs novos, eles são acrescentados a uma
+    cópia, sem alterar posições existentes nem o índice do chamador.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike], index: Optional[CustomerIdIndex] = None):
+        self.path = os.fspath(path)
+        self.index = index
+        self._shared = index  # índice do chamador: nunca é modificado
+        self._file: Optional[BinaryIO] = open(self.path, "wb")
+        self._file.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION))
+        self._sections: Dict[str, Dict[str, Any]] = {}
+        self._clusters: List[ClusterResult] = []
+        self._strategies: List[BusinessStrategy] = []
+
+    def __enter__(self) -> "ReportWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            self._file = None
+
+    def _write_section(self, name: str, payload, **metadata) -> None:
+        if name in self._sections:
+            raise ValueError(f"Seção duplicada no relatório: '{name}'")
+
+        padding = -self._file.tell() % _ALIGNMENT
+        if padding:
+            self._file.write(b"\x00" * padding)
+
+        offset = self._file.tell()
+        payload = memoryview(payload).cast("B")
+        self._file.write(payload)
+        self._sections[name] = {"offset": offset, "length": payload.nbytes, **metadata}
+
+    def write_summary(self, report: Union[B2ShiftAnalysisReport, Dict[str, Any]]) -> None:
+        """
+        Grava os campos escalares do relatório (sem clusters/estratégias).
+        """
+        if isinstance(report, B2ShiftAnalysisReport):
+            summary = {
+                field.name: getattr(report, field.name)
+                for field in dataclasses.fields(report)
+                if field.name not in _SUMMARY_EXCLUDED
+            }
+        else:
+            summary = dict(report)
+
+        if dataclasses.is_dataclass(summary.get("configuration")):
+            summary["configuration"] = dataclasses.asdict(summary["configuration"])
+
+        payload = json.dumps(summary, ensure_ascii=False, default=_json_default).encode("utf-8")
+        self._write_section("summary", payload)
+
+    def write_cluster(self, cluster: ClusterResult) -> None:
+        """
+        Grava a pertença do cluster imediatamente; os metadados (pequenos)
+        são gravados de forma colunar no ``close``.
+        """
+        membership = self._membership_for(cluster.customer_ids)
+        if membership.is_bitmap:
+            self._write_section(f"members/{cluster.cluster_id}", membership.bitmap,
+                                encoding="bitmap", size=len(membership))
+        else:
+            self._write_section(f"members/{cluster.cluster_id}", membership.indices,
+                                encoding="indices", size=len(membership))
+
+        # Só os metadados ficam em memória até o close
+        self._clusters.append(dataclasses.replace(cluster, customer_ids=[]))
+
+    def write_strategies(self, strategies: Sequence[BusinessStrategy]) -> None:
+        self._strategies.extend(strategies)
+
+    def _membership_for(self, customer_ids: Sequence[str]) -> ClusterMembership:
+        if isinstance(customer_ids, ClusterMembership):
+            if self.index is None:
+                self.index = self._shared = customer_ids.index
+            # A cópia estende o índice compartilhado sem mudar posições
+            if customer_ids.index is self.index or customer_ids.index is self._shared:
+                return customer_ids
+            customer_ids = customer_ids.to_ids()
+
+        if self.index is None:
+            self.index = CustomerIdIndex()
+        elif self.index is self._shared:
+            customer_ids = list(customer_ids)
+            positions = self.index.positions
+            if any(customer_id not in positions for customer_id in customer_ids):
+                self.index = self.index.copy()
+        return ClusterMembership(
+            self.index, self.index.encode(customer_ids, add_missing=True)
+        ).compact()
+
+    def close(self) -> None:
+        """
+        Grava metadados de clusters, estratégias, índice e o manifesto.
+        """
+        if self._file is None:
+            return
+
+        if self._clusters:
+            columns = to_columns(self._clusters, ClusterResult)
+            del columns["customer_ids"]
+            self._write_section("clusters", encode_columns(ClusterResult, columns),
+                                rows=len(self._clusters))
+        if self._strategies:
+            self._write_section("strategies", encode_columns(
+                BusinessStrategy, to_columns(self._strategies, BusinessStrategy)
+            ), rows=len(self._strategies))
+
+        index_ids = self.index.ids if self.index is not None else np.empty(0, dtype=object)
+        for chunk, start in enumerate(range(0, len(index_ids), INDEX_CHUNK_SIZE)):
+            offsets, blob, is_ascii = encode_strings(index_ids[start:start + INDEX_CHUNK_SIZE].tolist())
+            self._write_section(f"index/{chunk}/offsets", offsets)
+            self._write_section(f"index/{chunk}/blob", blob, ascii=is_ascii)
+
+        manifest = json.dumps({
+            "version": FORMAT_VERSION,
+            "written_at": datetime.now().isoformat(),
+            "index_size": len(index_ids),
+            "index_chunks": -(-len(index_ids) // INDEX_CHUNK_SIZE),
+            "cluster_ids": [cluster.cluster_id for cluster in self._clusters],
+            "sections": self._sections,
+        }, separators=(",", ":")).encode("utf-8")
+
+        manifest_offset = self._file.tell()
+        self._file.write(manifest)
+        self._file.write(_FOOTER.pack(manifest_offset, len(manifest), MAGIC))
+        self._file.close()
+        self._file = None
+
+
+class ReportReader:
+    """
+    Leitor seletivo de relatórios gravados por ``ReportWriter``.
+
+    Abrir o leitor lê apenas o manifesto; cada método carrega só a seção
+    necessária.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = os.fspath(path)
+        self._index: Optional[CustomerIdIndex] = None
+        self._clusters: Optional[Dict[int, ClusterResult]] = None
+
+        with open(self.path, "rb") as f:
+            magic, version = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{self.path} não é um relatório B2SR suportado")
+
+            f.seek(-_FOOTER.size, os.SEEK_END)
+            manifest_offset, manifest_length, footer_magic = _FOOTER.unpack(f.read(_FOOTER.size))
+            if footer_magic != MAGIC:
+                raise ValueError(f"{self.path} está incompleto (rodapé ausente)")
+
+            f.seek(manifest_offset)
+            self.manifest = json.loads(f.read(manifest_length))
+
+    @property
+    def cluster_ids(self) -> List[int]:
+        return list(self.manifest["cluster_ids"])
+
+    def _read_section(self, name: str) -> bytes:
+        section = self.manifest["sections"][name]
+        with open(self.path, "rb") as f:
+            f.seek(section["offset"])
+            return f.read(section["length"])
+
+    def _map_section(self, name: str, dtype) -> np.ndarray:
+        section = self.manifest["sections"][name]
+        dtype = np.dtype(dtype)
+        if section["length"] == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=section["offset"],
+                         shape=(section["length"] // dtype.itemsize,))
+
+    def summary(self) -> Dict[str, Any]:
+        """Campos escalares do relatório, sem clusters nem estratégias."""
+        return json.loads(self._read_section("summary"))
+
+    @property
+    def customer_index(self) -> CustomerIdIndex:
+        """
+        CustomerIdIndex do relatório. Os IDs só são decodificados quando
+        alguém os pede (``ids``, ``to_ids``, ``in``...), não ao abrir pertenças.
+        """
+        if self._index is None:
+            self._index = CustomerIdIndex.deferred(self.manifest["index_size"], self._decode_index)
+        return self._index
+
+    def _decode_index(self) -> List[str]:
+        ids: List[str] = []
+        for chunk in range(self.manifest["index_chunks"]):
+            blob_section = self.manifest["sections"][f"index/{chunk}/blob"]
+            offsets = self._map_section(f"index/{chunk}/offsets", np.int64)
+            ids.extend(decode_strings(offsets, self._read_section(f"index/{chunk}/blob"),
+                                      blob_section["ascii"]))
+        return ids
+
+    def load_membership(self, cluster_id: int) -> ClusterMembership:
+        """Pertença de um cluster, mapeada do arquivo sem decodificar IDs."""
+        name = f"members/{cluster_id}"
+        if name not in self.manifest["sections"]:
+            raise KeyError(f"Cluster {cluster_id} não existe no relatório")
+
+        if self.manifest["sections"][name]["encoding"] == "bitmap":
+            return ClusterMembership(self.customer_index, bitmap=self._map_section(name, np.uint8))
+        return ClusterMembership(self.customer_index, self._map_section(name, INDEX_DTYPE),
+                                 assume_sorted=True)
+
+    def _cluster_metadata(self) -> Dict[int, ClusterResult]:
+        if self._clusters is None:
+            self._clusters = {}
+            if "clusters" in self.manifest["sections"]:
+                _, columns = decode_columns(self._read_section("clusters"))
+                rows = self.manifest["sections"]["clusters"]["rows"]
+                columns["customer_ids"] = [[] for _ in range(rows)]
+                for cluster in from_columns(ClusterResult, columns):
+                    self._clusters[cluster.cluster_id] = cluster
+        return self._clusters
+
+    def load_cluster(self, cluster_id: int) -> ClusterResult:
+        """
+        Carrega um único cluster; ``customer_ids`` é um ClusterMembership.
+        """
+        cluster = self._cluster_metadata().get(cluster_id)
+        if cluster is None:
+            raise KeyError(f"Cluster {cluster_id} não existe no relatório")
+        return dataclasses.replace(cluster, customer_ids=self.load_membership(cluster_id))
+
+    def load_clusters(self) -> List[ClusterResult]:
+        return [self.load_cluster(cluster_id) for cluster_id in self.cluster_ids]
+
+    def load_strategies(self) -> List[BusinessStrategy]:
+        if "strategies" not in self.manifest["sections"]:
+            return []
+        return decode_batch(self._read_section("strategies"))
+
+    def load(self) -> B2ShiftAnalysisReport:
+        """Reconstrói o relatório completo."""
+        summary = self.summary()
+        summary["analysis_date"] = datetime.fromisoformat(summary["analysis_date"])
+        summary["configuration"] = ClusteringConfiguration(**summary["configuration"])
+        return B2ShiftAnalysisReport(
+            clusters_identified=self.load_clusters(),
+            business_strategies=self.load_strategies(),
+            **summary,
+        )
+
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Tipo não serializável no resumo do relatório: {type(value).__name__}")
+
+
+def write_report(report: B2ShiftAnalysisReport, path: Union[str, os.PathLike],
+                 index: Optional[CustomerIdIndex] = None) -> None:
+    """
+    Grava um relatório completo, um cluster por vez.
+    """
+    with ReportWriter(path, index=index) as writer:
+        writer.write_summary(report)
+        for cluster in report.clusters_identified:
+            writer.write_cluster(cluster)
+        writer.write_strategies(report.business_strategies)
+
+
+def read_report(path: Union[str, os.PathLike]) -> B2ShiftAnalysisReport:
+    """
+    Lê um relatório completo; pertenças são carregadas sob demanda (memmap).
+    """
+    return ReportReader(path).load()
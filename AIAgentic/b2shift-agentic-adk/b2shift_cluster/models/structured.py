@@ -0,0 +1,178 @@
+"""
+Saídas estruturadas dos sub-agentes.
+
+O Cluster Agent e o Decision Agent respondem em JSON validado contra os
+modelos deste módulo, que são convertidos nos dataclasses ``ClusterResult``
+e ``BusinessStrategy``. O agente principal recebe apenas o resumo compacto
+(``compact``) de cada saída; os registros ficam no estado da sessão
+(``cluster_results``/``business_strategies``) como lotes B2SB em base64
+(``encode_records``/``decode_records``).
+
+- ``StrategyPlan`` é o ``output_schema`` do Decision Agent: a resposta do
+  modelo é restrita ao schema (JSON mode do Gemini).
+- ``ClusterAnalysis`` não pode ser imposto como schema de resposta porque o
+  Cluster Agent executa código (o JSON mode impediria os blocos de código);
+  o agente termina com um bloco ```json``` que é extraído e validado aqui.
+
+O schema enviado ao Gemini não aceita dicionários livres, por isso
+``typical_profile`` trafega como lista de pares atributo/valor.
+"""
+
+import base64
+import json
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from pydantic import BaseModel, Field
+
+from . import BusinessStrategy, ClusterResult
+
+_JSON_FENCE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+
+
+def extract_json(text: str) -> Dict[str, Any]:
+    """
+    Objeto JSON de uma resposta do modelo: o último bloco ```json```, o
+    texto inteiro ou o trecho entre a primeira ``{`` e a última ``}``.
+
+    Raises:
+        ValueError: Se nenhum objeto JSON válido for encontrado
+    """
+    candidates = _JSON_FENCE.findall(text)[::-1]
+    candidates.append(text.strip())
+    start, end = text.find("{"), text.rfind("}")
+    if 0 <= start < end:
+        candidates.append(text[start:end + 1])
+
+    for candidate in candidates:
+        try:
+            value = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(value, dict):
+            return value
+    raise ValueError("Resposta sem objeto JSON")
+
+
+def encode_records(model: type, records: Sequence[Any]) -> str:
+    """
+    Lote de registros (``ClusterResult``, ``BusinessStrategy``) como texto
+    para o estado da sessão: payload B2SB de ``encode_batch`` em base64,
+    pois o estado só guarda valores JSON.
+    """
+    return base64.b64encode(model.encode_batch(records)).decode("ascii")
+
+
+def decode_records(model: type, value: str) -> List[Any]:
+    """Registros gravados por ``encode_records``."""
+    return model.decode_batch(base64.b64decode(value))
+
+
+class ProfileTrait(BaseModel):
+    """Atributo do perfil típico de um cluster."""
+    feature: str
+    value: str
+
+
+class ClusterOutput(BaseModel):
+    """``ClusterResult`` como emitido pelo Cluster Agent (sem ``customer_ids``)."""
+    cluster_id: int
+    cluster_name: str
+    cluster_description: str
+    size: int = Field(ge=0)
+    percentage_of_total: float = Field(ge=0, le=100)
+    typical_profile: List[ProfileTrait] = []
+    key_characteristics: List[str] = []
+    avg_revenue: float
+    avg_ltv: float
+    avg_churn_risk: float = Field(ge=0, le=1)
+    retention_rate: float = Field(ge=0, le=1)
+    intra_cluster_distance: float = Field(ge=0)
+    silhouette_score: float = Field(ge=-1, le=1)
+
+    def to_result(self) -> ClusterResult:
+        fields = self.model_dump(exclude={"typical_profile"})
+        profile = {trait.feature: trait.value for trait in self.typical_profile}
+        return ClusterResult(typical_profile=profile, customer_ids=[], **fields)
+
+
+class ClusterAnalysis(BaseModel):
+    """Saída do Cluster Agent."""
+    algorithm: str
+    n_clusters: int = Field(ge=1)
+    silhouette_score: float = Field(ge=-1, le=1)
+    calinski_harabasz: Optional[float] = None
+    davies_bouldin: Optional[float] = None
+    clusters: List[ClusterOutput]
+    notes: List[str] = []
+
+    @classmethod
+    def parse(cls, output: Any) -> "ClusterAnalysis":
+        """
+        Valida a saída do agente (texto com JSON ou dict já decodificado).
+
+        Raises:
+            ValueError: JSON ausente ou fora do schema (inclui
+                ``pydantic.ValidationError``)
+        """
+        data = output if isinstance(output, dict) else extract_json(str(output))
+        return cls.model_validate(data)
+
+    def results(self) -> List[ClusterResult]:
+        return [cluster.to_result() for cluster in self.clusters]
+
+    def compact(self) -> Dict[str, Any]:
+        """Resumo para o agente principal: métricas globais e uma linha por cluster."""
+        return {
+            "algorithm": self.algorithm,
+            "n_clusters": self.n_clusters,
+            "silhouette_score": round(self.silhouette_score, 3),
+            "clusters": [
+                {
+                    "id": c.cluster_id,
+                    "name": c.cluster_name,
+                    "size": c.size,
+                    "pct": round(c.percentage_of_total, 1),
+                    "avg_ltv": round(c.avg_ltv, 2),
+                    "churn_risk": round(c.avg_churn_risk, 3),
+                    "retention": round(c.retention_rate, 3),
+                    "traits": c.key_characteristics[:3],
+                }
+                for c in self.clusters
+            ],
+        }
+
+
+class StrategyPlan(BaseModel):
+    """Saída do Decision Agent (``output_schema``)."""
+    strategies: List[BusinessStrategy]
+    priorities: List[str] = []
+    summary: str = ""
+
+    @classmethod
+    def parse(cls, output: Any) -> "StrategyPlan":
+        """Como ``ClusterAnalysis.parse``."""
+        data = output if isinstance(output, dict) else extract_json(str(output))
+        return cls.model_validate(data)
+
+    def compact(self) -> Dict[str, Any]:
+        """Resumo para o agente principal: uma linha por estratégia."""
+        return {
+            "summary": self.summary,
+            "priorities": self.priorities,
+            "strategies": [
+                {
+                    "cluster_id": s.cluster_id,
+                    "cluster_name": s.cluster_name,
+                    "approach": s.target_approach,
+                    "products": s.recommended_products[:3],
+                    "revenue_increase": s.expected_revenue_increase,
+                    "retention_improvement": s.expected_retention_improvement,
+                    "cost": s.implementation_cost,
+                    "roi": s.projected_roi,
+                    "quick_wins": s.quick_wins[:2],
+                    "kpis": s.success_kpis[:3],
+                }
+                for s in self.strategies
+            ],
+        }
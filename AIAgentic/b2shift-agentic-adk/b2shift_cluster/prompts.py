@@ -63,6 +63,18 @@ def return_instructions_root() -> str:
     - Análises específicas sem necessidade de sub-agentes
     - Visualizações rápidas de dados
     - Cálculos de métricas pontuais
+    - Consultas ao warehouse com `query_customer_data`: filtros e agregações
+      rodam no banco — peça agregados por segmento em vez de linhas brutas
+    - Para campanhas, a tabela `customer_clusters` traz a confiança da
+      atribuição de cada conta (`cluster_confidence`, `low_confidence`);
+      exclua ou sinalize as contas de baixa confiança antes de recomendar
+    - Em sessões longas, turnos antigos aparecem resumidos e saídas grandes
+      de ferramentas como prévia + handle `ctx:...`; use `recall_context`
+      com o handle só quando precisar do conteúdo completo
+    - `call_cluster_agent` e `call_decision_agent` devolvem resumos
+      estruturados (uma linha por cluster/estratégia); o resultado completo
+      validado está no handle do campo `details`. Se `status` vier
+      `unstructured`, a saída veio em texto livre — trate-a com cautela
 
     ## FORMATO DE RESPOSTA
 
@@ -191,6 +203,19 @@ def return_instructions_cluster_agent() -> str:
     - Calinski-Harabasz Index  
     - Davies-Bouldin Index
     - Inertia/Within-cluster sum of squares
+    
+    FORMATO DA RESPOSTA FINAL:
+    Termine SEMPRE com um único bloco ```json``` contendo apenas o objeto:
+    - algorithm (texto), n_clusters (inteiro), silhouette_score (-1 a 1),
+      calinski_harabasz e davies_bouldin (números, opcionais)
+    - clusters: lista com, para cada cluster, cluster_id, cluster_name,
+      cluster_description, size, percentage_of_total (0 a 100),
+      typical_profile (lista de pares feature/value em texto),
+      key_characteristics (lista de textos), avg_revenue, avg_ltv,
+      avg_churn_risk (0 a 1), retention_rate (0 a 1),
+      intra_cluster_distance e silhouette_score do cluster
+    - notes: lista curta de observações (limitações, outliers)
+    Não repita os resultados em texto fora do bloco; não liste IDs de clientes.
     """
 
 
@@ -219,4 +244,9 @@ def return_instructions_decision_agent() -> str:
     - Pricing e packaging
     - Canais de comunicação
     - Programas de retenção
+    
+    FORMATO DA RESPOSTA:
+    A resposta segue o schema estruturado: uma entrada em "strategies" por
+    cluster (valores de ROI, receita e custo como números), "priorities"
+    com os clusters em ordem de prioridade e um "summary" de até 3 frases.
     """
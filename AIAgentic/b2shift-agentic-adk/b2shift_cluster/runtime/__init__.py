@@ -0,0 +1,56 @@
+# Execução e operação do B2Shift Customer Clustering Agent
+
+# Medição das chamadas aos sub-agentes, geração de carga, limitação
+# adaptativa e em cascata das chamadas de modelo, coalescência de pedidos
+# em voo, cache semântico de respostas e janela de contexto limitada do
+# agente principal. Os nomes públicos são resolvidos sob demanda (PEP 562),
+# como em ``b2shift_cluster.analytics``; ``.models`` importa o google-adk.
+
+import importlib
+
+_LAZY_ATTRIBUTES = {
+    "CallRecorder": ".telemetry",
+    "CallStats": ".telemetry",
+    "get_recorder": ".telemetry",
+    "record_call": ".telemetry",
+    "Scenario": ".loadtest",
+    "LoadReport": ".loadtest",
+    "run_load_test": ".loadtest",
+    "AdaptiveLimiter": ".limiter",
+    "RetryPolicy": ".limiter",
+    "get_limiter": ".limiter",
+    "limited_stream": ".limiter",
+    "run_limited": ".limiter",
+    "SingleFlight": ".singleflight",
+    "coalesce": ".singleflight",
+    "get_single_flight": ".singleflight",
+    "CascadeConfig": ".cascade",
+    "CascadeStats": ".cascade",
+    "get_cascade_stats": ".cascade",
+    "SemanticCache": ".semantic_cache",
+    "HashedNgramVectorizer": ".semantic_cache",
+    "get_semantic_cache": ".semantic_cache",
+    "ContextStore": ".context",
+    "ContextWindow": ".context",
+    "get_context_window": ".context",
+    "LimitedGemini": ".models",
+    "CascadeModel": ".models",
+    "routed_model": ".models",
+    "limited_model": ".models",
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
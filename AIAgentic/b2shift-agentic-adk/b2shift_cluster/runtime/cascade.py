@@ -0,0 +1,198 @@
+"""
+Cascata de modelos dos sub-agentes: modelo rápido primeiro, modelo maior
+só quando necessário.
+
+Cada chamada de modelo de um sub-agente passa pela cascata:
+
+1. Se a heurística de complexidade da requisição passa do limiar, vai
+   direto ao modelo forte (``direct``).
+2. Senão, o modelo rápido responde e um validador barato confere a
+   resposta: vazia, truncada (``MAX_TOKENS``), JSON inválido quando a
+   requisição pede JSON, ou clusters citados na requisição ausentes da
+   resposta. Se rejeitada, a mesma requisição é repetida no modelo forte
+   (``escalated``); se aceita, fica no rápido (``fast``).
+
+Latência por rota e taxa de escalonamento por motivo ficam em
+``CascadeStats`` (``get_cascade_stats``). Este módulo não depende do
+google-adk; o modelo do ADK que o usa é ``runtime.models.CascadeModel``.
+
+Configuração:
+
+- ``B2SHIFT_CASCADE``: 0 desliga (cada agente usa só seu ``*_AGENT_MODEL``)
+- ``B2SHIFT_CASCADE_FAST_MODEL``: modelo tentado primeiro
+- ``B2SHIFT_CASCADE_STRONG_MODEL``: modelo forte dos agentes cujo
+  ``*_AGENT_MODEL`` já é o rápido (para os demais, o forte é o próprio
+  ``*_AGENT_MODEL``)
+- ``B2SHIFT_CASCADE_COMPLEXITY``: limiar da heurística (padrão 1.0)
+"""
+
+import json
+import os
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+# Rótulos de cluster usados nos prompts (ver prompts.return_instructions_root)
+CLUSTER_LABELS = (
+    "enterprise", "mid-market tech", "mid-market", "smb", "startup", "startups",
+    "government", "governo", "setor público",
+)
+
+# Marcadores de pedidos que pedem raciocínio mais longo
+COMPLEX_MARKERS = (
+    "go-to-market", "roadmap", "roi", "realocação", "reallocation", "budget",
+    "otimiz", "trade-off", "projeç", "simulaç", "para cada cluster",
+    "para cada segmento", "todos os clusters", "compar", "cenários",
+)
+
+_LIST_ITEM = re.compile(r"^\s*(?:\d+[.)]|[-•*])\s", re.MULTILINE)
+_QUOTED_CLUSTER = re.compile(r"cluster\s+[\"“']([^\"”']{2,60})[\"”']", re.IGNORECASE)
+
+FAST, ESCALATED, DIRECT = "fast", "escalated", "direct"
+
+
+def complexity_score(text: str) -> float:
+    """
+    Heurística de complexidade de uma requisição (≥ 1.0 ≈ "precisa do
+    modelo forte"): tamanho, número de itens pedidos e marcadores de
+    planejamento/otimização.
+    """
+    lowered = text.casefold()
+    words = len(text.split())
+    items = len(_LIST_ITEM.findall(text))
+    markers = sum(marker in lowered for marker in COMPLEX_MARKERS)
+    return words / 400 + items / 12 + markers / 4
+
+
+def mentioned_clusters(text: str) -> List[str]:
+    """
+    Clusters citados explicitamente na requisição (entre aspas após
+    "cluster", ou rótulos conhecidos).
+    """
+    lowered = text.casefold()
+    names = {match.casefold() for match in _QUOTED_CLUSTER.findall(text)}
+    for label in CLUSTER_LABELS:
+        if re.search(rf"(?<![\w-]){re.escape(label)}(?![\w-])", lowered):
+            names.add(label)
+    # Basta citar "mid-market" quando a requisição diz "mid-market tech"
+    return sorted(n for n in names if not any(n != o and o in n for o in names))
+
+
+def validate_response(request_text: str, response_text: str, truncated: bool = False,
+                      expects_json: bool = False,
+                      has_function_calls: bool = False) -> Optional[str]:
+    """
+    Validador barato da resposta do modelo rápido.
+
+    Returns:
+        Motivo da rejeição ("empty", "truncated", "schema",
+        "missing_clusters") ou None se aceita
+    """
+    if has_function_calls:
+        # Chamada de ferramenta: o conteúdo será validado no próximo turno
+        return "truncated" if truncated else None
+    if truncated:
+        return "truncated"
+    if not response_text.strip():
+        return "empty"
+    if expects_json:
+        try:
+            json.loads(response_text)
+        except ValueError:
+            return "schema"
+    answer = response_text.casefold()
+    if any(name not in answer for name in mentioned_clusters(request_text)):
+        return "missing_clusters"
+    return None
+
+
+@dataclass
+class RouteStats:
+    """
+    Contadores e latências recentes (segundos) de um sub-agente.
+    """
+    calls: Dict[str, int] = field(default_factory=lambda: {FAST: 0, ESCALATED: 0, DIRECT: 0})
+    reasons: Dict[str, int] = field(default_factory=dict)
+    latencies: Dict[str, Deque[float]] = field(
+        default_factory=lambda: {r: deque(maxlen=10_000) for r in (FAST, ESCALATED, DIRECT)}
+    )
+
+    @property
+    def escalation_rate(self) -> float:
+        """Fração das tentativas no modelo rápido que precisaram escalar."""
+        attempted = self.calls[FAST] + self.calls[ESCALATED]
+        return self.calls[ESCALATED] / attempted if attempted else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        from .telemetry import CallStats
+
+        return {
+            "calls": dict(self.calls),
+            "escalation_rate": round(self.escalation_rate, 4),
+            "escalation_reasons": dict(self.reasons),
+            "latency": {
+                route: CallStats(latencies=list(values)).percentiles()
+                for route, values in self.latencies.items() if values
+            },
+        }
+
+
+class CascadeStats:
+    """
+    ``RouteStats`` por sub-agente. Thread-safe.
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, RouteStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, agent: str, route: str, latency: float, reason: Optional[str] = None) -> None:
+        with self._lock:
+            stats = self._routes.setdefault(agent, RouteStats())
+            stats.calls[route] += 1
+            stats.latencies[route].append(latency)
+            if reason:
+                stats.reasons[reason] = stats.reasons.get(reason, 0) + 1
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {agent: stats.summary() for agent, stats in sorted(self._routes.items())}
+
+
+@dataclass(frozen=True)
+class CascadeConfig:
+    fast_model: str
+    strong_model: str
+    complexity_threshold: float = 1.0
+
+    @classmethod
+    def from_env(cls) -> Optional["CascadeConfig"]:
+        """Configuração do ambiente, ou None se a cascata estiver desligada."""
+        if os.getenv("B2SHIFT_CASCADE", "1") == "0":
+            return None
+        return cls(
+            fast_model=os.getenv("B2SHIFT_CASCADE_FAST_MODEL", "gemini-1.5-flash"),
+            strong_model=os.getenv("B2SHIFT_CASCADE_STRONG_MODEL", "gemini-1.5-pro"),
+            complexity_threshold=float(os.getenv("B2SHIFT_CASCADE_COMPLEXITY", 1.0)),
+        )
+
+    def route_upfront(self, request_text: str) -> str:
+        """FAST (tentar o rápido) ou DIRECT (complexo demais)."""
+        if complexity_score(request_text) >= self.complexity_threshold:
+            return DIRECT
+        return FAST
+
+
+_STATS = CascadeStats()
+
+
+def get_cascade_stats() -> CascadeStats:
+    """Estatísticas da cascata compartilhadas pelo processo."""
+    return _STATS
+
+
+def joined_text(parts: Iterable[Any]) -> str:
+    """Texto concatenado de partes ``google.genai.types.Part`` (ou None)."""
+    return "".join(getattr(part, "text", None) or "" for part in parts or ())
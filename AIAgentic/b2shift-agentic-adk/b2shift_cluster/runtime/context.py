@@ -0,0 +1,341 @@
+"""
+Janela de contexto limitada para o agente principal.
+
+Sessões longas de análise fazem o histórico enviado ao modelo crescer a
+cada turno. ``ContextWindow.apply`` reescreve ``llm_request.contents``
+antes de cada chamada (``before_model_callback`` do agente principal):
+
+1. Os turnos recentes (``recent_turns``) seguem na íntegra.
+2. Saídas grandes de ferramentas fora do turno atual viram um trecho
+   inicial + um *handle* (``ctx:<hash>``); o conteúdo completo fica no
+   ``ContextStore`` e pode ser recuperado com a ferramenta
+   ``recall_context``.
+3. Turnos mais antigos são condensados num resumo extrativo (pergunta,
+   ferramentas usadas, início da resposta e handle da resposta completa),
+   sem chamada de modelo. Cada turno é resumido uma vez por sessão; as
+   chamadas seguintes reaproveitam a linha.
+4. Se ainda passar do orçamento, mais turnos entram no resumo e, por
+   fim, as linhas mais antigas do resumo são descartadas.
+
+Os tokens são estimados por caracteres (``CHARS_PER_TOKEN``); a conta só
+precisa ser estável, não exata.
+
+Configuração: ``B2SHIFT_CONTEXT_MAX_TOKENS``, ``B2SHIFT_CONTEXT_RECENT_TURNS``,
+``B2SHIFT_CONTEXT_TOOL_OUTPUT_TOKENS`` e ``B2SHIFT_CONTEXT_STORE_MAX_MB``.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+CHARS_PER_TOKEN = 4
+SUMMARY_HEADER = "[Resumo das interações anteriores desta sessão]"
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa de tokens de um texto (≈ 4 caracteres por token)."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _payload_text(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def part_tokens(part: Any) -> int:
+    """Tokens estimados de um ``types.Part`` (texto, chamada ou resposta de ferramenta)."""
+    if getattr(part, "text", None):
+        return estimate_tokens(part.text)
+    call = getattr(part, "function_call", None)
+    if call is not None:
+        return estimate_tokens(call.name or "") + estimate_tokens(_payload_text(call.args or {}))
+    response = getattr(part, "function_response", None)
+    if response is not None:
+        return estimate_tokens(response.name or "") + estimate_tokens(_payload_text(response.response or {}))
+    return 0
+
+
+def content_tokens(content: Any) -> int:
+    return sum(part_tokens(part) for part in content.parts or ())
+
+
+class ContextStore:
+    """
+    Conteúdos retirados do contexto, endereçados pelo hash (o mesmo
+    conteúdo gera sempre o mesmo handle). LRU limitado em bytes.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, text: str) -> str:
+        handle = "ctx:" + hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+        with self._lock:
+            if handle in self._items:
+                self._items.move_to_end(handle)
+                return handle
+            self._items[handle] = text
+            self._bytes += len(text)
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, dropped = self._items.popitem(last=False)
+                self._bytes -= len(dropped)
+        return handle
+
+    def get(self, handle: str) -> Optional[str]:
+        with self._lock:
+            text = self._items.get(handle.strip())
+            if text is not None:
+                self._items.move_to_end(handle.strip())
+            return text
+
+
+@dataclass
+class WindowStats:
+    tokens: int
+    turns: int
+    summarized_turns: int
+    offloaded_outputs: int
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+def _is_user_turn_start(content: Any) -> bool:
+    # Turno começa numa mensagem do usuário com texto (respostas de
+    # ferramentas também têm role "user")
+    return content.role == "user" and any(getattr(p, "text", None) for p in content.parts or ())
+
+
+def split_turns(contents: Sequence[Any]) -> List[List[Any]]:
+    """Agrupa ``contents`` em turnos iniciados por mensagens do usuário."""
+    turns: List[List[Any]] = []
+    for content in contents:
+        if not turns or _is_user_turn_start(content):
+            turns.append([])
+        turns[-1].append(content)
+    return turns
+
+
+def _question(turn: Sequence[Any]) -> str:
+    return "".join(p.text or "" for p in turn[0].parts or () if getattr(p, "text", None))
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1].rstrip() + "…"
+
+
+class ContextWindow:
+    """
+    Política de contexto do agente principal.
+
+    Args:
+        max_tokens: Orçamento total de ``contents`` por chamada de modelo
+        recent_turns: Turnos mantidos na íntegra (inclui o atual)
+        tool_output_tokens: Saídas de ferramenta acima disto viram handle
+        summary_share: Fração máxima do orçamento ocupada pelo resumo
+        store: ``ContextStore`` dos conteúdos retirados
+        max_summaries: Linhas de resumo guardadas entre chamadas (LRU,
+            todas as sessões)
+    """
+
+    def __init__(self, max_tokens: int = 32_000, recent_turns: int = 6,
+                 tool_output_tokens: int = 1_500, summary_share: float = 0.25,
+                 store: Optional[ContextStore] = None, max_summaries: int = 50_000):
+        self.max_tokens = max_tokens
+        self.recent_turns = max(1, recent_turns)
+        self.tool_output_tokens = tool_output_tokens
+        self.summary_share = summary_share
+        self.store = store or ContextStore()
+        self.max_summaries = max_summaries
+        # (sessão, turno) -> (pergunta, linha); a pergunta confere a entrada
+        self._summaries: "OrderedDict[Tuple[str, int], Tuple[str, str]]" = OrderedDict()
+        self._summaries_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Saídas de ferramentas
+    # ------------------------------------------------------------------
+    def _offload_part(self, part: Any, types) -> Tuple[Any, bool]:
+        response = getattr(part, "function_response", None)
+        if response is None or part_tokens(part) <= self.tool_output_tokens:
+            return part, False
+        text = _payload_text(response.response or {})
+        handle = self.store.put(text)
+        preview = _shorten(text, self.tool_output_tokens * CHARS_PER_TOKEN // 2)
+        compact = types.FunctionResponse(
+            id=response.id,
+            name=response.name,
+            response={
+                "preview": preview,
+                "handle": handle,
+                "omitted_tokens": estimate_tokens(text) - estimate_tokens(preview),
+                "note": f"Saída completa disponível com recall_context('{handle}').",
+            },
+        )
+        return types.Part(function_response=compact), True
+
+    def _offload_turn(self, turn: List[Any], types) -> Tuple[List[Any], int]:
+        result, offloaded = [], 0
+        for content in turn:
+            parts, changed = [], False
+            for part in content.parts or ():
+                new_part, moved = self._offload_part(part, types)
+                parts.append(new_part)
+                changed |= moved
+                offloaded += moved
+            result.append(types.Content(role=content.role, parts=parts) if changed else content)
+        return result, offloaded
+
+    # ------------------------------------------------------------------
+    # Resumo
+    # ------------------------------------------------------------------
+    def summarize_turn(self, number: int, turn: Sequence[Any]) -> str:
+        """Linha extrativa do resumo para um turno antigo."""
+        question = _question(turn)
+        tools = []
+        answer = ""
+        for content in turn[1:]:
+            for part in content.parts or ():
+                call = getattr(part, "function_call", None)
+                if call is not None and call.name not in tools:
+                    tools.append(call.name)
+                if content.role == "model" and getattr(part, "text", None) and not getattr(part, "thought", False):
+                    answer = part.text
+
+        line = f"- Turno {number}: pergunta «{_shorten(question, 240)}»"
+        if tools:
+            line += f"; ferramentas: {', '.join(tools)}"
+        if answer:
+            line += f"; resposta: «{_shorten(answer, 360)}»"
+            if estimate_tokens(answer) > 90:
+                line += f" (completa: {self.store.put(answer)})"
+        return line
+
+    def _cached_summary(self, session: str, index: int, turn: Sequence[Any]) -> str:
+        # Turnos antigos não mudam: a linha é calculada uma vez por sessão
+        key, question = (session, index), _question(turn)
+        with self._summaries_lock:
+            cached = self._summaries.get(key)
+            if cached is not None and cached[0] == question:
+                self._summaries.move_to_end(key)
+                return cached[1]
+        line = self.summarize_turn(index + 1, turn)
+        with self._summaries_lock:
+            self._summaries[key] = (question, line)
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.max_summaries:
+                self._summaries.popitem(last=False)
+        return line
+
+    def _summary_content(self, lines: List[str], omitted: int, types) -> Any:
+        body = [SUMMARY_HEADER]
+        if omitted:
+            body.append(f"({omitted} turnos mais antigos omitidos)")
+        body.extend(lines)
+        body.append("Use recall_context('<handle>') para recuperar um conteúdo completo.")
+        return types.Content(role="user", parts=[types.Part(text="\n".join(body))])
+
+    # ------------------------------------------------------------------
+    # Aplicação
+    # ------------------------------------------------------------------
+    def compact(self, contents: Sequence[Any],
+                session: Optional[str] = None) -> Tuple[List[Any], WindowStats]:
+        """
+        Versão limitada de ``contents`` (lista de ``types.Content``). Os
+        objetos originais não são alterados.
+
+        Só os turnos mantidos na íntegra são medidos e compactados; os
+        antigos viram uma linha de resumo cada. Com ``session``, a linha
+        de cada turno antigo é calculada uma única vez e reaproveitada nas
+        chamadas seguintes da sessão: o texto do histórico antigo não é
+        relido nem re-hasheado, e o que resta proporcional ao histórico é
+        percorrer a lista de mensagens e as linhas já prontas. Sem
+        ``session``, os resumos valem só para esta chamada.
+        """
+        from google.genai import types
+
+        turns = split_turns(contents)
+        if len(turns) <= self.recent_turns:
+            tokens = sum(content_tokens(c) for c in contents)
+            if tokens <= self.max_tokens:
+                return list(contents), WindowStats(tokens, len(turns), 0, 0)
+
+        current = len(turns) - 1
+        prepared: Dict[int, Tuple[List[Any], int, int]] = {}
+
+        def recent_turn(index: int, offload_current: bool = False):
+            # (conteúdos, tokens, saídas retiradas) de um turno mantido
+            if index not in prepared or (offload_current and index == current):
+                turn, moved = turns[index], 0
+                if index != current or offload_current:
+                    turn, moved = self._offload_turn(turn, types)
+                prepared[index] = (turn, sum(content_tokens(c) for c in turn), moved)
+            return prepared[index]
+
+        summary_budget = int(self.max_tokens * self.summary_share)
+        summaries: Dict[int, str] = {}
+
+        def summary(index: int) -> str:
+            if index not in summaries:
+                summaries[index] = (self.summarize_turn(index + 1, turns[index]) if session is None
+                                    else self._cached_summary(session, index, turns[index]))
+            return summaries[index]
+
+        def build(keep: int):
+            first_kept = len(turns) - keep
+            lines = [summary(i) for i in range(first_kept)]
+            omitted, summary_tokens = 0, sum(estimate_tokens(line) for line in lines)
+            while lines and summary_tokens > summary_budget:
+                summary_tokens -= estimate_tokens(lines.pop(0))
+                omitted += 1
+            head = [self._summary_content(lines, omitted, types)] if first_kept else []
+            kept = [recent_turn(i) for i in range(first_kept, len(turns))]
+            result = head + [c for turn, _, _ in kept for c in turn]
+            tokens = sum(content_tokens(c) for c in head) + sum(t for _, t, _ in kept)
+            return result, tokens, sum(m for _, _, m in kept)
+
+        keep = min(self.recent_turns, len(turns))
+        result, tokens, offloaded = build(keep)
+        # Ainda acima do orçamento: mais turnos vão para o resumo
+        while tokens > self.max_tokens and keep > 1:
+            keep -= 1
+            result, tokens, offloaded = build(keep)
+
+        # Último recurso: o próprio turno atual traz saídas enormes
+        if tokens > self.max_tokens:
+            recent_turn(current, offload_current=True)
+            result, tokens, offloaded = build(keep)
+
+        return result, WindowStats(tokens, len(turns), len(turns) - keep, offloaded)
+
+    def apply(self, llm_request: Any, session: Optional[str] = None) -> WindowStats:
+        """Limita ``llm_request.contents`` no lugar (ver ``compact``)."""
+        contents, stats = self.compact(llm_request.contents or [], session)
+        llm_request.contents = contents
+        return stats
+
+
+_WINDOW: Optional[ContextWindow] = None
+_WINDOW_LOCK = threading.Lock()
+
+
+def get_context_window() -> ContextWindow:
+    """Política compartilhada pelo processo, configurada pelo ambiente."""
+    global _WINDOW
+    with _WINDOW_LOCK:
+        if _WINDOW is None:
+            _WINDOW = ContextWindow(
+                max_tokens=int(os.getenv("B2SHIFT_CONTEXT_MAX_TOKENS", 32_000)),
+                recent_turns=int(os.getenv("B2SHIFT_CONTEXT_RECENT_TURNS", 6)),
+                tool_output_tokens=int(os.getenv("B2SHIFT_CONTEXT_TOOL_OUTPUT_TOKENS", 1_500)),
+                store=ContextStore(int(float(os.getenv("B2SHIFT_CONTEXT_STORE_MAX_MB", 256)) * 1024 ** 2)),
+            )
+        return _WINDOW
@@ -0,0 +1,357 @@
+"""
+Limitação adaptativa e retentativas das chamadas de modelo do B2Shift Agent.
+
+Cada modelo (ROOT_AGENT_MODEL, DATA_AGENT_MODEL, ...) tem um
+``AdaptiveLimiter`` compartilhado por todos os agentes do processo
+(``get_limiter``). Ele combina:
+
+- um token bucket com a cota de requisições por segundo do modelo;
+- um limite de concorrência AIMD: cresce +1 a cada "janela" de sucessos e
+  cai multiplicativamente em 429/503 ou quando a latência média passa do
+  alvo, no máximo uma vez por ``cooldown`` (uma rajada de 429 da mesma
+  janela conta como um único sinal);
+- um orçamento de retentativas: cada sucesso libera uma fração de
+  retentativa, e sem saldo o erro é propagado em vez de virar mais carga.
+
+``RetryPolicy`` define o backoff exponencial com jitter completo. As
+chamadas passam por ``limited_stream``/``run_limited``; o modelo do ADK
+que as usa está em ``runtime.models``.
+
+Configuração (padrão para todos os modelos; ``B2SHIFT_MODEL_LIMITS``
+aceita um JSON com sobrescritas por modelo, ex.
+``{"gemini-1.5-pro": {"rps": 2, "max_concurrency": 4}}``):
+
+- ``B2SHIFT_MODEL_RPS``: requisições por segundo (0 desliga o bucket)
+- ``B2SHIFT_MODEL_MAX_CONCURRENCY``: teto do limite de concorrência
+- ``B2SHIFT_MODEL_LATENCY_TARGET``: latência média alvo em segundos (0 desliga)
+- ``B2SHIFT_MODEL_MAX_RETRIES``: retentativas por chamada
+"""
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from .telemetry import record_call
+
+# Códigos tratados como sobrecarga (reduzem a concorrência) e como
+# transitórios (podem ser repetidos)
+OVERLOAD_CODES = frozenset({429, 503})
+RETRYABLE_CODES = frozenset({408, 429, 500, 502, 503, 504})
+_STATUS_NAMES = {
+    "RESOURCE_EXHAUSTED": 429,
+    "UNAVAILABLE": 503,
+    "DEADLINE_EXCEEDED": 504,
+    "INTERNAL": 500,
+}
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """
+    Código HTTP de um erro do google-genai/google-api-core, se houver.
+    """
+    for attribute in ("code", "status_code"):
+        value = getattr(exc, attribute, None)
+        value = getattr(value, "value", value)  # HTTPStatus / grpc.StatusCode
+        if isinstance(value, int) and 100 <= value < 600:
+            return value
+    status = str(getattr(exc, "status", "") or "")
+    if status in _STATUS_NAMES:
+        return _STATUS_NAMES[status]
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError)):
+        return 408
+    return None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Backoff exponencial com jitter completo: a espera antes da tentativa
+    ``n`` é uniforme em ``[0, min(max_delay, base_delay * 2**n)]``.
+    """
+    max_retries: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0.0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        return status_code(exc) in RETRYABLE_CODES
+
+
+class AdaptiveLimiter:
+    """
+    Token bucket + limite de concorrência AIMD para um modelo.
+
+    Thread-safe e independente de event loop: os waiters guardam o próprio
+    loop e são acordados com ``call_soon_threadsafe``, em ordem FIFO.
+
+    Args:
+        name: Nome do modelo (rótulo da telemetria)
+        rps: Requisições por segundo permitidas (0 = sem bucket)
+        burst: Capacidade do bucket (padrão: ``max(1, rps)``)
+        max_concurrency: Teto do limite de concorrência
+        min_concurrency: Piso do limite de concorrência
+        initial_concurrency: Limite inicial (padrão: ``min(4, max_concurrency)``)
+        latency_target: Latência média (EWMA) acima da qual o limite cai
+        decrease_factor: Fator multiplicativo aplicado na redução
+        cooldown: Intervalo mínimo entre duas reduções
+        retry_ratio: Retentativas liberadas por sucesso
+    """
+
+    def __init__(self, name: str, rps: float = 10.0, burst: Optional[float] = None,
+                 max_concurrency: int = 16, min_concurrency: int = 1,
+                 initial_concurrency: Optional[int] = None, latency_target: float = 30.0,
+                 decrease_factor: float = 0.5, cooldown: float = 5.0,
+                 retry_ratio: float = 0.2):
+        if max_concurrency < min_concurrency or min_concurrency < 1:
+            raise ValueError("require 1 <= min_concurrency <= max_concurrency")
+        self.name = name
+        self.rps = float(rps)
+        self.burst = float(burst if burst is not None else max(1.0, self.rps))
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.retry_ratio = retry_ratio
+
+        self._limit = float(initial_concurrency or min(4, max_concurrency))
+        self._limit = min(max(self._limit, min_concurrency), max_concurrency)
+        self._in_flight = 0
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self._latency_ewma: Optional[float] = None
+        self._last_decrease = float("-inf")
+        self._retry_tokens = 10.0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "model": self.name,
+                "limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "queued": len(self._waiters),
+                "latency_ewma": self._latency_ewma,
+                "retry_budget": round(self._retry_tokens, 2),
+            }
+
+    # ------------------------------------------------------------------
+    # Concorrência
+    # ------------------------------------------------------------------
+    async def _acquire_slot(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self._in_flight < int(self._limit):
+                self._in_flight += 1
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove((loop, future))
+                    granted = False
+                except ValueError:
+                    granted = True
+            # Vaga já concedida: se o future ainda não recebeu o resultado,
+            # _grant a devolve ao ver o cancelamento
+            if granted and future.done() and not future.cancelled():
+                self._release_slot()
+            raise
+
+    def _release_slot(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._wake_locked()
+
+    def _wake_locked(self) -> None:
+        while self._waiters and self._in_flight < int(self._limit):
+            loop, future = self._waiters.popleft()
+            self._in_flight += 1
+            loop.call_soon_threadsafe(self._grant, future)
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if future.done():
+            self._release_slot()
+        else:
+            future.set_result(None)
+
+    # ------------------------------------------------------------------
+    # Token bucket
+    # ------------------------------------------------------------------
+    async def _take_token(self) -> None:
+        if self.rps <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rps)
+                self._refilled_at = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rps
+            await asyncio.sleep(wait)
+
+    # ------------------------------------------------------------------
+    # Sinais AIMD
+    # ------------------------------------------------------------------
+    def on_success(self, latency: float) -> None:
+        with self._lock:
+            self._retry_tokens = min(10.0, self._retry_tokens + self.retry_ratio)
+            ewma = latency if self._latency_ewma is None else 0.8 * self._latency_ewma + 0.2 * latency
+            self._latency_ewma = ewma
+            if self.latency_target and ewma > self.latency_target:
+                self._decrease_locked()
+            elif self._limit < self.max_concurrency:
+                # +1 por janela completa de sucessos (aumento aditivo)
+                self._limit = min(self.max_concurrency, self._limit + 1.0 / self._limit)
+                self._wake_locked()
+
+    def on_overload(self) -> None:
+        with self._lock:
+            self._decrease_locked()
+            # Esvazia o bucket: ninguém sai da fila na mesma janela do 429
+            self._tokens = min(self._tokens, 0.0)
+
+    def _decrease_locked(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._limit = max(float(self.min_concurrency), self._limit * self.decrease_factor)
+
+    def try_retry(self) -> bool:
+        """
+        Consome uma retentativa do orçamento; False se esgotado.
+        """
+        with self._lock:
+            if self._retry_tokens < 1.0:
+                return False
+            self._retry_tokens -= 1.0
+            return True
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Reserva uma vaga de concorrência e um token do bucket durante o
+        bloco. Não sinaliza sucesso/erro; isso fica com quem chama.
+        """
+        await self._acquire_slot()
+        try:
+            await self._take_token()
+            yield
+        finally:
+            self._release_slot()
+
+
+_LIMITERS: Dict[str, AdaptiveLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def _limiter_config(model: str) -> Dict[str, Any]:
+    config = {
+        "rps": float(os.getenv("B2SHIFT_MODEL_RPS", 10)),
+        "max_concurrency": int(os.getenv("B2SHIFT_MODEL_MAX_CONCURRENCY", 16)),
+        "latency_target": float(os.getenv("B2SHIFT_MODEL_LATENCY_TARGET", 30)),
+    }
+    overrides = json.loads(os.getenv("B2SHIFT_MODEL_LIMITS") or "{}")
+    config.update(overrides.get(model, {}))
+    return config
+
+
+def get_limiter(model: str) -> AdaptiveLimiter:
+    """
+    Limitador compartilhado do modelo, criado no primeiro uso a partir do
+    ambiente.
+    """
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(model)
+        if limiter is None:
+            limiter = AdaptiveLimiter(model, **_limiter_config(model))
+            _LIMITERS[model] = limiter
+        return limiter
+
+
+def default_retry_policy() -> RetryPolicy:
+    return RetryPolicy(max_retries=int(os.getenv("B2SHIFT_MODEL_MAX_RETRIES", 4)))
+
+
+async def limited_stream(model: str, open_stream: Callable[[], AsyncIterator[Any]],
+                         policy: Optional[RetryPolicy] = None) -> AsyncIterator[Any]:
+    """
+    Consome ``open_stream()`` sob o limitador de ``model``, repetindo com
+    backoff enquanto nenhum item tiver sido entregue.
+
+    Um erro depois do primeiro item é propagado: repetir duplicaria a
+    resposta parcial já consumida.
+    """
+    limiter = get_limiter(model)
+    policy = policy or default_retry_policy()
+    attempt = 0
+    while True:
+        delivered = False
+        try:
+            async with limiter.slot(), record_call(f"model:{model}"):
+                # Latência só do upstream: o tempo em que o consumidor
+                # segura cada item não é sinal de sobrecarga do modelo
+                latency = 0.0
+                stream = open_stream().__aiter__()
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        item = await stream.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    finally:
+                        latency += time.perf_counter() - start
+                    delivered = True
+                    yield item
+            limiter.on_success(latency)
+            return
+        except Exception as exc:
+            if status_code(exc) in OVERLOAD_CODES:
+                limiter.on_overload()
+            if (delivered or attempt >= policy.max_retries or not policy.is_retryable(exc)
+                    or not limiter.try_retry()):
+                raise
+        # Espera fora da vaga, para não segurar concorrência durante o backoff
+        await asyncio.sleep(policy.backoff(attempt))
+        attempt += 1
+
+
+async def run_limited(model: str, call: Callable[[], Awaitable[Any]],
+                      policy: Optional[RetryPolicy] = None) -> Any:
+    """
+    Executa ``await call()`` sob o limitador de ``model``, com retentativas.
+    """
+    async def single():
+        yield await call()
+
+    result = None
+    async for result in limited_stream(model, single, policy):
+        pass
+    return result
@@ -0,0 +1,192 @@
+"""
+Gerador de carga concorrente para o B2Shift Agent.
+
+Simula N analistas reenviando as consultas dos cenários da demo em
+paralelo, com rampa de entrada, e reporta latência (p50/p95/p99), vazão e
+taxa de erro por cenário e por sub-agente. A vazão (req/s) conta só as
+consultas bem-sucedidas; as tentativas por segundo aparecem à parte. As latências dos sub-agentes
+vêm de ``record_call`` nas ferramentas ``call_*_agent`` (componentes
+``agent:<nome>``); as dos cenários, da consulta completa ao agente
+principal (``scenario:<nome>``).
+
+Usado por ``python demo.py --load``; ``send`` é qualquer corrotina que
+receba o índice do usuário simulado e a consulta, o que permite rodar
+contra o agente local (uma sessão por usuário) ou um deployment remoto.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+from .telemetry import CallRecorder, CallStats, record_call
+
+SCENARIO_PREFIX = "scenario:"
+AGENT_PREFIX = "agent:"
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """
+    Consulta reenviada pelos usuários simulados.
+    """
+    name: str
+    title: str
+    query: str
+
+
+@dataclass
+class LoadReport:
+    """
+    Resultado de um teste de carga.
+    """
+    users: int
+    elapsed: float
+    scenarios: Dict[str, CallStats]
+    agents: Dict[str, CallStats]
+
+    @property
+    def total(self) -> CallStats:
+        merged = CallStats()
+        for stats in self.scenarios.values():
+            merged.latencies.extend(stats.latencies)
+            for kind, count in stats.errors.items():
+                merged.errors[kind] = merged.errors.get(kind, 0) + count
+        return merged
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "users": self.users,
+            "elapsed_s": round(self.elapsed, 3),
+            "total": self.total.summary(self.elapsed),
+            "scenarios": {name: s.summary(self.elapsed) for name, s in self.scenarios.items()},
+            "agents": {name: s.summary(self.elapsed) for name, s in self.agents.items()},
+        }
+
+    def format_table(self) -> str:
+        """
+        Tabela de texto com uma linha por cenário, por sub-agente e o total.
+        ``req/s`` conta as chamadas bem-sucedidas; ``tent./s``, todas.
+        """
+        header = (f"{'componente':<32}{'chamadas':>9}{'erros':>8}{'p50 (s)':>10}"
+                  f"{'p95 (s)':>10}{'p99 (s)':>10}{'req/s':>9}{'tent./s':>9}")
+        lines = [header, "-" * len(header)]
+
+        def row(name: str, stats: CallStats):
+            p = stats.percentiles()
+            lines.append(
+                f"{name:<32}{stats.calls:>9}{stats.error_rate:>8.1%}{p['p50']:>10.2f}"
+                f"{p['p95']:>10.2f}{p['p99']:>10.2f}{stats.successes / self.elapsed:>9.2f}"
+                f"{stats.calls / self.elapsed:>9.2f}"
+            )
+
+        for name, stats in self.scenarios.items():
+            row(name, stats)
+        if self.agents:
+            lines.append("")
+            for name, stats in self.agents.items():
+                row(f"↳ {name}", stats)
+        lines.append("-" * len(header))
+        row("TOTAL", self.total)
+        return "\n".join(lines)
+
+
+async def _simulated_user(
+    index: int,
+    send: Callable[[int, str], Awaitable[Any]],
+    scenarios: Sequence[Scenario],
+    start_delay: float,
+    iterations: Optional[int],
+    deadline: Optional[float],
+    think_time: float,
+    timeout: Optional[float],
+    on_result: Optional[Callable[[int, Scenario, float, Optional[BaseException]], None]],
+):
+    await asyncio.sleep(start_delay)
+    step = 0
+    while True:
+        if deadline is not None:
+            if time.monotonic() >= deadline:
+                return
+        elif step >= iterations:
+            return
+
+        # Cada usuário começa num cenário diferente para misturar a carga
+        scenario = scenarios[(index + step) % len(scenarios)]
+        step += 1
+        start = time.perf_counter()
+        error = None
+        try:
+            async with record_call(SCENARIO_PREFIX + scenario.name):
+                await asyncio.wait_for(send(index, scenario.query), timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # erro contabilizado; o usuário segue
+            error = exc
+        if on_result is not None:
+            on_result(index, scenario, time.perf_counter() - start, error)
+
+        if think_time > 0:
+            await asyncio.sleep(think_time)
+
+
+async def run_load_test(
+    send: Callable[[int, str], Awaitable[Any]],
+    scenarios: Sequence[Scenario],
+    users: int = 10,
+    ramp_up: float = 0.0,
+    iterations: Optional[int] = 1,
+    duration: Optional[float] = None,
+    think_time: float = 0.0,
+    timeout: Optional[float] = None,
+    on_result: Optional[Callable[[int, Scenario, float, Optional[BaseException]], None]] = None,
+) -> LoadReport:
+    """
+    Executa os cenários com ``users`` usuários simulados concorrentes.
+
+    Args:
+        send: Corrotina ``send(usuário, consulta)`` que envia a consulta ao
+            agente; o índice do usuário permite manter uma sessão por usuário
+        scenarios: Cenários reenviados em rodízio por cada usuário
+        users: Número de analistas simultâneos
+        ramp_up: Segundos até todos os usuários estarem ativos (entrada linear)
+        iterations: Consultas por usuário (ignorado se ``duration`` for dado)
+        duration: Segundos de carga contados do início do teste
+        think_time: Pausa de cada usuário entre consultas
+        timeout: Limite por consulta; estouros contam como erro
+        on_result: Callback (usuário, cenário, latência, erro) por consulta
+
+    Returns:
+        LoadReport com estatísticas por cenário e por sub-agente
+    """
+    if not scenarios:
+        raise ValueError("run_load_test requires at least one scenario")
+    if users < 1:
+        raise ValueError("users must be >= 1")
+    if duration is None and (iterations is None or iterations < 1):
+        raise ValueError("either iterations >= 1 or duration must be given")
+
+    recorder = CallRecorder()
+    start = time.monotonic()
+    deadline = start + duration if duration is not None else None
+
+    with recorder.activate():
+        tasks = [
+            asyncio.create_task(_simulated_user(
+                index, send, scenarios, ramp_up * index / users,
+                iterations, deadline, think_time, timeout, on_result,
+            ))
+            for index in range(users)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return LoadReport(
+        users=users,
+        elapsed=time.monotonic() - start,
+        scenarios=recorder.stats(SCENARIO_PREFIX),
+        agents=recorder.stats(AGENT_PREFIX),
+    )
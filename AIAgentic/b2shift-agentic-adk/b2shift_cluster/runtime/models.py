@@ -0,0 +1,165 @@
+"""
+Modelos do ADK usados pelos agentes do B2Shift.
+
+``LimitedGemini`` é o ``Gemini`` do google-adk com as chamadas passando
+pelo ``AdaptiveLimiter`` compartilhado do modelo (``runtime.limiter``).
+``CascadeModel`` encadeia um modelo rápido e um forte conforme as regras
+de ``runtime.cascade``. Este módulo importa o google-adk no topo; é
+importado apenas pelas funções ``create_*_agent``.
+"""
+
+import os
+import time
+from typing import AsyncGenerator, List, Optional, Union
+
+from google.adk.models import BaseLlm, Gemini, LlmRequest, LlmResponse
+from google.genai import types
+
+from .cascade import (
+    DIRECT,
+    ESCALATED,
+    FAST,
+    CascadeConfig,
+    get_cascade_stats,
+    joined_text,
+    validate_response,
+)
+from .limiter import limited_stream
+
+
+class LimitedGemini(Gemini):
+    """
+    ``Gemini`` sob o limitador por modelo, com retentativas com jitter
+    enquanto nenhuma parte da resposta tiver sido entregue.
+    """
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        parent = super().generate_content_async
+
+        async for response in limited_stream(self.model, lambda: parent(llm_request, stream)):
+            yield response
+
+
+def limited_model(model: str) -> Union[str, Gemini]:
+    """
+    Modelo a passar para ``Agent(model=...)``: ``LimitedGemini`` para
+    modelos Gemini, ou o próprio nome se ``B2SHIFT_MODEL_LIMITER=0`` ou se
+    o modelo for de outro provedor.
+    """
+    if os.getenv("B2SHIFT_MODEL_LIMITER", "1") == "0" or not model.startswith("gemini"):
+        return model
+    return LimitedGemini(model=model)
+
+
+def _request_text(llm_request: LlmRequest) -> str:
+    # Última mensagem do usuário com texto (ignora respostas de ferramentas)
+    for content in reversed(llm_request.contents or []):
+        if content.role == "user":
+            text = joined_text(content.parts)
+            if text.strip():
+                return text
+    return ""
+
+
+def _for_model(llm_request: LlmRequest, model: str) -> LlmRequest:
+    # Cópia rasa com o nome do modelo da rota: o Gemini chama a API com
+    # ``llm_request.model`` e pode acrescentar conteúdos à lista
+    return llm_request.model_copy(update={"model": model, "contents": list(llm_request.contents)})
+
+
+def _rejection(llm_request: LlmRequest, request_text: str,
+               responses: List[LlmResponse]) -> Optional[str]:
+    if not responses or any(r.error_code for r in responses):
+        return "error"
+    text = "".join(
+        part.text or ""
+        for r in responses if r.content
+        for part in r.content.parts or () if not part.thought
+    )
+    config = llm_request.config
+    expects_json = config is not None and (
+        config.response_mime_type == "application/json" or config.response_schema is not None
+    )
+    return validate_response(
+        request_text,
+        text,
+        truncated=any(r.finish_reason == types.FinishReason.MAX_TOKENS for r in responses),
+        expects_json=expects_json,
+        has_function_calls=any(r.get_function_calls() for r in responses),
+    )
+
+
+class CascadeModel(BaseLlm):
+    """
+    Modelo rápido com escalonamento para o forte (ver ``runtime.cascade``).
+
+    A resposta do modelo rápido é consumida inteira (sem streaming) para
+    ser validada antes de chegar ao agente; o modelo forte é repassado em
+    streaming.
+    """
+
+    agent: str
+    fast: BaseLlm
+    strong: BaseLlm
+    complexity_threshold: float = 1.0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        stats = get_cascade_stats()
+        config = CascadeConfig(self.fast.model, self.strong.model, self.complexity_threshold)
+        request_text = _request_text(llm_request)
+        start = time.perf_counter()
+
+        reason = None
+        if config.route_upfront(request_text) == FAST:
+            try:
+                responses = [
+                    response async for response in
+                    self.fast.generate_content_async(_for_model(llm_request, self.fast.model))
+                ]
+            except Exception:
+                responses = []
+            reason = _rejection(llm_request, request_text, responses)
+            if reason is None:
+                stats.record(self.agent, FAST, time.perf_counter() - start)
+                for response in responses:
+                    yield response
+                return
+
+        async for response in self.strong.generate_content_async(
+            _for_model(llm_request, self.strong.model), stream
+        ):
+            yield response
+        stats.record(self.agent, ESCALATED if reason else DIRECT, time.perf_counter() - start, reason)
+
+
+def _as_llm(model: str) -> BaseLlm:
+    llm = limited_model(model)
+    if isinstance(llm, str):
+        from google.adk.models.registry import LLMRegistry
+
+        llm = LLMRegistry.new_llm(llm)
+    return llm
+
+
+def routed_model(agent: str, model: str) -> Union[str, BaseLlm]:
+    """
+    Modelo de um sub-agente: ``CascadeModel`` do modelo rápido para
+    ``model`` (o ``*_AGENT_MODEL`` do agente) ou, se ``model`` já for o
+    rápido, para ``B2SHIFT_CASCADE_STRONG_MODEL``. Com
+    ``B2SHIFT_CASCADE=0``, apenas ``limited_model(model)``.
+    """
+    config = CascadeConfig.from_env()
+    if config is None:
+        return limited_model(model)
+    strong = model if model != config.fast_model else config.strong_model
+    return CascadeModel(
+        model=config.fast_model,
+        agent=agent,
+        fast=_as_llm(config.fast_model),
+        strong=_as_llm(strong),
+        complexity_threshold=config.complexity_threshold,
+    )
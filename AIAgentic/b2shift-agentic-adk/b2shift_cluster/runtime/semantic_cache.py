@@ -0,0 +1,393 @@
+"""
+Cache semântico local das respostas do agente principal.
+
+Perguntas quase iguais ("quais os principais clusters?", "liste os
+clusters principais") são normalizadas, vetorizadas offline e comparadas
+por similaridade de cosseno com as perguntas já respondidas. Acima do
+limiar, a resposta anterior é servida em milissegundos, sem percorrer a
+cadeia de sub-agentes.
+
+- Normalização: NFKD sem acentos, caixa baixa, sem pontuação e sem as
+  palavras que só enquadram a pergunta ("quais", "liste", "me mostre"...).
+  Números têm de coincidir exatamente ("top 5" ≠ "top 10"), assim como
+  os operadores (negação, comparação, direção) e o termo a que cada um se
+  aplica: "CRM mas não ERP" ≠ "ERP mas não CRM", "acima de" ≠ "abaixo de".
+- Vetorização: ``HashedNgramVectorizer``, n-gramas de caracteres por
+  palavra + palavras inteiras + pares de palavras vizinhas, em espaço de
+  hash (crc32) com norma L2. É determinística entre processos e não
+  precisa de treino.
+- Escopo: entradas só são comparadas dentro da mesma versão de dados e de
+  modelos (``cache_scope``); trocar os dados ou os modelos não serve
+  respostas antigas.
+- Perguntas que dependem da conversa ("análise anterior", "o cluster
+  acima", "esse segmento") não são cacheadas; limiares como "receita
+  acima de 1 milhão" são.
+
+Usa ``ENABLE_CACHE``/``CACHE_TTL_HOURS`` como o cache do warehouse, mais
+``B2SHIFT_SEMANTIC_CACHE_THRESHOLD`` e ``B2SHIFT_SEMANTIC_CACHE_MAX_ENTRIES``.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Palavras que enquadram a pergunta sem mudar o que é pedido
+FRAMING_WORDS = frozenset("""
+    a o as os um uma uns umas de da do das dos em na no nas nos e ao aos para por pra
+    que qual quais quem como me mim nos voce voces sao seriam existem temos tem ha
+    liste listar lista mostre mostrar mostra exiba exibir diga dizer informe informar
+    apresente apresentar traga trazer retorne retornar quero queria gostaria saber ver
+    poderia pode podes consegue favor please show list what which are is the of
+""".split())
+
+# Referências à conversa: a resposta depende do histórico da sessão.
+# "acima de"/"abaixo de"/"above 10" são limiares, não referências.
+CONTEXTUAL_MARKERS = re.compile(
+    r"\b(anterior|anteriores|previous|isso|isto|esse|essa|esses|essas|aquele|aquela|"
+    r"novamente|de novo|continue|continuar)\b"
+    r"|\b(acima|abaixo)\b(?!\s+d[eoa]s?\b)"
+    r"|\b(above|below)\b(?!\s+\d)"
+)
+
+# Operadores cujo termo seguinte muda a pergunta, com a forma canônica
+OPERATORS = {
+    **dict.fromkeys("nao sem exceto excluindo nem nunca not without except".split(), "nao"),
+    **dict.fromkeys("acima maior mais superior above over greater more".split(), ">"),
+    **dict.fromkeys("abaixo menor menos inferior below under less".split(), "<"),
+    **dict.fromkeys("para pra ate to".split(), "->"),
+}
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def _fold(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r"[^\w\s]", " ", text.casefold())
+
+
+def normalize_query(text: str) -> str:
+    """
+    Forma normalizada de uma pergunta usada na vetorização.
+    """
+    words = [w for w in _fold(text).split() if w not in FRAMING_WORDS]
+    return " ".join(words)
+
+
+def query_operators(text: str) -> Tuple[Tuple[str, str], ...]:
+    """
+    Pares (operador canônico, termo seguinte) da pergunta, em ordem.
+    Perguntas com os mesmos termos mas operandos trocados diferem aqui.
+    """
+    words = _fold(text).split()
+    pairs = []
+    for position, word in enumerate(words):
+        operator = OPERATORS.get(word)
+        if operator is None:
+            continue
+        operand = next((w for w in words[position + 1:]
+                        if w not in FRAMING_WORDS and w not in OPERATORS), "")
+        pairs.append((operator, operand))
+    return tuple(pairs)
+
+
+def is_contextual(text: str) -> bool:
+    """True se a pergunta se refere a algo já dito na conversa."""
+    return bool(CONTEXTUAL_MARKERS.search(_fold(text)))
+
+
+class HashedNgramVectorizer:
+    """
+    Vetorizador sem estado: palavras + n-gramas de caracteres de cada
+    palavra (com bordas) + pares de palavras vizinhas, por hashing em
+    ``n_features`` dimensões. Os pares tornam a ordem visível: sem eles,
+    perguntas com as mesmas palavras em outra ordem teriam similaridade 1.
+
+    Args:
+        n_features: Dimensão do espaço de hash
+        ngram_range: Tamanhos mínimo e máximo dos n-gramas de caracteres
+        word_weight: Peso de cada palavra inteira em relação aos n-gramas
+        bigram_weight: Peso de cada par de palavras vizinhas
+    """
+
+    def __init__(self, n_features: int = 2 ** 18, ngram_range: Tuple[int, int] = (3, 5),
+                 word_weight: float = 2.0, bigram_weight: float = 0.5):
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.word_weight = word_weight
+        self.bigram_weight = bigram_weight
+
+    def _hash(self, feature: str) -> int:
+        return zlib.crc32(feature.encode("utf-8")) % self.n_features
+
+    def transform(self, normalized: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vetor esparso (índices ordenados, pesos) com norma L2 unitária.
+        """
+        weights: Dict[int, float] = {}
+        low, high = self.ngram_range
+        words = normalized.split()
+        for first, second in zip(words, words[1:]):
+            index = self._hash(f"b:{first} {second}")
+            weights[index] = weights.get(index, 0.0) + self.bigram_weight
+        for word in words:
+            index = self._hash("w:" + word)
+            weights[index] = weights.get(index, 0.0) + self.word_weight
+            padded = f" {word} "
+            grams = [padded[i:i + n] for n in range(low, high + 1) for i in range(len(padded) - n + 1)]
+            if not grams:
+                continue
+            share = 1.0 / len(grams) ** 0.5
+            for gram in grams:
+                index = self._hash(gram)
+                weights[index] = weights.get(index, 0.0) + share
+
+        if not weights:
+            return np.empty(0, np.int32), np.empty(0, np.float32)
+        indices = np.fromiter(sorted(weights), np.int32, len(weights))
+        values = np.array([weights[i] for i in indices], np.float32)
+        values /= np.linalg.norm(values)
+        return indices, values
+
+
+@dataclass
+class CacheEntry:
+    query: str
+    normalized: str
+    numbers: Tuple[str, ...]
+    operators: Tuple[Tuple[str, str], ...]
+    answer: str
+    created_at: float
+    hits: int = 0
+
+
+@dataclass(frozen=True)
+class CacheHit:
+    """
+    Resposta servida pelo cache.
+    """
+    answer: str
+    similarity: float
+    cached_query: str
+    age_seconds: float
+
+
+class _ScopeIndex:
+    """Entradas e matriz esparsa de um escopo (CSC: a consulta lê só as
+    colunas dos n-gramas da pergunta)."""
+
+    def __init__(self):
+        self.entries: List[CacheEntry] = []
+        self.vectors: List[Tuple[np.ndarray, np.ndarray]] = []
+        self.exact: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], int] = {}
+        self._matrix = None
+
+    def matrix(self, n_features: int):
+        if self._matrix is None:
+            from scipy import sparse
+
+            lengths = [len(indices) for indices, _ in self.vectors]
+            indptr = np.zeros(len(self.vectors) + 1, np.int64)
+            np.cumsum(lengths, out=indptr[1:])
+            indices = np.concatenate([i for i, _ in self.vectors]) if self.vectors else np.empty(0, np.int32)
+            values = np.concatenate([v for _, v in self.vectors]) if self.vectors else np.empty(0, np.float32)
+            shape = (len(self.vectors), n_features)
+            self._matrix = sparse.csr_matrix((values, indices, indptr), shape=shape).tocsc()
+        return self._matrix
+
+    def add(self, entry: CacheEntry, vector: Tuple[np.ndarray, np.ndarray]):
+        self.exact[entry.normalized, entry.operators] = len(self.entries)
+        self.entries.append(entry)
+        self.vectors.append(vector)
+        self._matrix = None
+
+    def remove(self, keep: np.ndarray):
+        self.entries = [e for e, k in zip(self.entries, keep) if k]
+        self.vectors = [v for v, k in zip(self.vectors, keep) if k]
+        self.exact = {(e.normalized, e.operators): i for i, e in enumerate(self.entries)}
+        self._matrix = None
+
+
+class SemanticCache:
+    """
+    Cache de respostas por similaridade de pergunta. Thread-safe.
+
+    Args:
+        threshold: Similaridade de cosseno mínima para servir uma resposta
+        ttl_seconds: Validade das entradas
+        max_entries: Entradas por escopo (as mais antigas saem primeiro)
+        vectorizer: Vetorizador (padrão: ``HashedNgramVectorizer()``)
+    """
+
+    def __init__(self, threshold: float = 0.9, ttl_seconds: float = 24 * 3600,
+                 max_entries: int = 5000, vectorizer: Optional[HashedNgramVectorizer] = None):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.vectorizer = vectorizer or HashedNgramVectorizer()
+        self._scopes: Dict[str, _ScopeIndex] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(index.entries) for index in self._scopes.values())
+
+    def clear(self):
+        with self._lock:
+            self._scopes.clear()
+
+    def _expire(self, index: _ScopeIndex, now: float):
+        if not index.entries:
+            return
+        created = np.fromiter((e.created_at for e in index.entries), float, len(index.entries))
+        keep = now - created < self.ttl_seconds
+        if len(index.entries) > self.max_entries:
+            keep[: len(index.entries) - self.max_entries] = False
+        if not keep.all():
+            index.remove(keep)
+
+    def lookup(self, query: str, scope: str = "") -> Optional[CacheHit]:
+        """
+        Resposta de uma pergunta similar já respondida no mesmo escopo.
+        """
+        normalized = normalize_query(query)
+        if not normalized or is_contextual(query):
+            return None
+        numbers = tuple(_NUMBER.findall(normalized))
+        operators = query_operators(query)
+        now = time.time()
+
+        with self._lock:
+            index = self._scopes.get(scope)
+            if index is None:
+                self.misses += 1
+                return None
+            self._expire(index, now)
+
+            position = index.exact.get((normalized, operators))
+            similarity = 1.0
+            if position is None and index.entries:
+                indices, values = self.vectorizer.transform(normalized)
+                if len(indices):
+                    scores = index.matrix(self.vectorizer.n_features)[:, indices] @ values
+                    # Números ou operandos diferentes nunca são a mesma pergunta
+                    for candidate in np.argsort(scores)[::-1][:5]:
+                        if scores[candidate] < self.threshold:
+                            break
+                        candidate_entry = index.entries[candidate]
+                        if candidate_entry.numbers == numbers and candidate_entry.operators == operators:
+                            position, similarity = int(candidate), min(1.0, float(scores[candidate]))
+                            break
+
+            if position is None:
+                self.misses += 1
+                return None
+            entry = index.entries[position]
+            entry.hits += 1
+            self.hits += 1
+            return CacheHit(entry.answer, similarity, entry.query, now - entry.created_at)
+
+    def store(self, query: str, answer: str, scope: str = "") -> bool:
+        """
+        Guarda a resposta; False se a pergunta não é cacheável.
+        """
+        normalized = normalize_query(query)
+        if not normalized or not answer.strip() or is_contextual(query):
+            return False
+        vector = self.vectorizer.transform(normalized)
+        entry = CacheEntry(query=query.strip(), normalized=normalized,
+                           numbers=tuple(_NUMBER.findall(normalized)),
+                           operators=query_operators(query), answer=answer,
+                           created_at=time.time())
+        with self._lock:
+            index = self._scopes.setdefault(scope, _ScopeIndex())
+            position = index.exact.get((normalized, entry.operators))
+            if position is not None:
+                keep = np.ones(len(index.entries), bool)
+                keep[position] = False
+                index.remove(keep)
+            index.add(entry, vector)
+            self._expire(index, entry.created_at)
+        return True
+
+
+_MODEL_VARIABLES = (
+    "ROOT_AGENT_MODEL", "DATA_AGENT_MODEL", "CLUSTER_AGENT_MODEL", "DECISION_AGENT_MODEL",
+    "B2SHIFT_CASCADE", "B2SHIFT_CASCADE_FAST_MODEL", "B2SHIFT_CASCADE_STRONG_MODEL",
+)
+
+
+def data_version() -> str:
+    """
+    Versão dos dados consultados pelo agente: ``B2SHIFT_DATA_VERSION`` se
+    definido (ex.: pelo pipeline que carrega o BigQuery; gravações de
+    outros processos devem incrementá-lo), senão uma impressão digital de
+    tamanho/mtime dos manifestos dos datasets e dos CSVs de exemplo. Soma
+    as gravações deste processo no warehouse (``DataSource.load_frame``,
+    ex.: ``write_cluster_confidence``), que os arquivos não refletem.
+    """
+    from ..data.warehouse import sample_data_dir, write_generation
+
+    version = os.getenv("B2SHIFT_DATA_VERSION")
+    if not version:
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(os.getenv("B2SHIFT_DATA_BACKEND", "sqlite").encode())
+        roots = {
+            sample_data_dir("B2SHIFT_DATASET_DIR"): "*/_dataset.json",
+            sample_data_dir("B2SHIFT_SAMPLE_DATA_DIR"): "*.csv",
+        }
+        for root, pattern in roots.items():
+            for path in sorted(root.glob(pattern)):
+                stat = path.stat()
+                digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        version = digest.hexdigest()
+    generation = write_generation()
+    return f"{version}+w{generation}" if generation else version
+
+
+def cache_scope() -> str:
+    """Escopo atual: versão dos dados + modelos configurados."""
+    models = "|".join(os.getenv(name, "") for name in _MODEL_VARIABLES)
+    return f"{data_version()}:{hashlib.blake2b(models.encode(), digest_size=6).hexdigest()}"
+
+
+_CACHE: Optional[SemanticCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    Cache compartilhado pelo processo, ou None se ``ENABLE_CACHE`` estiver
+    desligado.
+    """
+    global _CACHE
+    if os.getenv("ENABLE_CACHE", "true").lower() not in ("1", "true", "yes"):
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = SemanticCache(
+                threshold=float(os.getenv("B2SHIFT_SEMANTIC_CACHE_THRESHOLD", 0.9)),
+                ttl_seconds=float(os.getenv("CACHE_TTL_HOURS", 24)) * 3600,
+                max_entries=int(os.getenv("B2SHIFT_SEMANTIC_CACHE_MAX_ENTRIES", 5000)),
+            )
+        return _CACHE
+
+
+def format_cached_answer(hit: CacheHit) -> str:
+    """Resposta com o indicador de que veio do cache."""
+    minutes = hit.age_seconds / 60
+    age = f"{minutes:.0f} min" if minutes < 120 else f"{minutes / 60:.1f} h"
+    return (
+        f"⚡ Resposta do cache semântico (similaridade {hit.similarity:.2f} com "
+        f"\"{hit.cached_query}\", gerada há {age}).\n\n{hit.answer}"
+    )
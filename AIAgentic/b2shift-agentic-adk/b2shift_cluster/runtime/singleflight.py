@@ -0,0 +1,120 @@
+"""
+Coalescência de requisições idênticas em voo ("single-flight").
+
+Quando várias sessões pedem a mesma coisa ao mesmo tempo ao mesmo
+sub-agente, só a primeira executa; as demais aguardam e recebem o mesmo
+resultado (ou a mesma exceção). Nada é guardado depois que a execução
+termina — isto não é um cache.
+
+A chave é (sub-agente, requisição normalizada, escopo): o escopo é o
+mesmo do cache semântico (``semantic_cache.cache_scope``), versão dos
+dados consultados mais modelos configurados. A saída dos agentes
+anteriores não entra na chave: ela é texto gerado por sessão e nunca se
+repetiria entre sessões.
+
+Só o retorno de ``call()`` é compartilhado. Efeitos colaterais, como as
+mudanças de estado que o sub-agente grava na sessão de quem executou,
+ficam com essa sessão; quem precisa deles deve devolvê-los no resultado
+e aplicá-los em cada interessado (ver ``tools._run_agent_tool``).
+
+Cancelamento: a execução roda numa tarefa própria, protegida por
+``asyncio.shield``; cancelar um dos interessados (inclusive o primeiro)
+não interrompe os demais. A tarefa só é cancelada quando todos desistem.
+"""
+
+import asyncio
+import os
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from .semantic_cache import cache_scope
+
+
+def normalize_request(request: str) -> str:
+    """
+    Forma canônica de uma requisição: NFKC, caixa e espaços normalizados e
+    sem pontuação final.
+    """
+    text = unicodedata.normalize("NFKC", request).casefold()
+    return " ".join(text.split()).rstrip(" .!?;:")
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    loop: asyncio.AbstractEventLoop
+    waiters: int = 0
+
+
+class SingleFlight:
+    """
+    Registro das execuções em voo por chave.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Executa ``call()`` ou se junta à execução em voo da mesma ``key``.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None or flight.loop is not loop:
+                # Futures não atravessam event loops: outro loop executa sozinho
+                task = loop.create_task(call())
+                flight = _Flight(task=task, loop=loop)
+                if key not in self._flights:
+                    self._flights[key] = flight
+                    task.add_done_callback(lambda _, key=key, flight=flight: self._forget(key, flight))
+                self.executions += 1
+            else:
+                self.coalesced += 1
+            flight.waiters += 1
+
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            with self._lock:
+                flight.waiters -= 1
+                # Todos desistiram: cancela e libera a chave para novos pedidos
+                abandon = flight.waiters == 0 and not flight.task.done()
+                if abandon and self._flights.get(key) is flight:
+                    del self._flights[key]
+            if abandon:
+                flight.task.cancel()
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+
+_SINGLE_FLIGHT = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Registro compartilhado pelo processo."""
+    return _SINGLE_FLIGHT
+
+
+async def coalesce(agent: str, request: str, call: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Executa ``call()`` coalescendo chamadas idênticas em voo ao ``agent``
+    sobre a mesma versão dos dados e dos modelos.
+    Com ``B2SHIFT_SINGLE_FLIGHT=0`` apenas executa.
+    """
+    if os.getenv("B2SHIFT_SINGLE_FLIGHT", "1") == "0":
+        return await call()
+    key = (agent, normalize_request(request), cache_scope())
+    return await _SINGLE_FLIGHT.do(key, call)
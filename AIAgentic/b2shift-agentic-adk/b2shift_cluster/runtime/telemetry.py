@@ -0,0 +1,139 @@
+"""
+Medição de latência das chamadas do B2Shift Agent.
+
+``CallRecorder`` acumula latências e falhas por componente (cenário,
+sub-agente, ferramenta). O gravador ativo fica num ``ContextVar``: as
+ferramentas envolvem suas chamadas em ``record_call`` e, fora de um teste
+de carga (nenhum gravador ativo), o custo é uma única leitura da variável.
+Como tarefas do asyncio herdam o contexto de quem as cria, todas as
+chamadas feitas a partir de um usuário simulado caem no mesmo gravador.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+_ACTIVE_RECORDER: contextvars.ContextVar[Optional["CallRecorder"]] = contextvars.ContextVar(
+    "b2shift_call_recorder", default=None
+)
+
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class CallStats:
+    """
+    Latências (segundos) e falhas observadas para um componente.
+    """
+    latencies: List[float] = field(default_factory=list)
+    errors: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def calls(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def error_count(self) -> int:
+        return sum(self.errors.values())
+
+    @property
+    def successes(self) -> int:
+        return self.calls - self.error_count
+
+    @property
+    def error_rate(self) -> float:
+        return self.error_count / self.calls if self.calls else 0.0
+
+    def percentiles(self, quantiles: Iterable[float] = PERCENTILES) -> Dict[str, float]:
+        """
+        Percentis de latência em segundos, ex.: ``{"p50": 1.2, "p95": 3.4}``.
+        """
+        import numpy as np
+
+        quantiles = list(quantiles)
+        if not self.latencies:
+            return {f"p{q:g}": float("nan") for q in quantiles}
+        values = np.percentile(np.asarray(self.latencies), quantiles)
+        return {f"p{q:g}": float(v) for q, v in zip(quantiles, values)}
+
+    def summary(self, elapsed: Optional[float] = None) -> Dict[str, float]:
+        result = {
+            "calls": self.calls,
+            "errors": self.error_count,
+            "error_rate": round(self.error_rate, 4),
+            **{k: round(v, 4) for k, v in self.percentiles().items()},
+        }
+        if elapsed:
+            # Vazão conta só as chamadas bem-sucedidas; tentativas à parte
+            result["throughput_per_s"] = round(self.successes / elapsed, 4)
+            result["attempts_per_s"] = round(self.calls / elapsed, 4)
+        return result
+
+
+class CallRecorder:
+    """
+    Acumula ``CallStats`` por nome de componente. Thread-safe.
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, CallStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, component: str, latency: float, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(component, CallStats())
+            stats.latencies.append(latency)
+            if error is not None:
+                kind = type(error).__name__
+                stats.errors[kind] = stats.errors.get(kind, 0) + 1
+
+    def stats(self, prefix: str = "") -> Dict[str, CallStats]:
+        """
+        Estatísticas dos componentes cujo nome começa com ``prefix``
+        (o prefixo é removido das chaves).
+        """
+        with self._lock:
+            return {
+                name[len(prefix):]: stats
+                for name, stats in sorted(self._stats.items())
+                if name.startswith(prefix)
+            }
+
+    @contextmanager
+    def activate(self):
+        """
+        Torna este gravador o ativo no contexto atual.
+        """
+        token = _ACTIVE_RECORDER.set(self)
+        try:
+            yield self
+        finally:
+            _ACTIVE_RECORDER.reset(token)
+
+
+def get_recorder() -> Optional[CallRecorder]:
+    """Gravador ativo no contexto atual, ou None."""
+    return _ACTIVE_RECORDER.get()
+
+
+@asynccontextmanager
+async def record_call(component: str):
+    """
+    Mede o bloco e registra latência/erro em ``component`` no gravador
+    ativo. Sem gravador ativo, não faz nada.
+    """
+    recorder = _ACTIVE_RECORDER.get()
+    if recorder is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as exc:
+        recorder.record(component, time.perf_counter() - start, exc)
+        raise
+    recorder.record(component, time.perf_counter() - start)
@@ -0,0 +1,33 @@
+# Processamento em streaming do B2Shift Customer Clustering Agent
+
+# Filas de mensagens (Pub/Sub ou substituto em memória) e consumidores
+# incrementais. Os nomes públicos são resolvidos sob demanda (PEP 562),
+# como em ``b2shift_cluster.analytics``.
+
+import importlib
+
+_LAZY_ATTRIBUTES = {
+    "Message": ".queue",
+    "MessageQueue": ".queue",
+    "InProcessQueue": ".queue",
+    "PubSubQueue": ".queue",
+    "get_queue": ".queue",
+    "ClusterDriftMonitor": ".drift",
+    "DriftReport": ".drift",
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
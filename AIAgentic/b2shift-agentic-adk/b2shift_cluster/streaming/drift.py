@@ -0,0 +1,371 @@
+"""
+Monitor de drift e migração de clusters em streaming.
+
+Consome atualizações de atribuição (``customer_id``, ``cluster_id`` e o
+vetor do cliente no espaço do embedding) de uma ``MessageQueue`` e mantém:
+
+- estatísticas de Welford por cluster (contagem, média, M2) da pertença
+  atual — cada atualização remove o vetor antigo do cluster de origem e
+  adiciona o novo ao de destino, em lote (fórmulas de Chan);
+- uma matriz esparsa de migração cluster -> cluster desde o último
+  snapshot.
+
+Em cada ``snapshot`` o monitor compara centróides e tamanhos com a
+referência da última clusterização completa e sinaliza drift quando
+passam dos limites, indicando se vale a pena reclusterizar.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from ..models.membership import CustomerIdIndex
+
+UNASSIGNED = -1
+ASSIGNMENTS_TOPIC = "cluster-assignments"
+
+
+@dataclass
+class DriftReport:
+    """
+    Resultado de um snapshot do monitor.
+    """
+    snapshot_time: float
+    updates: int  # atualizações aplicadas desde o snapshot anterior
+    sizes: np.ndarray
+    centroid_shift: np.ndarray  # deslocamento / dispersão de referência
+    size_change: np.ndarray  # variação relativa do tamanho
+    migrations: Any  # scipy.sparse.csr_matrix (origem x destino)
+    migration_rate: float
+    drifted_clusters: Dict[int, List[str]] = field(default_factory=dict)
+
+    @property
+    def needs_reclustering(self) -> bool:
+        return bool(self.drifted_clusters)
+
+    def top_migrations(self, limit: int = 10) -> List[tuple]:
+        """Maiores fluxos (origem, destino, clientes) do período."""
+        coo = self.migrations.tocoo()
+        order = np.argsort(-coo.data)[:limit]
+        return [(int(coo.row[i]) - 1, int(coo.col[i]) - 1, int(coo.data[i])) for i in order]
+
+
+class ClusterDriftMonitor:
+    """
+    Estatísticas incrementais por cluster e detecção de drift.
+
+    As linhas da matriz de migração e os slots internos usam ``cluster_id + 1``
+    (slot 0 = cliente sem cluster/ruído).
+
+    Args:
+        reference_centroids: Centróides (k, d) da última clusterização completa
+        reference_sizes: Clientes por cluster na referência
+        reference_spread: Dispersão (desvio médio) de cada cluster na
+            referência; o deslocamento do centróide é medido nessa unidade
+        centroid_threshold: Deslocamento relativo que caracteriza drift
+            (padrão: ``B2SHIFT_DRIFT_CENTROID_THRESHOLD``)
+        size_threshold: Variação relativa de tamanho que caracteriza drift
+            (padrão: ``B2SHIFT_DRIFT_SIZE_THRESHOLD``)
+        migration_threshold: Fração de clientes migrando entre snapshots que
+            caracteriza drift (padrão: ``B2SHIFT_DRIFT_MIGRATION_THRESHOLD``)
+    """
+
+    def __init__(
+        self,
+        reference_centroids: np.ndarray,
+        reference_sizes: np.ndarray,
+        reference_spread: Optional[np.ndarray] = None,
+        centroid_threshold: Optional[float] = None,
+        size_threshold: Optional[float] = None,
+        migration_threshold: Optional[float] = None,
+    ):
+        self.reference_centroids = np.asarray(reference_centroids, dtype=np.float64)
+        self.reference_sizes = np.asarray(reference_sizes, dtype=np.float64)
+        n_clusters, n_dims = self.reference_centroids.shape
+        self.reference_spread = (
+            np.ones(n_clusters) if reference_spread is None
+            else np.maximum(np.asarray(reference_spread, dtype=np.float64), 1e-12)
+        )
+
+        self.centroid_threshold = centroid_threshold if centroid_threshold is not None else float(
+            os.getenv("B2SHIFT_DRIFT_CENTROID_THRESHOLD", 0.25))
+        self.size_threshold = size_threshold if size_threshold is not None else float(
+            os.getenv("B2SHIFT_DRIFT_SIZE_THRESHOLD", 0.2))
+        self.migration_threshold = migration_threshold if migration_threshold is not None else float(
+            os.getenv("B2SHIFT_DRIFT_MIGRATION_THRESHOLD", 0.05))
+
+        # Welford por slot (cluster_id + 1)
+        self.count = np.zeros(n_clusters + 1)
+        self.mean = np.zeros((n_clusters + 1, n_dims))
+        self.m2 = np.zeros((n_clusters + 1, n_dims))
+
+        # Estado atual de cada cliente
+        self.index = CustomerIdIndex()
+        self._slots = np.zeros(0, dtype=np.int32)
+        self._vectors = np.zeros((0, n_dims), dtype=np.float32)
+
+        self._migrations: Dict[int, int] = {}
+        self._updates = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_artifact(cls, artifact, **thresholds) -> "ClusterDriftMonitor":
+        """
+        Inicializa a partir de um ClusteringArtifact (labels + embedding).
+        """
+        if artifact.embedding is None:
+            raise ValueError("Artefato não contém embedding dos clientes")
+        embedding = np.asarray(artifact.embedding, dtype=np.float64)
+        labels = np.asarray(artifact.labels, dtype=np.int64)
+        n_clusters = max(artifact.n_clusters, int(labels.max()) + 1)
+
+        sizes = np.bincount(labels[labels >= 0], minlength=n_clusters)
+        centroids = np.zeros((n_clusters, embedding.shape[1]))
+        spread = np.ones(n_clusters)
+        for cluster_id in np.flatnonzero(sizes).tolist():
+            members = embedding[labels == cluster_id]
+            centroids[cluster_id] = members.mean(axis=0)
+            spread[cluster_id] = np.sqrt(members.var(axis=0).mean())
+
+        monitor = cls(centroids, sizes, spread, **thresholds)
+        customer_ids = (artifact.customer_ids if artifact.customer_ids is not None
+                        else np.array([str(i) for i in range(len(labels))], dtype=object))
+        monitor.load_state(np.asarray(customer_ids, dtype=object), labels, embedding)
+        return monitor
+
+    @property
+    def n_clusters(self) -> int:
+        return len(self.count) - 1
+
+    # ------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------
+
+    def _grow(self, n_slots: int):
+        if n_slots <= len(self.count):
+            return
+        extra = n_slots - len(self.count)
+        n_dims = self.mean.shape[1]
+        self.count = np.concatenate([self.count, np.zeros(extra)])
+        self.mean = np.vstack([self.mean, np.zeros((extra, n_dims))])
+        self.m2 = np.vstack([self.m2, np.zeros((extra, n_dims))])
+        self.reference_sizes = np.concatenate([self.reference_sizes, np.zeros(extra)])
+        self.reference_centroids = np.vstack([self.reference_centroids, np.zeros((extra, n_dims))])
+        self.reference_spread = np.concatenate([self.reference_spread, np.ones(extra)])
+
+    def load_state(self, customer_ids: np.ndarray, cluster_ids: np.ndarray, vectors: np.ndarray):
+        """Estado inicial completo (sem registrar migrações)."""
+        with self._lock:
+            self.index = CustomerIdIndex(customer_ids)
+            self._slots = (np.asarray(cluster_ids, dtype=np.int64) + 1).astype(np.int32)
+            self._vectors = np.asarray(vectors, dtype=np.float32)
+            self._grow(int(self._slots.max()) + 1 if len(self._slots) else 1)
+            self.count[:] = 0
+            self.mean[:] = 0
+            self.m2[:] = 0
+            self._welford_add(self._slots, self._vectors.astype(np.float64))
+
+    def _group(self, slots: np.ndarray, vectors: np.ndarray):
+        """Contagem, média e M2 de um lote, agrupado por slot."""
+        n_slots = len(self.count)
+        count = np.bincount(slots, minlength=n_slots).astype(np.float64)
+        total = np.zeros((n_slots, vectors.shape[1]))
+        np.add.at(total, slots, vectors)
+        mean = total / np.maximum(count, 1)[:, None]
+        deviation = vectors - mean[slots]
+        m2 = np.zeros_like(total)
+        np.add.at(m2, slots, deviation * deviation)
+        return count, mean, m2
+
+    def _welford_add(self, slots: np.ndarray, vectors: np.ndarray):
+        count_b, mean_b, m2_b = self._group(slots, vectors)
+        count = self.count + count_b
+        safe = np.maximum(count, 1)[:, None]
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * (count_b[:, None] / safe)
+        self.m2 = self.m2 + m2_b + delta ** 2 * (self.count * count_b)[:, None] / safe
+        self.count = count
+
+    def _welford_remove(self, slots: np.ndarray, vectors: np.ndarray):
+        count_b, mean_b, m2_b = self._group(slots, vectors)
+        count = np.maximum(self.count - count_b, 0)
+        safe = np.maximum(count, 1)[:, None]
+        mean = np.where(count[:, None] > 0, (self.count[:, None] * self.mean - count_b[:, None] * mean_b) / safe, 0.0)
+        delta = mean_b - mean
+        m2 = self.m2 - m2_b - delta ** 2 * (count * count_b)[:, None] / np.maximum(self.count, 1)[:, None]
+        self.mean = mean
+        self.m2 = np.where(count[:, None] > 0, np.maximum(m2, 0), 0.0)
+        self.count = count
+
+    # ------------------------------------------------------------------
+    # Atualizações
+    # ------------------------------------------------------------------
+
+    def apply(self, customer_ids: List[str], cluster_ids: np.ndarray, vectors: np.ndarray) -> int:
+        """
+        Aplica um lote de atribuições (a última ocorrência de cada cliente vale).
+
+        Args:
+            customer_ids: Clientes atualizados
+            cluster_ids: Novo cluster de cada um (UNASSIGNED para ruído)
+            vectors: Novo vetor (len, d) no espaço do embedding
+
+        Returns:
+            Número de clientes que mudaram de cluster
+        """
+        if not len(customer_ids):
+            return 0
+        cluster_ids = np.asarray(cluster_ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float64)
+
+        with self._lock:
+            positions = self.index.encode(customer_ids, add_missing=True)
+            # Última ocorrência de cada cliente no lote
+            _, last = np.unique(positions[::-1], return_index=True)
+            keep = len(positions) - 1 - last
+            positions, cluster_ids, vectors = positions[keep], cluster_ids[keep], vectors[keep]
+
+            # Clientes novos entram com slot de origem -1 (nenhum)
+            n_known = len(self._slots)
+            if len(self.index) > n_known:
+                extra = len(self.index) - n_known
+                self._slots = np.concatenate([self._slots, np.full(extra, -1, dtype=np.int32)])
+                self._vectors = np.vstack([self._vectors, np.zeros((extra, self._vectors.shape[1]), np.float32)])
+
+            new_slots = cluster_ids + 1
+            self._grow(int(new_slots.max()) + 1)
+            old_slots = self._slots[positions].astype(np.int64)
+
+            known = old_slots >= 0
+            if known.any():
+                self._welford_remove(old_slots[known], self._vectors[positions[known]].astype(np.float64))
+            self._welford_add(new_slots, vectors)
+
+            moved = known & (old_slots != new_slots)
+            if moved.any():
+                width = len(self.count) + 1
+                pairs, counts = np.unique(old_slots[moved] * width + new_slots[moved], return_counts=True)
+                for pair, n in zip(pairs.tolist(), counts.tolist()):
+                    key = (pair // width, pair % width)
+                    self._migrations[key] = self._migrations.get(key, 0) + n
+
+            self._slots[positions] = new_slots
+            self._vectors[positions] = vectors
+            self._updates += len(positions)
+            return int(moved.sum())
+
+    def apply_messages(self, messages: Iterable[Any]) -> int:
+        """Aplica mensagens ``{"customer_id", "cluster_id", "vector"}``."""
+        records = [message.data for message in messages]
+        if not records:
+            return 0
+        return self.apply(
+            [record["customer_id"] for record in records],
+            np.fromiter((record["cluster_id"] for record in records), dtype=np.int64, count=len(records)),
+            np.asarray([record["vector"] for record in records], dtype=np.float64),
+        )
+
+    def consume(self, queue, subscription: str, max_messages: int = 10_000,
+                timeout: Optional[float] = None) -> int:
+        """Puxa, aplica e confirma um lote da fila. Retorna mensagens processadas."""
+        messages = queue.pull(subscription, max_messages=max_messages, timeout=timeout)
+        if messages:
+            self.apply_messages(messages)
+            queue.ack(subscription, [message.message_id for message in messages])
+        return len(messages)
+
+    def run(self, queue, subscription: str, stop: threading.Event,
+            snapshot_interval: float = 60.0, on_snapshot=None, batch_size: int = 10_000):
+        """
+        Laço de consumo até ``stop`` ser sinalizado, com snapshots periódicos.
+
+        Args:
+            on_snapshot: Callback chamado com cada DriftReport
+        """
+        next_snapshot = time.monotonic() + snapshot_interval
+        while not stop.is_set():
+            self.consume(queue, subscription, max_messages=batch_size, timeout=0.5)
+            if time.monotonic() >= next_snapshot:
+                report = self.snapshot()
+                if on_snapshot is not None:
+                    on_snapshot(report)
+                next_snapshot = time.monotonic() + snapshot_interval
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def centroids(self) -> np.ndarray:
+        """Centróides atuais (k, d)."""
+        return self.mean[1:].copy()
+
+    def variances(self) -> np.ndarray:
+        return self.m2[1:] / np.maximum(self.count[1:] - 1, 1)[:, None]
+
+    def snapshot(self, reset_migrations: bool = True) -> DriftReport:
+        """
+        Compara o estado atual com a referência e zera as migrações.
+        """
+        from scipy.sparse import coo_matrix
+
+        with self._lock:
+            sizes = self.count[1:].copy()
+            reference_sizes = self.reference_sizes
+            shift = np.linalg.norm(self.mean[1:] - self.reference_centroids, axis=1) / self.reference_spread
+            shift[sizes == 0] = 0.0
+            with np.errstate(divide="ignore", invalid="ignore"):
+                size_change = np.where(
+                    reference_sizes > 0, (sizes - reference_sizes) / np.maximum(reference_sizes, 1),
+                    np.where(sizes > 0, np.inf, 0.0),
+                )
+
+            n_slots = len(self.count)
+            if self._migrations:
+                keys = np.array(list(self._migrations), dtype=np.int64)
+                values = np.array(list(self._migrations.values()), dtype=np.int64)
+                migrations = coo_matrix((values, (keys[:, 0], keys[:, 1])), shape=(n_slots, n_slots)).tocsr()
+            else:
+                migrations = coo_matrix((n_slots, n_slots), dtype=np.int64).tocsr()
+            moved = int(migrations.sum())
+            migration_rate = moved / max(int(sizes.sum()), 1)
+            updates = self._updates
+
+            if reset_migrations:
+                self._migrations = {}
+                self._updates = 0
+
+        drifted: Dict[int, List[str]] = {}
+        for cluster_id in np.flatnonzero(shift > self.centroid_threshold).tolist():
+            drifted.setdefault(cluster_id, []).append(f"centroid_shift={shift[cluster_id]:.2f}")
+        for cluster_id in np.flatnonzero(np.abs(size_change) > self.size_threshold).tolist():
+            drifted.setdefault(cluster_id, []).append(f"size_change={size_change[cluster_id]:+.1%}")
+        if migration_rate > self.migration_threshold:
+            # Fluxo dominante identifica os clusters envolvidos
+            outflow = np.asarray(migrations.sum(axis=1)).ravel()[1:]
+            for cluster_id in np.flatnonzero(outflow > 0).tolist():
+                if outflow[cluster_id] / max(reference_sizes[cluster_id], 1) > self.migration_threshold:
+                    drifted.setdefault(cluster_id, []).append(
+                        f"outflow={outflow[cluster_id] / max(reference_sizes[cluster_id], 1):.1%}"
+                    )
+
+        return DriftReport(
+            snapshot_time=time.time(),
+            updates=updates,
+            sizes=sizes,
+            centroid_shift=shift,
+            size_change=size_change,
+            migrations=migrations,
+            migration_rate=migration_rate,
+            drifted_clusters=drifted,
+        )
+
+    def rebase(self):
+        """Adota o estado atual como nova referência (após reclusterizar)."""
+        with self._lock:
+            self.reference_centroids = self.mean[1:].copy()
+            self.reference_sizes = self.count[1:].copy()
+            self.reference_spread = np.maximum(np.sqrt(self.variances().mean(axis=1)), 1e-12)
@@ -0,0 +1,488 @@
+"""
+Features comportamentais incrementais a partir de ``customer_events``.
+
+Consome eventos (login, feature_use, support_contact, payment) de uma
+``MessageQueue`` e mantém, por cliente, agregados em janela deslizante
+(padrão: 30 dias em buckets diários):
+
+- ``login_frequency``: logins por semana na janela;
+- ``support_ticket_count``: contatos de suporte na janela;
+- ``session_duration_avg``: média de ``event_details.session_duration``
+  (minutos) dos eventos que a informam.
+
+A tabela é compacta: um anel de buckets ``(n_buckets, clientes, tipos)``
+em uint16 mais totais da janela mantidos incrementalmente — ler as
+features é O(1) por cliente e expirar um bucket é uma subtração vetorizada.
+O estado é gravado periodicamente em um checkpoint ``.npz`` (troca
+atômica), lido por ``get_feature_store``. Scoring e atribuição de clusters
+só usam o store recebido explicitamente (``feature_store=``); a ferramenta
+de predição do agente passa o do processo, e as features ficam com minutos
+de atraso em vez de um dia.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+from ..models.membership import CustomerIdIndex
+
+EVENTS_TOPIC = "customer-events"
+EVENT_TYPES = ("login", "feature_use", "support_contact", "payment")
+SESSION_DETAIL = "session_duration"
+
+# Colunas de CustomerProfile substituídas pelos valores da janela
+STREAMED_FEATURES = ("login_frequency", "support_ticket_count", "session_duration_avg")
+
+_COUNT_MAX = np.iinfo(np.uint16).max
+_INITIAL_CAPACITY = 1024
+
+
+def _epoch_seconds(timestamps: Sequence[Any]) -> np.ndarray:
+    """Timestamps (epoch em segundos ou ISO 8601) como float64 em segundos."""
+    values = np.asarray(timestamps)
+    if values.dtype.kind in "iuf":
+        return values.astype(np.float64)
+    import pandas as pd
+
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), utc=True, format="ISO8601")
+    return parsed.to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+
+
+def _saturating_add(flat: np.ndarray, index: np.ndarray) -> tuple:
+    """
+    Soma uma ocorrência por entrada de ``index`` em ``flat`` (uint16),
+    saturando no máximo. Retorna (posições únicas, incremento aplicado).
+    """
+    unique, counts = np.unique(index, return_counts=True)
+    before = flat[unique].astype(np.int64)
+    after = np.minimum(before + counts, _COUNT_MAX)
+    flat[unique] = after
+    return unique, after - before
+
+
+class EventFeatureStore:
+    """
+    Agregados por cliente em janela deslizante de eventos.
+
+    Args:
+        window_days: Tamanho da janela (padrão: ``B2SHIFT_EVENT_WINDOW_DAYS``)
+        bucket_hours: Granularidade da expiração (padrão:
+            ``B2SHIFT_EVENT_BUCKET_HOURS``); a janela efetiva varia em até
+            um bucket
+        event_types: Tipos de evento contados; os demais são ignorados
+    """
+
+    def __init__(
+        self,
+        window_days: Optional[float] = None,
+        bucket_hours: Optional[float] = None,
+        event_types: Sequence[str] = EVENT_TYPES,
+    ):
+        window_days = window_days if window_days is not None else float(
+            os.getenv("B2SHIFT_EVENT_WINDOW_DAYS", 30))
+        bucket_hours = bucket_hours if bucket_hours is not None else float(
+            os.getenv("B2SHIFT_EVENT_BUCKET_HOURS", 24))
+
+        self.bucket_seconds = bucket_hours * 3600
+        self.n_buckets = max(1, int(round(window_days * 24 / bucket_hours)))
+        self.event_types = tuple(event_types)
+        self._type_codes = {name: code for code, name in enumerate(self.event_types)}
+
+        self.index = CustomerIdIndex()
+        self.head_bucket: Optional[int] = None  # bucket mais recente da janela
+        self.first_bucket: Optional[int] = None  # bucket mais antigo com eventos
+        self.ignored = 0  # eventos de tipo desconhecido ou fora da janela
+        self._lock = threading.Lock()
+        self._allocate(0)
+
+    def _allocate(self, capacity: int):
+        n_types = len(self.event_types)
+        self._capacity = capacity
+        # Buckets do anel
+        self.counts = np.zeros((self.n_buckets, capacity, n_types), dtype=np.uint16)
+        self.session_sum = np.zeros((self.n_buckets, capacity), dtype=np.float32)
+        self.session_count = np.zeros((self.n_buckets, capacity), dtype=np.uint16)
+        # Totais da janela
+        self.totals = np.zeros((capacity, n_types), dtype=np.int64)
+        self.session_total = np.zeros(capacity)
+        self.session_n = np.zeros(capacity, dtype=np.int64)
+        self.last_event = np.full(capacity, np.nan)
+
+    def _ensure_capacity(self, n_customers: int):
+        if n_customers <= self._capacity:
+            return
+        capacity = max(_INITIAL_CAPACITY, self._capacity)
+        while capacity < n_customers:
+            capacity *= 2
+        old = (self.counts, self.session_sum, self.session_count,
+               self.totals, self.session_total, self.session_n, self.last_event)
+        used = self._capacity
+        self._allocate(capacity)
+        self.counts[:, :used] = old[0]
+        self.session_sum[:, :used] = old[1]
+        self.session_count[:, :used] = old[2]
+        self.totals[:used] = old[3]
+        self.session_total[:used] = old[4]
+        self.session_n[:used] = old[5]
+        self.last_event[:used] = old[6]
+
+    @property
+    def window_days(self) -> float:
+        return self.n_buckets * self.bucket_seconds / 86400
+
+    @property
+    def n_customers(self) -> int:
+        return len(self.index)
+
+    @property
+    def coverage(self) -> float:
+        """
+        Fração da janela já observada: do bucket mais antigo com eventos
+        (inclusive os de um backfill) até o mais recente.
+        """
+        if self.head_bucket is None:
+            return 0.0
+        return min(1.0, (self.head_bucket - self.first_bucket + 1) / self.n_buckets)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (
+            self.counts, self.session_sum, self.session_count, self.totals,
+            self.session_total, self.session_n, self.last_event,
+        ))
+
+    # ------------------------------------------------------------------
+    # Janela
+    # ------------------------------------------------------------------
+
+    def _advance(self, bucket: int):
+        if self.head_bucket is None:
+            self.head_bucket = self.first_bucket = bucket
+            return
+        if bucket <= self.head_bucket:
+            return
+        used = self._capacity
+        # Os buckets que entram reutilizam os slots dos que expiram
+        for new_bucket in range(self.head_bucket + 1, min(bucket, self.head_bucket + self.n_buckets) + 1):
+            slot = new_bucket % self.n_buckets
+            self.totals[:used] -= self.counts[slot]
+            self.session_total[:used] -= self.session_sum[slot]
+            self.session_n[:used] -= self.session_count[slot]
+            self.counts[slot] = 0
+            self.session_sum[slot] = 0
+            self.session_count[slot] = 0
+        self.head_bucket = bucket
+
+    def advance(self, now: Optional[float] = None):
+        """Expira buckets até ``now`` (epoch em segundos; padrão: agora)."""
+        with self._lock:
+            self._advance(int((time.time() if now is None else now) // self.bucket_seconds))
+
+    # ------------------------------------------------------------------
+    # Ingestão
+    # ------------------------------------------------------------------
+
+    def apply(
+        self,
+        customer_ids: Sequence[str],
+        event_types: Sequence[str],
+        timestamps: Sequence[Any],
+        session_durations: Optional[Sequence[float]] = None,
+    ) -> int:
+        """
+        Aplica um lote de eventos.
+
+        Args:
+            customer_ids: Cliente de cada evento
+            event_types: Tipo de cada evento
+            timestamps: Epoch em segundos ou strings ISO 8601
+            session_durations: Duração da sessão em minutos (NaN se ausente)
+
+        Returns:
+            Número de eventos contabilizados
+        """
+        n_events = len(customer_ids)
+        if not n_events:
+            return 0
+        seconds = _epoch_seconds(timestamps)
+        codes = np.fromiter((self._type_codes.get(name, -1) for name in event_types),
+                            dtype=np.int64, count=n_events)
+        durations = (np.full(n_events, np.nan) if session_durations is None
+                     else np.asarray(session_durations, dtype=np.float64))
+
+        with self._lock:
+            buckets = (seconds // self.bucket_seconds).astype(np.int64)
+            self._advance(int(buckets.max()))
+            valid = (codes >= 0) & (buckets > self.head_bucket - self.n_buckets)
+            self.ignored += int(n_events - valid.sum())
+            if not valid.any():
+                return 0
+            # Backfill: eventos anteriores ao primeiro lote também contam
+            self.first_bucket = min(self.first_bucket, int(buckets[valid].min()))
+
+            ids = np.asarray(customer_ids, dtype=object)[valid]
+            positions = self.index.encode(ids.tolist(), add_missing=True).astype(np.int64)
+            self._ensure_capacity(len(self.index))
+            codes, seconds, durations = codes[valid], seconds[valid], durations[valid]
+            rows = (buckets[valid] % self.n_buckets) * self._capacity + positions
+
+            n_types = len(self.event_types)
+            cells, added = _saturating_add(self.counts.reshape(-1), rows * n_types + codes)
+            np.add.at(self.totals.reshape(-1), cells % (self._capacity * n_types), added)
+
+            timed = ~np.isnan(durations)
+            if timed.any():
+                cells, added = _saturating_add(self.session_count.reshape(-1), rows[timed])
+                np.add.at(self.session_n, cells % self._capacity, added)
+                np.add.at(self.session_sum.reshape(-1), rows[timed], durations[timed].astype(np.float32))
+                np.add.at(self.session_total, positions[timed], durations[timed])
+
+            np.fmax.at(self.last_event, positions, seconds)
+            return int(valid.sum())
+
+    def apply_messages(self, messages: Iterable[Any]) -> int:
+        """
+        Aplica mensagens no formato de ``customer_events``: ``customer_id``,
+        ``event_type``, ``event_timestamp`` e ``event_details`` (opcional).
+        """
+        records = [message.data for message in messages]
+        if not records:
+            return 0
+        durations = [
+            (record.get("event_details") or {}).get(SESSION_DETAIL, np.nan) for record in records
+        ]
+        return self.apply(
+            [record["customer_id"] for record in records],
+            [record["event_type"] for record in records],
+            [record["event_timestamp"] for record in records],
+            np.asarray([np.nan if value is None else value for value in durations], dtype=np.float64),
+        )
+
+    def consume(self, queue, subscription: str, max_messages: int = 10_000,
+                timeout: Optional[float] = None) -> int:
+        """
+        Puxa, aplica e confirma um lote. Eventos confirmados depois do último
+        checkpoint se perdem se o processo cair antes do próximo.
+        """
+        messages = queue.pull(subscription, max_messages=max_messages, timeout=timeout)
+        if messages:
+            self.apply_messages(messages)
+            queue.ack(subscription, [message.message_id for message in messages])
+        return len(messages)
+
+    def run(self, queue, subscription: str, stop: threading.Event,
+            checkpoint_path: Optional[Union[str, os.PathLike]] = None,
+            checkpoint_interval: Optional[float] = None, batch_size: int = 10_000):
+        """
+        Laço de consumo até ``stop``, com checkpoints periódicos.
+
+        Args:
+            checkpoint_path: Arquivo do checkpoint (padrão:
+                ``B2SHIFT_EVENT_FEATURES_CHECKPOINT``; sem checkpoint se vazio)
+            checkpoint_interval: Segundos entre checkpoints (padrão:
+                ``B2SHIFT_EVENT_CHECKPOINT_SECONDS``)
+        """
+        checkpoint_path = checkpoint_path or os.getenv("B2SHIFT_EVENT_FEATURES_CHECKPOINT") or None
+        if checkpoint_interval is None:
+            checkpoint_interval = float(os.getenv("B2SHIFT_EVENT_CHECKPOINT_SECONDS", 60))
+
+        next_checkpoint = time.monotonic() + checkpoint_interval
+        while not stop.is_set():
+            self.consume(queue, subscription, max_messages=batch_size, timeout=0.5)
+            if time.monotonic() >= next_checkpoint:
+                self.advance()
+                if checkpoint_path:
+                    self.save(checkpoint_path)
+                next_checkpoint = time.monotonic() + checkpoint_interval
+        if checkpoint_path:
+            self.save(checkpoint_path)
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def _feature_arrays(self, positions: np.ndarray) -> Dict[str, np.ndarray]:
+        known = positions >= 0
+        safe = np.where(known, positions, 0)
+        totals = self.totals[safe].astype(np.float64)
+        totals[~known] = np.nan
+
+        session_n = self.session_n[safe]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            session_avg = np.where(known & (session_n > 0), self.session_total[safe] / session_n, np.nan)
+
+        columns = {
+            "login_frequency": totals[:, self._type_codes["login"]] / (self.window_days / 7)
+            if "login" in self._type_codes else np.full(len(positions), np.nan),
+            "support_ticket_count": totals[:, self._type_codes["support_contact"]]
+            if "support_contact" in self._type_codes else np.full(len(positions), np.nan),
+            "session_duration_avg": session_avg,
+        }
+        for name, code in self._type_codes.items():
+            columns[f"{name}_count"] = totals[:, code]
+        columns["last_event_at"] = np.where(known, self.last_event[safe], np.nan)
+        return columns
+
+    def _positions(self, customer_ids: Sequence[str]) -> np.ndarray:
+        lookup = self.index.positions
+        return np.fromiter((lookup.get(cid, -1) for cid in customer_ids), dtype=np.int64,
+                           count=len(customer_ids))
+
+    def features(self, customer_ids: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Features da janela como tabela colunar (clientes desconhecidos -> NaN).
+
+        Args:
+            customer_ids: Clientes desejados (padrão: todos, na ordem do índice)
+        """
+        with self._lock:
+            if customer_ids is None:
+                positions = np.arange(len(self.index), dtype=np.int64)
+                ids = self.index.ids
+            else:
+                ids = np.asarray(list(customer_ids), dtype=object)
+                positions = self._positions(ids.tolist())
+            columns = self._feature_arrays(positions)
+        return {"customer_id": np.asarray(ids, dtype=object), **columns}
+
+    def overlay(self, columns: Mapping[str, Any], require_full_window: bool = True) -> Dict[str, np.ndarray]:
+        """
+        Substitui ``STREAMED_FEATURES`` em uma tabela de CustomerProfile pelos
+        valores da janela, para os clientes com eventos processados.
+
+        Args:
+            columns: Colunas (dict de arrays ou DataFrame) com ``customer_id``
+            require_full_window: Só substitui quando a janela inteira já foi
+                observada (senão as contagens estariam subestimadas)
+
+        Returns:
+            Cópia das colunas como dict de arrays
+        """
+        result = {name: np.asarray(values) for name, values in columns.items()}
+        if "customer_id" not in result or (require_full_window and self.coverage < 1.0):
+            return result
+
+        fresh = self.features(result["customer_id"].tolist())
+        n_rows = len(result["customer_id"])
+        for name in STREAMED_FEATURES:
+            values = fresh[name]
+            available = ~np.isnan(values)
+            if not available.any():
+                continue
+            current = (result[name].astype(np.float64) if name in result
+                       else np.full(n_rows, np.nan))
+            result[name] = np.where(available, values, current)
+        return result
+
+    # ------------------------------------------------------------------
+    # Checkpoint
+    # ------------------------------------------------------------------
+
+    def save(self, path: Union[str, os.PathLike]) -> Path:
+        """
+        Grava o estado em ``path`` (.npz), trocando o arquivo atomicamente.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+        with self._lock:
+            used = len(self.index)
+            with open(staging, "wb") as f:
+                np.savez(
+                    f,
+                    customer_ids=self.index.ids.astype(str),
+                    event_types=np.asarray(self.event_types, dtype=str),
+                    counts=self.counts[:, :used],
+                    session_sum=self.session_sum[:, :used],
+                    session_count=self.session_count[:, :used],
+                    session_total=self.session_total[:used],
+                    last_event=self.last_event[:used],
+                    clock=np.array([
+                        self.bucket_seconds,
+                        -1 if self.head_bucket is None else self.head_bucket,
+                        -1 if self.first_bucket is None else self.first_bucket,
+                        self.ignored,
+                    ], dtype=np.float64),
+                )
+        os.replace(staging, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Union[str, os.PathLike]) -> "EventFeatureStore":
+        """Restaura um checkpoint gravado por ``save``."""
+        with np.load(path, allow_pickle=False) as data:
+            bucket_seconds, head, first, ignored = data["clock"].tolist()
+            counts = data["counts"]
+            store = cls(
+                window_days=counts.shape[0] * bucket_seconds / 86400,
+                bucket_hours=bucket_seconds / 3600,
+                event_types=data["event_types"].tolist(),
+            )
+            customer_ids = data["customer_ids"].astype(object)
+            store.index = CustomerIdIndex(customer_ids)
+            store._allocate(len(customer_ids))
+            store.counts[:] = counts
+            store.session_sum[:] = data["session_sum"]
+            store.session_count[:] = data["session_count"]
+            store.session_total[:] = data["session_total"]
+            store.last_event[:] = data["last_event"]
+
+        # Contagens inteiras são recalculadas dos buckets (exatas)
+        store.totals[:] = store.counts.sum(axis=0, dtype=np.int64)
+        store.session_n[:] = store.session_count.sum(axis=0, dtype=np.int64)
+        store.head_bucket = None if head < 0 else int(head)
+        store.first_bucket = None if first < 0 else int(first)
+        store.ignored = int(ignored)
+        return store
+
+
+_active_store: Optional[EventFeatureStore] = None
+_checkpoint_cache: Dict[str, Any] = {}
+
+
+def set_feature_store(store: Optional[EventFeatureStore]):
+    """Registra o store do processo (quando o consumidor roda junto ao agente)."""
+    global _active_store
+    _active_store = store
+
+
+def get_feature_store() -> Optional[EventFeatureStore]:
+    """
+    Store de features em tempo real, se houver.
+
+    Usa o store registrado por ``set_feature_store`` ou o checkpoint de
+    ``B2SHIFT_EVENT_FEATURES_CHECKPOINT``, relido quando o arquivo muda.
+    """
+    if _active_store is not None:
+        return _active_store
+    path = os.getenv("B2SHIFT_EVENT_FEATURES_CHECKPOINT")
+    if not path:
+        return None
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _checkpoint_cache.get("key") != (path, mtime):
+        _checkpoint_cache["store"] = EventFeatureStore.load(path)
+        _checkpoint_cache["key"] = (path, mtime)
+    return _checkpoint_cache["store"]
+
+
+def event_records(customer_ids: Sequence[str], event_types: Sequence[str],
+                  timestamps: Sequence[float], session_durations: Sequence[float]) -> List[Dict[str, Any]]:
+    """Monta mensagens no formato de ``customer_events`` (útil para testes e backfill)."""
+    return [
+        {
+            "customer_id": customer_id,
+            "event_type": event_type,
+            "event_timestamp": float(timestamp),
+            "event_details": {} if np.isnan(duration) else {SESSION_DETAIL: float(duration)},
+        }
+        for customer_id, event_type, timestamp, duration
+        in zip(customer_ids, event_types, timestamps, session_durations)
+    ]
@@ -0,0 +1,219 @@
+"""
+Filas de mensagens para o processamento em streaming do B2Shift.
+
+``MessageQueue`` é a interface mínima usada pelos consumidores (publicar,
+puxar em lote, confirmar). ``InProcessQueue`` é o substituto local do
+Pub/Sub — thread-safe, com semântica de entrega pelo menos uma vez por
+assinatura — e ``PubSubQueue`` adapta o Google Cloud Pub/Sub quando
+``google-cloud-pubsub`` está instalado (extra ``pubsub``).
+
+O backend é escolhido por ``B2SHIFT_STREAM_BACKEND`` ("memory" ou
+"pubsub") em ``get_queue``.
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional, Protocol
+
+
+@dataclass
+class Message:
+    """
+    Mensagem recebida de uma assinatura.
+    """
+    message_id: str
+    data: Dict[str, Any]
+    attributes: Dict[str, str] = field(default_factory=dict)
+    publish_time: float = field(default_factory=time.time)
+
+
+class MessageQueue(Protocol):
+    """Interface das filas consumidas pelos processadores de streaming."""
+
+    def create_subscription(self, topic: str, subscription: str) -> None:
+        ...
+
+    def publish(self, topic: str, data: Dict[str, Any], **attributes: str) -> str:
+        ...
+
+    def pull(self, subscription: str, max_messages: int = 1000,
+             timeout: Optional[float] = None) -> List[Message]:
+        ...
+
+    def ack(self, subscription: str, message_ids: Iterable[str]) -> None:
+        ...
+
+
+class _Subscription:
+    __slots__ = ("pending", "in_flight")
+
+    def __init__(self):
+        self.pending: Deque[Message] = deque()
+        self.in_flight: Dict[str, Message] = {}
+
+
+class InProcessQueue:
+    """
+    Substituto local do Pub/Sub, em memória.
+
+    Cada assinatura recebe uma cópia de toda mensagem publicada no tópico
+    depois da sua criação. Mensagens puxadas ficam "em voo" até ``ack``;
+    ``nack`` as devolve para o início da fila.
+    """
+
+    def __init__(self):
+        self._topics: Dict[str, List[str]] = {}
+        self._subscriptions: Dict[str, _Subscription] = {}
+        self._condition = threading.Condition()
+        self._ids = itertools.count(1)
+
+    def create_subscription(self, topic: str, subscription: str) -> None:
+        with self._condition:
+            if subscription in self._subscriptions:
+                return
+            self._subscriptions[subscription] = _Subscription()
+            self._topics.setdefault(topic, []).append(subscription)
+
+    def publish(self, topic: str, data: Dict[str, Any], **attributes: str) -> str:
+        return self.publish_batch(topic, [data], **attributes)[0]
+
+    def publish_batch(self, topic: str, records: Iterable[Dict[str, Any]], **attributes: str) -> List[str]:
+        """Publica vários registros de uma vez (um lock para o lote)."""
+        now = time.time()
+        with self._condition:
+            ids = []
+            subscriptions = [self._subscriptions[name] for name in self._topics.get(topic, [])]
+            for data in records:
+                message_id = str(next(self._ids))
+                ids.append(message_id)
+                for subscription in subscriptions:
+                    subscription.pending.append(Message(message_id, data, dict(attributes), now))
+            self._condition.notify_all()
+        return ids
+
+    def pull(self, subscription: str, max_messages: int = 1000,
+             timeout: Optional[float] = None) -> List[Message]:
+        """
+        Puxa até ``max_messages``; espera até ``timeout`` segundos se vazia.
+        """
+        with self._condition:
+            state = self._subscriptions[subscription]
+            if not state.pending and timeout:
+                self._condition.wait_for(lambda: bool(state.pending), timeout=timeout)
+            count = min(max_messages, len(state.pending))
+            messages = [state.pending.popleft() for _ in range(count)]
+            for message in messages:
+                state.in_flight[message.message_id] = message
+        return messages
+
+    def ack(self, subscription: str, message_ids: Iterable[str]) -> None:
+        with self._condition:
+            in_flight = self._subscriptions[subscription].in_flight
+            for message_id in message_ids:
+                in_flight.pop(message_id, None)
+
+    def nack(self, subscription: str, message_ids: Iterable[str]) -> None:
+        """Devolve mensagens em voo para reentrega."""
+        with self._condition:
+            state = self._subscriptions[subscription]
+            returned = [state.in_flight.pop(message_id) for message_id in message_ids
+                        if message_id in state.in_flight]
+            state.pending.extendleft(reversed(returned))
+            self._condition.notify_all()
+
+    def backlog(self, subscription: str) -> int:
+        """Mensagens ainda não entregues na assinatura."""
+        with self._condition:
+            return len(self._subscriptions[subscription].pending)
+
+
+class PubSubQueue:
+    """
+    Adaptador do Google Cloud Pub/Sub para a interface ``MessageQueue``.
+
+    Mensagens são JSON em UTF-8. Tópicos e assinaturas são nomes curtos,
+    resolvidos no projeto ``project_id`` (padrão: ``GOOGLE_CLOUD_PROJECT``).
+    """
+
+    def __init__(self, project_id: Optional[str] = None):
+        try:
+            from google.cloud import pubsub_v1
+        except ImportError as e:
+            raise ImportError(
+                "PubSubQueue requer google-cloud-pubsub "
+                "(instale com: pip install 'b2shift-cluster-agent[pubsub]')"
+            ) from e
+
+        self.project_id = project_id or os.getenv("GOOGLE_CLOUD_PROJECT")
+        self._publisher = pubsub_v1.PublisherClient()
+        self._subscriber = pubsub_v1.SubscriberClient()
+
+    def _topic_path(self, topic: str) -> str:
+        return self._publisher.topic_path(self.project_id, topic)
+
+    def _subscription_path(self, subscription: str) -> str:
+        return self._subscriber.subscription_path(self.project_id, subscription)
+
+    def create_subscription(self, topic: str, subscription: str) -> None:
+        from google.api_core.exceptions import AlreadyExists
+
+        try:
+            self._subscriber.create_subscription(
+                request={"name": self._subscription_path(subscription), "topic": self._topic_path(topic)}
+            )
+        except AlreadyExists:
+            pass
+
+    def publish(self, topic: str, data: Dict[str, Any], **attributes: str) -> str:
+        future = self._publisher.publish(
+            self._topic_path(topic), json.dumps(data, default=str).encode("utf-8"), **attributes
+        )
+        return future.result()
+
+    def pull(self, subscription: str, max_messages: int = 1000,
+             timeout: Optional[float] = None) -> List[Message]:
+        response = self._subscriber.pull(
+            request={"subscription": self._subscription_path(subscription), "max_messages": max_messages},
+            timeout=timeout,
+        )
+        return [
+            Message(
+                # O ack do Pub/Sub usa o ack_id, não o ID da mensagem
+                message_id=received.ack_id,
+                data=json.loads(received.message.data.decode("utf-8")),
+                attributes=dict(received.message.attributes),
+                publish_time=received.message.publish_time.timestamp(),
+            )
+            for received in response.received_messages
+        ]
+
+    def ack(self, subscription: str, message_ids: Iterable[str]) -> None:
+        ack_ids = list(message_ids)
+        if ack_ids:
+            self._subscriber.acknowledge(
+                request={"subscription": self._subscription_path(subscription), "ack_ids": ack_ids}
+            )
+
+
+_default_queue: Optional[MessageQueue] = None
+
+
+def get_queue() -> MessageQueue:
+    """
+    Fila padrão do processo, conforme ``B2SHIFT_STREAM_BACKEND``.
+    """
+    global _default_queue
+    if _default_queue is None:
+        backend = os.getenv("B2SHIFT_STREAM_BACKEND", "memory")
+        if backend == "pubsub":
+            _default_queue = PubSubQueue()
+        elif backend == "memory":
+            _default_queue = InProcessQueue()
+        else:
+            raise ValueError(f"B2SHIFT_STREAM_BACKEND inválido: {backend} (use 'memory' ou 'pubsub')")
+    return _default_queue
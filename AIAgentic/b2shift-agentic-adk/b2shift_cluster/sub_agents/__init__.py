@@ -1,7 +1,31 @@
 # Sub-agents para o B2Shift Customer Clustering Agent
 
-from .data import data_agent
-from .cluster import cluster_agent  
-from .decision import decision_agent
+# Os agentes são construídos sob demanda: importar este pacote não carrega o
+# google-adk nem instancia os VertexAiCodeExecutor dos sub-agentes.
 
-__all__ = ["data_agent", "cluster_agent", "decision_agent"]
+import importlib
+
+from .data import create_data_agent
+from .cluster import create_cluster_agent
+from .decision import create_decision_agent
+
+_LAZY_AGENTS = {
+    "data_agent": ".data",
+    "cluster_agent": ".cluster",
+    "decision_agent": ".decision",
+}
+
+__all__ = [
+    "data_agent", "cluster_agent", "decision_agent",
+    "create_data_agent", "create_cluster_agent", "create_decision_agent",
+]
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_AGENTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    agent = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = agent
+    return agent
@@ -9,18 +9,38 @@ Este agente é responsável por:
 """
 
 import os
-from google.adk.agents import Agent
-from google.adk.code_executors import VertexAiCodeExecutor
 
-from ..prompts import return_instructions_data_agent
+from ...prompts import return_instructions_data_agent
 
 
-data_agent = Agent(
-    model=os.getenv("DATA_AGENT_MODEL", "gemini-1.5-flash"),
-    name="b2shift_data_agent",
-    instruction=return_instructions_data_agent(),
-    code_executor=VertexAiCodeExecutor(
-        optimize_data_file=True,
-        stateful=True,
-    ),
-)
+def create_data_agent():
+    """
+    Constrói uma nova instância do Data Agent.
+
+    As dependências do google-adk são importadas aqui para que importar este
+    módulo não tenha custo; use o atributo ``data_agent`` para obter a instância
+    compartilhada do processo.
+    """
+    from google.adk.agents import Agent
+    from google.adk.code_executors import VertexAiCodeExecutor
+
+    from ...runtime.models import routed_model
+
+    return Agent(
+        model=routed_model("data_agent", os.getenv("DATA_AGENT_MODEL", "gemini-1.5-flash")),
+        name="b2shift_data_agent",
+        instruction=return_instructions_data_agent(),
+        code_executor=VertexAiCodeExecutor(
+            optimize_data_file=True,
+            stateful=True,
+        ),
+    )
+
+
+def __getattr__(name: str):
+    # Instância única construída no primeiro acesso (PEP 562)
+    if name == "data_agent":
+        agent = create_data_agent()
+        globals()[name] = agent
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
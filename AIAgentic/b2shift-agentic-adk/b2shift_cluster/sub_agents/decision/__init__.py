@@ -10,13 +10,36 @@ Este agente é responsável por:
 """
 
 import os
-from google.adk.agents import Agent
 
-from ..prompts import return_instructions_decision_agent
+from ...prompts import return_instructions_decision_agent
 
 
-decision_agent = Agent(
-    model=os.getenv("DECISION_AGENT_MODEL", "gemini-1.5-pro"),
-    name="b2shift_decision_agent", 
-    instruction=return_instructions_decision_agent(),
-)
+def create_decision_agent():
+    """
+    Constrói uma nova instância do Decision Agent.
+
+    As dependências do google-adk são importadas aqui para que importar este
+    módulo não tenha custo; use o atributo ``decision_agent`` para obter a instância
+    compartilhada do processo.
+    """
+    from google.adk.agents import Agent
+
+    from ...models.structured import StrategyPlan
+    from ...runtime.models import routed_model
+
+    return Agent(
+        model=routed_model("decision_agent", os.getenv("DECISION_AGENT_MODEL", "gemini-1.5-pro")),
+        name="b2shift_decision_agent",
+        instruction=return_instructions_decision_agent(),
+        # Resposta restrita ao schema (JSON mode); validada em StrategyPlan
+        output_schema=StrategyPlan,
+    )
+
+
+def __getattr__(name: str):
+    # Instância única construída no primeiro acesso (PEP 562)
+    if name == "decision_agent":
+        agent = create_decision_agent()
+        globals()[name] = agent
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
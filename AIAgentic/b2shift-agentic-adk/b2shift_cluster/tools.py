@@ -5,15 +5,57 @@ Este módulo implementa as ferramentas específicas para análise de clusteriza
 de clientes B2B e geração de estratégias de negócio no contexto B2Shift.
 """
 
-import pandas as pd
-import numpy as np
 from typing import Dict, List, Any, Optional
 import json
 
 from google.adk.tools import ToolContext
-from google.adk.tools.agent_tool import AgentTool
 
-from .sub_agents import data_agent, cluster_agent, decision_agent
+from .runtime.singleflight import coalesce
+from .runtime.telemetry import record_call
+
+# AgentTool e os sub-agentes são importados dentro das funções: os agentes só
+# são construídos na primeira chamada que realmente precisa deles.
+
+
+def _structured_output(schema, output: Any):
+    """
+    Valida a saída de um sub-agente contra ``schema`` (ver
+    ``models.structured``). Retorna o modelo validado ou None.
+    """
+    try:
+        return schema.parse(output)
+    except ValueError as exc:
+        print(f"⚠️ Saída fora do schema {schema.__name__}: {exc}")
+        return None
+
+
+def _compact_output(structured, output: Any) -> Dict[str, Any]:
+    # O agente principal recebe só o resumo; a saída completa validada fica
+    # recuperável pelo handle em "details" (recall_context)
+    if structured is None:
+        return {"status": "unstructured", "output": output}
+    from .runtime.context import get_context_window
+
+    summary = structured.compact()
+    summary["details"] = get_context_window().store.put(structured.model_dump_json(exclude_none=True))
+    return {"status": "ok", **summary}
+
+
+async def _run_agent_tool(agent_tool, request: str, tool_context: ToolContext):
+    """
+    Executa o sub-agente e devolve (saída, mudanças de estado). As mudanças
+    são o que o AgentTool repassou à sessão de quem executou; numa chamada
+    coalescida, as sessões que só aguardaram as aplicam no próprio estado.
+    """
+    delta = tool_context.actions.state_delta
+    before = dict(delta)
+    output = await agent_tool.run_async(
+        args={"request": request},
+        tool_context=tool_context
+    )
+    changes = {key: value for key, value in delta.items()
+               if key not in before or before[key] is not value}
+    return output, changes
 
 
 async def call_data_agent(
@@ -32,12 +74,16 @@ async def call_data_agent(
     """
     print(f"\n🔄 Calling Data Agent: {request}")
     
+    from google.adk.tools.agent_tool import AgentTool
+    from .sub_agents import data_agent
+
     agent_tool = AgentTool(agent=data_agent)
     
-    data_agent_output = await agent_tool.run_async(
-        args={"request": request}, 
-        tool_context=tool_context
-    )
+    async with record_call("agent:data_agent"):
+        data_agent_output = await agent_tool.run_async(
+            args={"request": request}, 
+            tool_context=tool_context
+        )
     
     # Armazenar resultado no contexto para uso posterior
     tool_context.state["data_agent_output"] = data_agent_output
@@ -49,7 +95,7 @@ async def call_data_agent(
 async def call_cluster_agent(
     request: str,
     tool_context: ToolContext,
-) -> str:
+) -> Dict[str, Any]:
     """
     Chama o Cluster Agent para execução de algoritmos de clusterização.
     
@@ -58,23 +104,39 @@ async def call_cluster_agent(
         tool_context: Contexto da ferramenta com estado da sessão
         
     Returns:
-        Resultado da análise de clusterização
+        Resumo compacto da análise (métricas e uma linha por cluster), com
+        o handle da análise completa em "details"
     """
     print(f"\n🔄 Calling Cluster Agent: {request}")
     
     # Verificar se dados estão preparados
     if not tool_context.state.get("data_prepared", False):
-        return "❌ Erro: Dados não preparados. Execute primeiro o call_data_agent."
+        return {"status": "error", "error": "Dados não preparados. Execute primeiro o call_data_agent."}
     
+    from google.adk.tools.agent_tool import AgentTool
+    from .models import ClusterResult
+    from .models.structured import ClusterAnalysis, encode_records
+    from .sub_agents import cluster_agent
+
     agent_tool = AgentTool(agent=cluster_agent)
+
+    async def run():
+        output, changes = await _run_agent_tool(agent_tool, request, tool_context)
+        return _structured_output(ClusterAnalysis, output), output, changes
     
-    cluster_agent_output = await agent_tool.run_async(
-        args={"request": request}, 
-        tool_context=tool_context
-    )
+    # Pedidos idênticos em voo (mesma requisição sobre a mesma versão dos
+    # dados e dos modelos) compartilham uma única execução
+    async with record_call("agent:cluster_agent"):
+        analysis, output, changes = await coalesce("cluster_agent", request, run)
+    tool_context.state.update(changes)
+    cluster_agent_output = _compact_output(analysis, output)
     
-    # Armazenar resultado no contexto
+    # Armazenar resultado no contexto: resumo e os ClusterResult validados
+    # (lote B2SB; ler com decode_records(ClusterResult, ...))
     tool_context.state["cluster_agent_output"] = cluster_agent_output
+    tool_context.state["cluster_results"] = (
+        encode_records(ClusterResult, analysis.results()) if analysis else None
+    )
     tool_context.state["clusters_identified"] = True
     
     return cluster_agent_output
@@ -83,7 +145,7 @@ async def call_cluster_agent(
 async def call_decision_agent(
     request: str,
     tool_context: ToolContext,
-) -> str:
+) -> Dict[str, Any]:
     """
     Chama o Decision Agent para geração de estratégias de negócio.
     
@@ -92,23 +154,40 @@ async def call_decision_agent(
         tool_context: Contexto da ferramenta com estado da sessão
         
     Returns:
-        Estratégias e recomendações de negócio
+        Resumo compacto das estratégias (uma linha por cluster), com o
+        handle do plano completo em "details"
     """
     print(f"\n🔄 Calling Decision Agent: {request}")
     
     # Verificar se clusters foram identificados
     if not tool_context.state.get("clusters_identified", False):
-        return "❌ Erro: Clusters não identificados. Execute primeiro o call_cluster_agent."
+        return {"status": "error", "error": "Clusters não identificados. Execute primeiro o call_cluster_agent."}
     
+    from google.adk.tools.agent_tool import AgentTool
+    from .models import BusinessStrategy
+    from .models.structured import StrategyPlan, encode_records
+    from .sub_agents import decision_agent
+
     agent_tool = AgentTool(agent=decision_agent)
+
+    async def run():
+        # Com output_schema, o AgentTool já devolve o dict validado
+        output, changes = await _run_agent_tool(agent_tool, request, tool_context)
+        return _structured_output(StrategyPlan, output), output, changes
     
-    decision_agent_output = await agent_tool.run_async(
-        args={"request": request}, 
-        tool_context=tool_context
-    )
+    # Pedidos idênticos em voo (mesma requisição sobre a mesma versão dos
+    # dados e dos modelos) compartilham uma única execução
+    async with record_call("agent:decision_agent"):
+        plan, output, changes = await coalesce("decision_agent", request, run)
+    tool_context.state.update(changes)
+    decision_agent_output = _compact_output(plan, output)
     
-    # Armazenar resultado no contexto
+    # Armazenar resultado no contexto: resumo e os BusinessStrategy validados
+    # (lote B2SB; ler com decode_records(BusinessStrategy, ...))
     tool_context.state["decision_agent_output"] = decision_agent_output
+    tool_context.state["business_strategies"] = (
+        encode_records(BusinessStrategy, plan.strategies) if plan else None
+    )
     tool_context.state["strategies_generated"] = True
     
     return decision_agent_output
@@ -339,6 +418,115 @@ def evaluate_cluster_quality(
         return f"❌ Erro na avaliação de qualidade: {str(e)}"
 
 
+def query_customer_data(
+    table: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[List[Dict[str, Any]]] = None,
+    group_by: Optional[List[str]] = None,
+    aggregates: Optional[Dict[str, str]] = None,
+    order_by: Optional[List[str]] = None,
+    limit: int = 100,
+    tool_context: ToolContext = None,
+) -> str:
+    """
+    Consulta o warehouse de clientes com filtros e agregações executados no banco.
+
+    Prefira agregações (``group_by`` + ``aggregates``) a extrair linhas brutas.
+
+    Args:
+        table: customers, customer_usage, customer_events ou customer_clusters
+            (cluster e confiança por cliente: cluster_id, cluster_confidence,
+            second_cluster_id, low_confidence)
+        columns: Colunas a retornar (projeção)
+        filters: Lista de {"column", "op", "value"}; op em =, !=, <, <=, >, >=,
+            in, not in, between, is null, is not null, like
+        group_by: Colunas de agrupamento
+        aggregates: alias -> "função(coluna)" com count, count_distinct, sum,
+            avg, min ou max (ex.: {"mrr_total": "sum(mrr)"})
+        order_by: Colunas/aliases; prefixo "-" para decrescente
+        limit: Máximo de linhas (até 1000)
+        tool_context: Contexto da ferramenta
+
+    Returns:
+        Resultado em tabela markdown
+    """
+    print(f"\n🗄️ Querying {table}...")
+
+    try:
+        from .data.warehouse import Query, get_data_source
+
+        query = Query(
+            table=table,
+            columns=columns or (),
+            filters=[(item["column"], item.get("op", "="), item.get("value")) for item in filters or []],
+            group_by=group_by or (),
+            aggregates=aggregates or {},
+            order_by=order_by or (),
+            limit=max(1, min(int(limit), 1000)),
+        )
+        frame = get_data_source().to_pandas(query)
+
+        if tool_context is not None:
+            tool_context.state["last_query"] = {
+                "table": table,
+                "rows": len(frame),
+                "columns": list(frame.columns),
+            }
+
+        if frame.empty:
+            return f"Consulta em {table} não retornou linhas."
+
+        def cell(value):
+            return f"{value:.4g}" if isinstance(value, float) else str(value)
+
+        lines = ["| " + " | ".join(frame.columns) + " |", "|" + "---|" * len(frame.columns)]
+        lines += ["| " + " | ".join(cell(value) for value in row) + " |"
+                  for row in frame.itertuples(index=False)]
+        return f"## 🗄️ {table} ({len(frame)} linhas)\n\n" + "\n".join(lines)
+
+    except Exception as e:
+        return f"❌ Erro na consulta: {str(e)}"
+
+
+def recall_context(
+    handle: str,
+    tool_context: ToolContext = None,
+) -> str:
+    """
+    Recupera um conteúdo retirado do contexto da conversa (saída completa de
+    ferramenta ou resposta de um turno antigo) pelo handle ``ctx:...``.
+
+    Args:
+        handle: Handle citado no resumo ou na prévia da saída (ex.: ctx:9f2c...)
+        tool_context: Contexto da ferramenta
+
+    Returns:
+        Conteúdo completo, ou aviso se o handle expirou
+    """
+    from .runtime.context import get_context_window
+
+    text = get_context_window().store.get(handle)
+    if text is None:
+        return f"❌ Handle {handle} não encontrado (expirado ou inválido). Refaça a consulta."
+    return text
+
+
+# Vizinhos consultados por predição quando há artefato de clusterização
+_SIMILAR_CUSTOMERS = 25
+
+
+def _probability_level(probability: float) -> str:
+    if probability >= 0.8:
+        return "Muito Alta"
+    if probability >= 0.6:
+        return "Alta"
+    if probability >= 0.4:
+        return "Moderada"
+    if probability >= 0.2:
+        return "Baixa"
+    return "Muito Baixa"
+
+
 def predict_customer_behavior(
     customer_profile: Dict[str, Any],
     prediction_horizon: str = "6_months",
@@ -347,8 +535,15 @@ def predict_customer_behavior(
     """
     Prediz comportamentos futuros de clientes baseado no cluster.
     
+    O cálculo usa o motor de scoring em lote (analytics.scoring) com um único
+    cliente; para a base inteira use ``BehaviorScorer.score`` diretamente.
+    Com um artefato de clusterização configurado
+    (``B2SHIFT_CLUSTERING_ARTIFACT``) e perfil com as features dele, a prior
+    vem dos clusters dos clientes mais similares (índice de vizinhos).
+    
     Args:
-        customer_profile: Perfil do cliente para predição
+        customer_profile: Perfil do cliente para predição (campos de
+            CustomerProfile; ``cluster_id`` e ``cluster_name`` opcionais)
         prediction_horizon: Horizonte de predição (3_months, 6_months, 1_year)
         tool_context: Contexto da ferramenta
         
@@ -358,48 +553,98 @@ def predict_customer_behavior(
     print(f"\n🔮 Predicting Customer Behavior for {prediction_horizon}...")
     
     try:
+        import numpy as np
+
+        from .analytics.artifact import default_artifact
+        from .analytics.scoring import BehaviorScorer
+        from .streaming.features import get_feature_store
+
+        columns = {name: [value] for name, value in customer_profile.items()}
+        columns.setdefault("customer_id", ["unknown"])
+
+        neighbor_clusters = None
+        artifact = default_artifact()
+        if artifact is not None:
+            try:
+                _, positions = artifact.similar_customers(columns, k=_SIMILAR_CUSTOMERS)
+                labels = np.asarray(artifact.labels)
+                neighbor_clusters = np.where(positions >= 0, labels[np.maximum(positions, 0)], -1)
+            except (KeyError, FileNotFoundError) as e:
+                # Perfil sem as features do artefato ou artefato sem índice
+                print(f"⚠️ Clientes similares indisponíveis: {e}")
+
+        # Features da janela de eventos, quando o consumidor está ativo ou há
+        # checkpoint configurado (B2SHIFT_EVENT_FEATURES_CHECKPOINT)
+        scorer = BehaviorScorer(feature_store=get_feature_store())
+        prediction = scorer.predict(columns, horizon=prediction_horizon,
+                                    neighbor_clusters=neighbor_clusters)[0]
+
+        cluster_name = customer_profile.get("cluster_name") or (
+            f"Cluster {prediction.cluster_id}" if prediction.cluster_id >= 0 else "Não atribuído"
+        )
+        if neighbor_clusters is not None:
+            clusters, counts = np.unique(neighbor_clusters[0], return_counts=True)
+            spread = ", ".join(f"{count} no cluster {cluster}" for cluster, count in zip(clusters, counts))
+            base = (f"Taxas históricas dos clusters dos {neighbor_clusters.shape[1]} clientes "
+                    f"mais similares ({spread})")
+        else:
+            _, cluster_counts = scorer.priors.lookup([prediction.cluster_id])
+            base = (
+                f"Taxas históricas de {int(cluster_counts[0]):,} clientes do cluster {cluster_name}"
+                if cluster_counts[0] > 0 else "Taxas de referência globais (cluster sem histórico)"
+            )
+
+        def listed(items):
+            return "\n".join(f"{i}. {item}" for i, item in enumerate(items, 1)) or "- Nenhum identificado"
+
+        timing = "\n".join(f"- **{when}**: {what}" for when, what in prediction.optimal_timing.items())
+
         prediction_result = f"""
 ## 🔮 PREDIÇÃO DE COMPORTAMENTO DO CLIENTE
 
 ### Perfil Analisado
-- **Cluster Identificado**: Mid-Market Tech
-- **Confidence Level**: 92%
+- **Cliente**: {prediction.customer_id}
+- **Cluster Identificado**: {cluster_name}
 - **Horizonte de Predição**: {prediction_horizon}
 
 ### Predições Principais
 
 #### 💰 Comportamento de Compra
-- **Probabilidade de Upgrade**: 73% (Alta)
-- **Expansão de Produtos**: 68% (Moderada-Alta)
-- **Renovação de Contrato**: 89% (Muito Alta)
-- **Churn Risk**: 12% (Baixo)
-
-#### 📈 Engajamento Esperado
-- **Uso de Features**: +25% vs baseline
-- **API Calls**: +40% nos próximos 3 meses
-- **Support Tickets**: -15% (melhoria na adoção)
-- **Training Participation**: 85% probabilidade
+- **Probabilidade de Upgrade**: {prediction.upgrade_probability:.0%} ({_probability_level(prediction.upgrade_probability)})
+- **Expansão de Produtos**: {prediction.expansion_probability:.0%} ({_probability_level(prediction.expansion_probability)})
+- **Renovação de Contrato**: {prediction.renewal_probability:.0%} ({_probability_level(prediction.renewal_probability)})
+- **Churn Risk**: {prediction.churn_probability:.0%} ({_probability_level(prediction.churn_probability)})
 
 #### 🎯 Oportunidades Identificadas
-1. **Cross-sell**: Integration modules (78% probabilidade)
-2. **Up-sell**: Advanced analytics (65% probabilidade)
-3. **Expansion**: Additional users (82% probabilidade)
-4. **Advocacy**: Reference customer (71% probabilidade)
+{listed(prediction.cross_sell_opportunities + prediction.upsell_opportunities)}
 
 ### Fatores de Risco
-- **Price Sensitivity**: Moderada (monitorar competição)
-- **Tech Changes**: Alta capacidade de adaptação
-- **Market Conditions**: Sensível a economic downturn
+{listed(prediction.risk_factors)}
+
+### Estratégias de Mitigação
+{listed(prediction.mitigation_strategies)}
 
 ### Ações Recomendadas
-1. **Próximos 30 dias**: Apresentar roadmap de integrações
-2. **60 dias**: Propor pilot de advanced analytics
-3. **90 dias**: Discutir expansion plan
-4. **6 meses**: Avaliar para customer success story
+{listed(prediction.recommended_actions)}
 
-### Confiança da Predição: 87% ✅
-**Base**: Análise de 1,247 clientes similares no cluster Mid-Market Tech
+### Timing
+{timing}
+
+### Confiança da Predição: {prediction.confidence_score:.0%}
+**Base**: {base}
         """
+
+        if tool_context is not None:
+            tool_context.state["last_prediction"] = {
+                "customer_id": prediction.customer_id,
+                "cluster_id": prediction.cluster_id,
+                "prediction_horizon": prediction_horizon,
+                "churn_probability": prediction.churn_probability,
+                "upgrade_probability": prediction.upgrade_probability,
+                "expansion_probability": prediction.expansion_probability,
+                "renewal_probability": prediction.renewal_probability,
+                "confidence_score": prediction.confidence_score,
+            }
         
         return prediction_result.strip()
         
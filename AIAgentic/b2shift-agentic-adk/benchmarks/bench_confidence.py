@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark da confiança por cliente (analytics.confidence).
+
+Gera clientes sintéticos em clusters gaussianos, calcula a silhueta
+simplificada de todos, a silhueta exata de uma amostra contra a base
+inteira e confere a silhueta exata com ``silhouette_samples`` do
+scikit-learn num subconjunto (cujo custo O(n²) é extrapolado para a base).
+
+Uso:
+    python benchmarks/bench_confidence.py [--rows 1000000] [--sample 1000] [--jobs 4]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from b2shift_cluster.analytics.confidence import (  # noqa: E402
+    cluster_confidence,
+    confidence_summary,
+    sample_silhouette,
+)
+
+
+def synthetic_embedding(n_rows: int, n_clusters: int, n_dims: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=4.0, size=(n_clusters, n_dims))
+    labels = rng.integers(0, n_clusters, n_rows)
+    Z = centers[labels] + rng.normal(scale=rng.uniform(1.0, 2.5, n_clusters)[labels, None],
+                                     size=(n_rows, n_dims))
+    centroids = np.stack([Z[labels == c].mean(axis=0) for c in range(n_clusters)])
+    return Z, labels, centroids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift per-customer cluster confidence benchmark")
+    parser.add_argument("--rows", "-n", type=int, default=1_000_000)
+    parser.add_argument("--clusters", "-k", type=int, default=8)
+    parser.add_argument("--dims", "-d", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=1_000)
+    parser.add_argument("--check-rows", type=int, default=10_000)
+    parser.add_argument("--jobs", "-j", type=int, default=None)
+    args = parser.parse_args()
+
+    Z, labels, centroids = synthetic_embedding(args.rows, args.clusters, args.dims)
+    ids = np.array([f"CUST_{i:07d}" for i in range(args.rows)], dtype=object)
+
+    start = time.perf_counter()
+    result = cluster_confidence(Z, centroids, labels=labels, customer_ids=ids, n_jobs=args.jobs)
+    simplified_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sample = sample_silhouette(Z, labels, sample_size=args.sample, centroids=centroids, n_jobs=args.jobs)
+    sample_elapsed = time.perf_counter() - start
+
+    print(f"{args.rows:,} clientes, {args.clusters} clusters, {args.dims} dimensões")
+    print(f"silhueta simplificada (todos):      {simplified_elapsed:.2f}s "
+          f"({args.rows / simplified_elapsed:,.0f} clientes/s)")
+    print(f"silhueta exata ({args.sample:,} vs. base):  {sample_elapsed:.2f}s, média {sample.mean:.3f}")
+    agreement = sample.agreement()
+    print(f"simplificada vs. exata na amostra: Spearman {agreement['spearman']:.3f}, "
+          f"|diferença| média {agreement['mean_abs_diff']:.3f}")
+    low = result.low_confidence()
+    print(f"baixa confiança: {int(low.sum()):,} contas ({low.mean():.1%})\n")
+
+    try:
+        from sklearn.metrics import silhouette_samples
+    except ImportError:
+        silhouette_samples = None
+    if silhouette_samples is not None:
+        rows = min(args.check_rows, args.rows)
+        check = sample_silhouette(Z[:rows], labels[:rows], sample_size=min(500, rows), n_jobs=args.jobs)
+        start = time.perf_counter()
+        exact = silhouette_samples(Z[:rows], labels[:rows])
+        exact_elapsed = time.perf_counter() - start
+        error = float(np.abs(check.silhouette - exact[check.indices]).max())
+        print(f"silhouette_samples ({rows:,} linhas): {exact_elapsed:.2f}s "
+              f"(~{exact_elapsed * (args.rows / rows) ** 2:,.0f}s extrapolado para a base)")
+        print(f"erro máx. da silhueta exata amostrada vs. scikit-learn: {error:.1e}\n")
+
+    print(f"{'cluster':>7} {'clientes':>10} {'conf. média':>12} {'mediana':>8} {'baixa':>7}")
+    for row in confidence_summary(result):
+        print(f"{row['cluster_id']:>7} {row['customers']:>10,} {row['mean_confidence']:>12.3f} "
+              f"{row['median_confidence']:>8.3f} {row['low_confidence_share']:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
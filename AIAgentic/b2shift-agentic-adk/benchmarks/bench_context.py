@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark da janela de contexto do agente principal (runtime.context).
+
+Simula uma sessão de análise com saídas grandes de ferramentas e mede, a
+cada turno, os tokens enviados ao modelo com e sem a janela limitada e o
+tempo gasto para compactar o histórico. Requer google-genai (dependência
+do google-adk).
+
+Uso:
+    python benchmarks/bench_context.py [--turns 50] [--max-tokens 32000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+from google.genai import types
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from b2shift_cluster.runtime.context import ContextWindow, content_tokens  # noqa: E402
+
+TOOLS = ["call_cluster_agent", "query_customer_data", "call_decision_agent", "analyze_customer_clusters"]
+
+
+def synthetic_turn(rng: random.Random, number: int):
+    question = f"Turno {number}: analise o cluster {rng.choice(['SMB', 'Enterprise', 'Startups'])} " * 8
+    tool = rng.choice(TOOLS)
+    rows = "\n".join(f"| CUST_{i:05d} | {rng.random():.3f} | {rng.randint(1, 9)} |"
+                     for i in range(rng.randint(200, 700)))
+    answer = " ".join(f"insight {number}.{i} sobre retenção e expansão" for i in range(rng.randint(60, 160)))
+    return [
+        types.Content(role="user", parts=[types.Part(text=question)]),
+        types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+            id=f"call-{number}", name=tool, args={"request": question[:120]}))]),
+        types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+            id=f"call-{number}", name=tool, response={"result": rows}))]),
+        types.Content(role="model", parts=[types.Part(text=answer)]),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift bounded context benchmark")
+    parser.add_argument("--turns", "-n", type=int, default=50)
+    parser.add_argument("--max-tokens", type=int, default=32_000)
+    parser.add_argument("--recent-turns", type=int, default=6)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    window = ContextWindow(max_tokens=args.max_tokens, recent_turns=args.recent_turns)
+    history = []
+    history_tokens = 0
+    print(f"{'turno':>5} {'histórico (tokens)':>19} {'enviado (tokens)':>17} {'resumidos':>10} {'compactação':>12}")
+    for number in range(1, args.turns + 1):
+        turn = synthetic_turn(rng, number)
+        # O modelo é chamado com a pergunta nova (e o histórico anterior)
+        history.append(turn[0])
+        history_tokens += content_tokens(turn[0])
+        start = time.perf_counter()
+        contents, stats = window.compact(history, session="bench")
+        elapsed = time.perf_counter() - start
+        assert sum(content_tokens(c) for c in contents) == stats.tokens <= args.max_tokens
+        if number == 1 or number % 5 == 0:
+            print(f"{number:>5} {history_tokens:>19,} {stats.tokens:>17,} "
+                  f"{stats.summarized_turns:>10} {elapsed * 1000:>10.2f}ms")
+        history.extend(turn[1:])
+        history_tokens += sum(content_tokens(c) for c in turn[1:])
+
+
+if __name__ == "__main__":
+    main()
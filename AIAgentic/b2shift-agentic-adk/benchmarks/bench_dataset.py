@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark do layout colunar particionado (data.dataset).
+
+Compara a leitura de um CSV (reparse do texto a cada consumidor) com a
+leitura do dataset com projeção de colunas e pruning por partição/estatística.
+
+Uso:
+    python benchmarks/bench_dataset.py [--rows 5000000]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from b2shift_cluster.data.dataset import Dataset, write_dataset  # noqa: E402
+from bench_usage import synthetic_usage  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift partitioned dataset benchmark")
+    parser.add_argument("--rows", "-n", type=int, default=5_000_000)
+    parser.add_argument("--customers", type=int, default=100_000)
+    args = parser.parse_args()
+
+    as_of = pd.Timestamp("2026-01-31").date()
+    frame = synthetic_usage(args.rows, args.customers, as_of, seed=0)
+    filters = [("product_module", "=", "CRM"), ("usage_date", ">=", "2026-01-01")]
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = Path(directory) / "usage.csv"
+        frame.to_csv(csv_path, sep=";", index=False)
+        start = time.perf_counter()
+        write_dataset(frame, Path(directory) / "customer_usage",
+                      partition_by=["product_module"], date_column="usage_date")
+        write = time.perf_counter() - start
+
+        start = time.perf_counter()
+        raw = pd.read_csv(csv_path, sep=";", parse_dates=["usage_date"])
+        raw = raw.loc[(raw.product_module == "CRM") & (raw.usage_date >= "2026-01-01"),
+                      ["customer_id", "usage_value"]]
+        csv_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        dataset = Dataset(Path(directory) / "customer_usage")
+        pruned = dataset.prune(filters)
+        result = dataset.read(["customer_id", "usage_value"], filters)
+        dataset_time = time.perf_counter() - start
+
+    print(f"{args.rows:,} linhas; dataset com {len(dataset.fragments)} fragmentos (gravação: {write:.2f}s)")
+    print(f"CSV + filtro:            {csv_time:7.2f}s ({len(raw):,} linhas)")
+    print(f"dataset (2 colunas):     {dataset_time:7.2f}s ({len(result['usage_value']):,} linhas, "
+          f"{len(pruned)}/{len(dataset.fragments)} fragmentos lidos)")
+    print(f"soma confere: {np.isclose(raw.usage_value.sum(), result['usage_value'].sum())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark da redução de dimensionalidade (analytics.decomposition).
+
+Compara ``sklearn.decomposition.PCA(n_components=<fração>)`` com os modos
+de ReducedPCA em uma matriz sintética de posto baixo + ruído (perfil de
+features padronizadas com muitas colunas dummy).
+
+Uso:
+    python benchmarks/bench_decomposition.py [--customers 300000] [--features 200]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from b2shift_cluster.analytics.decomposition import ReducedPCA  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift PCA benchmark")
+    parser.add_argument("--customers", "-n", type=int, default=300_000)
+    parser.add_argument("--features", "-f", type=int, default=200)
+    parser.add_argument("--rank", type=int, default=15, help="Posto do sinal sintético")
+    parser.add_argument("--variance", type=float, default=0.8)
+    parser.add_argument("--skip-sklearn", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(args.customers, args.rank)) @ rng.normal(size=(args.rank, args.features))
+    X += 0.3 * rng.normal(size=X.shape)
+
+    rows = []
+    if not args.skip_sklearn:
+        from sklearn.decomposition import PCA
+
+        start = time.perf_counter()
+        pca = PCA(n_components=args.variance, svd_solver="full").fit(X)
+        rows.append(("sklearn PCA (full)", time.perf_counter() - start,
+                     pca.n_components_, pca.explained_variance_ratio_.sum()))
+
+    for method in ("covariance", "randomized", "incremental"):
+        start = time.perf_counter()
+        reducer = ReducedPCA(n_components=args.variance, method=method).fit(X)
+        rows.append((f"ReducedPCA {method}", time.perf_counter() - start,
+                     reducer.n_components_, reducer.explained_variance_ratio_.sum()))
+
+    print(f"{args.customers:,} clientes x {args.features} features, alvo {args.variance:.0%} da variância")
+    print(f"\n{'método':<26}{'tempo (s)':>10}{'comp.':>7}{'variância':>11}")
+    print("-" * 54)
+    for label, elapsed, n_components, explained in rows:
+        print(f"{label:<26}{elapsed:>10.2f}{n_components:>7}{explained:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
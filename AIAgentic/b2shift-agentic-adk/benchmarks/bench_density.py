@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark da clusterização por densidade (analytics.density).
+
+Mede a construção do grafo k-NN (uma vez), a MST por min_samples, uma
+varredura de eps e o HDBSCAN sobre o mesmo grafo.
+
+Uso:
+    python benchmarks/bench_density.py [--customers 200000] [--dims 10]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from b2shift_cluster.analytics.density import DensityClusterer  # noqa: E402
+from bench_neighbors import synthetic_embedding  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift density clustering benchmark")
+    parser.add_argument("--customers", "-n", type=int, default=200_000)
+    parser.add_argument("--dims", "-d", type=int, default=10)
+    parser.add_argument("--neighbors", type=int, default=32)
+    parser.add_argument("--method", default="ivf", help="Método do NeighborIndex (ivf, kd_tree...)")
+    parser.add_argument("--min-samples", type=int, nargs="+", default=[5, 10])
+    parser.add_argument("--min-cluster-size", type=int, default=500)
+    args = parser.parse_args()
+
+    X = synthetic_embedding(args.customers, args.dims)
+    timings = []
+
+    start = time.perf_counter()
+    clusterer = DensityClusterer(n_neighbors=args.neighbors, index_params={"method": args.method}).fit(X)
+    timings.append((f"grafo k-NN ({args.method})", time.perf_counter() - start, ""))
+
+    for min_samples in args.min_samples:
+        start = time.perf_counter()
+        clusterer.mutual_reachability_mst(min_samples)
+        timings.append((f"MST min_samples={min_samples}", time.perf_counter() - start, ""))
+
+        base = clusterer.suggest_eps(min_samples, 0.5)
+        for eps in (0.75 * base, base, 1.5 * base):
+            start = time.perf_counter()
+            result = clusterer.dbscan(eps, min_samples)
+            timings.append((
+                f"  dbscan eps={eps:.2f}",
+                time.perf_counter() - start,
+                f"{result.n_clusters} clusters, ruído {result.noise_ratio:.1%}",
+            ))
+
+    start = time.perf_counter()
+    result = clusterer.hdbscan(args.min_cluster_size, args.min_samples[0])
+    timings.append((
+        f"hdbscan mcs={args.min_cluster_size}",
+        time.perf_counter() - start,
+        f"{result.n_clusters} clusters, ruído {result.noise_ratio:.1%}",
+    ))
+
+    print(f"{args.customers:,} clientes x {args.dims} dims, k={args.neighbors}")
+    print(f"\n{'etapa':<30}{'tempo (s)':>10}  resultado")
+    print("-" * 70)
+    for label, elapsed, detail in timings:
+        print(f"{label:<30}{elapsed:>10.2f}  {detail}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark do monitor de drift em streaming (streaming.drift).
+
+Publica atualizações de atribuição sintéticas em uma InProcessQueue — uma
+fração dos clientes migra de um cluster para outro — e mede a vazão do
+consumidor e o tempo de cada snapshot.
+
+Uso:
+    python benchmarks/bench_drift.py [--customers 1000000] [--updates 500000]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from b2shift_cluster.analytics.artifact import ClusteringArtifact  # noqa: E402
+from b2shift_cluster.streaming.drift import ASSIGNMENTS_TOPIC, ClusterDriftMonitor  # noqa: E402
+from b2shift_cluster.streaming.queue import InProcessQueue  # noqa: E402
+from bench_neighbors import synthetic_embedding  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift streaming drift benchmark")
+    parser.add_argument("--customers", "-n", type=int, default=1_000_000)
+    parser.add_argument("--dims", "-d", type=int, default=10)
+    parser.add_argument("--clusters", "-k", type=int, default=22)
+    parser.add_argument("--updates", "-u", type=int, default=500_000)
+    parser.add_argument("--migration", type=float, default=0.1,
+                        help="fração das atualizações que migra para o cluster 0")
+    parser.add_argument("--batch", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    X = synthetic_embedding(args.customers, args.dims, n_clusters=args.clusters)
+    centroids = np.stack([X[i::args.clusters][:1000].mean(axis=0) for i in range(args.clusters)])
+    labels = np.argmin(
+        np.einsum("ij,ij->i", centroids, centroids)[None, :] - 2 * X @ centroids.T, axis=1
+    )
+    customer_ids = np.array([f"C{i:08d}" for i in range(args.customers)], dtype=object)
+    artifact = ClusteringArtifact(
+        feature_names=[f"pc_{i + 1}" for i in range(args.dims)],
+        centroids=centroids, labels=labels, customer_ids=customer_ids, embedding=X,
+    )
+
+    start = time.perf_counter()
+    monitor = ClusterDriftMonitor.from_artifact(artifact)
+    init = time.perf_counter() - start
+
+    # Atualizações: pequeno ruído no vetor; uma fração migra para o cluster 0
+    rows = rng.integers(0, args.customers, args.updates)
+    vectors = X[rows] + rng.normal(scale=0.05, size=(args.updates, args.dims))
+    new_labels = labels[rows].copy()
+    migrate = rng.random(args.updates) < args.migration
+    vectors[migrate] = centroids[0] + rng.normal(scale=0.5, size=(int(migrate.sum()), args.dims))
+    new_labels[migrate] = 0
+
+    queue = InProcessQueue()
+    queue.create_subscription(ASSIGNMENTS_TOPIC, "drift-monitor")
+    records = [
+        {"customer_id": customer_ids[row], "cluster_id": int(label), "vector": vector.tolist()}
+        for row, label, vector in zip(rows.tolist(), new_labels.tolist(), vectors)
+    ]
+    start = time.perf_counter()
+    queue.publish_batch(ASSIGNMENTS_TOPIC, records)
+    publish = time.perf_counter() - start
+
+    start = time.perf_counter()
+    processed = 0
+    while processed < args.updates:
+        processed += monitor.consume(queue, "drift-monitor", max_messages=args.batch)
+    consume = time.perf_counter() - start
+
+    start = time.perf_counter()
+    report = monitor.snapshot()
+    snapshot = time.perf_counter() - start
+
+    # Conferência: médias incrementais vs. recálculo completo
+    final_labels = labels.copy()
+    final_vectors = X.astype(np.float64)
+    final_labels[rows] = new_labels
+    final_vectors[rows] = vectors
+    expected = np.stack([final_vectors[final_labels == c].mean(axis=0) for c in range(args.clusters)])
+    error = float(np.abs(monitor.centroids() - expected).max())
+
+    print(f"{args.customers:,} clientes x {args.dims} dims, {args.clusters} clusters")
+    print(f"estado inicial:  {init:.2f}s")
+    print(f"publicação:      {publish:.2f}s ({args.updates:,} mensagens)")
+    print(f"consumo:         {consume:.2f}s ({args.updates / consume:,.0f} msg/s)")
+    print(f"snapshot:        {snapshot * 1000:.1f} ms")
+    print(f"erro máx. centróide vs. recálculo: {error:.2e}")
+    print(f"\ntaxa de migração: {report.migration_rate:.2%}; reclusterizar: {report.needs_reclustering}")
+    for cluster_id, reasons in sorted(report.drifted_clusters.items())[:10]:
+        print(f"  cluster {cluster_id}: {', '.join(reasons)}")
+    print(f"maiores fluxos: {report.top_migrations(5)}")
+
+
+if __name__ == "__main__":
+    main()
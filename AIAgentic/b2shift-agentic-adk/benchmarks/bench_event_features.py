@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark das features incrementais de customer_events (streaming.features).
+
+Publica eventos sintéticos de 60 dias em uma InProcessQueue, consome com
+um EventFeatureStore, confere as features contra um groupby do pandas na
+mesma janela e mede o checkpoint.
+
+Uso:
+    python benchmarks/bench_event_features.py [--customers 100000] [--events 2000000]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from b2shift_cluster.streaming.features import (  # noqa: E402
+    EVENT_TYPES, EVENTS_TOPIC, EventFeatureStore, event_records,
+)
+from b2shift_cluster.streaming.queue import InProcessQueue  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift streaming event features benchmark")
+    parser.add_argument("--customers", "-n", type=int, default=100_000)
+    parser.add_argument("--events", "-e", type=int, default=2_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(3)
+    start_time = 1_760_000_000.0
+    timestamps = np.sort(start_time + rng.uniform(0, 60 * 86400, args.events))
+    customers = np.array([f"CUST_{i:06d}" for i in range(args.customers)], dtype=object)
+    customer_ids = customers[rng.zipf(1.3, args.events) % args.customers]
+    event_types = np.asarray(EVENT_TYPES, dtype=object)[
+        rng.choice(len(EVENT_TYPES), args.events, p=[0.5, 0.35, 0.1, 0.05])
+    ]
+    durations = np.where(event_types == "login", rng.lognormal(3, 0.5, args.events), np.nan)
+
+    queue = InProcessQueue()
+    queue.create_subscription(EVENTS_TOPIC, "event-features")
+    start = time.perf_counter()
+    for offset in range(0, args.events, 100_000):
+        window = slice(offset, offset + 100_000)
+        queue.publish_batch(EVENTS_TOPIC, event_records(
+            customer_ids[window], event_types[window], timestamps[window], durations[window]
+        ))
+    publish = time.perf_counter() - start
+
+    store = EventFeatureStore()
+    start = time.perf_counter()
+    processed = 0
+    while processed < args.events:
+        processed += store.consume(queue, "event-features", max_messages=args.batch)
+    consume = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        path = store.save(Path(directory) / "event_features.npz")
+        checkpoint = time.perf_counter() - start
+        start = time.perf_counter()
+        EventFeatureStore.load(path)
+        restore = time.perf_counter() - start
+
+    # Conferência com um groupby na mesma janela de buckets
+    buckets = (timestamps // store.bucket_seconds).astype(np.int64)
+    in_window = buckets > store.head_bucket - store.n_buckets
+    events = pd.DataFrame({"customer_id": customer_ids, "event_type": event_types})[in_window]
+    expected = events[events.event_type == "login"].groupby("customer_id").size() / (store.window_days / 7)
+    features = store.features(expected.index.tolist())
+    error = float(np.abs(features["login_frequency"] - expected.to_numpy()).max())
+
+    print(f"{args.events:,} eventos de {args.customers:,} clientes, janela de {store.window_days:.0f} dias")
+    print(f"publicação:  {publish:.2f}s")
+    print(f"consumo:     {consume:.2f}s ({args.events / consume:,.0f} eventos/s)")
+    print(f"tabela:      {store.nbytes / 1e6:.1f} MB para {store.n_customers:,} clientes")
+    print(f"checkpoint:  {checkpoint * 1000:.0f} ms (restauração {restore * 1000:.0f} ms)")
+    print(f"erro máx. login_frequency vs. groupby: {error:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark da seleção de features e corte de outliers (analytics.feature_selection).
+
+Gera uma matriz com colunas contínuas (parte correlacionada), dummies de
+uma variável categórica e colunas redundantes, e mede cada etapa e o
+efeito da seleção no PCA seguinte.
+
+Uso:
+    python benchmarks/bench_feature_selection.py [--customers 1000000] [--categories 200]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from b2shift_cluster.analytics.decomposition import ReducedPCA  # noqa: E402
+from b2shift_cluster.analytics.feature_selection import (  # noqa: E402
+    column_statistics,
+    iqr_bounds,
+    select_features,
+)
+
+
+def synthetic_matrix(n_rows: int, n_continuous: int, n_categories: int, seed: int = 42) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    continuous = rng.lognormal(0, 1, (n_rows, n_continuous))
+    # Metade das contínuas são combinações quase exatas da outra metade
+    half = n_continuous // 2
+    continuous[:, half:2 * half] = 2 * continuous[:, :half] + 0.001 * rng.normal(size=(n_rows, half))
+
+    categories = rng.integers(0, n_categories, n_rows)
+    dummies = np.zeros((n_rows, n_categories), dtype=np.float32)
+    dummies[np.arange(n_rows), categories] = 1
+    redundant = np.column_stack([dummies[:, 0], 1 - dummies[:, 1], np.zeros(n_rows)])
+    return np.column_stack([continuous, dummies, redundant])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift feature selection benchmark")
+    parser.add_argument("--customers", "-n", type=int, default=1_000_000)
+    parser.add_argument("--continuous", type=int, default=40)
+    parser.add_argument("--categories", type=int, default=100)
+    args = parser.parse_args()
+
+    X = synthetic_matrix(args.customers, args.continuous, args.categories)
+    timings = []
+
+    start = time.perf_counter()
+    stats = column_statistics(X)
+    timings.append(("estatísticas (1 passada)", time.perf_counter() - start))
+
+    start = time.perf_counter()
+    selected, removed = select_features(stats)
+    timings.append(("seleção", time.perf_counter() - start))
+
+    start = time.perf_counter()
+    iqr_bounds(X, stats, columns=selected)
+    timings.append(("limites IQR", time.perf_counter() - start))
+
+    for label, matrix in (("PCA todas as colunas", X), ("PCA colunas selecionadas", X[:, selected])):
+        start = time.perf_counter()
+        ReducedPCA(n_components=0.8).fit(matrix)
+        timings.append((label, time.perf_counter() - start))
+
+    print(f"{args.customers:,} clientes x {X.shape[1]} colunas -> {len(selected)} mantidas "
+          f"({len(removed)} removidas)")
+    print(f"\n{'etapa':<32}{'tempo (s)':>10}")
+    print("-" * 42)
+    for label, elapsed in timings:
+        print(f"{label:<32}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
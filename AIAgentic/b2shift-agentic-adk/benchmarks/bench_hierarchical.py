@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Benchmark da clusterização hierárquica por micro-clusters (analytics.hierarchical).
+
+Mede a super-segmentação, o linkage sobre os resumos e cortes em vários
+níveis do mesmo dendrograma.
+
+Uso:
+    python benchmarks/bench_hierarchical.py [--customers 1000000] [--micro 1000]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from b2shift_cluster.analytics.hierarchical import MicroClusterHierarchy  # noqa: E402
+from bench_neighbors import synthetic_embedding  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift hierarchical clustering benchmark")
+    parser.add_argument("--customers", "-n", type=int, default=1_000_000)
+    parser.add_argument("--dims", "-d", type=int, default=10)
+    parser.add_argument("--micro", type=int, default=1000)
+    parser.add_argument("--linkage", default="ward")
+    parser.add_argument("--levels", type=int, nargs="+", default=[5, 10, 22])
+    args = parser.parse_args()
+
+    X = synthetic_embedding(args.customers, args.dims)
+    hierarchy = MicroClusterHierarchy(n_micro=args.micro, linkage=args.linkage)
+
+    start = time.perf_counter()
+    hierarchy.fit(X)
+    fit = time.perf_counter() - start
+
+    print(f"{args.customers:,} clientes x {args.dims} dims, {hierarchy.n_micro_clusters} micro-clusters, "
+          f"linkage={args.linkage} (ajuste: {fit:.2f}s)")
+    print(f"\n{'corte':<10}{'tempo (ms)':>12}  maiores clusters")
+    print("-" * 60)
+    for n_clusters in args.levels:
+        start = time.perf_counter()
+        hierarchy.cut(n_clusters)
+        elapsed = time.perf_counter() - start
+        sizes = sorted(hierarchy.cluster_sizes(n_clusters).tolist(), reverse=True)[:5]
+        print(f"{n_clusters:<10}{elapsed * 1000:>12.1f}  {sizes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark de tempo de inicialização do B2Shift Customer Clustering Agent.
+
+Cada cenário roda em um processo Python novo (sem cache de módulos), repetido
+algumas vezes, e reporta a mediana do tempo de parede. Cenários que dependem
+do google-adk são marcados como indisponíveis quando o pacote não está
+instalado.
+
+Uso:
+    python benchmarks/bench_import.py [--repeat 5]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+
+SCENARIOS = {
+    "import b2shift_cluster": "import b2shift_cluster",
+    "import models": "from b2shift_cluster.models import CustomerProfile",
+    "cli --help": None,  # executado como módulo, ver run_scenario
+    "build root agent": "import b2shift_cluster; b2shift_cluster.b2shift_root_agent",
+}
+
+
+def run_scenario(code: str) -> float:
+    """
+    Executa um cenário em subprocesso e retorna o tempo de parede em segundos.
+    """
+    if code is None:
+        command = [sys.executable, "-m", "b2shift_cluster.agent", "--help"]
+    else:
+        command = [sys.executable, "-c", code]
+
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=project_root, capture_output=True)
+    elapsed = time.perf_counter() - start
+
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.decode(errors="replace").strip().splitlines()[-1])
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift startup benchmark")
+    parser.add_argument("--repeat", "-r", type=int, default=5,
+                        help="Execuções por cenário")
+    args = parser.parse_args()
+
+    baseline = run_scenario("pass")
+    print(f"{'cenário':<28}{'mediana (ms)':>14}{'- python (ms)':>16}")
+    print("-" * 58)
+
+    for name, code in SCENARIOS.items():
+        try:
+            timings = [run_scenario(code) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{name:<28}{'indisponível':>14}  ({e})")
+            continue
+        median = statistics.median(timings)
+        print(f"{name:<28}{median * 1000:>14.1f}{(median - baseline) * 1000:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark de pertença a clusters (models.membership).
+
+Compara memória e operações de conjunto entre List[str] e ClusterMembership
+para uma base sintética particionada em clusters.
+
+Uso:
+    python benchmarks/bench_membership.py [--customers 2000000] [--clusters 22]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from b2shift_cluster.models.membership import CustomerIdIndex  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift cluster membership benchmark")
+    parser.add_argument("--customers", "-n", type=int, default=2_000_000)
+    parser.add_argument("--clusters", "-k", type=int, default=22)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    ids = np.array([f"CUST_{i:08d}" for i in range(args.customers)], dtype=object)
+    labels = rng.integers(0, args.clusters, args.customers)
+
+    start = time.perf_counter()
+    index = CustomerIdIndex(ids)
+    memberships = index.memberships_from_labels(labels)
+    build = time.perf_counter() - start
+
+    # Lista de strings: 8 bytes por ponteiro + o objeto str de cada ID
+    id_bytes = sys.getsizeof(ids[0])
+    list_bytes = args.customers * (8 + id_bytes)
+    compact_bytes = sum(m.nbytes for m in memberships.values())
+
+    audience = index.membership(ids[rng.choice(args.customers, args.customers // 10, replace=False)])
+    a, b = memberships[0], memberships[1]
+
+    timings = {}
+    for label, operation in [
+        ("união de 2 clusters", lambda: a | b),
+        ("interseção cluster x audiência", lambda: a & audience),
+        ("diferença cluster - audiência", lambda: a - audience),
+        ("união de todos os clusters", lambda: _union_all(memberships.values())),
+        ("decodificar 1 cluster (IDs)", lambda: a.to_ids()),
+    ]:
+        start = time.perf_counter()
+        operation()
+        timings[label] = time.perf_counter() - start
+
+    print(f"{args.customers:,} clientes em {args.clusters} clusters (agrupamento: {build:.2f}s)")
+    print(f"  List[str]:          {list_bytes / 2**20:8.1f} MiB")
+    print(f"  ClusterMembership:  {compact_bytes / 2**20:8.1f} MiB (+ índice compartilhado)")
+    print(f"\n{'operação':<34}{'tempo (ms)':>12}")
+    print("-" * 46)
+    for label, elapsed in timings.items():
+        print(f"{label:<34}{elapsed * 1000:>12.1f}")
+
+
+def _union_all(memberships):
+    memberships = list(memberships)
+    result = memberships[0]
+    for membership in memberships[1:]:
+        result = result | membership
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark das conversões em lote dos modelos B2Shift (models.columnar).
+
+Gera colunas sintéticas de CustomerProfile e mede construção de objetos,
+DataFrame, Arrow e a codificação binária B2SB.
+
+Uso:
+    python benchmarks/bench_models.py [--rows 1000000]
+"""
+
+import argparse
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from b2shift_cluster.models import CustomerProfile  # noqa: E402
+from b2shift_cluster.models import columnar  # noqa: E402
+
+
+def synthetic_customer_columns(n_rows: int, seed: int = 42) -> dict:
+    """
+    Gera colunas sintéticas no formato de ``columnar.to_columns``.
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.array([f"CUST_{i:07d}" for i in range(n_rows)], dtype=object)
+    timestamps = np.datetime64("2024-01-01", "us") + rng.integers(0, 10**12, n_rows).astype("timedelta64[us]")
+
+    def choice(values):
+        return rng.choice(values, n_rows).astype(object)
+
+    def integers(high):
+        return rng.integers(0, high, n_rows)
+
+    return {
+        "customer_id": ids,
+        "company_name": np.array([f"Company {i}" for i in range(n_rows)], dtype=object),
+        "industry": choice(["technology", "manufacturing", "retail", "financial", "healthcare"]),
+        "company_size": choice(["startup", "small", "medium", "large", "enterprise"]),
+        "annual_revenue": rng.lognormal(15, 1, n_rows),
+        "employee_count": integers(5000),
+        "location": choice(["São Paulo, BR", "Rio de Janeiro, BR", "Belo Horizonte, BR"]),
+        "account_age_months": integers(60),
+        "monthly_active_users": integers(1000),
+        "feature_adoption_score": rng.random(n_rows),
+        "support_ticket_count": integers(50),
+        "training_sessions_completed": integers(10),
+        "mrr": rng.lognormal(9, 1, n_rows),
+        "lifetime_value": rng.lognormal(11, 1, n_rows),
+        "churn_risk_score": rng.beta(1, 4, n_rows),
+        "payment_health": choice(["current", "late", "at_risk"]),
+        "login_frequency": rng.random(n_rows) * 10,
+        "session_duration_avg": rng.lognormal(3, 0.5, n_rows),
+        "api_calls_monthly": integers(5000),
+        "integrations_count": integers(10),
+        "created_at": timestamps,
+        "updated_at": timestamps,
+    }
+
+
+@contextmanager
+def timed(label: str, results: list):
+    start = time.perf_counter()
+    yield
+    results.append((label, time.perf_counter() - start))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift bulk model conversion benchmark")
+    parser.add_argument("--rows", "-n", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    columns = synthetic_customer_columns(args.rows)
+    results = []
+
+    with timed("from_columns (objetos)", results):
+        records = columnar.from_columns(CustomerProfile, columns)
+    with timed("to_dataframe", results):
+        df = CustomerProfile.to_dataframe(records)
+    with timed("from_dataframe", results):
+        CustomerProfile.from_dataframe(df)
+    with timed("encode_batch", results):
+        payload = CustomerProfile.encode_batch(records)
+    with timed("decode_columns", results):
+        columnar.decode_columns(payload)
+    with timed("decode_batch (objetos)", results):
+        CustomerProfile.decode_batch(payload)
+    try:
+        with timed("to_arrow", results):
+            CustomerProfile.to_arrow(records)
+    except ImportError:
+        results.pop()
+        results.append(("to_arrow", None))
+
+    print(f"CustomerProfile x {args.rows:,} linhas — payload B2SB: "
+          f"{len(payload) / 2**20:.1f} MiB ({len(payload) / args.rows:.0f} B/linha)")
+    print(f"{'etapa':<28}{'tempo (s)':>12}")
+    print("-" * 40)
+    for label, elapsed in results:
+        print(f"{label:<28}{'indisponível' if elapsed is None else f'{elapsed:.2f}':>12}")
+
+
+if __name__ == "__main__":
+    main()
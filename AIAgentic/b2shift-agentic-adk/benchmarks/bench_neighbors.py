@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark do índice de vizinhos (analytics.neighbors).
+
+Mede construção e um lote de consultas k-NN sobre um embedding sintético
+(clientes em clusters gaussianos no espaço PCA) e o recall do modo
+aproximado contra a busca exata em uma amostra das consultas.
+
+Uso:
+    python benchmarks/bench_neighbors.py [--customers 1000000] [--queries 10000]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from b2shift_cluster.analytics.neighbors import NeighborIndex  # noqa: E402
+
+
+def synthetic_embedding(n_rows: int, n_dims: int, n_clusters: int = 22, seed: int = 42) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 4, (n_clusters, n_dims))
+    labels = rng.integers(0, n_clusters, n_rows)
+    return (centers[labels] + rng.normal(0, 1, (n_rows, n_dims))).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift nearest-neighbour benchmark")
+    parser.add_argument("--customers", "-n", type=int, default=1_000_000)
+    parser.add_argument("--queries", "-q", type=int, default=10_000)
+    parser.add_argument("--dims", "-d", type=int, default=10)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--methods", nargs="+", default=["ivf", "kd_tree"])
+    parser.add_argument("--recall-sample", type=int, default=500)
+    args = parser.parse_args()
+
+    X = synthetic_embedding(args.customers, args.dims)
+    rng = np.random.default_rng(7)
+    Q = X[rng.choice(args.customers, args.queries, replace=False)] + rng.normal(0, 0.1, (args.queries, args.dims))
+
+    # Referência exata em amostra, para o recall
+    sample = Q[:args.recall_sample]
+    _, truth = NeighborIndex(method="brute").fit(X).query(sample, k=args.k)
+
+    print(f"{args.customers:,} clientes x {args.dims} dims, {args.queries:,} consultas, k={args.k}")
+    print(f"\n{'método':<12}{'build (s)':>12}{'consulta (s)':>14}{'recall@k':>10}")
+    print("-" * 48)
+    for method in args.methods:
+        start = time.perf_counter()
+        index = NeighborIndex(method=method).fit(X)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, ind = index.query(Q, k=args.k)
+        elapsed = time.perf_counter() - start
+
+        hits = sum(len(np.intersect1d(found, expected)) for found, expected in zip(ind[:len(sample)], truth))
+        recall = hits / truth.size
+        print(f"{method:<12}{build:>12.2f}{elapsed:>14.2f}{recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark do cache de pré-processamento (analytics.preprocessing).
+
+Compara o pré-processamento completo com a leitura da matriz em cache para
+a mesma configuração, como acontece a cada tentativa de clusterização.
+
+Uso:
+    python benchmarks/bench_preprocessing.py [--customers 1000000] [--features 40]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from b2shift_cluster.analytics.preprocessing import PreprocessingCache  # noqa: E402
+from b2shift_cluster.models import ClusteringConfiguration  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift preprocessing cache benchmark")
+    parser.add_argument("--customers", "-n", type=int, default=1_000_000)
+    parser.add_argument("--features", "-f", type=int, default=40)
+    parser.add_argument("--attempts", type=int, default=5, help="Tentativas de clusterização simuladas")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    X = rng.lognormal(0, 1, (args.customers, args.features))
+    config = ClusteringConfiguration(
+        algorithm="kmeans", features=[f"feature_{i}" for i in range(args.features)]
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = PreprocessingCache(directory)
+        timings = []
+        for attempt in range(args.attempts):
+            start = time.perf_counter()
+            result = cache.preprocess(X, config)
+            np.asarray(result.matrix[:: max(1, args.customers // 1000)]).sum()
+            timings.append((attempt + 1, result.from_cache, time.perf_counter() - start))
+
+        print(f"{args.customers:,} clientes x {args.features} features "
+              f"(cache: {cache.size_bytes / 2**20:.1f} MiB)")
+        print(f"\n{'tentativa':<12}{'origem':<12}{'tempo (s)':>10}")
+        print("-" * 34)
+        for attempt, from_cache, elapsed in timings:
+            print(f"{attempt:<12}{'cache' if from_cache else 'cálculo':<12}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
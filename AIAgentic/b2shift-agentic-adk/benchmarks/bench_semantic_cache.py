@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark do cache semântico do agente principal (runtime.semantic_cache).
+
+Preenche o cache com perguntas sintéticas e mede o tempo de consulta e a
+taxa de acerto para reformulações das mesmas perguntas e para perguntas
+novas (que não devem acertar).
+
+Uso:
+    python benchmarks/bench_semantic_cache.py [--entries 5000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from b2shift_cluster.runtime.semantic_cache import SemanticCache  # noqa: E402
+
+SUBJECTS = ["clusters", "clientes", "segmentos", "contas"]
+QUALIFIERS = ["principais", "de maior churn", "com maior mrr", "em risco", "mais engajados",
+              "com baixa adoção", "do setor de varejo", "enterprise", "smb", "com tickets em alta"]
+FRAMES = [("quais os {s} {q}?", "liste os {s} {q}"), ("mostre os {s} {q}", "quais são os {s} {q}")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift semantic cache benchmark")
+    parser.add_argument("--entries", "-n", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    cache = SemanticCache()
+    stored = []
+    for i in range(args.entries):
+        subject, qualifier = rng.choice(SUBJECTS), rng.choice(QUALIFIERS)
+        asked, rephrased = rng.choice(FRAMES)
+        key = f"{qualifier} no trimestre {i}"
+        cache.store(asked.format(s=subject, q=key), f"resposta {i}")
+        stored.append(rephrased.format(s=subject, q=key))
+
+    cache.lookup(stored[0])  # monta a matriz do escopo
+    start = time.perf_counter()
+    hits = sum(cache.lookup(rng.choice(stored)) is not None for _ in range(args.lookups))
+    repeated = time.perf_counter() - start
+
+    start = time.perf_counter()
+    false_hits = sum(
+        cache.lookup(f"quais os {rng.choice(SUBJECTS)} {rng.choice(QUALIFIERS)} no semestre {i}") is not None
+        for i in range(args.lookups)
+    )
+    novel = time.perf_counter() - start
+
+    print(f"{len(cache):,} entradas")
+    print(f"reformulações: {hits / args.lookups:6.1%} acertos, {repeated / args.lookups * 1000:.2f} ms/consulta")
+    print(f"perguntas novas: {false_hits / args.lookups:6.1%} acertos, {novel / args.lookups * 1000:.2f} ms/consulta")
+
+
+if __name__ == "__main__":
+    main()
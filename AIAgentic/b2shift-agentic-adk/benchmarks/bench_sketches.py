@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark das estatísticas por cluster com sketches (analytics.sketches).
+
+Grava partições sintéticas (cluster, receita, LTV, risco de churn) em disco
+(.parquet com pyarrow, senão .csv), resume em paralelo e compara os quantis
+com ``groupby().quantile`` do pandas sobre os dados completos: erro em
+posição (rank) e erro relativo no valor.
+
+Uso:
+    python benchmarks/bench_sketches.py [--rows 10000000] [--partitions 10] [--jobs 4]
+"""
+
+import argparse
+import importlib.util
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from b2shift_cluster.analytics.sketches import cluster_statistics  # noqa: E402
+
+COLUMNS = ["annual_revenue", "lifetime_value", "churn_risk_score"]
+QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+def synthetic_customers(n_rows: int, n_clusters: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    cluster = rng.integers(0, n_clusters, n_rows)
+    return pd.DataFrame({
+        "cluster_id": cluster,
+        "annual_revenue": rng.lognormal(13 + cluster * 0.3, 1.1),
+        "lifetime_value": rng.pareto(2.5 + cluster * 0.1, n_rows) * 5e4,
+        "churn_risk_score": rng.beta(2, 4 + cluster, n_rows),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift per-cluster sketch benchmark")
+    parser.add_argument("--rows", "-n", type=int, default=10_000_000)
+    parser.add_argument("--clusters", type=int, default=8)
+    parser.add_argument("--partitions", "-p", type=int, default=10)
+    parser.add_argument("--jobs", "-j", type=int, default=None)
+    parser.add_argument("--compression", type=float, default=200)
+    args = parser.parse_args()
+
+    suffix = ".parquet" if importlib.util.find_spec("pyarrow") else ".csv"
+    rows_per_partition = -(-args.rows // args.partitions)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths, frames = [], []
+        for p in range(args.partitions):
+            frame = synthetic_customers(min(rows_per_partition, args.rows - p * rows_per_partition),
+                                        args.clusters, seed=p)
+            path = Path(directory) / f"customers_{p:04d}{suffix}"
+            frame.to_parquet(path) if suffix == ".parquet" else frame.to_csv(path, index=False)
+            paths.append(path)
+            frames.append(frame)
+
+        start = time.perf_counter()
+        sketch = cluster_statistics(paths, COLUMNS, compression=args.compression, n_jobs=args.jobs)
+        elapsed = time.perf_counter() - start
+
+    data = pd.concat(frames, ignore_index=True)
+    start = time.perf_counter()
+    exact = data.groupby("cluster_id")[COLUMNS].quantile(QUANTILES)
+    exact_elapsed = time.perf_counter() - start
+
+    print(f"{sketch.rows:,} linhas em {args.partitions} partições ({suffix}), {args.clusters} clusters")
+    print(f"sketch:  {elapsed:.2f}s ({sketch.rows / elapsed:,.0f} linhas/s, leitura inclusa)")
+    print(f"pandas:  {exact_elapsed:.2f}s (groupby.quantile em memória, sem leitura)")
+    centroids = sum(len(s.centroid_mean) for s in sketch.columns.values())
+    print(f"estado:  {centroids:,} centroides ({centroids * 24 / 1e3:.0f} KB)\n")
+
+    print(f"{'coluna':<18} {'erro rank máx.':>15} {'erro rel. máx. (p5-p95)':>24}")
+    for column in COLUMNS:
+        labels, estimates = sketch.quantiles(column, QUANTILES)
+        rank_error = relative_error = 0.0
+        for position, label in enumerate(labels.tolist()):
+            values = np.sort(data[column].to_numpy()[data["cluster_id"].to_numpy() == label])
+            ranks = np.searchsorted(values, estimates[position]) / len(values)
+            rank_error = max(rank_error, float(np.abs(ranks - QUANTILES).max()))
+            reference = exact.loc[label, column].to_numpy()
+            relative_error = max(relative_error, float(
+                np.abs(estimates[position][1:-1] / reference[1:-1] - 1).max()
+            ))
+        print(f"{column:<18} {rank_error:>15.2e} {relative_error:>24.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos rollups de customer_usage (analytics.usage).
+
+Grava partições sintéticas em disco (.parquet com pyarrow, senão .csv),
+agrega em paralelo e confere uma coluna contra um groupby do pandas na
+primeira partição.
+
+Uso:
+    python benchmarks/bench_usage.py [--rows 10000000] [--partitions 10] [--jobs 4]
+"""
+
+import argparse
+import importlib.util
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from b2shift_cluster.analytics.usage import rollup_usage  # noqa: E402
+
+MODULES = ["ERP", "CRM", "BI", "HR", "Fiscal", "Supply", "Finance", "Retail"]
+METRICS = ["logins", "api_calls", "documents", "transactions", "active_users"]
+
+
+def synthetic_usage(n_rows: int, n_customers: int, as_of: date, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    customers = pd.Categorical.from_codes(
+        rng.integers(0, n_customers, n_rows), [f"CUST_{i:07d}" for i in range(n_customers)]
+    )
+    return pd.DataFrame({
+        "customer_id": customers,
+        "product_module": pd.Categorical.from_codes(rng.integers(0, len(MODULES), n_rows), MODULES),
+        "usage_metric": pd.Categorical.from_codes(rng.integers(0, len(METRICS), n_rows), METRICS),
+        "usage_value": rng.exponential(20, n_rows),
+        "usage_date": np.datetime64(as_of, "D") - rng.integers(0, 120, n_rows).astype("timedelta64[D]"),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift customer_usage rollup benchmark")
+    parser.add_argument("--rows", "-n", type=int, default=10_000_000)
+    parser.add_argument("--customers", type=int, default=200_000)
+    parser.add_argument("--partitions", "-p", type=int, default=10)
+    parser.add_argument("--jobs", "-j", type=int, default=None)
+    args = parser.parse_args()
+
+    as_of = date(2026, 1, 31)
+    suffix = ".parquet" if importlib.util.find_spec("pyarrow") else ".csv"
+    rows_per_partition = -(-args.rows // args.partitions)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for p in range(args.partitions):
+            frame = synthetic_usage(min(rows_per_partition, args.rows - p * rows_per_partition),
+                                    args.customers, as_of, seed=p)
+            path = Path(directory) / f"usage_{p:04d}{suffix}"
+            frame.to_parquet(path) if suffix == ".parquet" else frame.to_csv(path, index=False)
+            paths.append(path)
+        first = synthetic_usage(min(rows_per_partition, args.rows), args.customers, as_of, seed=0)
+
+        start = time.perf_counter()
+        rollup = rollup_usage(paths, as_of=as_of, n_jobs=args.jobs)
+        elapsed = time.perf_counter() - start
+
+        single = rollup_usage([paths[0]], as_of=as_of, n_jobs=1).to_dataframe()
+
+    # Conferência com groupby na primeira partição
+    age = (np.datetime64(as_of, "D") - first["usage_date"].to_numpy().astype("datetime64[D]")).astype(int)
+    window = first[(age >= 0) & (age < 30)]
+    expected = (window[(window.product_module == "ERP") & (window.usage_metric == "logins")]
+                .groupby("customer_id", observed=True).usage_value.sum())
+    error = float(np.abs(single["ERP__logins__30d"].reindex(expected.index) - expected).max())
+
+    print(f"{rollup.rows:,} linhas em {args.partitions} partições ({suffix})")
+    print(f"rollup:  {elapsed:.2f}s ({rollup.rows / elapsed:,.0f} linhas/s)")
+    print(f"matriz:  {rollup.matrix.shape[0]:,} clientes x {rollup.matrix.shape[1]} features "
+          f"({rollup.matrix.nbytes / 1e6:.0f} MB)")
+    print(f"erro máx. ERP__logins__30d vs. groupby: {error:.2e}")
+
+
+if __name__ == "__main__":
+    main()
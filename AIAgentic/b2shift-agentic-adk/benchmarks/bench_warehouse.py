@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark da camada de acesso a dados (data.warehouse) sobre o SQLite local.
+
+Compara uma agregação empurrada para o motor com a extração das linhas
+brutas + groupby no pandas, e mede a resposta do cache por impressão
+digital da consulta.
+
+Uso:
+    python benchmarks/bench_warehouse.py [--customers 1000000]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from b2shift_cluster.data.warehouse import Query, SQLiteSource  # noqa: E402
+
+
+def synthetic_customers(n_customers: int) -> pd.DataFrame:
+    rng = np.random.default_rng(11)
+    return pd.DataFrame({
+        "customer_id": [f"CUST_{i:07d}" for i in range(n_customers)],
+        "company_size": rng.choice(["startup", "small", "medium", "large", "enterprise"], n_customers),
+        "industry": rng.choice(["Manufacturing", "Retail", "Healthcare", "Finance", "Agro"], n_customers),
+        "payment_health": rng.choice(["current", "late", "at_risk"], n_customers, p=[0.8, 0.15, 0.05]),
+        "mrr": rng.lognormal(7, 1, n_customers).round(2),
+        "churn_risk_score": rng.beta(1, 4, n_customers).round(3),
+        "login_frequency": rng.uniform(0, 10, n_customers).round(2),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B2Shift warehouse access benchmark")
+    parser.add_argument("--customers", "-n", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    source = SQLiteSource()
+    start = time.perf_counter()
+    source.load_frame("customers", synthetic_customers(args.customers))
+    load = time.perf_counter() - start
+
+    query = Query(
+        table="customers",
+        group_by=["company_size", "industry"],
+        aggregates={"customers": "count(*)", "mrr_total": "sum(mrr)", "churn_avg": "avg(churn_risk_score)"},
+        filters=[("payment_health", "!=", "current")],
+        order_by=["-mrr_total"],
+    )
+
+    start = time.perf_counter()
+    pushed = source.execute(query, use_cache=False)
+    pushdown = time.perf_counter() - start
+
+    start = time.perf_counter()
+    raw = source.to_pandas(Query(table="customers"), use_cache=False)
+    raw = raw[raw.payment_health != "current"]
+    expected = raw.groupby(["company_size", "industry"]).agg(
+        customers=("customer_id", "size"), mrr_total=("mrr", "sum"), churn_avg=("churn_risk_score", "mean"))
+    pulled = time.perf_counter() - start
+
+    source.execute(query)
+    start = time.perf_counter()
+    source.execute(query)
+    cached = time.perf_counter() - start
+
+    result = pushed.to_pandas().set_index(["company_size", "industry"]).sort_index()
+    error = float(np.abs(result["mrr_total"] - expected.sort_index()["mrr_total"]).max())
+
+    print(f"{args.customers:,} clientes (carga no SQLite: {load:.2f}s)")
+    print(f"agregação no motor:        {pushdown * 1000:8.1f} ms ({pushed.num_rows} linhas, "
+          f"{pushed.nbytes / 1e3:.1f} kB)")
+    print(f"linhas brutas + pandas:    {pulled * 1000:8.1f} ms ({len(raw):,} linhas)")
+    print(f"cache (mesma impressão):   {cached * 1000:8.3f} ms")
+    print(f"erro máx. mrr_total: {error:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,11 @@ Este script demonstra todas as capacidades do agente através de um
 cenário realista de análise de clusterização de clientes B2B TOTVS.
 """
 
+import argparse
 import asyncio
+import json
 import os
 import sys
-import time
 from datetime import datetime
 from pathlib import Path
 
@@ -23,7 +24,173 @@ if not os.getenv("GOOGLE_CLOUD_PROJECT"):
     os.environ["GOOGLE_CLOUD_LOCATION"] = "us-central1"
     os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "0"  # Use ML Dev para demo
 
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
 from b2shift_cluster import b2shift_root_agent
+from b2shift_cluster.runtime import Scenario, get_cascade_stats, run_load_test
+
+APP_NAME = "b2shift_demo"
+
+
+# Consultas dos cenários (também reenviadas pelo modo --load)
+SCENARIOS = [
+    Scenario(
+        name="initial_analysis",
+        title="ANÁLISE INICIAL DE CLUSTERIZAÇÃO",
+        query="""
+    Como cientista de dados da TOTVS, preciso analisar nossa base de clientes B2B 
+    para identificar segmentos estratégicos. Execute uma análise completa de 
+    clusterização que inclua:
+
+    1. Preparação e limpeza dos dados de clientes
+    2. Identificação de clusters comportamentais distintos
+    3. Caracterização detalhada de cada segmento
+    4. Métricas de qualidade da segmentação
+    5. Insights estratégicos preliminares
+
+    Foque em encontrar clusters que sejam:
+    - Homogêneos internamente
+    - Distintos entre si
+    - Acionáveis para estratégias de negócio
+    - Representativos de pelo menos 5% da base
+
+    Contexto: Base de ~10.000 clientes B2B da TOTVS com dados de revenue, 
+    engajamento, uso de produtos e características firmográficas.
+    """,
+    ),
+    Scenario(
+        name="cluster_deep_dive",
+        title="DEEP DIVE - MID-MARKET TECH CLUSTER",
+        query="""
+    Baseado na análise anterior, faça um deep dive no cluster "Mid-Market Tech" 
+    (empresas de médio porte do setor tecnológico). Forneça:
+
+    PERFIL DETALHADO:
+    - Demografia: tamanho, localização, setor específico
+    - Firmographics: revenue range, employee count, growth stage
+    - Comportamento: padrões de uso, engagement, feature adoption
+    - Financeiro: MRR, LTV, payment behavior, churn risk
+
+    ANÁLISE DE NECESSIDADES:
+    - Pain points principais identificados
+    - Drivers de decisão de compra
+    - Ciclo de vida do cliente típico
+    - Fatores de sucesso e risco
+
+    BENCHMARKING:
+    - Como se compara aos outros clusters?
+    - Quais são suas vantagens competitivas?
+    - Onde estão as maiores oportunidades?
+
+    Use dados comportamentais para insights profundos sobre este segmento.
+    """,
+    ),
+    Scenario(
+        name="strategy_generation",
+        title="GERAÇÃO DE ESTRATÉGIAS PERSONALIZADAS",
+        query="""
+    Agora gere uma estratégia completa de go-to-market para cada cluster identificado. 
+    Para cada segmento, defina:
+
+    ESTRATÉGIA DE AQUISIÇÃO:
+    - Canais de marketing mais efetivos
+    - Messaging e value propositions específicas
+    - Táticas de lead generation
+    - Processo de vendas otimizado
+
+    ESTRATÉGIA DE PRODUTO:
+    - Features/módulos mais relevantes
+    - Packaging e bundling ideal
+    - Pricing strategy diferenciada
+    - Roadmap de desenvolvimento
+
+    ESTRATÉGIA DE SUCESSO:
+    - Onboarding personalizado
+    - Suporte e service levels
+    - Programas de expansão/upsell
+    - Métricas de health score
+
+    IMPLEMENTAÇÃO:
+    - Timeline de 90 dias
+    - Recursos necessários
+    - KPIs de acompanhamento
+    - ROI projetado por estratégia
+
+    Priorize estratégias com maior impacto no revenue e retention.
+    """,
+    ),
+    Scenario(
+        name="customer_prediction",
+        title="PREDIÇÃO DE COMPORTAMENTO ESPECÍFICO",
+        query="""
+    Execute uma análise preditiva para um cliente específico:
+
+    PERFIL DO CLIENTE:
+    - TechFlow Solutions (Mid-Market Tech cluster)
+    - Revenue anual: R$ 8.5M 
+    - 180 funcionários
+    - MRR atual: R$ 42K
+    - Account age: 18 meses
+    - Feature adoption: 68%
+    - Churn risk atual: 22%
+    - Últimos 3 meses: -5% MRR growth
+    - Support tickets: +40% vs baseline
+
+    PREDIÇÕES SOLICITADAS (horizonte 6 meses):
+    1. Probabilidade de churn e fatores de risco
+    2. Potencial de expansion/upsell 
+    3. Produtos/features com maior probabilidade de adoção
+    4. Timing ideal para intervenções comerciais
+    5. Ações preventivas para reduzir churn risk
+
+    RECOMMENDATIONS:
+    - Ações imediatas (próximos 30 dias)
+    - Estratégia de médio prazo (3-6 meses)
+    - Métricas para monitoramento
+    - Success criteria para cada intervenção
+
+    Base a análise em padrões do cluster e dados comportamentais.
+    """,
+    ),
+    Scenario(
+        name="optimization",
+        title="OTIMIZAÇÃO BASEADA EM PERFORMANCE",
+        query="""
+    Baseado em dados de performance dos últimos 6 meses, otimize as estratégias:
+
+    PERFORMANCE ATUAL POR CLUSTER:
+    - Enterprise: 12% revenue growth, 94% retention, $180K ACV
+    - Mid-Market Tech: 8% revenue growth, 85% retention, $65K ACV  
+    - SMB Traditional: 4% revenue growth, 76% retention, $28K ACV
+    - Startups: 28% revenue growth, 68% retention, $15K ACV
+    - Government: 6% revenue growth, 92% retention, $120K ACV
+
+    GAPS IDENTIFICADOS:
+    - Mid-Market: underperforming vs potential (+15% esperado)
+    - SMB: alta sensitivity price pressure
+    - Startups: alto growth mas retention baixa
+    - Todos: cross-sell below benchmark
+
+    OTIMIZAÇÕES SOLICITADAS:
+    1. Realocação de recursos entre clusters
+    2. Ajustes nas estratégias de pricing
+    3. Melhorias nos programas de retention
+    4. Otimização do processo de cross-sell
+    5. Implementação de early warning systems
+
+    DELIVERABLES:
+    - Plano de otimização por cluster
+    - Budget reallocation recommendations
+    - Updated KPIs e targets
+    - Implementation roadmap Q1-Q2
+
+    Foque em maximizar ROI total mantendo balance de portfolio.
+    """,
+    ),
+]
 
 
 class B2ShiftDemo:
@@ -58,32 +225,13 @@ class B2ShiftDemo:
             
         # Pausa entre cenários
         print("\n⏸️  Aguardando 3 segundos antes do próximo cenário...")
-        time.sleep(3)
+        await asyncio.sleep(3)
     
     async def scenario_1_initial_analysis(self):
         """
         Cenário 1: Análise inicial de clusterização.
         """
-        query = """
-        Como cientista de dados da TOTVS, preciso analisar nossa base de clientes B2B 
-        para identificar segmentos estratégicos. Execute uma análise completa de 
-        clusterização que inclua:
-
-        1. Preparação e limpeza dos dados de clientes
-        2. Identificação de clusters comportamentais distintos
-        3. Caracterização detalhada de cada segmento
-        4. Métricas de qualidade da segmentação
-        5. Insights estratégicos preliminares
-
-        Foque em encontrar clusters que sejam:
-        - Homogêneos internamente
-        - Distintos entre si
-        - Acionáveis para estratégias de negócio
-        - Representativos de pelo menos 5% da base
-
-        Contexto: Base de ~10.000 clientes B2B da TOTVS com dados de revenue, 
-        engajamento, uso de produtos e características firmográficas.
-        """
+        query = SCENARIOS[0].query
         
         print("🔄 Executando análise inicial de clusterização...")
         response = await self.agent.send_message_async(query)
@@ -97,29 +245,7 @@ class B2ShiftDemo:
         """
         Cenário 2: Análise profunda de um cluster específico.
         """
-        query = """
-        Baseado na análise anterior, faça um deep dive no cluster "Mid-Market Tech" 
-        (empresas de médio porte do setor tecnológico). Forneça:
-
-        PERFIL DETALHADO:
-        - Demografia: tamanho, localização, setor específico
-        - Firmographics: revenue range, employee count, growth stage
-        - Comportamento: padrões de uso, engagement, feature adoption
-        - Financeiro: MRR, LTV, payment behavior, churn risk
-
-        ANÁLISE DE NECESSIDADES:
-        - Pain points principais identificados
-        - Drivers de decisão de compra
-        - Ciclo de vida do cliente típico
-        - Fatores de sucesso e risco
-
-        BENCHMARKING:
-        - Como se compara aos outros clusters?
-        - Quais são suas vantagens competitivas?
-        - Onde estão as maiores oportunidades?
-
-        Use dados comportamentais para insights profundos sobre este segmento.
-        """
+        query = SCENARIOS[1].query
         
         print("🎯 Executando análise profunda do cluster Mid-Market Tech...")
         response = await self.agent.send_message_async(query)
@@ -133,36 +259,7 @@ class B2ShiftDemo:
         """
         Cenário 3: Geração de estratégias personalizadas.
         """
-        query = """
-        Agora gere uma estratégia completa de go-to-market para cada cluster identificado. 
-        Para cada segmento, defina:
-
-        ESTRATÉGIA DE AQUISIÇÃO:
-        - Canais de marketing mais efetivos
-        - Messaging e value propositions específicas
-        - Táticas de lead generation
-        - Processo de vendas otimizado
-
-        ESTRATÉGIA DE PRODUTO:
-        - Features/módulos mais relevantes
-        - Packaging e bundling ideal
-        - Pricing strategy diferenciada
-        - Roadmap de desenvolvimento
-
-        ESTRATÉGIA DE SUCESSO:
-        - Onboarding personalizado
-        - Suporte e service levels
-        - Programas de expansão/upsell
-        - Métricas de health score
-
-        IMPLEMENTAÇÃO:
-        - Timeline de 90 dias
-        - Recursos necessários
-        - KPIs de acompanhamento
-        - ROI projetado por estratégia
-
-        Priorize estratégias com maior impacto no revenue e retention.
-        """
+        query = SCENARIOS[2].query
         
         print("🎯 Gerando estratégias personalizadas por cluster...")
         response = await self.agent.send_message_async(query)
@@ -176,35 +273,7 @@ class B2ShiftDemo:
         """
         Cenário 4: Predição de comportamento específico.
         """
-        query = """
-        Execute uma análise preditiva para um cliente específico:
-
-        PERFIL DO CLIENTE:
-        - TechFlow Solutions (Mid-Market Tech cluster)
-        - Revenue anual: R$ 8.5M 
-        - 180 funcionários
-        - MRR atual: R$ 42K
-        - Account age: 18 meses
-        - Feature adoption: 68%
-        - Churn risk atual: 22%
-        - Últimos 3 meses: -5% MRR growth
-        - Support tickets: +40% vs baseline
-
-        PREDIÇÕES SOLICITADAS (horizonte 6 meses):
-        1. Probabilidade de churn e fatores de risco
-        2. Potencial de expansion/upsell 
-        3. Produtos/features com maior probabilidade de adoção
-        4. Timing ideal para intervenções comerciais
-        5. Ações preventivas para reduzir churn risk
-
-        RECOMMENDATIONS:
-        - Ações imediatas (próximos 30 dias)
-        - Estratégia de médio prazo (3-6 meses)
-        - Métricas para monitoramento
-        - Success criteria para cada intervenção
-
-        Base a análise em padrões do cluster e dados comportamentais.
-        """
+        query = SCENARIOS[3].query
         
         print("🔮 Executando predição de comportamento do cliente...")
         response = await self.agent.send_message_async(query)
@@ -218,37 +287,7 @@ class B2ShiftDemo:
         """
         Cenário 5: Otimização baseada em performance.
         """
-        query = """
-        Baseado em dados de performance dos últimos 6 meses, otimize as estratégias:
-
-        PERFORMANCE ATUAL POR CLUSTER:
-        - Enterprise: 12% revenue growth, 94% retention, $180K ACV
-        - Mid-Market Tech: 8% revenue growth, 85% retention, $65K ACV  
-        - SMB Traditional: 4% revenue growth, 76% retention, $28K ACV
-        - Startups: 28% revenue growth, 68% retention, $15K ACV
-        - Government: 6% revenue growth, 92% retention, $120K ACV
-
-        GAPS IDENTIFICADOS:
-        - Mid-Market: underperforming vs potential (+15% esperado)
-        - SMB: alta sensitivity price pressure
-        - Startups: alto growth mas retention baixa
-        - Todos: cross-sell below benchmark
-
-        OTIMIZAÇÕES SOLICITADAS:
-        1. Realocação de recursos entre clusters
-        2. Ajustes nas estratégias de pricing
-        3. Melhorias nos programas de retention
-        4. Otimização do processo de cross-sell
-        5. Implementação de early warning systems
-
-        DELIVERABLES:
-        - Plano de otimização por cluster
-        - Budget reallocation recommendations
-        - Updated KPIs e targets
-        - Implementation roadmap Q1-Q2
-
-        Foque em maximizar ROI total mantendo balance de portfolio.
-        """
+        query = SCENARIOS[4].query
         
         print("⚡ Executando otimização baseada em performance...")
         response = await self.agent.send_message_async(query)
@@ -269,16 +308,10 @@ class B2ShiftDemo:
         print(f"🎯 Objetivo: Demonstrar capacidades completas de clusterização e decisão")
         print("=" * 100)
         
-        scenarios = [
-            (self.scenario_1_initial_analysis, "ANÁLISE INICIAL DE CLUSTERIZAÇÃO"),
-            (self.scenario_2_cluster_deep_dive, "DEEP DIVE - MID-MARKET TECH CLUSTER"),
-            (self.scenario_3_strategy_generation, "GERAÇÃO DE ESTRATÉGIAS PERSONALIZADAS"),
-            (self.scenario_4_customer_prediction, "PREDIÇÃO DE COMPORTAMENTO ESPECÍFICO"),
-            (self.scenario_5_optimization, "OTIMIZAÇÃO BASEADA EM PERFORMANCE")
-        ]
+        scenarios = [(func, scenario.title) for func, scenario in zip(self.demo_scenarios, SCENARIOS)]
         
         for i, (scenario_func, title) in enumerate(scenarios, 1):
-            print(f"\n🎬 CENÁRIO {i}/5: {title}")
+            print(f"\n🎬 CENÁRIO {i}/{len(scenarios)}: {title}")
             await self.run_scenario(scenario_func, title)
         
         # Resumo final
@@ -310,21 +343,114 @@ class B2ShiftDemo:
         print("📧 Email: fiap-team@totvs.com.br")
         print("📱 GitHub: https://github.com/fiap/b2shift-cluster-agent")
         print("📚 Docs: docs/b2shift_context.md")
+    
+    async def run_load_test(self, users: int, ramp_up: float, iterations: int,
+                            duration: float = None, think_time: float = 0.0,
+                            timeout: float = None, report_path: Path = None):
+        """
+        Reenvia as consultas dos cenários com ``users`` analistas simulados
+        concorrentes e imprime latência, vazão e erros por cenário e por
+        sub-agente.
+        """
+        print("🏋️ B2SHIFT AGENT - TESTE DE CARGA")
+        print("=" * 100)
+        load = f"{duration:.0f}s" if duration else f"{iterations} consultas/usuário"
+        print(f"👥 {users} usuários | rampa de {ramp_up:.0f}s | {load}")
+        print("=" * 100)
+
+        # Uma sessão por usuário simulado, como analistas distintos
+        runner = Runner(agent=self.agent, app_name=APP_NAME,
+                        session_service=InMemorySessionService(),
+                        artifact_service=InMemoryArtifactService())
+        sessions = {}
+
+        async def send(user: int, query: str) -> str:
+            user_id = f"analyst_{user:03d}"
+            if user not in sessions:
+                session = await runner.session_service.create_session(
+                    app_name=APP_NAME, user_id=user_id
+                )
+                sessions[user] = session.id
+            message = types.Content(role="user", parts=[types.Part(text=query)])
+            response = ""
+            async for event in runner.run_async(
+                user_id=user_id, session_id=sessions[user], new_message=message
+            ):
+                if event.is_final_response() and event.content and event.content.parts:
+                    response = "".join(part.text or "" for part in event.content.parts)
+            return response
+
+        def progress(user: int, scenario: Scenario, latency: float, error):
+            status = f"❌ {type(error).__name__}" if error else "✅"
+            print(f"  {status} usuário {user:>3} | {scenario.name:<20} | {latency:6.2f}s")
+
+        report = await run_load_test(
+            send,
+            SCENARIOS,
+            users=users,
+            ramp_up=ramp_up,
+            iterations=iterations,
+            duration=duration,
+            think_time=think_time,
+            timeout=timeout,
+            on_result=progress,
+        )
+
+        print("\n📊 RESULTADO DO TESTE DE CARGA:")
+        print(report.format_table())
+        print(f"\n⏱️  Duração: {report.elapsed:.1f}s")
+
+        cascade = get_cascade_stats().summary()
+        if cascade:
+            print("\n🔀 CASCATA DE MODELOS (rápido → forte):")
+            for agent, stats in cascade.items():
+                calls = stats["calls"]
+                print(f"  {agent:<16} rápido {calls['fast']:>4} | escalado {calls['escalated']:>4} "
+                      f"({stats['escalation_rate']:.0%}) | direto {calls['direct']:>4} "
+                      f"| motivos {stats['escalation_reasons']}")
+        if report_path:
+            payload = {**report.to_dict(), "cascade": cascade}
+            report_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+            print(f"💾 Relatório salvo em {report_path}")
+        return report
 
 
 async def main():
     """
     Função principal da demonstração.
     """
-    
-    # Verificar se é ambiente de demo
-    if len(sys.argv) > 1 and sys.argv[1] == "--quick":
+    parser = argparse.ArgumentParser(description="Demo do B2Shift Customer Clustering Agent")
+    parser.add_argument("--quick", action="store_true", help="Executa apenas o cenário 1")
+    parser.add_argument("--load", action="store_true",
+                        help="Teste de carga: reenvia os cenários com usuários concorrentes")
+    parser.add_argument("--users", "-u", type=int, default=10, help="Analistas simultâneos")
+    parser.add_argument("--ramp-up", type=float, default=30.0,
+                        help="Segundos até todos os usuários estarem ativos")
+    parser.add_argument("--iterations", "-i", type=int, default=5, help="Consultas por usuário")
+    parser.add_argument("--duration", "-d", type=float, default=None,
+                        help="Duração da carga em segundos (substitui --iterations)")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="Pausa de cada usuário entre consultas")
+    parser.add_argument("--timeout", type=float, default=None, help="Limite por consulta (s)")
+    parser.add_argument("--report", type=Path, default=None, help="Salva o relatório em JSON")
+    args = parser.parse_args()
+
+    demo = B2ShiftDemo()
+    if args.quick:
         print("⚡ Modo Quick Demo - Executando versão resumida...\n")
-        demo = B2ShiftDemo()
         await demo.scenario_1_initial_analysis()
+    elif args.load:
+        await demo.run_load_test(
+            users=args.users,
+            ramp_up=args.ramp_up,
+            iterations=args.iterations,
+            duration=args.duration,
+            think_time=args.think_time,
+            timeout=args.timeout,
+            report_path=args.report,
+        )
     else:
         # Demo completa
-        demo = B2ShiftDemo()
         await demo.run_complete_demo()
 
 
@@ -115,6 +115,16 @@ class B2ShiftSetup:
         usage_data.to_csv(usage_file, index=False)
         print(f"  ✅ Dados de uso salvos: {usage_file}")
         
+        # Layout colunar particionado (lido sem reparsear texto)
+        from b2shift_cluster.data.dataset import write_dataset
+
+        write_dataset(customers_data, self.sample_data_dir / "customers",
+                      partition_by=["industry"], mode="overwrite")
+        usage_data["usage_date"] = pd.to_datetime(usage_data["usage_date"])
+        write_dataset(usage_data, self.sample_data_dir / "customer_usage",
+                      partition_by=["product_module"], date_column="usage_date", mode="overwrite")
+        print(f"  ✅ Datasets colunares salvos: {self.sample_data_dir}/customers, customer_usage")
+        
         # Criar resumo dos dados
         self.create_data_summary(customers_data, usage_data)
         
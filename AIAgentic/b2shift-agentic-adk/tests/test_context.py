@@ -0,0 +1,37 @@
+"""
+Testes da janela de contexto do agente principal (runtime.context).
+"""
+
+from google.genai import types
+
+from b2shift_cluster.runtime.context import ContextWindow
+
+
+def make_turn(number):
+    answer = f"resposta {number} " * 200
+    return [
+        types.Content(role="user", parts=[types.Part(text=f"pergunta {number}")]),
+        types.Content(role="model", parts=[types.Part(text=answer)]),
+    ]
+
+
+def test_old_turns_are_summarized_once_per_session(monkeypatch):
+    window = ContextWindow(max_tokens=4_000, recent_turns=2)
+    calls = []
+    summarize = window.summarize_turn
+    monkeypatch.setattr(window, "summarize_turn",
+                        lambda number, turn: calls.append(number) or summarize(number, turn))
+
+    history = []
+    for number in range(1, 9):
+        history.extend(make_turn(number))
+        window.compact(history, session="a")
+    assert sorted(calls) == list(range(1, 7))
+
+    window.compact(history, session="b")
+    assert len(calls) == 6 + 6
+
+    # Outro histórico na mesma posição não reaproveita a linha
+    history[0] = types.Content(role="user", parts=[types.Part(text="pergunta reescrita")])
+    contents, _ = window.compact(history, session="a")
+    assert calls[-1] == 1 and "pergunta reescrita" in contents[0].parts[0].text
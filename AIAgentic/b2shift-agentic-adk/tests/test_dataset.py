@@ -0,0 +1,61 @@
+"""
+Testes do layout colunar particionado (data.dataset).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from b2shift_cluster.data.dataset import write_dataset
+
+
+@pytest.fixture
+def usage(tmp_path):
+    frame = pd.DataFrame({
+        "customer_id": [f"CUST_{i:03d}" for i in range(8)],
+        "region": ["Sul", "Sudeste", "Sul", "Norte", "Sul", None, "Norte", "Sul"],
+        "product_module": ["CRM", "CRM", "ERP", "ERP", "BI", "BI", "BI", "CRM"],
+        "segment": [None, None, None, None, "SMB", "Enterprise", None, None],
+        "mrr": [100.0, np.nan, 300.0, 400.0, np.nan, 600.0, 700.0, 800.0],
+    })
+    dataset = write_dataset(frame, tmp_path / "usage", partition_by=["region"], mode="overwrite")
+    return frame, dataset
+
+
+def expected(frame, column, operator, value):
+    series = frame[column]
+    mask = {
+        "=": lambda: series == value,
+        "!=": lambda: series.notna() & (series != value),
+        "in": lambda: series.isin(value),
+        "between": lambda: series.between(*value),
+    }[operator]()
+    return sorted(frame.loc[mask, "customer_id"])
+
+
+@pytest.mark.parametrize("column, operator, value", [
+    ("segment", "!=", "SMB"),
+    ("segment", "=", "Enterprise"),
+    ("segment", "in", ["SMB", "Enterprise"]),
+    ("segment", "between", ["A", "F"]),
+    ("region", "!=", "Sul"),
+    ("product_module", "!=", "CRM"),
+    ("mrr", "!=", 300.0),
+    ("mrr", "between", [200.0, 700.0]),
+])
+def test_filters_skip_null_strings_and_values(usage, column, operator, value):
+    frame, dataset = usage
+    filters = [(column, operator, value)]
+
+    result = dataset.to_pandas(["customer_id", column], filters=filters)
+    assert sorted(result["customer_id"]) == expected(frame, column, operator, value)
+
+
+def test_all_null_fragments_are_pruned(usage):
+    _, dataset = usage
+    # Só Sul (SMB) e a região nula (Enterprise) têm "segment" preenchido
+    assert sum(fragment.statistics["segment"] is None for fragment in dataset.fragments) == 2
+    for operator, value, fragments in [("!=", "SMB", 1), ("in", ["SMB"], 1), ("between", ["A", "Z"], 2)]:
+        kept = dataset.prune([("segment", operator, value)])
+        assert len(kept) == fragments
+        assert all(fragment.statistics["segment"] is not None for fragment in kept)
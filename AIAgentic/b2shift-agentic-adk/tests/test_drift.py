@@ -0,0 +1,57 @@
+"""
+Testes do monitor de drift em streaming (streaming.drift).
+"""
+
+import numpy as np
+
+from b2shift_cluster.streaming.drift import UNASSIGNED, ClusterDriftMonitor
+
+
+def _vectors(rng, n, d=4):
+    # float32 exato: o monitor guarda os vetores atuais em float32
+    return rng.normal(size=(n, d)).astype(np.float32).astype(np.float64)
+
+
+def _recompute(state, n_slots, d=4):
+    count = np.zeros(n_slots)
+    mean = np.zeros((n_slots, d))
+    m2 = np.zeros((n_slots, d))
+    for slot in range(n_slots):
+        members = np.array([vector for cluster_id, vector in state.values() if cluster_id + 1 == slot])
+        if len(members):
+            count[slot] = len(members)
+            mean[slot] = members.mean(axis=0)
+            m2[slot] = ((members - mean[slot]) ** 2).sum(axis=0)
+    return count, mean, m2
+
+
+def test_apply_matches_full_recompute():
+    rng = np.random.default_rng(7)
+    ids = [f"CUST_{i}" for i in range(60)]
+    labels = rng.integers(0, 3, size=len(ids))
+    vectors = _vectors(rng, len(ids))
+    monitor = ClusterDriftMonitor(np.zeros((3, 4)), np.bincount(labels, minlength=3))
+    monitor.load_state(np.array(ids, dtype=object), labels, vectors)
+    state = {customer_id: (int(label), vector) for customer_id, label, vector in zip(ids, labels, vectors)}
+
+    # Duplicados (vale a última ocorrência), clientes novos, cluster novo e ruído
+    batch_ids = ["CUST_1", "CUST_2", "CUST_1", "NEW_1", "CUST_3", "NEW_2", "NEW_1", "CUST_4"]
+    batch_clusters = np.array([2, 5, 0, 1, UNASSIGNED, 5, 3, 1])
+    batch_vectors = _vectors(rng, len(batch_ids))
+    monitor.apply(batch_ids, batch_clusters, batch_vectors)
+    for customer_id, cluster_id, vector in zip(batch_ids, batch_clusters, batch_vectors):
+        state[customer_id] = (int(cluster_id), vector)
+
+    # Segundo lote esvazia e repovoa clusters já tocados
+    batch_ids = ["NEW_2", "CUST_1", "NEW_1", "CUST_5"]
+    batch_clusters = np.array([0, 5, 3, 5])
+    batch_vectors = _vectors(rng, len(batch_ids))
+    monitor.apply(batch_ids, batch_clusters, batch_vectors)
+    for customer_id, cluster_id, vector in zip(batch_ids, batch_clusters, batch_vectors):
+        state[customer_id] = (int(cluster_id), vector)
+
+    count, mean, m2 = _recompute(state, len(monitor.count))
+    assert monitor.n_clusters == 6
+    np.testing.assert_array_equal(monitor.count, count)
+    np.testing.assert_allclose(monitor.mean, mean, atol=1e-9)
+    np.testing.assert_allclose(monitor.m2, m2, atol=1e-9)
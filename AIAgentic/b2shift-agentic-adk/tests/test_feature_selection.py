@@ -0,0 +1,44 @@
+"""
+Testes dos limites IQR (analytics.feature_selection).
+"""
+
+import numpy as np
+import pytest
+
+from b2shift_cluster.analytics import feature_selection
+from b2shift_cluster.analytics.feature_selection import column_statistics, iqr_bounds
+
+
+def tukey_fences(X, whisker=1.5):
+    fences = []
+    for column in X.T:
+        q1, q3 = np.nanpercentile(column, [25, 75])
+        fences.append((q1 - whisker * (q3 - q1), q3 + whisker * (q3 - q1)))
+    return np.array(fences)
+
+
+def test_heavy_tail_quartiles_are_exact():
+    rng = np.random.default_rng(0)
+    revenue = rng.lognormal(13, 1.5, 300_000)
+    revenue[rng.choice(len(revenue), 10, replace=False)] = 1e12
+    X = revenue[:, None]
+
+    lower, upper = iqr_bounds(X, column_statistics(X))
+
+    np.testing.assert_allclose(np.c_[lower, upper], tukey_fences(X), rtol=1e-12)
+    assert (revenue > upper[0]).mean() > 0.05
+
+
+@pytest.mark.parametrize("exact_rows", [1, 7, 65_536])
+def test_refinement_with_ties_and_nan(monkeypatch, exact_rows):
+    monkeypatch.setattr(feature_selection, "_EXACT_ROWS", exact_rows)
+    rng = np.random.default_rng(1)
+    n_rows = 20_000
+    sparse = np.where(rng.random(n_rows) < 0.6, 0.0, rng.poisson(3, n_rows))
+    missing = rng.normal(size=n_rows)
+    missing[rng.random(n_rows) < 0.3] = np.nan
+    X = np.column_stack([rng.pareto(1.5, n_rows), sparse, missing])
+
+    lower, upper = iqr_bounds(X, column_statistics(X), bins=8)
+
+    np.testing.assert_allclose(np.c_[lower, upper], tukey_fences(X), rtol=1e-12)
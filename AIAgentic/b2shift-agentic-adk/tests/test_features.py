@@ -0,0 +1,35 @@
+"""
+Testes das features de eventos em janela deslizante (streaming.features).
+"""
+
+import numpy as np
+
+from b2shift_cluster.streaming.features import EventFeatureStore
+
+DAY = 86_400
+NOW = 20_000 * DAY + 3_600
+
+
+def test_backfill_of_full_window_enables_overlay():
+    store = EventFeatureStore(window_days=30, bucket_hours=24)
+    # Histórico de 30 dias enviado do mais recente para o mais antigo
+    days = np.arange(30)
+    store.apply(["CUST_1"] * 30, ["login"] * 30, NOW - days * DAY, np.full(30, 12.0))
+
+    assert store.coverage == 1.0
+    profiles = {
+        "customer_id": np.array(["CUST_1", "CUST_2"], dtype=object),
+        "login_frequency": np.array([0.5, 0.5]),
+    }
+    result = store.overlay(profiles)
+    np.testing.assert_allclose(result["login_frequency"], [30 / (30 / 7), 0.5])
+    np.testing.assert_allclose(result["session_duration_avg"][:1], [12.0])
+
+
+def test_partial_history_keeps_batch_features():
+    store = EventFeatureStore(window_days=30, bucket_hours=24)
+    store.apply(["CUST_1"] * 10, ["login"] * 10, NOW - np.arange(10) * DAY)
+
+    assert store.coverage == 10 / 30
+    profiles = {"customer_id": np.array(["CUST_1"], dtype=object), "login_frequency": np.array([0.5])}
+    assert store.overlay(profiles)["login_frequency"].tolist() == [0.5]
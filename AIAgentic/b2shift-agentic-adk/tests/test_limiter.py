@@ -0,0 +1,124 @@
+"""
+Testes do limitador adaptativo e das retentativas (runtime.limiter).
+"""
+
+import asyncio
+
+import pytest
+
+from b2shift_cluster.runtime import limiter as limiter_module
+from b2shift_cluster.runtime.limiter import AdaptiveLimiter, RetryPolicy, limited_stream
+
+
+class Overloaded(Exception):
+    code = 503
+
+
+def _install(monkeypatch, limiter):
+    monkeypatch.setitem(limiter_module._LIMITERS, limiter.name, limiter)
+    return limiter
+
+
+async def _collect(stream):
+    return [item async for item in stream]
+
+
+def test_aimd_increase_and_decrease_with_cooldown():
+    limiter = AdaptiveLimiter("m", rps=0, max_concurrency=8, initial_concurrency=4,
+                              latency_target=1.0, cooldown=60.0)
+    for _ in range(5):
+        limiter.on_success(0.1)
+    assert limiter.limit == 5
+
+    limiter.on_overload()
+    assert limiter.limit == 2
+    limiter.on_overload()
+    limiter.on_success(5.0)  # latência acima do alvo, ainda no cooldown
+    assert limiter.limit == 2
+
+    limiter._last_decrease -= limiter.cooldown
+    limiter.on_success(5.0)
+    assert limiter.limit == 1
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    limiter = AdaptiveLimiter("m", rps=0, max_concurrency=1)
+
+    async def scenario():
+        await limiter._acquire_slot()
+        # Cancelado ainda na fila
+        queued = asyncio.ensure_future(limiter._acquire_slot())
+        await asyncio.sleep(0)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert limiter.in_flight == 1
+
+        # Cancelado depois de a vaga ser concedida, antes do _grant rodar
+        granted = asyncio.ensure_future(limiter._acquire_slot())
+        await asyncio.sleep(0)
+        limiter._release_slot()
+        granted.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await granted
+        await asyncio.sleep(0)
+        assert limiter.in_flight == 0
+
+        await asyncio.wait_for(limiter._acquire_slot(), timeout=1)
+        limiter._release_slot()
+
+    asyncio.run(scenario())
+    assert limiter.in_flight == 0
+    assert limiter.snapshot()["queued"] == 0
+
+
+def test_retry_budget_exhausted(monkeypatch):
+    limiter = _install(monkeypatch, AdaptiveLimiter("budget", rps=0))
+    limiter._retry_tokens = 2.0
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        raise Overloaded()
+        yield
+
+    policy = RetryPolicy(max_retries=10, base_delay=0.0)
+    with pytest.raises(Overloaded):
+        asyncio.run(_collect(limited_stream("budget", failing, policy)))
+    assert len(calls) == 3
+    assert limiter.in_flight == 0
+
+
+def test_no_retry_after_first_item(monkeypatch):
+    _install(monkeypatch, AdaptiveLimiter("partial", rps=0))
+    calls = []
+    received = []
+
+    async def partial():
+        calls.append(1)
+        yield "parcial"
+        raise Overloaded()
+
+    async def consume():
+        async for item in limited_stream("partial", partial, RetryPolicy(base_delay=0.0)):
+            received.append(item)
+
+    with pytest.raises(Overloaded):
+        asyncio.run(consume())
+    assert calls == [1]
+    assert received == ["parcial"]
+
+
+def test_latency_excludes_consumer_time(monkeypatch):
+    limiter = _install(monkeypatch, AdaptiveLimiter("latency", rps=0))
+
+    async def chunks():
+        for index in range(3):
+            yield index
+
+    async def slow_consumer():
+        async for _ in limited_stream("latency", chunks):
+            await asyncio.sleep(0.1)
+
+    asyncio.run(slow_consumer())
+    assert limiter.snapshot()["latency_ewma"] < 0.05
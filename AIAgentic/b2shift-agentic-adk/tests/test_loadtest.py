@@ -0,0 +1,26 @@
+"""
+Testes do gerador de carga (runtime.loadtest).
+"""
+
+import asyncio
+
+from b2shift_cluster.runtime import Scenario, run_load_test
+
+
+def test_throughput_counts_only_successes():
+    scenarios = [Scenario("ok", "OK", "ok"), Scenario("fail", "Falha", "fail")]
+    seen = []
+
+    async def send(user, query):
+        seen.append((user, query))
+        if query == "fail":
+            raise RuntimeError(query)
+
+    report = asyncio.run(run_load_test(send, scenarios, users=2, iterations=2))
+
+    assert sorted(seen) == [(0, "fail"), (0, "ok"), (1, "fail"), (1, "ok")]
+    total = report.total
+    assert (total.calls, total.successes, total.error_count) == (4, 2, 2)
+    summary = total.summary(2.0)
+    assert (summary["throughput_per_s"], summary["attempts_per_s"]) == (1.0, 2.0)
+    assert "tent./s" in report.format_table()
@@ -0,0 +1,49 @@
+"""
+Testes do formato B2SR (models.report_io).
+"""
+
+from b2shift_cluster.models import ClusterResult
+from b2shift_cluster.models.membership import CustomerIdIndex
+from b2shift_cluster.models.report_io import ReportReader, ReportWriter
+
+
+def make_cluster(cluster_id, customer_ids):
+    return ClusterResult(
+        cluster_id=cluster_id, cluster_name=f"Cluster {cluster_id}", cluster_description="",
+        size=len(customer_ids), percentage_of_total=50.0, typical_profile={},
+        key_characteristics=[], avg_revenue=1.0, avg_ltv=2.0, avg_churn_risk=0.1,
+        retention_rate=0.9, intra_cluster_distance=0.5, silhouette_score=0.4,
+        customer_ids=customer_ids,
+    )
+
+
+def test_writer_does_not_mutate_caller_index(tmp_path):
+    index = CustomerIdIndex(["A", "B", "C"])
+    members = index.membership(["A", "C"])
+
+    with ReportWriter(tmp_path / "r.b2sr", index=index) as writer:
+        writer.write_cluster(make_cluster(0, members))
+        writer.write_cluster(make_cluster(1, ["B", "NEW"]))
+
+    assert index.ids.tolist() == ["A", "B", "C"]
+    assert "NEW" not in index
+
+    reader = ReportReader(tmp_path / "r.b2sr")
+    assert reader.load_cluster(0).customer_ids.to_ids() == ["A", "C"]
+    assert reader.load_cluster(1).customer_ids.to_ids() == ["B", "NEW"]
+
+
+def test_load_membership_does_not_decode_index(tmp_path):
+    ids = [f"CUST_{i:05d}" for i in range(1000)]
+    with ReportWriter(tmp_path / "r.b2sr") as writer:
+        writer.write_cluster(make_cluster(0, ids[:10]))
+        writer.write_cluster(make_cluster(1, ids[10:]))
+
+    reader = ReportReader(tmp_path / "r.b2sr")
+    sparse, dense = reader.load_membership(0), reader.load_membership(1)
+    assert (len(sparse), len(dense)) == (10, 990)
+    assert (sparse | dense).indices.tolist() == list(range(1000))
+    assert reader.customer_index._ids is None
+
+    assert sparse.to_ids() == ids[:10]
+    assert "CUST_00500" in dense
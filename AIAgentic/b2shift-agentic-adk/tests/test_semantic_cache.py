@@ -0,0 +1,53 @@
+"""
+Testes do cache semântico (runtime.semantic_cache).
+"""
+
+import pandas as pd
+import pytest
+
+from b2shift_cluster.data.warehouse import SQLiteSource
+from b2shift_cluster.runtime.semantic_cache import SemanticCache, cache_scope, is_contextual
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("clientes que usam CRM mas não ERP", "clientes que usam ERP mas não CRM"),
+    ("clientes que migraram de CRM para ERP", "clientes que migraram de ERP para CRM"),
+    ("clientes com receita acima de 1 milhão", "clientes com receita abaixo de 1 milhão"),
+    ("clusters mais rentáveis", "clusters menos rentáveis"),
+    ("clientes para ERP", "clientes de ERP"),
+])
+def test_swapped_operands_are_not_served(stored, asked):
+    cache = SemanticCache()
+    assert cache.store(stored, "resposta")
+    assert cache.lookup(asked) is None
+    assert cache.lookup(stored).answer == "resposta"
+
+
+def test_rephrased_question_is_served():
+    cache = SemanticCache()
+    cache.store("quais os principais clusters?", "resposta")
+    hit = cache.lookup("liste os clusters principais")
+    assert hit is not None and hit.similarity >= cache.threshold
+
+
+@pytest.mark.parametrize("query, contextual", [
+    ("clientes com receita acima de 1 milhão", False),
+    ("contas com churn abaixo do limite", False),
+    ("clusters with churn above 10%", False),
+    ("detalhe o cluster acima", True),
+    ("refaça a análise anterior", True),
+    ("quais as estratégias para esse segmento?", True),
+])
+def test_only_conversation_references_are_contextual(query, contextual):
+    assert is_contextual(query) is contextual
+    assert SemanticCache().store(query, "resposta") is not contextual
+
+
+def test_warehouse_write_changes_scope():
+    cache = SemanticCache()
+    cache.store("quais contas têm baixa confiança?", "CUST_1", cache_scope())
+    assert cache.lookup("quais contas têm baixa confiança?", cache_scope()) is not None
+
+    frame = pd.DataFrame({"customer_id": ["CUST_2"], "cluster_confidence": [0.1]})
+    SQLiteSource(use_cache=False).load_frame("customer_clusters", frame)
+    assert cache.lookup("quais contas têm baixa confiança?", cache_scope()) is None
@@ -0,0 +1,44 @@
+"""
+Testes da coalescência de pedidos em voo (runtime.singleflight).
+"""
+
+import asyncio
+
+from b2shift_cluster.runtime.singleflight import coalesce
+
+
+def test_sessions_share_one_execution(monkeypatch):
+    monkeypatch.setenv("B2SHIFT_DATA_VERSION", "v1")
+    calls = []
+
+    async def run():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "análise", {"cluster_agent_state": 1}
+
+    async def sessions():
+        same = [coalesce("cluster_agent", request, run)
+                for request in ("Segmente a base.", "segmente  a base", "Segmente a base")]
+        return await asyncio.gather(*same)
+
+    results = asyncio.run(sessions())
+    assert len(calls) == 1
+    assert results == [("análise", {"cluster_agent_state": 1})] * 3
+
+
+def test_new_data_version_does_not_coalesce(monkeypatch):
+    calls = []
+
+    async def run():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+
+    async def versions():
+        monkeypatch.setenv("B2SHIFT_DATA_VERSION", "v1")
+        first = asyncio.ensure_future(coalesce("cluster_agent", "segmente", run))
+        await asyncio.sleep(0)
+        monkeypatch.setenv("B2SHIFT_DATA_VERSION", "v2")
+        await asyncio.gather(first, coalesce("cluster_agent", "segmente", run))
+
+    asyncio.run(versions())
+    assert len(calls) == 2
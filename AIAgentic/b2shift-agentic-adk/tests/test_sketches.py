@@ -0,0 +1,35 @@
+"""
+Testes dos sketches por cluster (analytics.sketches).
+"""
+
+import numpy as np
+import pytest
+
+from b2shift_cluster.analytics.sketches import cluster_statistics
+
+
+def test_group_with_only_nan():
+    sketch = cluster_statistics([{"cluster_id": [0, 0, 1], "mrr": [1.0, 2.0, np.nan]}], ["mrr"], n_jobs=1)
+
+    column = sketch.columns["mrr"]
+    assert column.count.tolist() == [2, 0]
+    np.testing.assert_array_equal(column.minimum, [1.0, np.nan])
+    np.testing.assert_array_equal(column.maximum, [2.0, np.nan])
+    assert list(sketch.describe()) == [0]
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_empty_groups_across_partitions(n_jobs):
+    partitions = [
+        {"cluster_id": [0, 0, 0, 1], "mrr": [10.0, 20.0, 30.0, 600.0]},
+        {"cluster_id": [2, 0, 1, 1], "mrr": [7.0, np.nan, 500.0, 400.0]},
+        {"cluster_id": [0, 1, 2], "mrr": [np.nan, np.nan, 9.0]},
+    ]
+    sketch = cluster_statistics(partitions, ["mrr"], n_jobs=n_jobs)
+
+    profile = sketch.describe(quantiles=[0.5, 0.95])
+    for label, values in {0: [10, 20, 30], 1: [600, 500, 400], 2: [7, 9]}.items():
+        stats = profile[label]["mrr"]
+        assert stats["count"] == len(values)
+        assert (stats["min"], stats["max"]) == (min(values), max(values))
+        assert min(values) <= stats["p50"] <= stats["p95"] <= max(values)
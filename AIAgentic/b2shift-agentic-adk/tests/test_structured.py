@@ -0,0 +1,40 @@
+"""
+Testes das saídas estruturadas dos sub-agentes (models.structured).
+"""
+
+import json
+
+from b2shift_cluster.models import BusinessStrategy, ClusterResult
+from b2shift_cluster.models.structured import (
+    ClusterAnalysis,
+    StrategyPlan,
+    decode_records,
+    encode_records,
+)
+
+CLUSTER = {
+    "cluster_id": 0, "cluster_name": "Mid-Market Tech", "cluster_description": "SaaS em expansão",
+    "size": 120, "percentage_of_total": 40.0,
+    "typical_profile": [{"feature": "setor", "value": "tecnologia"}],
+    "key_characteristics": ["alto engajamento"], "avg_revenue": 1.5e6, "avg_ltv": 4.2e5,
+    "avg_churn_risk": 0.12, "retention_rate": 0.9, "intra_cluster_distance": 0.8,
+    "silhouette_score": 0.41,
+}
+
+
+def test_cluster_results_round_trip_through_state():
+    text = "Análise concluída.\n```json\n" + json.dumps({
+        "algorithm": "kmeans", "n_clusters": 1, "silhouette_score": 0.41, "clusters": [CLUSTER],
+    }) + "\n```"
+    results = ClusterAnalysis.parse(text).results()
+
+    value = encode_records(ClusterResult, results)
+    assert isinstance(value, str) and json.dumps(value)
+    restored = decode_records(ClusterResult, value)
+    assert restored == results
+    assert restored[0].typical_profile == {"setor": "tecnologia"}
+
+
+def test_empty_strategy_plan_round_trip():
+    plan = StrategyPlan.parse({"strategies": [], "summary": "sem ações"})
+    assert decode_records(BusinessStrategy, encode_records(BusinessStrategy, plan.strategies)) == []
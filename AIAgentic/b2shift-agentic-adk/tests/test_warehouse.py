@@ -0,0 +1,34 @@
+"""
+Testes da camada de acesso ao warehouse (data.warehouse).
+"""
+
+import pandas as pd
+import pytest
+
+from b2shift_cluster.data.warehouse import PROJECT_ROOT, Query, SQLiteSource, sample_data_dir
+
+pa = pytest.importorskip("pyarrow")
+
+
+def test_batches_share_schema_when_first_batch_is_all_null():
+    rows = 70_000
+    churn = [None] * 66_000 + ["2026-09-30"] * (rows - 66_000)
+    frame = pd.DataFrame({"customer_id": [f"CUST_{i:06d}" for i in range(rows)], "churn_date": churn})
+    source = SQLiteSource(use_cache=False)
+    source.load_frame("customers", frame)
+
+    query = Query("customers", columns=["customer_id", "churn_date"])
+    schemas = {batch.schema for batch in source.iter_batches(query)}
+    assert len(schemas) == 1 and schemas.pop().field("churn_date").type == pa.string()
+
+    table = source.execute(query, use_cache=False)
+    assert table.num_rows == rows
+    assert table.column("churn_date").null_count == 66_000
+
+
+def test_sample_data_dir_ignores_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("B2SHIFT_SAMPLE_DATA_DIR", raising=False)
+    assert sample_data_dir() == PROJECT_ROOT / "data" / "sample"
+    monkeypatch.setenv("B2SHIFT_SAMPLE_DATA_DIR", str(tmp_path))
+    assert sample_data_dir() == tmp_path